@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from ..database.database import get_db
-from ..database.models import Website, Email, ScrapingQueue, ScrapingSession, ScrapingLog
+from ..database.models import Website, Email, ScrapingQueue, ScrapingSession, ScrapingLog, ScrapingStats
 from ..core.exceptions_new import NotFoundException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -296,6 +296,62 @@ async def get_realtime_stats(db: Session = Depends(get_db)):
     except Exception as e:
         raise e
 
+@router.get("/telemetry", response_model=List[Dict[str, Any]])
+async def get_crawl_telemetry(
+    session_id: Optional[str] = Query(None, description="Sesión de scraping"),
+    domain: Optional[str] = Query(None, description="Limitar la telemetría a este dominio"),
+    limit: int = Query(10, ge=1, le=100, description="Número máximo de sesiones"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene la última instantánea de telemetría del crawl de cada sesión.
+
+    Los workers guardan periódicamente en ``ScrapingStats`` los contadores e
+    histogramas por dominio de ``MonitoringMiddleware`` (latencia, tamaño y
+    códigos de estado), así que durante un crawl la respuesta tiene como mucho
+    ``TELEMETRY_SNAPSHOT_INTERVAL`` segundos de retraso.
+
+    - **session_id**: Sesión de scraping (por defecto las más recientes)
+    - **domain**: Dominio para filtrar el desglose por dominio
+    - **limit**: Número máximo de sesiones
+    """
+    query = db.query(ScrapingStats).filter(
+        ScrapingStats.extra_metadata.like('%"source": "telemetry"%')
+    )
+    if session_id:
+        query = query.filter(ScrapingStats.session_id == session_id)
+
+    snapshots = []
+    seen_sessions = set()
+    # Las instantáneas más recientes primero; una por sesión
+    for stats in query.order_by(ScrapingStats.id.desc()).limit(limit * 50):
+        if stats.session_id in seen_sessions:
+            continue
+        seen_sessions.add(stats.session_id)
+
+        telemetry = json.loads(stats.domain_stats or '{}')
+        metadata = json.loads(stats.extra_metadata or '{}')
+        domains = telemetry.get('domains', {})
+        if domain:
+            domains = {name: values for name, values in domains.items() if name == domain}
+
+        snapshots.append({
+            "session_id": stats.session_id,
+            "job_id": metadata.get('job_id'),
+            "final": metadata.get('final', False),
+            "timestamp": stats.timestamp.isoformat() if stats.timestamp else None,
+            "urls_per_minute": stats.urls_per_minute,
+            "success_rate": stats.success_rate,
+            "totals": telemetry.get('totals', {}),
+            "domains": domains
+        })
+        if len(snapshots) >= limit:
+            break
+
+    if session_id and not snapshots:
+        raise NotFoundException("Telemetría", identifier=session_id)
+    return snapshots
+
 @router.get("/domain/{domain}", response_model=Dict[str, Any])
 async def get_domain_stats(domain: str, db: Session = Depends(get_db)):
     """
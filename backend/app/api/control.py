@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from ..database.database import get_db
 from ..database.models import ScrapingQueue
 from ..core.exceptions_new import NotFoundException, ValidationException
+from ..scraper.job_control import send_job_command, broadcast_job_command, resume_job_process
 from pydantic import BaseModel
 from typing import List
 import uuid
@@ -55,6 +56,7 @@ async def stop_job(job_id: str, db: Session = Depends(get_db)):
         # Actualizar el estado a 'cancelled'
         queue_item.status = "cancelled"
         db.commit()
+        send_job_command(job_id, "cancel")
         
         return JobActionResponse(
             job_id=job_id,
@@ -92,6 +94,7 @@ async def pause_job(job_id: str, db: Session = Depends(get_db)):
         # Actualizar el estado a 'paused'
         queue_item.status = "paused"
         db.commit()
+        send_job_command(job_id, "pause")
         
         return JobActionResponse(
             job_id=job_id,
@@ -126,8 +129,8 @@ async def resume_job(job_id: str, db: Session = Depends(get_db)):
         if queue_item.status != "paused":
             raise ValidationException(f"No se puede reanudar un job en estado '{queue_item.status}'", field="status")
         
-        # Actualizar el estado a 'pending' para que se procese
-        queue_item.status = "pending"
+        # Reanudar el proceso en ejecución o devolver el job a la cola ('pending')
+        queue_item.status = resume_job_process(job_id)
         db.commit()
         
         return JobActionResponse(
@@ -156,6 +159,7 @@ async def stop_all_jobs(db: Session = Depends(get_db)):
             synchronize_session=False
         )
         db.commit()
+        broadcast_job_command("cancel")
         
         return BulkJobActionResponse(
             success_count=stopped_count,
@@ -187,6 +191,7 @@ async def pause_all_jobs(db: Session = Depends(get_db)):
             synchronize_session=False
         )
         db.commit()
+        broadcast_job_command("pause")
         
         return BulkJobActionResponse(
             success_count=paused_count,
@@ -209,14 +214,10 @@ async def resume_all_jobs(db: Session = Depends(get_db)):
     """
     try:
         # Reanudar todos los jobs en estado 'paused'
-        resumed_count = db.query(ScrapingQueue).filter(
-            ScrapingQueue.status == "paused"
-        ).update(
-            {
-                ScrapingQueue.status: "pending"
-            },
-            synchronize_session=False
-        )
+        paused_items = db.query(ScrapingQueue).filter(ScrapingQueue.status == "paused").all()
+        for queue_item in paused_items:
+            queue_item.status = resume_job_process(queue_item.job_id)
+        resumed_count = len(paused_items)
         db.commit()
         
         return BulkJobActionResponse(
@@ -273,6 +274,7 @@ async def bulk_stop_jobs(request: BulkJobActionRequest, db: Session = Depends(ge
                 # Actualizar el estado a 'cancelled'
                 queue_item.status = "cancelled"
                 db.commit()
+                send_job_command(job_id, "cancel")
                 
                 details.append(JobActionResponse(
                     job_id=job_id,
@@ -339,6 +341,7 @@ async def bulk_pause_jobs(request: BulkJobActionRequest, db: Session = Depends(g
                 # Actualizar el estado a 'paused'
                 queue_item.status = "paused"
                 db.commit()
+                send_job_command(job_id, "pause")
                 
                 details.append(JobActionResponse(
                     job_id=job_id,
@@ -402,8 +405,8 @@ async def bulk_resume_jobs(request: BulkJobActionRequest, db: Session = Depends(
                     failed_count += 1
                     continue
                 
-                # Actualizar el estado a 'pending'
-                queue_item.status = "pending"
+                # Reanudar el proceso en ejecución o devolver el job a la cola
+                queue_item.status = resume_job_process(job_id)
                 db.commit()
                 
                 details.append(JobActionResponse(
@@ -4,7 +4,7 @@ Endpoints para gestión de trabajos de scraping.
 
 import uuid
 from typing import Dict, Any
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from fastapi import APIRouter, BackgroundTasks, Depends
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
@@ -13,6 +13,11 @@ from sqlalchemy.sql import func
 from ..database.database import get_db
 from ..database.models import ScrapingQueue, ScrapingLog
 from ..scraper.run_scraper import run_scraper
+from ..scraper.job_control import send_job_command, broadcast_job_command, resume_job_process
+from ..scraper.worker import notify_workers
+from ..scraper.dispatcher import registered_domain
+from ..scraper.freshness import cached_leads, completed_depth, get_freshness_estimator, host_stats
+from ..core.config import settings
 from ..core.exceptions_new import (
     DatabaseException,
     ScrapingException,
@@ -29,6 +34,15 @@ class JobConfig(BaseModel):
     depth: int = Field(3, description="Profundidad máxima de scraping", ge=1, le=10)
     languages: list[str] = Field(["es", "en"], description="Idiomas a buscar")
     delay: float = Field(2.0, description="Delay entre requests", ge=0.1, le=10.0)
+    priority: int = Field(0, description="Prioridad del job en la cola", ge=0, le=10)
+    force: bool = Field(False, description="Rastrear el dominio completo aunque esté fresco")
+
+
+class CachedLead(BaseModel):
+    """Lead ya guardado de un dominio rastreado."""
+    email: str
+    url: str
+    quality_score: int
 
 
 class JobResponse(BaseModel):
@@ -36,6 +50,7 @@ class JobResponse(BaseModel):
     job_id: str
     status: str
     message: str
+    cached_leads: list[CachedLead] = Field(default_factory=list, description="Leads guardados del dominio")
 
 
 class JobStatus(BaseModel):
@@ -92,6 +107,12 @@ async def create_job(
     - **depth**: Profundidad máxima de scraping (1-10)
     - **languages**: Lista de idiomas a buscar
     - **delay**: Delay entre requests en segundos
+    - **priority**: Prioridad en la cola (0-10, mayor primero)
+    - **force**: Crawl completo aunque el dominio se haya rastreado hace poco
+
+    Si el último job completado del dominio llegó al menos a ``depth`` y el
+    dominio sigue fresco se devuelven sus leads guardados sin rastrearlo; si
+    caducó se encola como recrawl incremental. Si no, se rastrea completo.
     """
     # Validar que la URL no esté vacía
     if not config.start_url:
@@ -111,6 +132,39 @@ async def create_job(
         import uuid
         job_id = str(uuid.uuid4())[:8]  # ID corto único
         
+        # Historial del dominio: leads en caché en lugar de un crawl completo
+        host = urlparse(config.start_url).netloc.lower()
+        domain_stats = None
+        if settings.FRESHNESS_ENABLED and not config.force:
+            domain_stats = host_stats(db, host)
+        leads = cached_leads(db, host, settings.FRESHNESS_CACHED_LEADS) if domain_stats else []
+        # Solo un crawl anterior igual de profundo sustituye al que se pide
+        covered_depth = completed_depth(db, config.start_url) if domain_stats else None
+        covered = covered_depth is not None and covered_depth >= config.depth
+
+        estimator = get_freshness_estimator()
+        if covered and estimator.is_fresh(domain_stats):
+            db.add(ScrapingQueue(
+                job_id=job_id,
+                url=config.start_url,
+                domain=registered_domain(config.start_url),
+                priority=config.priority,
+                depth_level=0,
+                max_depth=config.depth,
+                status="completed",
+                attempts=0,
+                progress=100
+            ))
+            db.commit()
+            fresh_until = estimator.fresh_until(domain_stats)
+            return JobResponse(
+                job_id=job_id,
+                status="fresh",
+                message=f"Domain crawled recently and fresh until {fresh_until:%Y-%m-%d %H:%M} UTC: "
+                        f"returning {len(leads)} cached leads.",
+                cached_leads=leads
+            )
+
         existing_queue_item = db.query(ScrapingQueue).filter_by(job_id=job_id).first()
         
         if existing_queue_item:
@@ -118,6 +172,7 @@ async def create_job(
             if existing_queue_item.status in ["failed", "completed"]:
                 existing_queue_item.status = "pending"
                 existing_queue_item.attempts = 0
+                existing_queue_item.max_depth = config.depth
                 db.commit()
                 queue_item = existing_queue_item
             else:
@@ -128,18 +183,32 @@ async def create_job(
             queue_item = ScrapingQueue(
                 job_id=job_id,
                 url=config.start_url,
-                priority=0,
+                domain=registered_domain(config.start_url),
+                priority=config.priority,
                 depth_level=0,
+                max_depth=config.depth,
                 status="pending",
-                attempts=0
+                attempts=0,
+                # Dominio ya rastreado a esta profundidad pero caducado: solo se descargan las páginas cambiadas
+                recrawl=1 if covered else 0
             )
             db.add(queue_item)
             db.commit()
             db.refresh(queue_item)
 
-        # Iniciar el scraper en background
-        background_tasks.add_task(run_scraper, job_id, config.start_url, config.depth)
+        # Los workers reclaman el job de la cola; sin pool, un subproceso por job
+        if settings.SCRAPER_WORKERS > 0:
+            notify_workers()
+        else:
+            background_tasks.add_task(run_scraper, job_id, config.start_url, config.depth, bool(queue_item.recrawl))
 
+        if domain_stats:
+            return JobResponse(
+                job_id=job_id,
+                status="starting",
+                message=f"Incremental recrawl started: returning {len(leads)} cached leads meanwhile.",
+                cached_leads=leads
+            )
         return JobResponse(
             job_id=job_id,
             status="starting",
@@ -226,6 +295,9 @@ async def pause_job(job_id: str, db: Session = Depends(get_db)):
         queue_item.status = "paused"
         queue_item.updated_at = func.now()
         db.commit()
+
+        # Notificar al proceso de scraping en ejecución (si lo hay)
+        send_job_command(decoded_job_id, "pause")
         
         return JobResponse(
             job_id=decoded_job_id,
@@ -266,8 +338,8 @@ async def resume_job(job_id: str, db: Session = Depends(get_db)):
         if queue_item.status != "paused":
             raise ValidationException(f"No se puede reanudar un job en estado '{queue_item.status}'", field="status")
         
-        # Actualizar el estado a 'pending' para que se procese
-        queue_item.status = "pending"
+        # Reanudar el proceso en ejecución o devolver el job a la cola ('pending')
+        queue_item.status = resume_job_process(decoded_job_id)
         queue_item.updated_at = func.now()
         db.commit()
         
@@ -310,6 +382,9 @@ async def cancel_job(job_id: str, db: Session = Depends(get_db)):
         queue_item.status = "cancelled"
         queue_item.updated_at = func.now()
         db.commit()
+
+        # Notificar al proceso de scraping en ejecución (si lo hay)
+        send_job_command(decoded_job_id, "cancel")
         
         return JobResponse(
             job_id=decoded_job_id,
@@ -391,6 +466,7 @@ async def pause_all_jobs(db: Session = Depends(get_db)):
             synchronize_session=False
         )
         db.commit()
+        broadcast_job_command("pause")
         
         return JobResponse(
             job_id="all",
@@ -412,15 +488,11 @@ async def resume_all_jobs(db: Session = Depends(get_db)):
     """
     try:
         # Reanudar todos los jobs en estado 'paused'
-        resumed_count = db.query(ScrapingQueue).filter(
-            ScrapingQueue.status == "paused"
-        ).update(
-            {
-                ScrapingQueue.status: "pending",
-                ScrapingQueue.updated_at: func.now()
-            },
-            synchronize_session=False
-        )
+        paused_items = db.query(ScrapingQueue).filter(ScrapingQueue.status == "paused").all()
+        for queue_item in paused_items:
+            queue_item.status = resume_job_process(queue_item.job_id)
+            queue_item.updated_at = func.now()
+        resumed_count = len(paused_items)
         db.commit()
         
         return JobResponse(
@@ -453,6 +525,7 @@ async def cancel_all_active_jobs(db: Session = Depends(get_db)):
             synchronize_session=False
         )
         db.commit()
+        broadcast_job_command("cancel")
         
         return JobResponse(
             job_id="all",
@@ -31,6 +31,20 @@ class Settings(BaseSettings):
     CONCURRENT_REQUESTS: int = config.scrapy_settings.get("CONCURRENT_REQUESTS", 16)
     CONCURRENT_REQUESTS_PER_DOMAIN: int = config.scrapy_settings.get("CONCURRENT_REQUESTS_PER_DOMAIN", 8)
 
+    # Pool de workers de scraping (0 = un subproceso scrapy por job)
+    SCRAPER_WORKERS: int = 2
+    SCRAPER_WORKER_CONCURRENCY: int = 4
+    SCRAPER_WORKER_POLL_INTERVAL: float = 2.0
+    SCRAPER_MAX_ACTIVE_JOBS: int = 16  # Límite global de jobs en ejecución (0 = sin límite)
+    SCRAPER_MAX_JOBS_PER_DOMAIN: int = 2  # Límite de jobs simultáneos por dominio registrado
+    SCRAPER_JOB_LEASE_SECONDS: int = 300  # Sin latido en este tiempo, un job en 'processing' se reencola (0 = nunca)
+
+    # Frescura de los dominios rastreados (app/scraper/freshness.py)
+    FRESHNESS_ENABLED: bool = True  # Leads en caché / recrawl para dominios ya rastreados
+    FRESHNESS_MAX_STALENESS: float = 0.2  # Fracción esperada de páginas cambiadas que caduca un dominio
+    FRESHNESS_DEFAULT_CHANGE_DAYS: float = 30.0  # Días entre cambios supuestos sin historial de revisitas
+    FRESHNESS_CACHED_LEADS: int = 100  # Leads devueltos al crear un job sobre un dominio fresco
+
     # Configuración de logging
     LOG_LEVEL: str = config.log_level
     LOG_FILE_PATH: str = config.log_file
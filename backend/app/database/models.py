@@ -2,7 +2,7 @@
 Modelos de base de datos para el sistema de generación de leads.
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -29,6 +29,7 @@ class Website(Base):
     email_count = Column(Integer, default=0, nullable=False)  # Número de emails encontrados
     last_scraped = Column(DateTime(timezone=True), nullable=True)  # Última vez scrapeado
     scrape_count = Column(Integer, default=0, nullable=False)  # Número de veces scrapeado
+    change_count = Column(Integer, default=0, nullable=False)  # Revisitas con el contenido cambiado
     error_count = Column(Integer, default=0, nullable=False)  # Número de errores
     last_error = Column(Text, nullable=True)  # Último error
     user_agent = Column(String(500), nullable=True)  # User-Agent usado
@@ -52,6 +53,13 @@ class Website(Base):
     duplicate_hash = Column(String(64), nullable=True)  # Hash para detectar duplicados
     fingerprint = Column(String(128), nullable=True)  # Fingerprint único de la página
 
+    # Validadores del último crawl (recrawl con GET condicional)
+    fetch_url = Column(String(500), nullable=True)  # URL pedida (la canónica no lleva barra final)
+    canonical_url = Column(String(500), nullable=True)  # URL declarada en <link rel="canonical"> (mismo host)
+    etag = Column(String(255), nullable=True)  # Cabecera ETag
+    last_modified = Column(String(64), nullable=True)  # Cabecera Last-Modified
+    content_hash = Column(String(64), nullable=True)  # Hash del cuerpo de la respuesta
+
     # Campos de rendimiento y monitoreo
     load_time = Column(Integer, nullable=True)  # Tiempo de carga en ms
     word_count = Column(Integer, default=0, nullable=False)  # Número de palabras en la página
@@ -97,6 +105,11 @@ class Email(Base):
     # Relación con website
     website = relationship("Website", back_populates="emails")
 
+    # Un email por sitio web (necesario para los upserts en lote del pipeline)
+    __table_args__ = (
+        Index("uq_emails_website_email", "website_id", "email", unique=True),
+    )
+
     def __repr__(self):
         return f"<Email(id={self.id}, email='{self.email}', quality={self.quality_score}, valid={self.is_valid})>"
 
@@ -108,8 +121,11 @@ class ScrapingQueue(Base):
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(String(100), unique=True, nullable=False, index=True)
     url = Column(String(500), nullable=False, index=True)
+    domain = Column(String(255), nullable=True, index=True)  # Dominio registrado (reparto justo entre clientes)
     priority = Column(Integer, default=0, nullable=False, index=True)
     depth_level = Column(Integer, default=0, nullable=False)
+    max_depth = Column(Integer, default=3, nullable=False)  # Profundidad máxima del crawl del job
+    recrawl = Column(Integer, default=0, nullable=False)  # 1=recrawl incremental de un dominio ya rastreado
     status = Column(Enum("pending", "processing", "completed", "failed", "paused", "cancelled", name="queue_status"),
                    default="pending", nullable=False)
     attempts = Column(Integer, default=0, nullable=False)
@@ -176,6 +192,26 @@ class ScrapingLog(Base):
         return f"<ScrapingLog(id={self.id}, level='{self.level}', url='{self.url}')>"
 
 
+class CrawlOutcome(Base):
+    """Resultado de cada página descargada, tenga emails o no (entrenamiento del modelo de URLs)."""
+    __tablename__ = "crawl_outcomes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(50), nullable=True, index=True)
+    url = Column(String(500), nullable=False)  # URL descargada (sin parámetros de seguimiento)
+    domain = Column(String(255), nullable=True, index=True)
+    source_url = Column(String(500), nullable=True)  # Página donde se encontró el enlace
+    anchor_text = Column(String(255), nullable=True)  # Texto del enlace que llevó a la página
+    depth_level = Column(Integer, default=0, nullable=False)
+    http_status = Column(Integer, nullable=True)
+    email_count = Column(Integer, default=0, nullable=False)  # Emails extraídos de la página
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<CrawlOutcome(id={self.id}, url='{self.url}', emails={self.email_count})>"
+
+
 class SystemStats(Base):
     """Modelo para almacenar estadísticas del sistema."""
     __tablename__ = "system_stats"
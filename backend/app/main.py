@@ -10,6 +10,7 @@ from .database.database import create_tables
 from .core.config import settings
 from .core.error_handler_new import add_error_handlers
 from .core.logging_config import setup_logging
+from .scraper.worker import start_worker_pool, stop_worker_pool
 
 # Configurar logging
 setup_logging()
@@ -92,6 +93,22 @@ async def startup_event():
     create_tables()
     print("✅ Base de datos inicializada correctamente")
 
+    # Arrancar el pool de workers de scraping
+    if settings.SCRAPER_WORKERS > 0:
+        app.state.scraper_workers = start_worker_pool(
+            settings.SCRAPER_WORKERS,
+            concurrency=settings.SCRAPER_WORKER_CONCURRENCY,
+            poll_interval=settings.SCRAPER_WORKER_POLL_INTERVAL
+        )
+        print(f"✅ {settings.SCRAPER_WORKERS} workers de scraping iniciados")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento que se ejecuta al detener la aplicación."""
+    # Detener los workers: los jobs en curso vuelven a la cola
+    stop_worker_pool(getattr(app.state, 'scraper_workers', []))
+
 
 @app.get("/api/v1/health")
 async def health_check():
@@ -3,10 +3,13 @@ Pipelines adicionales de filtrado para el sistema de scraping.
 """
 
 import re
+import hashlib
 from scrapy.exceptions import DropItem
 from sqlalchemy.orm import sessionmaker
 from ..database.database import engine
 from ..database.models import Website
+from .storage import get_storage_executor
+from .dedupe import get_dedupe_index
 
 class BusinessRelevancePipeline:
     """Pipeline para filtrar contenido basado en relevancia para negocios."""
@@ -209,7 +212,8 @@ class DuplicateContentPipeline:
         """Inicializa el pipeline."""
         # Conexión a la base de datos
         self.Session = sessionmaker(bind=engine)
-        self.seen_content_hashes = set()
+        # Hashes vistos: índice persistente compartido entre jobs
+        self.dedupe = get_dedupe_index()
     
     def process_item(self, item, spider):
         """
@@ -221,21 +225,27 @@ class DuplicateContentPipeline:
         # Generar hash del contenido
         content_hash = self._generate_content_hash(item)
         
-        # Verificar si ya hemos visto este contenido
-        if content_hash in self.seen_content_hashes:
+        # Verificar si ya hemos visto este contenido (queda reservado antes de
+        # consultar la base de datos para que un duplicado que llegue mientras
+        # tanto se filtre sin esperar; se registra al guardar el item)
+        if not self.dedupe.reserve('content_summary', str(content_hash), item):
             url = item.get('url', 'unknown')
             spider.logger.debug(f"📄 Filtering out duplicate content: {url}")
             raise DropItem(f"Duplicate content: {url}")
         
-        # Verificar en la base de datos
-        if self._is_duplicate_in_database(content_hash):
+        # Verificar en la base de datos (fuera del hilo del reactor)
+        d = get_storage_executor().submit(self._is_duplicate_in_database, content_hash)
+        d.addCallback(self._check_database_result, item, content_hash, spider)
+        return d
+    
+    def _check_database_result(self, is_duplicate, item, content_hash, spider):
+        """Descarta el item si la base de datos ya tiene su contenido."""
+        if is_duplicate:
             url = item.get('url', 'unknown')
             spider.logger.debug(f"📄 Filtering out duplicate content (DB): {url}")
+            self.dedupe.release(item)
             raise DropItem(f"Duplicate content (DB): {url}")
         
-        # Registrar como visto
-        self.seen_content_hashes.add(content_hash)
-        
         # Agregar hash al item
         item['content_hash'] = content_hash
         
@@ -253,7 +263,8 @@ class DuplicateContentPipeline:
         domain = item.get('domain', '') or ''
         
         content = f"{title}|{description}|{domain}"
-        return hash(content)
+        # Hash estable entre procesos (hash() cambia en cada ejecución)
+        return int(hashlib.md5(content.encode('utf-8')).hexdigest()[:15], 16)
     
     def _is_duplicate_in_database(self, content_hash):
         """
@@ -0,0 +1,221 @@
+"""
+Control adaptativo de concurrencia y delay por dominio.
+
+Sustituye la heurística de ``RateLimitingMiddleware`` (delay que crece con el
+número de peticiones al dominio, sano o no) por un controlador AIMD guiado por
+lo que se observa de cada host:
+
+- Respuestas con latencia normal: el delay baja de forma multiplicativa hasta
+  su suelo y la concurrencia sube de forma aditiva (+1 por cada ventana de
+  ``concurrency`` respuestas), pero solo si el delay no limita ya las
+  peticiones en vuelo por debajo de ella (latencia / delay). Un host rápido
+  acaba descargándose a su capacidad real.
+- Latencia por encima de ``latency_tolerance`` veces la base del host (la
+  menor observada) más un margen de ruido: el host está encolando peticiones
+  y la concurrencia se reduce en proporción (gradiente base/latencia).
+- 429/503 (con ``Retry-After`` si lo trae), timeouts y errores de conexión:
+  la concurrencia se reduce a la mitad y el delay se duplica. Las respuestas
+  de peticiones enviadas antes del recorte no vuelven a recortar: solo hay una
+  reducción por ventana (aprox. una latencia o un delay del host).
+
+``ErrorHandlingMiddleware`` envía las señales ``domain_throttled`` y
+``domain_failed``; ``RateLimitingMiddleware`` las conecta al controlador,
+aplica el delay con su token bucket y la concurrencia al slot del downloader
+del dominio. El controlador solo calcula: el reloj es inyectable para tests.
+"""
+
+import time
+from typing import Dict, Optional
+
+# Señales de Scrapy enviadas por ErrorHandlingMiddleware
+domain_throttled = object()  # 429/503: domain, status, retry_after
+domain_failed = object()  # Timeout, error de conexión o 5xx: domain, reason
+
+# Cada respuesta sana reduce el delay un 10% (la mitad tras ~7 respuestas)
+_DELAY_DECAY = 0.9
+# Delay mínimo del que parte un recorte cuando el host no tenía delay
+_BACKOFF_DELAY = 0.25
+# Peso de cada muestra en la media móvil de latencia
+_LATENCY_ALPHA = 0.2
+# Deriva de la latencia base hacia la observada (el host puede cambiar)
+_BASELINE_DRIFT = 0.01
+# Variación de latencia (segundos) que no se considera cola en el host
+_LATENCY_SLACK = 0.02
+
+
+class DomainLimits:
+    """Estado del controlador para un dominio."""
+
+    __slots__ = ('concurrency', 'delay', 'floor', 'latency', 'baseline', 'cooldown_until',
+                 'throttled', 'failed')
+
+    def __init__(self, concurrency: float, delay: float, floor: float):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.floor = floor
+        # Media móvil y base (mínimo) de la latencia de descarga, en segundos
+        self.latency = None
+        self.baseline = None
+        self.cooldown_until = 0.0
+        self.throttled = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'concurrency': int(self.concurrency),
+            'delay': round(self.delay, 3),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'baseline': round(self.baseline, 3) if self.baseline is not None else None,
+            'throttled': self.throttled,
+            'failed': self.failed,
+        }
+
+
+class AdaptiveConcurrencyController:
+    """Ajusta concurrencia y delay de cada dominio con AIMD y el gradiente de latencia."""
+
+    def __init__(self, start_delay: float = 1.0, min_delay: float = 0.1, max_delay: float = 30.0,
+                 start_concurrency: int = 2, min_concurrency: int = 1, max_concurrency: int = 8,
+                 latency_tolerance: float = 1.5, backoff: float = 0.5,
+                 delay_floors: Optional[Dict[str, float]] = None, clock=time.monotonic):
+        """
+        Inicializa el controlador.
+
+        Args:
+            start_delay: Delay inicial de un dominio nuevo (DOWNLOAD_DELAY)
+            min_delay: Suelo del delay (ADAPTIVE_MIN_DELAY)
+            max_delay: Techo del delay (ADAPTIVE_MAX_DELAY)
+            start_concurrency: Concurrencia inicial (CONCURRENT_REQUESTS_PER_DOMAIN)
+            min_concurrency: Concurrencia mínima (ADAPTIVE_MIN_CONCURRENCY)
+            max_concurrency: Concurrencia máxima (ADAPTIVE_MAX_CONCURRENCY)
+            latency_tolerance: Latencia máxima sana, en múltiplos de la base del host (ADAPTIVE_LATENCY_TOLERANCE)
+            backoff: Factor de reducción ante 429/503/errores (ADAPTIVE_BACKOFF_FACTOR)
+            delay_floors: Delay mínimo y de partida por dominio (DOMAIN_DELAYS)
+            clock: Función de reloj (inyectable para tests)
+        """
+        self.min_delay = max(0.0, min_delay)
+        self.max_delay = max(self.min_delay, max_delay)
+        self.start_delay = min(max(start_delay, self.min_delay), self.max_delay)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.start_concurrency = min(max(start_concurrency, self.min_concurrency), self.max_concurrency)
+        self.latency_tolerance = max(1.0, latency_tolerance)
+        self.backoff = min(max(backoff, 0.1), 0.9)
+        self.delay_floors = delay_floors or {}
+        self.clock = clock
+        self.domains: Dict[str, DomainLimits] = {}
+
+    def limits(self, domain: str) -> DomainLimits:
+        """Estado del dominio (se crea con los valores iniciales)."""
+        limits = self.domains.get(domain)
+        if limits is None:
+            floor = self.delay_floors.get(domain)
+            if floor is None:
+                limits = DomainLimits(self.start_concurrency, self.start_delay, self.min_delay)
+            else:
+                # Los delays configurados a mano son el suelo y el punto de partida del dominio
+                limits = DomainLimits(self.start_concurrency, max(floor, self.min_delay), max(floor, self.min_delay))
+            self.domains[domain] = limits
+        return limits
+
+    def delay(self, domain: str) -> float:
+        """Delay actual entre peticiones del dominio (segundos)."""
+        return self.limits(domain).delay
+
+    def concurrency(self, domain: str) -> int:
+        """Peticiones simultáneas permitidas al dominio."""
+        return int(self.limits(domain).concurrency)
+
+    def on_response(self, domain: str, latency: float, now: Optional[float] = None) -> None:
+        """
+        Registra una respuesta del host (no 429/503) con su latencia de descarga.
+
+        Args:
+            domain: Dominio de la respuesta
+            latency: Latencia de descarga en segundos (``download_latency``)
+            now: Instante actual (opcional)
+        """
+        limits = self.limits(domain)
+        latency = max(0.0, latency)
+        if limits.baseline is None:
+            limits.baseline = limits.latency = latency
+        else:
+            limits.latency += _LATENCY_ALPHA * (latency - limits.latency)
+            if latency < limits.baseline:
+                limits.baseline = latency
+            else:
+                limits.baseline += _BASELINE_DRIFT * (latency - limits.baseline)
+
+        healthy_latency = limits.baseline * self.latency_tolerance + _LATENCY_SLACK
+        if limits.latency > healthy_latency:
+            # El host encola: reducir en proporción al gradiente de latencia
+            self._decrease(limits, max(self.backoff, healthy_latency / limits.latency), now)
+            return
+
+        # Aumento aditivo: +1 de concurrencia por cada ventana completa de respuestas,
+        # solo si el delay permite usarla (en vuelo ~ latencia / delay)
+        if limits.latency >= limits.delay * (limits.concurrency - 1):
+            limits.concurrency = min(self.max_concurrency, limits.concurrency + 1.0 / limits.concurrency)
+        limits.delay = max(limits.floor, limits.delay * _DELAY_DECAY)
+
+    def on_throttle(self, domain: str, retry_after: Optional[float] = None, now: Optional[float] = None) -> None:
+        """
+        Registra un 429/503 del host.
+
+        Args:
+            domain: Dominio de la respuesta
+            retry_after: Segundos de ``Retry-After`` si el host los indica
+            now: Instante actual (opcional)
+        """
+        limits = self.limits(domain)
+        limits.throttled += 1
+        if self._decrease(limits, self.backoff, now):
+            limits.delay = min(self.max_delay, max(limits.delay, _BACKOFF_DELAY) / self.backoff)
+        if retry_after:
+            limits.delay = min(self.max_delay, max(limits.delay, retry_after))
+
+    def on_failure(self, domain: str, now: Optional[float] = None) -> None:
+        """Registra un timeout, error de conexión o error del servidor del host."""
+        limits = self.limits(domain)
+        limits.failed += 1
+        if self._decrease(limits, self.backoff, now):
+            limits.delay = min(self.max_delay, max(limits.delay, _BACKOFF_DELAY) / self.backoff)
+
+    def _decrease(self, limits: DomainLimits, factor: float, now: Optional[float]) -> bool:
+        """Reduce la concurrencia una vez por ventana. Devuelve si se ha reducido."""
+        if now is None:
+            now = self.clock()
+        if now < limits.cooldown_until:
+            return False
+        limits.concurrency = max(self.min_concurrency, limits.concurrency * factor)
+        # Las respuestas de lo ya enviado llegan durante la próxima latencia del host
+        limits.cooldown_until = now + max(limits.latency or 0.0, limits.delay, 0.1)
+        return True
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Límites actuales de cada dominio."""
+        return {domain: limits.as_dict() for domain, limits in self.domains.items()}
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Segundos indicados por una cabecera ``Retry-After`` (número o fecha HTTP), o None."""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+__all__ = [
+    'AdaptiveConcurrencyController', 'DomainLimits', 'domain_throttled', 'domain_failed',
+    'parse_retry_after',
+]
@@ -0,0 +1,358 @@
+"""
+Índice de duplicados persistente y con memoria acotada compartido entre jobs.
+
+Sustituye a los ``set`` en memoria de los pipelines de duplicados (que crecían
+con cada página y se perdían al terminar el job). Cada espacio de nombres
+(``url``, ``email``, ``content``...) es un fichero de tamaño fijo mapeado en
+memoria con:
+
+- Un filtro de Bloom que responde sin tocar la tabla para la mayoría de las
+  claves nuevas.
+- Una tabla hash de direccionamiento abierto con fingerprints de 64 bits que
+  confirma los positivos del filtro (sin falsos positivos apreciables).
+
+Los ficheros se comparten entre los procesos worker (``MAP_SHARED``) y las
+inserciones se serializan con ``flock``. La memoria es fija
+(``DEDUPE_CAPACITY``): cuando la tabla se llena se vacía y se vuelve a
+empezar, como una caché.
+
+Los pipelines no registran las claves de un item directamente: las reservan
+(``reserve``) y ``DatabasePipeline`` las registra (``commit``) cuando el item
+queda guardado. Un item descartado o cuya escritura falla libera sus reservas
+(``release``) y no marca nada como visto.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'LGDEDUP1'
+# magic, slots, bloom_bits, hashes, capacity, count
+_HEADER = struct.Struct('<8sQQIQQ')
+_HEADER_SIZE = 64
+_COUNT_OFFSET = _HEADER.size - 8
+_SLOT = struct.Struct('<Q')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dedupe_dir() -> str:
+    """
+    Directorio de los ficheros del índice (DEDUPE_DIR).
+
+    Por defecto vive junto a la base de datos SQLite para que borrar la base
+    de datos no deje un índice que descarte páginas que ya no están guardadas.
+    """
+    if os.environ.get('DEDUPE_DIR'):
+        return os.environ['DEDUPE_DIR']
+    from app.database.database import engine
+    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        return f"{os.path.abspath(engine.url.database)}.dedupe"
+    return os.path.join(tempfile.gettempdir(), 'leads_generator_dedupe')
+
+
+def fingerprint(key: str) -> int:
+    """Fingerprint de 64 bits de una clave (0 queda reservado para huecos vacíos)."""
+    value = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class _Namespace:
+    """Filtro de Bloom y tabla hash de un espacio de nombres sobre un mmap."""
+
+    def __init__(self, path: Optional[str], capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.max_count = capacity
+        self.slots = 1 << math.ceil(math.log2(capacity / 0.75))
+        self.bloom_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bloom_bits / capacity * math.log(2)))
+        self.bloom_offset = _HEADER_SIZE
+        self.table_offset = _HEADER_SIZE + (self.bloom_bits + 7) // 8
+        self.size = self.table_offset + self.slots * _SLOT.size
+        self.file = None
+
+        if path is None:
+            self.mm = mmap.mmap(-1, self.size)
+            self._write_header()
+            return
+
+        self.file = open(path, 'a+b')
+        with self.locked():
+            self.file.seek(0, os.SEEK_END)
+            if self.file.tell() != self.size or not self._header_matches():
+                # Fichero nuevo o creado con otra capacidad: se recrea vacío
+                self.file.truncate(0)
+                self.file.truncate(self.size)
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+                self._write_header()
+            else:
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+
+    def _header_matches(self) -> bool:
+        self.file.seek(0)
+        header = self.file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, slots, bloom_bits, hashes, capacity, _ = _HEADER.unpack(header)
+        return (magic, slots, bloom_bits, hashes, capacity) == (
+            _MAGIC, self.slots, self.bloom_bits, self.hashes, self.capacity)
+
+    def _write_header(self):
+        _HEADER.pack_into(self.mm, 0, _MAGIC, self.slots, self.bloom_bits, self.hashes, self.capacity, 0)
+
+    @property
+    def count(self) -> int:
+        return _SLOT.unpack_from(self.mm, _COUNT_OFFSET)[0]
+
+    def locked(self):
+        return _FileLock(self.file)
+
+    def _bloom_positions(self, fp: int):
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bloom_bits
+
+    def contains(self, fp: int) -> bool:
+        mm = self.mm
+        offset = self.bloom_offset
+        for position in self._bloom_positions(fp):
+            if not mm[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return self._find_slot(fp)[1]
+
+    def _find_slot(self, fp: int):
+        """Devuelve (hueco, encontrado) siguiendo el sondeo lineal."""
+        mask = self.slots - 1
+        slot = fp & mask
+        while True:
+            value = _SLOT.unpack_from(self.mm, self.table_offset + slot * _SLOT.size)[0]
+            if value == fp:
+                return slot, True
+            if value == 0:
+                return slot, False
+            slot = (slot + 1) & mask
+
+    def add(self, fp: int) -> bool:
+        """Inserta el fingerprint (con el bloqueo tomado). Devuelve False si ya estaba."""
+        if self.contains(fp):
+            return False
+        if self.count >= self.max_count:
+            logger.warning(f"⚠️ Dedupe index full ({self.count} keys), starting a new generation")
+            self.mm[_HEADER_SIZE:self.size] = bytes(self.size - _HEADER_SIZE)
+            _SLOT.pack_into(self.mm, _COUNT_OFFSET, 0)
+
+        slot, _ = self._find_slot(fp)
+        _SLOT.pack_into(self.mm, self.table_offset + slot * _SLOT.size, fp)
+        for position in self._bloom_positions(fp):
+            index = self.bloom_offset + (position >> 3)
+            self.mm[index] = self.mm[index] | (1 << (position & 7))
+        _SLOT.pack_into(self.mm, _COUNT_OFFSET, self.count + 1)
+        return True
+
+    def close(self):
+        self.mm.close()
+        if self.file is not None:
+            self.file.close()
+
+
+class _FileLock:
+    """``flock`` exclusivo sobre el fichero del espacio de nombres (nada si es anónimo)."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+
+
+class DedupeIndex:
+    """Conjuntos de claves vistas, persistentes entre jobs y de tamaño fijo."""
+
+    def __init__(self, directory: Optional[str] = None, capacity: int = 1_000_000, error_rate: float = 0.01):
+        """
+        Inicializa el índice.
+
+        Args:
+            directory: Directorio de los ficheros (None = índice anónimo solo en memoria)
+            capacity: Claves por espacio de nombres antes de empezar de cero (DEDUPE_CAPACITY)
+            error_rate: Tasa de falsos positivos del filtro de Bloom
+        """
+        self.directory = directory
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+        # Resultado de add() por objeto (item) para que varios pipelines
+        # pregunten por la misma clave del mismo item y obtengan la misma respuesta
+        self._owners = weakref.WeakKeyDictionary()
+        # Claves reservadas por items aún no guardados: (espacio, fingerprint) -> ref al item
+        self._reserved: Dict[Tuple[str, int], weakref.ref] = {}
+        self._reservations = weakref.WeakKeyDictionary()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _namespace(self, name: str) -> _Namespace:
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            with self._lock:
+                namespace = self.namespaces.get(name)
+                if namespace is None:
+                    path = os.path.join(self.directory, f"{name}.idx") if self.directory else None
+                    namespace = _Namespace(path, self.capacity, self.error_rate)
+                    self.namespaces[name] = namespace
+        return namespace
+
+    def contains(self, namespace: str, key: str) -> bool:
+        """Indica si la clave ya se ha registrado (en este job o en uno anterior)."""
+        return self._namespace(namespace).contains(fingerprint(key))
+
+    def _answers(self, owner) -> dict:
+        try:
+            return self._owners.setdefault(owner, {})
+        except TypeError:
+            return {}
+
+    def add(self, namespace: str, key: str, owner=None) -> bool:
+        """
+        Registra una clave.
+
+        Args:
+            namespace: Espacio de nombres ('url', 'email', ...)
+            key: Clave a registrar
+            owner: Objeto (normalmente el item) para el que se hace la consulta;
+                las consultas repetidas del mismo objeto devuelven el primer resultado
+
+        Returns:
+            True si la clave es nueva, False si ya estaba registrada
+        """
+        if owner is not None:
+            answers = self._answers(owner)
+            if (namespace, key) in answers:
+                return answers[namespace, key]
+
+        store = self._namespace(namespace)
+        fp = fingerprint(key)
+        with self._lock, store.locked():
+            added = store.add(fp)
+
+        if owner is not None:
+            answers[namespace, key] = added
+        return added
+
+    def reserve(self, namespace: str, key: str, owner) -> bool:
+        """
+        Reserva una clave para un item sin registrarla todavía.
+
+        La clave se registra con ``commit(owner)`` cuando el item se guarda y
+        se libera con ``release(owner)`` si se descarta. Mientras tanto otro
+        item con la misma clave se considera duplicado.
+
+        Args:
+            namespace: Espacio de nombres ('url', 'email', ...)
+            key: Clave a reservar
+            owner: Item que reserva la clave; sus consultas repetidas devuelven el primer resultado
+
+        Returns:
+            True si la clave es nueva, False si ya está registrada o reservada por otro item
+        """
+        answers = self._answers(owner)
+        if (namespace, key) in answers:
+            return answers[namespace, key]
+
+        store = self._namespace(namespace)
+        entry = (namespace, fingerprint(key))
+        with self._lock:
+            holder = self._reserved.get(entry)
+            holder = holder() if holder is not None else None
+            if store.contains(entry[1]) or (holder is not None and holder is not owner):
+                added = False
+            else:
+                # Si el item desaparece sin commit ni release su reserva caduca sola
+                self._reserved[entry] = weakref.ref(owner, lambda ref, entry=entry: self._expire(entry, ref))
+                self._reservations.setdefault(owner, set()).add(entry)
+                added = True
+
+        answers[namespace, key] = added
+        return added
+
+    def _expire(self, entry: Tuple[str, int], ref: weakref.ref):
+        if self._reserved.get(entry) is ref:
+            self._reserved.pop(entry, None)
+
+    def commit(self, owner) -> int:
+        """Registra las claves reservadas por el item. Devuelve cuántas eran nuevas."""
+        with self._lock:
+            entries = self._reservations.pop(owner, set())
+            added = 0
+            for namespace, fp in entries:
+                self._reserved.pop((namespace, fp), None)
+                store = self.namespaces.get(namespace)
+                if store is None:  # Índice cerrado
+                    continue
+                with store.locked():
+                    added += store.add(fp)
+        return added
+
+    def release(self, owner):
+        """Libera las claves reservadas por un item descartado o que no se pudo guardar."""
+        with self._lock:
+            for entry in self._reservations.pop(owner, set()):
+                holder = self._reserved.get(entry)
+                if holder is not None and holder() is owner:
+                    del self._reserved[entry]
+            self._owners.pop(owner, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Claves registradas por espacio de nombres."""
+        return {name: namespace.count for name, namespace in self.namespaces.items()}
+
+    def close(self):
+        for namespace in self.namespaces.values():
+            namespace.close()
+        self.namespaces.clear()
+
+
+def get_dedupe_index(settings=None) -> DedupeIndex:
+    """
+    Devuelve el índice de duplicados del proceso (se crea en la primera llamada).
+
+    Args:
+        settings: Settings de Scrapy con DEDUPE_PERSISTENT, DEDUPE_CAPACITY y DEDUPE_ERROR_RATE (opcional)
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            if settings is None:
+                from scrapy.settings import Settings
+                settings = Settings()
+                settings.setmodule('app.scraper.settings', priority='project')
+            _index = DedupeIndex(
+                directory=get_dedupe_dir() if settings.getbool('DEDUPE_PERSISTENT', True) else None,
+                capacity=settings.getint('DEDUPE_CAPACITY', 1_000_000),
+                error_rate=settings.getfloat('DEDUPE_ERROR_RATE', 0.01)
+            )
+        return _index
+
+
+__all__ = ['DedupeIndex', 'fingerprint', 'get_dedupe_dir', 'get_dedupe_index']
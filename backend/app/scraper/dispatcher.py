@@ -0,0 +1,258 @@
+"""
+Despachador de jobs de scraping por prioridad y con reparto justo entre dominios.
+
+Los workers no reclaman los jobs en orden de llegada sino a través de
+``JobDispatcher``:
+
+- Se respeta ``ScrapingQueue.priority`` (mayor primero) y, a igual prioridad,
+  la antigüedad del job.
+- Hay un límite global de jobs en ejecución y otro por dominio registrado.
+- Entre dominios con la misma prioridad se reparte por turnos: primero el
+  dominio con menos jobs activos y, a igualdad, el que lleva más tiempo sin
+  ser atendido, de modo que un cliente con cientos de jobs no bloquea al resto.
+- Los jobs cuyo host tiene el circuito abierto en la tabla de salud de hosts
+  (``DomainHealthStore``) se quedan pendientes hasta que vence el enfriamiento.
+- Con ``lease_seconds`` un job en 'processing' cuyo ``updated_at`` no se ha
+  renovado en ese tiempo (worker muerto: los vivos lo renuevan con
+  ``heartbeat_jobs``) vuelve a 'pending' antes de reclamar.
+
+La reclamación se serializa entre procesos con un ``flock`` sobre un fichero
+del directorio de control para que varios workers no superen los límites.
+"""
+
+import contextlib
+import itertools
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import func
+
+from app.database.database import SessionLocal
+from app.database.models import ScrapingQueue
+from app.scraper.job_control import get_control_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Sufijos de segundo nivel habituales (dominio registrado = una etiqueta más)
+_SECOND_LEVEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'com.mx', 'org.mx', 'gob.mx', 'com.ar',
+    'com.br', 'com.co', 'com.pe', 'com.es', 'org.es', 'com.au', 'co.jp', 'co.nz',
+    'co.za', 'com.cn', 'com.tr', 'com.ve', 'com.ec', 'com.uy', 'com.bo', 'com.py',
+}
+
+
+def registered_domain(url: str) -> str:
+    """
+    Obtiene el dominio registrado de una URL (``https://www.tienda.com.mx/x`` -> ``tienda.com.mx``).
+
+    Args:
+        url: URL completa o nombre de host
+
+    Returns:
+        Dominio registrado en minúsculas
+    """
+    host = urlparse(url).hostname if '://' in url else url.split('/')[0]
+    host = (host or '').lower().rstrip('.')
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if '.'.join(labels[-2:]) in _SECOND_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+class JobDispatcher:
+    """Selecciona y reclama los siguientes jobs pendientes respetando prioridad y límites."""
+
+    def __init__(self, max_active_jobs: int = 16, max_jobs_per_domain: int = 2,
+                 session_factory=SessionLocal, lock_path: Optional[str] = None, health=None,
+                 lease_seconds: float = 0):
+        """
+        Inicializa el despachador.
+
+        Args:
+            max_active_jobs: Límite global de jobs en 'processing' (0 = sin límite)
+            max_jobs_per_domain: Límite de jobs activos por dominio registrado (0 = sin límite)
+            session_factory: Fábrica de sesiones de SQLAlchemy (inyectable para tests)
+            lock_path: Fichero de bloqueo compartido entre workers
+            health: ``DomainHealthStore`` para no despachar jobs a hosts con el circuito abierto (opcional)
+            lease_seconds: Segundos sin latido tras los que un job en 'processing' se reencola (0 = nunca)
+        """
+        self.max_active_jobs = max_active_jobs
+        self.max_jobs_per_domain = max_jobs_per_domain
+        self.session_factory = session_factory
+        self.lock_path = lock_path or os.path.join(get_control_dir(), 'dispatch.lock')
+        self.health = health
+        self.lease_seconds = lease_seconds
+        self._turn = itertools.count(1)
+        self.last_served: Dict[str, int] = {}
+
+    def select(self, candidates: List[Dict], active_by_domain: Dict[str, int], limit: int) -> List[Dict]:
+        """
+        Elige hasta ``limit`` jobs entre los candidatos pendientes.
+
+        Args:
+            candidates: Dicts con id, domain, priority y created_at, ordenados por
+                (priority desc, created_at asc)
+            active_by_domain: Jobs en ejecución por dominio
+            limit: Número máximo de jobs a elegir
+
+        Returns:
+            Jobs elegidos en orden de despacho
+        """
+        queues: Dict[str, List[Dict]] = {}
+        for order, candidate in enumerate(candidates):
+            queues.setdefault(candidate['domain'], []).append(dict(candidate, order=order))
+        for queue in queues.values():
+            queue.reverse()  # pop() devuelve el mejor job del dominio
+
+        active = dict(active_by_domain)
+        selected = []
+        while len(selected) < limit:
+            best_domain = None
+            best_key = None
+            for domain, queue in queues.items():
+                if not queue:
+                    continue
+                if self.max_jobs_per_domain and active.get(domain, 0) >= self.max_jobs_per_domain:
+                    continue
+                head = queue[-1]
+                key = (-head['priority'], active.get(domain, 0), self.last_served.get(domain, 0), head['order'])
+                if best_key is None or key < best_key:
+                    best_domain, best_key = domain, key
+            if best_domain is None:
+                break
+
+            selected.append(queues[best_domain].pop())
+            active[best_domain] = active.get(best_domain, 0) + 1
+            self.last_served[best_domain] = next(self._turn)
+        return selected
+
+    def claim(self, limit: int) -> List[Dict]:
+        """
+        Reclama atómicamente hasta ``limit`` jobs (pending -> processing).
+
+        Args:
+            limit: Huecos libres del worker que reclama
+
+        Returns:
+            Lista de dicts con job_id, url, max_depth y recrawl de los jobs reclamados
+        """
+        if limit <= 0:
+            return []
+
+        with self._lock():
+            db = self.session_factory()
+            try:
+                return self._claim(db, limit)
+            finally:
+                db.close()
+
+    def _requeue_expired(self, db) -> int:
+        """Devuelve a la cola los jobs en 'processing' cuyo latido ha caducado."""
+        expired = datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)
+        requeued = db.query(ScrapingQueue).filter(
+            ScrapingQueue.status == "processing",
+            ScrapingQueue.updated_at < expired
+        ).update({ScrapingQueue.status: "pending"}, synchronize_session=False)
+        db.commit()
+        if requeued:
+            logger.warning(f"♻️ Requeued {requeued} jobs whose worker stopped sending heartbeats")
+        return requeued
+
+    def _claim(self, db, limit: int) -> List[Dict]:
+        if self.lease_seconds:
+            self._requeue_expired(db)
+        active_rows = db.query(ScrapingQueue.domain, ScrapingQueue.url).filter(
+            ScrapingQueue.status == "processing"
+        ).all()
+        active_by_domain: Dict[str, int] = {}
+        for domain, url in active_rows:
+            domain = domain or registered_domain(url)
+            active_by_domain[domain] = active_by_domain.get(domain, 0) + 1
+
+        if self.max_active_jobs:
+            limit = min(limit, self.max_active_jobs - len(active_rows))
+        if limit <= 0:
+            return []
+
+        candidates = self._load_candidates(db, limit)
+        if self.health is not None:
+            candidates = [candidate for candidate in candidates
+                          if not self.health.is_open(urlparse(candidate['url']).netloc)]
+        claimed = []
+        for candidate in self.select(candidates, active_by_domain, limit):
+            # La condición sobre el estado evita reclamar un job pausado o cancelado entretanto
+            updated = db.query(ScrapingQueue).filter(
+                ScrapingQueue.id == candidate['id'],
+                ScrapingQueue.status == "pending"
+            ).update(
+                {
+                    ScrapingQueue.status: "processing",
+                    ScrapingQueue.attempts: ScrapingQueue.attempts + 1
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            if updated:
+                claimed.append({
+                    'job_id': candidate['job_id'],
+                    'url': candidate['url'],
+                    'max_depth': candidate['max_depth'],
+                    'recrawl': bool(candidate['recrawl'])
+                })
+        return claimed
+
+    def _load_candidates(self, db, limit: int) -> List[Dict]:
+        """Carga los mejores jobs pendientes de cada dominio (como mucho ``limit`` por dominio)."""
+        per_domain = min(limit, self.max_jobs_per_domain) if self.max_jobs_per_domain else limit
+        rank = func.row_number().over(
+            partition_by=ScrapingQueue.domain,
+            order_by=(ScrapingQueue.priority.desc(), ScrapingQueue.created_at.asc(), ScrapingQueue.id.asc())
+        ).label('domain_rank')
+        ranked = db.query(
+            ScrapingQueue.id, ScrapingQueue.job_id, ScrapingQueue.url, ScrapingQueue.domain,
+            ScrapingQueue.priority, ScrapingQueue.created_at, ScrapingQueue.max_depth, ScrapingQueue.recrawl, rank
+        ).filter(ScrapingQueue.status == "pending").subquery()
+
+        rows = db.query(ranked).filter(ranked.c.domain_rank <= per_domain).order_by(
+            ranked.c.priority.desc(), ranked.c.created_at.asc(), ranked.c.id.asc()
+        ).all()
+        return [
+            {
+                'id': row.id,
+                'job_id': row.job_id,
+                'url': row.url,
+                # Jobs encolados antes de la columna 'domain' (base de datos sin migrar)
+                'domain': row.domain or registered_domain(row.url),
+                'priority': row.priority,
+                'created_at': row.created_at,
+                'max_depth': row.max_depth,
+                'recrawl': row.recrawl
+            }
+            for row in rows
+        ]
+
+    @contextlib.contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+__all__ = ['JobDispatcher', 'registered_domain']
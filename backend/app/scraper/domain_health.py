@@ -0,0 +1,386 @@
+"""
+Salud de los hosts y circuit breaker persistentes y compartidos entre jobs.
+
+``ErrorHandlingMiddleware`` guardaba los hosts bloqueados y sus errores en la
+memoria del proceso, así que cada job nuevo volvía a gastar su presupuesto de
+reintentos en un host caído o que nos banea. Aquí el estado de cada host vive
+en una tabla de tamaño fijo mapeada en memoria junto a la base de datos, que
+comparten todos los jobs y workers:
+
+- ``closed``: el host funciona; se cuentan los fallos seguidos. Al llegar a
+  ``failure_threshold`` (o ante un bloqueo explícito: 403, CAPTCHA,
+  ``Retry-After`` largo) el circuito se abre.
+- ``open``: no se envía nada al host hasta que vence el enfriamiento, que se
+  duplica con cada apertura seguida (hasta ``max_open_seconds``).
+- ``half_open``: vencido el enfriamiento, una única petición de prueba (de
+  cualquier proceso) sale al host. Si va bien el circuito se cierra; si falla
+  se vuelve a abrir con el doble de enfriamiento.
+
+Solo ocupan entrada los hosts que han fallado alguna vez. Las consultas
+(``allow``, ``is_open``) leen el mmap sin bloqueo; los cambios se serializan
+con ``flock``. Cuando la tabla se llena se descartan los hosts sanos.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from .dedupe import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Señal de Scrapy enviada por ErrorHandlingMiddleware: domain, seconds, reason
+domain_blocked = object()
+
+CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: 'closed', OPEN: 'open', HALF_OPEN: 'half_open'}
+
+_MAGIC = b'LGHEALT1'
+# magic, slots, count
+_HEADER = struct.Struct('<8sQQ')
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 16
+# fingerprint, estado, fallos seguidos, éxitos, fallos, aperturas seguidas,
+# abierto hasta, último fallo, host
+_ENTRY = struct.Struct('<QB3xIQQI4xdd64s')
+_FP = struct.Struct('<Q')
+_MAX_LOAD = 0.75
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_health_path() -> str:
+    """
+    Fichero de la tabla de salud (DOMAIN_HEALTH_FILE).
+
+    Por defecto vive junto a la base de datos SQLite, como el índice de duplicados.
+    """
+    if os.environ.get('DOMAIN_HEALTH_FILE'):
+        return os.environ['DOMAIN_HEALTH_FILE']
+    from app.database.database import engine
+    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        return f"{os.path.abspath(engine.url.database)}.health"
+    return os.path.join(tempfile.gettempdir(), 'leads_generator.health')
+
+
+class DomainHealth:
+    """Estado de un host leído de la tabla."""
+
+    __slots__ = ('domain', 'state', 'consecutive_failures', 'successes', 'failures', 'trips',
+                 'open_until', 'last_failure_at')
+
+    def __init__(self, entry):
+        (_, self.state, self.consecutive_failures, self.successes, self.failures, self.trips,
+         self.open_until, self.last_failure_at, host) = entry
+        self.domain = host.rstrip(b'\0').decode('utf-8', 'replace')
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'domain': self.domain,
+            'state': STATE_NAMES.get(self.state, 'closed'),
+            'consecutive_failures': self.consecutive_failures,
+            'successes': self.successes,
+            'failures': self.failures,
+            'trips': self.trips,
+            'open_until': self.open_until or None,
+            'last_failure_at': self.last_failure_at or None,
+        }
+
+
+class DomainHealthStore:
+    """Circuit breaker por host sobre un mmap compartido entre procesos."""
+
+    def __init__(self, path: Optional[str] = None, slots: int = 4096, failure_threshold: int = 5,
+                 open_seconds: float = 60.0, max_open_seconds: float = 3600.0, clock=time.time):
+        """
+        Abre (o crea) la tabla.
+
+        Args:
+            path: Fichero compartido (None = tabla anónima solo en memoria del proceso)
+            slots: Huecos de la tabla; se redondea a potencia de dos (DOMAIN_HEALTH_SLOTS)
+            failure_threshold: Fallos seguidos que abren el circuito (DOMAIN_HEALTH_FAILURE_THRESHOLD)
+            open_seconds: Enfriamiento de la primera apertura (DOMAIN_HEALTH_OPEN_SECONDS)
+            max_open_seconds: Enfriamiento máximo (DOMAIN_HEALTH_MAX_OPEN_SECONDS)
+            clock: Función de reloj común a todos los procesos (inyectable para tests)
+        """
+        self.slots = 1 << max(4, (max(16, slots) - 1).bit_length())
+        self.size = _HEADER_SIZE + self.slots * _ENTRY.size
+        self.max_count = int(self.slots * _MAX_LOAD)
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = max(0.0, open_seconds)
+        self.max_open_seconds = max(self.open_seconds, max_open_seconds)
+        self.clock = clock
+        self.file = None
+        self._lock = threading.Lock()
+
+        if path is None:
+            self.mm = mmap.mmap(-1, self.size)
+            _HEADER.pack_into(self.mm, 0, _MAGIC, self.slots, 0)
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, 'a+b')
+        self._flock(True)
+        try:
+            self.file.seek(0, os.SEEK_END)
+            if self.file.tell() != self.size or not self._header_matches():
+                # Fichero nuevo o creado con otro tamaño: se recrea vacío
+                self.file.truncate(0)
+                self.file.truncate(self.size)
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+                _HEADER.pack_into(self.mm, 0, _MAGIC, self.slots, 0)
+            else:
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+        finally:
+            self._flock(False)
+
+    def _header_matches(self) -> bool:
+        self.file.seek(0)
+        header = self.file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, slots, _ = _HEADER.unpack(header)
+        return (magic, slots) == (_MAGIC, self.slots)
+
+    def _flock(self, acquire: bool):
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX if acquire else fcntl.LOCK_UN)
+
+    def _locked(self):
+        return _Locked(self)
+
+    @property
+    def count(self) -> int:
+        return _FP.unpack_from(self.mm, _COUNT_OFFSET)[0]
+
+    def _find_slot(self, fp: int):
+        """Devuelve (offset, encontrado) siguiendo el sondeo lineal."""
+        mask = self.slots - 1
+        slot = fp & mask
+        while True:
+            offset = _HEADER_SIZE + slot * _ENTRY.size
+            value = _FP.unpack_from(self.mm, offset)[0]
+            if value == fp or value == 0:
+                return offset, value == fp
+            slot = (slot + 1) & mask
+
+    def _read(self, domain: str):
+        offset, found = self._find_slot(fingerprint(domain))
+        return _ENTRY.unpack_from(self.mm, offset) if found else None
+
+    def _compact(self) -> None:
+        """Descarta los hosts sanos (cerrados y sin fallos seguidos) y reinserta el resto."""
+        live = []
+        for slot in range(self.slots):
+            entry = _ENTRY.unpack_from(self.mm, _HEADER_SIZE + slot * _ENTRY.size)
+            if entry[0] and (entry[1] != CLOSED or entry[2]):
+                live.append(entry)
+        self.mm[_HEADER_SIZE:self.size] = bytes(self.size - _HEADER_SIZE)
+        for entry in live:
+            offset, _ = self._find_slot(entry[0])
+            _ENTRY.pack_into(self.mm, offset, *entry)
+        _FP.pack_into(self.mm, _COUNT_OFFSET, len(live))
+
+    def _update(self, domain: str, change) -> Optional[DomainHealth]:
+        """
+        Aplica ``change(entry) -> entry`` a la entrada del host (con el bloqueo tomado).
+
+        ``change`` recibe None si el host no está en la tabla y puede devolver
+        None para no escribir nada.
+        """
+        fp = fingerprint(domain)
+        with self._locked():
+            offset, found = self._find_slot(fp)
+            entry = change(_ENTRY.unpack_from(self.mm, offset) if found else None)
+            if entry is None:
+                return None
+            if not found:
+                if self.count >= self.max_count:
+                    self._compact()
+                    if self.count >= self.max_count:
+                        logger.warning(f"⚠️ Domain health table full, not tracking {domain}")
+                        return None
+                    offset, _ = self._find_slot(fp)
+                _FP.pack_into(self.mm, _COUNT_OFFSET, self.count + 1)
+            entry = (fp,) + tuple(entry[1:8]) + (domain.encode('utf-8')[:64],)
+            _ENTRY.pack_into(self.mm, offset, *entry)
+        return DomainHealth(entry)
+
+    def _cooldown(self, trips: int) -> float:
+        return min(self.max_open_seconds, self.open_seconds * (2 ** max(0, trips - 1)))
+
+    def allow(self, domain: str, now: Optional[float] = None) -> bool:
+        """
+        Indica si se puede enviar una petición al host.
+
+        Con el circuito abierto y el enfriamiento vencido, la primera llamada
+        (de cualquier proceso) pasa a ``half_open`` y sale como prueba.
+        """
+        entry = self._read(domain)
+        if entry is None or entry[1] == CLOSED:
+            return True
+        if now is None:
+            now = self.clock()
+        if now < entry[6]:
+            return False
+
+        def probe(entry):
+            # Otro proceso puede haber tomado la prueba entretanto
+            if entry is None or entry[1] == CLOSED or now < entry[6]:
+                return None
+            # Mientras la prueba está en vuelo el resto sigue esperando
+            return (entry[0], HALF_OPEN) + entry[2:6] + (now + max(self.open_seconds, 1.0),) + entry[7:]
+
+        probed = self._update(domain, probe)
+        if probed is not None:
+            logger.info(f"🔎 Circuit half-open for {domain}, sending a probe request")
+        return probed is not None
+
+    def is_open(self, domain: str, now: Optional[float] = None) -> bool:
+        """Indica si el host está en enfriamiento (sin tomar la petición de prueba)."""
+        entry = self._read(domain)
+        if entry is None or entry[1] == CLOSED:
+            return False
+        return (self.clock() if now is None else now) < entry[6]
+
+    def record_success(self, domain: str) -> None:
+        """Registra una respuesta sana del host: reinicia los fallos seguidos y, si era la prueba, cierra el circuito."""
+        entry = self._read(domain)
+        if entry is None:
+            # Los hosts que nunca han fallado no ocupan entrada
+            return
+
+        def succeed(entry):
+            if entry is None:
+                return None
+            if entry[1] == OPEN:
+                # Respuesta de algo enviado antes de abrir: solo la prueba cierra el circuito
+                return entry[:3] + (entry[3] + 1,) + entry[4:]
+            return (entry[0], CLOSED, 0, entry[3] + 1, entry[4], 0, 0.0) + entry[7:]
+
+        if entry[1] == HALF_OPEN:
+            logger.info(f"✅ Circuit closed for {domain}")
+        self._update(domain, succeed)
+
+    def record_failure(self, domain: str, now: Optional[float] = None) -> DomainHealth:
+        """Registra un fallo del host; abre el circuito al llegar al umbral o si la prueba falla."""
+        if now is None:
+            now = self.clock()
+        opened = []
+
+        def fail(entry):
+            if entry is None:
+                entry = (0, CLOSED, 0, 0, 0, 0, 0.0, 0.0, b'')
+            _, state, consecutive, successes, failures, trips, open_until, _, host = entry
+            consecutive += 1
+            if state == HALF_OPEN or (state == CLOSED and consecutive >= self.failure_threshold):
+                state, trips = OPEN, trips + 1
+                open_until = now + self._cooldown(trips)
+                opened.append(True)
+            return (0, state, consecutive, successes, failures + 1, trips, open_until, now, host)
+
+        health = self._update(domain, fail)
+        if health is not None and opened:
+            logger.warning(f"🔌 Circuit open for {domain} until {time.ctime(health.open_until)} "
+                           f"({health.consecutive_failures} consecutive failures)")
+        return health
+
+    def trip(self, domain: str, seconds: float, now: Optional[float] = None) -> DomainHealth:
+        """Abre el circuito del host durante al menos ``seconds`` (bloqueo, CAPTCHA, Retry-After largo)."""
+        if now is None:
+            now = self.clock()
+
+        def block(entry):
+            if entry is None:
+                entry = (0, CLOSED, 0, 0, 0, 0, 0.0, 0.0, b'')
+            _, _, consecutive, successes, failures, trips, open_until, _, host = entry
+            return (0, OPEN, consecutive + 1, successes, failures + 1, trips + 1,
+                    max(open_until, now + min(seconds, self.max_open_seconds)), now, host)
+
+        health = self._update(domain, block)
+        if health is not None:
+            logger.warning(f"🚫 Circuit open for {domain} until {time.ctime(health.open_until)}")
+        return health
+
+    def get(self, domain: str) -> Optional[DomainHealth]:
+        """Estado del host, o None si nunca ha fallado."""
+        entry = self._read(domain)
+        return DomainHealth(entry) if entry is not None else None
+
+    def snapshot(self, state: Optional[str] = None) -> List[Dict[str, object]]:
+        """Hosts registrados (opcionalmente solo los de un estado), los más problemáticos primero."""
+        items = []
+        for slot in range(self.slots):
+            entry = _ENTRY.unpack_from(self.mm, _HEADER_SIZE + slot * _ENTRY.size)
+            if entry[0]:
+                health = DomainHealth(entry).as_dict()
+                if state is None or health['state'] == state:
+                    items.append(health)
+        items.sort(key=lambda item: (item['state'] == 'closed', -item['consecutive_failures'], -item['failures']))
+        return items
+
+    def close(self):
+        self.mm.close()
+        if self.file is not None:
+            self.file.close()
+
+
+class _Locked:
+    """Lock del proceso más ``flock`` sobre el fichero de la tabla."""
+
+    def __init__(self, store: DomainHealthStore):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.store._flock(True)
+
+    def __exit__(self, *exc_info):
+        self.store._flock(False)
+        self.store._lock.release()
+
+
+def create_domain_health(settings, path: Optional[str] = None) -> DomainHealthStore:
+    """Crea una tabla con los parámetros DOMAIN_HEALTH_* de los settings."""
+    return DomainHealthStore(
+        path=path,
+        slots=settings.getint('DOMAIN_HEALTH_SLOTS', 4096),
+        failure_threshold=settings.getint('DOMAIN_HEALTH_FAILURE_THRESHOLD', 5),
+        open_seconds=settings.getfloat('DOMAIN_HEALTH_OPEN_SECONDS', 60.0),
+        max_open_seconds=settings.getfloat('DOMAIN_HEALTH_MAX_OPEN_SECONDS', 3600.0),
+    )
+
+
+def get_domain_health(settings=None) -> DomainHealthStore:
+    """
+    Devuelve la tabla de salud persistente del proceso (se crea en la primera llamada).
+
+    Args:
+        settings: Settings de Scrapy con los parámetros DOMAIN_HEALTH_* (opcional)
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if settings is None:
+                from scrapy.settings import Settings
+                settings = Settings()
+                settings.setmodule('app.scraper.settings', priority='project')
+            _store = create_domain_health(settings, get_health_path())
+        return _store
+
+
+__all__ = [
+    'CLOSED', 'OPEN', 'HALF_OPEN', 'DomainHealth', 'DomainHealthStore', 'create_domain_health',
+    'domain_blocked', 'get_domain_health', 'get_health_path',
+]
@@ -0,0 +1,227 @@
+"""
+Planificador de delays por dominio basado en token buckets.
+
+Cada dominio tiene su propio bucket: las peticiones consumen un token y, si
+no hay tokens disponibles, reservan el siguiente hueco libre. El planificador
+solo calcula cuánto debe esperar cada petición; la espera en sí la hace el
+middleware con un ``Deferred`` para no bloquear el reactor de Twisted, de modo
+que mientras un dominio espera los demás siguen descargando.
+
+``DomainReadyPriorityQueue`` (``SCHEDULER_PRIORITY_QUEUE``) lleva la espera a
+la cola del scheduler: una petición que espera dentro del downloader ocupa uno
+de los ``CONCURRENT_REQUESTS`` huecos globales, y varias peticiones seguidas de
+un dominio lento podían dejar parado el crawl del resto de dominios.
+"""
+
+import time
+from typing import Dict, Optional
+
+from scrapy.pqueues import ScrapyPriorityQueue, _path_safe
+from scrapy.utils.httpobj import urlparse_cached
+
+
+class TokenBucket:
+    """Token bucket con reservas: los tokens pueden quedar en negativo."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Consume un token y devuelve los segundos de espera necesarios.
+
+        Args:
+            now: Instante actual (segundos, reloj monotónico)
+
+        Returns:
+            Segundos que la petición debe esperar antes de salir
+        """
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        self.tokens -= 1.0
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class DomainDelayScheduler:
+    """Reparte las peticiones de cada dominio respetando un delay mínimo entre ellas."""
+
+    def __init__(self, burst: float = 1.0, clock=time.monotonic):
+        """
+        Inicializa el planificador.
+
+        Args:
+            burst: Número de peticiones que un dominio inactivo puede lanzar sin esperar
+            clock: Función de reloj (inyectable para tests)
+        """
+        self.burst = max(1.0, burst)
+        self.clock = clock
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def reserve(self, domain: str, delay: float, now: Optional[float] = None) -> float:
+        """
+        Reserva el siguiente hueco para un dominio.
+
+        Args:
+            domain: Dominio de la petición
+            delay: Delay mínimo deseado entre peticiones del dominio (segundos)
+            now: Instante actual (opcional)
+
+        Returns:
+            Segundos que la petición debe esperar (0 si puede salir ya)
+        """
+        if now is None:
+            now = self.clock()
+        if delay <= 0:
+            return 0.0
+
+        rate = 1.0 / delay
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            bucket = TokenBucket(rate, self.burst, now)
+            self.buckets[domain] = bucket
+        else:
+            # El delay es adaptativo: actualizar la tasa antes de reservar
+            bucket.rate = rate
+        return bucket.reserve(now)
+
+    def pending_wait(self, domain: str, now: Optional[float] = None) -> float:
+        """Devuelve cuánto esperaría ahora una nueva petición del dominio sin reservar."""
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            return 0.0
+        if now is None:
+            now = self.clock()
+        tokens = min(bucket.capacity, bucket.tokens + max(0.0, now - bucket.updated_at) * bucket.rate)
+        return 0.0 if tokens >= 1.0 else (1.0 - tokens) / bucket.rate
+
+
+class DomainReadyPriorityQueue:
+    """
+    Cola de prioridad del scheduler que solo entrega peticiones de dominios con hueco libre.
+
+    Mantiene una cola de prioridad de Scrapy por dominio (``netloc``, la misma
+    clave que los token buckets de ``RateLimitingMiddleware``). ``pop`` recorre
+    los dominios con menos descargas activas primero, se salta los que aún no
+    tienen hueco (``ready_in`` del rate limiter) y reserva el hueco del que
+    entrega (``claim``). Si ningún dominio está listo devuelve ``None`` y
+    programa que el engine vuelva a pedir peticiones cuando el primero lo esté.
+
+    Sin ``RateLimitingMiddleware`` activo se comporta como
+    ``DownloaderAwarePriorityQueue``.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler, downstream_queue_cls, key, startprios=()):
+        return cls(crawler, downstream_queue_cls, key, startprios)
+
+    def __init__(self, crawler, downstream_queue_cls, key, slot_startprios=()):
+        if slot_startprios and not isinstance(slot_startprios, dict):
+            raise ValueError(
+                "DomainReadyPriorityQueue solo puede reanudar un estado creado por la misma cola "
+                f"(recibido {slot_startprios.__class__!r})"
+            )
+        self.crawler = crawler
+        self.downstream_queue_cls = downstream_queue_cls
+        self.key = key
+        self.downloader = crawler.engine.downloader
+        self.limiter = next(
+            (mw for mw in self.downloader.middleware.middlewares if hasattr(mw, 'claim') and hasattr(mw, 'ready_in')),
+            None,
+        )
+        self.wakeup = None
+
+        self.pqueues = {}  # dominio -> cola de prioridad
+        for slot, startprios in (slot_startprios or {}).items():
+            self.pqueues[slot] = self.pqfactory(slot, startprios)
+
+    def pqfactory(self, slot, startprios=()):
+        return ScrapyPriorityQueue(
+            self.crawler,
+            self.downstream_queue_cls,
+            self.key + "/" + _path_safe(slot),
+            startprios,
+        )
+
+    def _ready_slot(self):
+        """Dominio listo con menos descargas activas y, si no hay ninguno, la espera mínima."""
+        slots = sorted(self.pqueues, key=self._active_downloads)
+        if self.limiter is None:
+            return (slots[0] if slots else None), 0.0
+        min_wait = None
+        for slot in slots:
+            wait = self.limiter.ready_in(slot)
+            if wait <= 0:
+                return slot, 0.0
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+        return None, min_wait
+
+    def _active_downloads(self, slot):
+        downloader_slot = self.downloader.slots.get(slot)
+        return len(downloader_slot.active) if downloader_slot is not None else 0
+
+    def pop(self):
+        slot, wait = self._ready_slot()
+        if slot is None:
+            if wait:
+                self._schedule_wakeup(wait)
+            return None
+
+        queue = self.pqueues[slot]
+        request = queue.pop()
+        if len(queue) == 0:
+            del self.pqueues[slot]
+        if request is not None and self.limiter is not None:
+            self.limiter.claim(request)
+        return request
+
+    def _schedule_wakeup(self, wait):
+        """Despierta al engine cuando el primer dominio en espera tenga hueco."""
+        from twisted.internet import reactor
+
+        if self.wakeup is not None and self.wakeup.active():
+            if self.wakeup.getTime() <= reactor.seconds() + wait:
+                return
+            self.wakeup.cancel()
+        self.wakeup = reactor.callLater(wait, self._wake_engine)
+
+    def _wake_engine(self):
+        self.wakeup = None
+        slot = getattr(self.crawler.engine, 'slot', None)
+        if slot is not None:
+            slot.nextcall.schedule()
+
+    def push(self, request):
+        slot = urlparse_cached(request).netloc
+        if slot not in self.pqueues:
+            self.pqueues[slot] = self.pqfactory(slot)
+        self.pqueues[slot].push(request)
+
+    def peek(self):
+        """Petición que devolvería ``pop`` sin sacarla ni reservar su hueco."""
+        slot, _ = self._ready_slot()
+        return self.pqueues[slot].peek() if slot is not None else None
+
+    def close(self):
+        if self.wakeup is not None and self.wakeup.active():
+            self.wakeup.cancel()
+        self.wakeup = None
+        active = {slot: queue.close() for slot, queue in self.pqueues.items()}
+        self.pqueues.clear()
+        return active
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.pqueues.values()) if self.pqueues else 0
+
+    def __contains__(self, slot):
+        return slot in self.pqueues
+
+
+__all__ = ['TokenBucket', 'DomainDelayScheduler', 'DomainReadyPriorityQueue']
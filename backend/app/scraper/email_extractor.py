@@ -0,0 +1,133 @@
+"""
+Extractor de emails de una sola pasada para el spider de leads.
+
+En lugar de ejecutar decenas de ``re.findall`` sobre el HTML completo, se
+recorre el texto una única vez buscando marcadores de arroba (``@``,
+``[at]``, ``(at)``, ``\\u0040``, ``&#64;``...) y, para cada marcador, se
+expande hacia la izquierda (parte local) y hacia la derecha (dominio).
+El coste es lineal en el tamaño de la página y cubre los emails planos,
+con prefijo (``mailto:``, ``email:``), ofuscados, dentro de strings de
+JavaScript, en valores de formularios, comentarios y etiquetas meta.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Marcadores de arroba: literal, ofuscados y codificados (JS / entidades HTML)
+_MARKER_RE = re.compile(
+    r'@|\[at\]|\(at\)|\\u0040|\\x40|&#0*64;|&#x0*40;',
+    re.IGNORECASE
+)
+
+# Dominio inmediatamente después del marcador
+_DOMAIN_RE = re.compile(r'[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+_DOMAIN_BOUNDARY_RE = re.compile(r'[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+
+# Tokens anti-spam que algunos sitios insertan tras la arroba
+_SPAM_TOKEN_RE = re.compile(r'(?:nospam|no\s*spam|remove\s*me)\s*', re.IGNORECASE)
+
+_WHITESPACE = frozenset(' \t\n\r\f\v')
+_LOCAL_CHARS = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-'
+)
+
+# Límites RFC 5321
+MAX_LOCAL_LENGTH = 64
+MAX_EMAIL_LENGTH = 254
+
+
+def _is_word_char(char: str) -> bool:
+    """Replica la semántica de ``\\w`` usada por ``\\b`` en el patrón clásico."""
+    return char.isalnum() or char == '_'
+
+
+def _local_starts(text: str, end: int) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Devuelve los posibles inicios de la parte local que termina en ``end``.
+
+    Se devuelve el inicio de la secuencia completa de caracteres válidos y el
+    primer inicio que cae en un límite de palabra (el que encontraría
+    ``\\b[A-Za-z0-9._%+-]+@``), o ``None`` si no hay ninguno.
+    """
+    start = end
+    limit = max(0, end - MAX_LOCAL_LENGTH)
+    while start > limit and text[start - 1] in _LOCAL_CHARS:
+        start -= 1
+
+    if start == end:
+        return None
+    # Parte local más larga que el máximo permitido: no es un email real
+    if start > 0 and text[start - 1] in _LOCAL_CHARS:
+        return None
+
+    previous_is_word = start > 0 and _is_word_char(text[start - 1])
+    for position in range(start, end):
+        current_is_word = _is_word_char(text[position])
+        if current_is_word != previous_is_word:
+            return start, position
+        previous_is_word = current_is_word
+
+    return start, None
+
+
+def extract_emails(text) -> List[str]:
+    """
+    Extrae todos los emails candidatos de un texto en una sola pasada.
+
+    Args:
+        text: HTML o texto de la página
+
+    Returns:
+        Lista de emails únicos en minúsculas, en orden de aparición
+    """
+    if not text:
+        return []
+
+    text = str(text)
+    found = {}
+
+    for marker in _MARKER_RE.finditer(text):
+        marker_start, marker_end = marker.span()
+
+        # Parte local: se permiten espacios entre el usuario y el marcador
+        local_end = marker_start
+        while local_end > 0 and text[local_end - 1] in _WHITESPACE:
+            local_end -= 1
+        starts = _local_starts(text, local_end)
+        if starts is None:
+            continue
+        run_start, boundary_start = starts
+
+        # Dominio: se permiten espacios y tokens anti-spam tras el marcador
+        domain_start = marker_end
+        while domain_start < len(text) and text[domain_start] in _WHITESPACE:
+            domain_start += 1
+
+        candidates = []
+        domain_match = _DOMAIN_RE.match(text, domain_start)
+        if domain_match:
+            candidates.append((run_start, domain_match.group()))
+
+            # Arroba literal sin espacios: variante con límites de palabra
+            is_tight = (marker.group() == '@' and local_end == marker_start
+                        and domain_start == marker_end)
+            if is_tight and boundary_start is not None:
+                boundary_match = _DOMAIN_BOUNDARY_RE.match(text, domain_start)
+                if boundary_match:
+                    candidates.append((boundary_start, boundary_match.group()))
+
+        spam_match = _SPAM_TOKEN_RE.match(text, domain_start)
+        if spam_match:
+            stripped_match = _DOMAIN_RE.match(text, spam_match.end())
+            if stripped_match:
+                candidates.append((run_start, stripped_match.group()))
+
+        for start, domain in candidates:
+            email = f"{text[start:local_end]}@{domain}".lower()
+            if len(email) <= MAX_EMAIL_LENGTH:
+                found.setdefault(email, None)
+
+    return list(found)
+
+
+__all__ = ['extract_emails', 'MAX_LOCAL_LENGTH', 'MAX_EMAIL_LENGTH']
@@ -0,0 +1,286 @@
+"""
+Frescura de los dominios rastreados y planificación de revisitas.
+
+Cada página guardada cuenta sus visitas (``Website.scrape_count``, una por
+recrawl, cambie o no) y los cambios de contenido detectados en ellas
+(``Website.change_count``: el hash del cuerpo difiere del guardado). Con ese
+historial ``FreshnessEstimator`` estima la tasa de cambio de cada dominio
+como un proceso de Poisson: si una página se visita ``n`` veces cada ``I``
+segundos y se detectan ``X`` cambios, la tasa es
+``-ln((n - X + 0.5) / (n + 0.5)) / I`` (el estimador corregido de Cho y
+Garcia-Molina: visitas que encuentran un cambio pueden esconder varios). La
+tasa a priori, un cambio cada ``FRESHNESS_DEFAULT_CHANGE_DAYS`` días, pesa
+como una visita más, así que sin revisitas es la única estimación.
+
+Con la tasa ``λ`` y la edad del último crawl ``t``, la fracción esperada de
+páginas cambiadas es ``1 - exp(-λ t)``:
+
+- Un dominio está fresco mientras esa fracción no llega a
+  ``FRESHNESS_MAX_STALENESS``. ``create_job`` devuelve entonces los leads
+  guardados sin rastrearlo si su último job completado llegó al menos a la
+  profundidad pedida (``completed_depth``), y un dominio así pero caducado se
+  encola como recrawl incremental (GET condicional). Si no, crawl completo.
+- ``plan_revisits`` ordena los dominios caducados por rendimiento esperado
+  (páginas cambiadas esperadas × emails por página) y ``schedule_revisits``
+  los encola como jobs de recrawl. Se lanza periódicamente (cron):
+
+    cd backend && python -m app.scraper.freshness [--schedule N]
+"""
+
+import argparse
+import logging
+import math
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import func
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from app.database.models import Email, ScrapingQueue, Website
+from app.scraper.dispatcher import registered_domain
+
+logger = logging.getLogger(__name__)
+
+# Estados de un job que ya cubren la revisita de su dominio
+_ACTIVE_STATUSES = ("pending", "processing", "paused")
+
+
+class DomainStats(NamedTuple):
+    """Historial de crawls de un dominio (host de ``Website.domain``)."""
+    domain: str
+    pages: int
+    emails: int
+    visits: int  # Revisitas de páginas ya guardadas
+    changes: int  # Revisitas que encontraron la página cambiada
+    first_seen: datetime
+    last_crawled: datetime
+    start_url: str
+    max_depth: int
+
+
+class RevisitPlan(NamedTuple):
+    """Revisita propuesta para un dominio caducado."""
+    stats: DomainStats
+    staleness: float  # Fracción esperada de páginas cambiadas
+    expected_yield: float  # Páginas cambiadas esperadas × emails por página
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona horaria (CURRENT_TIMESTAMP está en UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class FreshnessEstimator:
+    """Tasa de cambio, frescura y rendimiento esperado de la revisita de un dominio."""
+
+    def __init__(self, default_change_days: float = 30.0, max_staleness: float = 0.2):
+        """
+        Args:
+            default_change_days: Días entre cambios supuestos para un dominio sin revisitas
+            max_staleness: Fracción de páginas cambiadas a partir de la cual un dominio caduca
+        """
+        self.default_rate = 1.0 / (max(default_change_days, 1e-6) * 86400.0)
+        self.max_staleness = min(max(max_staleness, 0.0), 0.999)
+
+    def change_rate(self, stats: DomainStats) -> float:
+        """Cambios por página y segundo."""
+        visits = stats.visits
+        span = (_utc(stats.last_crawled) - _utc(stats.first_seen)).total_seconds()
+        if visits <= 0 or span <= 0:
+            return self.default_rate
+        changes = min(stats.changes, visits)
+        # Intervalo medio entre visitas de una misma página
+        interval = span * max(stats.pages, 1) / visits
+        estimate = -math.log((visits - changes + 0.5) / (visits + 0.5)) / interval
+        # La tasa a priori cuenta como una visita más: un sitio sin cambios vistos acaba caducando
+        return (estimate * visits + self.default_rate) / (visits + 1)
+
+    def staleness(self, stats: DomainStats, now: Optional[datetime] = None) -> float:
+        """Fracción esperada de páginas que cambiaron desde el último crawl."""
+        now = now or datetime.now(timezone.utc)
+        age = max((now - _utc(stats.last_crawled)).total_seconds(), 0.0)
+        return 1.0 - math.exp(-self.change_rate(stats) * age)
+
+    def is_fresh(self, stats: DomainStats, now: Optional[datetime] = None) -> bool:
+        return self.staleness(stats, now) < self.max_staleness
+
+    def fresh_until(self, stats: DomainStats) -> datetime:
+        """Momento en que el dominio caduca."""
+        seconds = -math.log(1.0 - self.max_staleness) / self.change_rate(stats)
+        return _utc(stats.last_crawled) + timedelta(seconds=min(seconds, 3650 * 86400.0))
+
+    def expected_yield(self, stats: DomainStats, now: Optional[datetime] = None) -> float:
+        """Páginas cambiadas esperadas ponderadas por los emails por página del dominio."""
+        density = (stats.emails + 1) / (stats.pages + 2)
+        return stats.pages * self.staleness(stats, now) * density
+
+
+def get_freshness_estimator() -> FreshnessEstimator:
+    """Estimador con la configuración de la aplicación (``FRESHNESS_*``)."""
+    from app.core.config import settings
+    return FreshnessEstimator(settings.FRESHNESS_DEFAULT_CHANGE_DAYS, settings.FRESHNESS_MAX_STALENESS)
+
+
+def load_domain_stats(db, domains: Optional[Iterable[str]] = None) -> Dict[str, DomainStats]:
+    """
+    Agrega el historial de crawls por dominio con una consulta.
+
+    Args:
+        db: Sesión de SQLAlchemy
+        domains: Hosts a cargar (por defecto todos)
+    """
+    query = db.query(
+        Website.domain, func.count(Website.id), func.sum(Website.email_count), func.sum(Website.scrape_count),
+        func.sum(Website.change_count), func.min(Website.created_at), func.max(Website.updated_at),
+        func.min(Website.url), func.max(Website.depth_level)
+    ).group_by(Website.domain)
+    if domains is not None:
+        query = query.filter(Website.domain.in_(list(domains)))
+
+    stats = {}
+    for domain, pages, emails, visits, changes, first_seen, last_crawled, url, max_depth in query:
+        if first_seen is None or last_crawled is None:
+            continue
+        scheme = urlparse(url).scheme or 'https'
+        stats[domain] = DomainStats(domain, pages, emails or 0, visits or 0, changes or 0, first_seen,
+                                    last_crawled, f"{scheme}://{domain}/", max_depth or 0)
+    return stats
+
+
+def host_variants(host: str) -> List[str]:
+    """El host con y sin ``www.`` (``Website.domain`` guarda el host tal como se rastreó)."""
+    host = host.lower()
+    bare = host[4:] if host.startswith('www.') else host
+    return [host, bare if bare != host else f'www.{host}']
+
+
+def host_stats(db, host: str) -> Optional[DomainStats]:
+    """Historial del host (con o sin ``www.``): el de la variante rastreada más recientemente."""
+    stats = load_domain_stats(db, host_variants(host)).values()
+    return max(stats, key=lambda entry: entry.last_crawled, default=None)
+
+
+def completed_depth(db, url: str) -> Optional[int]:
+    """
+    Profundidad del último job completado del host de la URL (con o sin ``www.``).
+
+    Returns:
+        ``max_depth`` de ese job, o None si el host no tiene jobs completados
+    """
+    variants = host_variants(urlparse(url).netloc)
+    rows = db.query(ScrapingQueue.url, ScrapingQueue.max_depth).filter(
+        ScrapingQueue.domain == registered_domain(url), ScrapingQueue.status == "completed"
+    ).order_by(ScrapingQueue.updated_at.desc(), ScrapingQueue.id.desc())
+    for job_url, max_depth in rows:
+        if urlparse(job_url).netloc.lower() in variants:
+            return max_depth
+    return None
+
+
+def cached_leads(db, domain: str, limit: int = 100) -> List[Dict]:
+    """Emails válidos ya guardados del host (con o sin ``www.``), los de mayor calidad primero."""
+    rows = db.query(Email.email, Email.source_page, Email.quality_score).join(Website).filter(
+        Website.domain.in_(host_variants(domain)), Email.is_valid == 1
+    ).order_by(Email.quality_score.desc(), Email.id.asc()).limit(limit)
+    return [{'email': email, 'url': source_page, 'quality_score': quality_score}
+            for email, source_page, quality_score in rows]
+
+
+def plan_revisits(db, estimator: FreshnessEstimator, limit: int,
+                  now: Optional[datetime] = None) -> List[RevisitPlan]:
+    """
+    Dominios caducados sin un job en curso, por rendimiento esperado.
+
+    Args:
+        db: Sesión de SQLAlchemy
+        estimator: ``FreshnessEstimator``
+        limit: Número máximo de revisitas
+        now: Instante de referencia (inyectable para tests)
+    """
+    now = now or datetime.now(timezone.utc)
+    queued = {
+        domain or registered_domain(url)
+        for domain, url in db.query(ScrapingQueue.domain, ScrapingQueue.url).filter(
+            ScrapingQueue.status.in_(_ACTIVE_STATUSES))
+    }
+    plans = []
+    for stats in load_domain_stats(db).values():
+        if registered_domain(stats.domain) in queued or estimator.is_fresh(stats, now):
+            continue
+        plans.append(RevisitPlan(stats, estimator.staleness(stats, now), estimator.expected_yield(stats, now)))
+    plans.sort(key=lambda plan: plan.expected_yield, reverse=True)
+    return plans[:max(limit, 0)]
+
+
+def schedule_revisits(limit: int, estimator: Optional[FreshnessEstimator] = None,
+                      session_factory=None, now: Optional[datetime] = None) -> List[str]:
+    """
+    Encola como jobs de recrawl las ``limit`` mejores revisitas.
+
+    Returns:
+        IDs de los jobs encolados
+    """
+    if session_factory is None:
+        from app.database.database import SessionLocal as session_factory
+    estimator = estimator or get_freshness_estimator()
+
+    db = session_factory()
+    try:
+        job_ids = []
+        for plan in plan_revisits(db, estimator, limit, now):
+            job_id = str(uuid.uuid4())[:8]
+            db.add(ScrapingQueue(
+                job_id=job_id,
+                url=plan.stats.start_url,
+                domain=registered_domain(plan.stats.start_url),
+                priority=0,
+                depth_level=0,
+                max_depth=max(plan.stats.max_depth, 1),
+                status="pending",
+                attempts=0,
+                recrawl=1
+            ))
+            job_ids.append(job_id)
+        db.commit()
+    finally:
+        db.close()
+    if job_ids:
+        logger.info(f"🔁 Scheduled {len(job_ids)} revisit jobs")
+    return job_ids
+
+
+__all__ = [
+    'DomainStats', 'FreshnessEstimator', 'RevisitPlan', 'cached_leads', 'completed_depth', 'get_freshness_estimator',
+    'host_stats', 'host_variants', 'load_domain_stats', 'plan_revisits', 'schedule_revisits',
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planifica las revisitas de los dominios caducados")
+    parser.add_argument('--limit', type=int, default=20, help='Revisitas a mostrar')
+    parser.add_argument('--schedule', type=int, default=0, help='Encola las N mejores revisitas como jobs de recrawl')
+    args = parser.parse_args()
+
+    from app.database.database import SessionLocal
+
+    freshness = get_freshness_estimator()
+    session = SessionLocal()
+    try:
+        revisits = plan_revisits(session, freshness, max(args.limit, args.schedule))
+    finally:
+        session.close()
+    if not revisits:
+        print("✅ Ningún dominio caducado")
+    for revisit in revisits:
+        print(f"   {revisit.stats.domain:<40} {revisit.staleness:6.1%} cambiado, "
+              f"rendimiento {revisit.expected_yield:7.2f}, último crawl {revisit.stats.last_crawled:%Y-%m-%d %H:%M}")
+    if args.schedule:
+        from app.scraper.worker import notify_workers
+
+        scheduled = schedule_revisits(args.schedule, freshness)
+        notify_workers()
+        print(f"🔁 {len(scheduled)} revisitas encoladas")
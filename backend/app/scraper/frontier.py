@@ -0,0 +1,94 @@
+"""
+Prioridad de los enlaces: primero las páginas con más probabilidad de tener contacto.
+
+``LinkScorer`` puntúa cada enlace saliente con su texto de anclaje, las
+palabras de su ruta y su posición en la página, y la puntuación se convierte
+en la prioridad de la petición de Scrapy (que se suma a la de profundidad de
+``DEPTH_PRIORITY``). Así la página de contacto enlazada desde la portada se
+descarga antes que las decenas de entradas de blog que aparecen antes en el
+HTML.
+
+Las palabras se buscan como comienzo de palabra (``contact`` encuentra
+``contact-us`` y ``contactanos``, pero ``tag`` no encuentra ``vintage``).
+
+- Ruta con palabras de contacto (``FRONTIER_CONTACT_KEYWORDS``: contacto,
+  about, nosotros, equipo, impressum, legal...): +60.
+- Texto de anclaje con esas palabras: +50.
+- Ruta o texto de listados sin contacto (``FRONTIER_LOW_VALUE_KEYWORDS``:
+  blog, tag, categoría, páginas de archivo...): -30.
+- Posición: hasta +10 en la cabecera y el pie de la página (menú y footer,
+  donde suelen estar los enlaces de contacto), nada en el centro.
+"""
+
+import re
+from typing import Iterable, Optional
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_CONTACT_KEYWORDS = (
+    'contact', 'contáct', 'kontakt', 'about', 'acerca', 'nosotros', 'quienes', 'quiénes',
+    'equipo', 'team', 'staff', 'impressum', 'imprint', 'legal',
+)
+
+DEFAULT_LOW_VALUE_KEYWORDS = (
+    'blog', 'noticia', 'news', 'tag', 'categor', 'archiv', 'page', 'pagina', 'página',
+    'feed', 'comment', 'comentario', 'etiqueta', 'autor', 'author',
+)
+
+CONTACT_PATH_SCORE = 60
+CONTACT_ANCHOR_SCORE = 50
+LOW_VALUE_SCORE = -30
+POSITION_SCORE = 10
+# Puntuación mínima de un enlace con palabras de contacto en la ruta o en el texto
+CONTACT_SCORE_THRESHOLD = min(CONTACT_PATH_SCORE, CONTACT_ANCHOR_SCORE)
+
+
+class LinkScorer:
+    """Puntuación de enlaces salientes para ordenar la frontera del crawl."""
+
+    def __init__(self, contact_keywords: Iterable[str] = DEFAULT_CONTACT_KEYWORDS,
+                 low_value_keywords: Iterable[str] = DEFAULT_LOW_VALUE_KEYWORDS):
+        """
+        Compila las familias de palabras.
+
+        Args:
+            contact_keywords: Palabras de páginas de contacto (FRONTIER_CONTACT_KEYWORDS)
+            low_value_keywords: Palabras de listados y archivos (FRONTIER_LOW_VALUE_KEYWORDS)
+        """
+        self.contact = self._compile(contact_keywords)
+        self.low_value = self._compile(low_value_keywords)
+
+    @staticmethod
+    def _compile(keywords: Iterable[str]):
+        """Expresión que encuentra cualquiera de las palabras al comienzo de una palabra."""
+        keywords = sorted({keyword.lower() for keyword in keywords if keyword}, key=len, reverse=True)
+        if not keywords:
+            return re.compile(r'(?!)')
+        return re.compile(r'(?<![^\W\d_])(?:' + '|'.join(map(re.escape, keywords)) + ')', re.IGNORECASE)
+
+    def score(self, url: str, anchor_text: Optional[str] = None, position: int = 0, total: int = 1) -> int:
+        """
+        Puntuación del enlace (se usa como prioridad de la petición).
+
+        Args:
+            url: URL absoluta del enlace
+            anchor_text: Texto del enlace
+            position: Índice del enlace entre los de la página
+            total: Número de enlaces de la página
+        """
+        path = unquote(urlsplit(url).path).lower()
+        score = 0
+        contact_path = self.contact.search(path)
+        if contact_path:
+            score += CONTACT_PATH_SCORE
+        if anchor_text and self.contact.search(anchor_text):
+            score += CONTACT_ANCHOR_SCORE
+        elif not contact_path and (self.low_value.search(path) or self.low_value.search(anchor_text or '')):
+            score += LOW_VALUE_SCORE
+        if total > 1:
+            # 1 en el primer y el último enlace, 0 en el centro de la página
+            edge = abs(2 * position / (total - 1) - 1)
+            score += round(POSITION_SCORE * edge * edge)
+        return score
+
+
+__all__ = ['LinkScorer', 'CONTACT_SCORE_THRESHOLD', 'DEFAULT_CONTACT_KEYWORDS', 'DEFAULT_LOW_VALUE_KEYWORDS']
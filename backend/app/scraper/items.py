@@ -15,6 +15,7 @@ class LeadItem(scrapy.Item):
     depth_level = scrapy.Field()
     source_url = scrapy.Field()
     emails = scrapy.Field()  # Lista de emails encontrados
+    job_id = scrapy.Field()  # Job de la semilla de la que viene la página (modo batch)
     
     # Campos avanzados de calidad
     page_quality_score = scrapy.Field()  # Puntuación de calidad de página (0-100)
@@ -55,6 +56,14 @@ class LeadItem(scrapy.Item):
     scraped_at = scrapy.Field()  # Timestamp de scraping
     email_context = scrapy.Field()  # Contexto donde se encontró cada email
     email_anchors = scrapy.Field()  # Texto del enlace para cada email
+    content_signature = scrapy.Field()  # Firma MinHash del texto visible (casi-duplicados)
+    page_features = scrapy.Field()  # PageFeatures de la página (no se guarda en la base de datos)
+    fetch_url = scrapy.Field()  # URL de la respuesta (la que se vuelve a pedir en el recrawl)
+    canonical_url = scrapy.Field()  # URL declarada en <link rel="canonical"> (no sustituye a url)
+    etag = scrapy.Field()  # Cabecera ETag de la respuesta
+    last_modified = scrapy.Field()  # Cabecera Last-Modified de la respuesta
+    content_hash = scrapy.Field()  # Hash del cuerpo (detección de cambios en el recrawl)
+    recrawled = scrapy.Field()  # Página ya guardada que cambió (actualiza su registro)
 
 
 class EmailItem(scrapy.Item):
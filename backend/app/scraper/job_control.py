@@ -0,0 +1,263 @@
+"""
+Canal de control local para los procesos de scraping.
+
+Cada proceso de Scrapy que ejecuta un job escucha en un socket Unix de
+datagramas propio (uno por ``job_id``). La API envía ``pause``, ``resume`` o
+``cancel`` a ese socket y la extensión ``JobControlExtension`` los traduce a
+``engine.pause()``, ``engine.unpause()`` y ``engine.close_spider()``: las
+peticiones en vuelo terminan con normalidad, no se bloquea el reactor y el
+spider no necesita consultar la base de datos mientras parsea.
+
+Un spider batch (``-a queue=N``) escucha además en el socket de cada job
+reclamado. Esos comandos solo afectan a la semilla del job:
+``JobControlMiddleware`` retiene sus peticiones mientras está pausado (se
+vuelven a pedir al reanudarlo) y descarta las de un job cancelado, sin parar
+el resto del batch.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from scrapy.exceptions import IgnoreRequest
+
+logger = logging.getLogger(__name__)
+
+CONTROL_COMMANDS = ('pause', 'resume', 'cancel')
+
+# Estados de ScrapingQueue que implican un comando al arrancar el proceso
+_INITIAL_STATUS_COMMANDS = {'paused': 'pause', 'cancelled': 'cancel'}
+
+
+def get_control_dir() -> str:
+    """Devuelve el directorio donde viven los sockets de control (JOB_CONTROL_DIR)."""
+    return os.environ.get(
+        'JOB_CONTROL_DIR',
+        os.path.join(tempfile.gettempdir(), 'leads_generator_jobs')
+    )
+
+
+def control_socket_path(job_id: str, control_dir: Optional[str] = None) -> str:
+    """
+    Calcula la ruta del socket de control de un job.
+
+    Se usa un hash del ``job_id`` para respetar el límite de longitud de las
+    rutas de sockets Unix y evitar caracteres problemáticos.
+    """
+    digest = hashlib.sha1(str(job_id).encode('utf-8')).hexdigest()[:20]
+    return os.path.join(control_dir or get_control_dir(), f"{digest}.sock")
+
+
+def _send(path: str, command: str) -> bool:
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(command.encode('ascii'), path)
+        return True
+    except OSError:
+        # Socket huérfano (el proceso terminó sin limpiarlo) o buffer lleno
+        return False
+
+
+def send_job_command(job_id: str, command: str, control_dir: Optional[str] = None) -> bool:
+    """
+    Envía un comando al proceso que ejecuta un job.
+
+    Args:
+        job_id: ID del job
+        command: 'pause', 'resume' o 'cancel'
+        control_dir: Directorio de sockets (opcional)
+
+    Returns:
+        True si había un proceso escuchando y se entregó el comando
+    """
+    if command not in CONTROL_COMMANDS:
+        raise ValueError(f"Comando de control no soportado: {command}")
+    return _send(control_socket_path(job_id, control_dir), command)
+
+
+def resume_job_process(job_id: str, control_dir: Optional[str] = None) -> str:
+    """
+    Reanuda el proceso de un job pausado.
+
+    Returns:
+        Estado que debe quedar en ScrapingQueue: 'processing' si el proceso
+        seguía vivo y se reanudó, 'pending' para que vuelva a la cola
+    """
+    return "processing" if send_job_command(job_id, "resume", control_dir) else "pending"
+
+
+def broadcast_job_command(command: str, control_dir: Optional[str] = None) -> int:
+    """
+    Envía un comando a todos los procesos de scraping en ejecución.
+
+    Returns:
+        Número de procesos que recibieron el comando
+    """
+    if command not in CONTROL_COMMANDS:
+        raise ValueError(f"Comando de control no soportado: {command}")
+    control_dir = control_dir or get_control_dir()
+    try:
+        names = os.listdir(control_dir)
+    except OSError:
+        return 0
+    return sum(
+        _send(os.path.join(control_dir, name), command)
+        for name in names if name.endswith('.sock')
+    )
+
+
+class JobRequestHeld(IgnoreRequest):
+    """Petición de un job de un spider batch pausado (se retiene) o cancelado (se descarta)."""
+
+
+class JobControlExtension:
+    """Extensión de Scrapy que aplica los comandos de control recibidos por el socket de cada job."""
+
+    def __init__(self, crawler, control_dir: Optional[str] = None):
+        self.crawler = crawler
+        self.control_dir = control_dir or get_control_dir()
+        self.spider = None
+        # job_id -> (ruta del socket, puerto que escucha en él)
+        self.channels = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy import signals
+        from scrapy.exceptions import NotConfigured
+
+        if not crawler.settings.getbool('JOB_CONTROL_ENABLED', True) or not hasattr(socket, 'AF_UNIX'):
+            raise NotConfigured
+        ext = cls(crawler, crawler.settings.get('JOB_CONTROL_DIR'))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        # El job del spider y, en modo batch, los jobs reclamados de la cola
+        job_id = getattr(spider, 'job_id', None)
+        job_ids = ([job_id] if job_id else []) + list(getattr(spider, 'claimed_jobs', []))
+        if not job_ids:
+            return
+
+        from twisted.internet import reactor
+
+        self.spider = spider
+        os.makedirs(self.control_dir, exist_ok=True)
+        for channel_job_id in job_ids:
+            self._listen(channel_job_id)
+        logger.info(f"🎛️ Job control channel listening for job {job_ids[0]}" if len(job_ids) == 1
+                    else f"🎛️ Job control channels listening for {len(job_ids)} jobs")
+
+        # Comandos emitidos antes de que existieran los sockets: una sola consulta al arrancar
+        for channel_job_id, status in self._load_job_statuses(job_ids).items():
+            command = _INITIAL_STATUS_COMMANDS.get(status)
+            if command:
+                reactor.callLater(0, self.handle_command, command, channel_job_id)
+
+    def _listen(self, job_id: str):
+        from twisted.internet import reactor
+        from twisted.internet.protocol import DatagramProtocol
+
+        extension = self
+
+        class _ControlProtocol(DatagramProtocol):
+            def datagramReceived(self, data, addr):
+                extension.handle_command(data.decode('ascii', 'ignore').strip(), job_id)
+
+        path = control_socket_path(job_id, self.control_dir)
+        if os.path.exists(path):
+            os.unlink(path)
+        self.channels[job_id] = (path, reactor.listenUNIXDatagram(path, _ControlProtocol()))
+
+    def spider_closed(self, spider):
+        for path, port in self.channels.values():
+            port.stopListening()
+            if os.path.exists(path):
+                os.unlink(path)
+        self.channels = {}
+
+    def handle_command(self, command: str, job_id: Optional[str] = None):
+        """
+        Aplica un comando de control sobre el engine de Scrapy o, si es de un job
+        reclamado por un spider batch, solo sobre la semilla de ese job.
+        """
+        engine = self.crawler.engine
+        if engine is None or self.spider is None:
+            return
+        if job_id is not None and job_id != getattr(self.spider, 'job_id', None):
+            self.spider.control_batch_job(job_id, command)
+            return
+
+        if command == 'pause':
+            if not engine.paused:
+                engine.pause()
+                logger.info(f"⏸️ Job paused: {self.spider.job_id}")
+        elif command == 'resume':
+            if engine.paused:
+                engine.unpause()
+                # Reanudar la planificación sin esperar al siguiente heartbeat del engine
+                if engine.slot is not None:
+                    engine.slot.nextcall.schedule()
+                logger.info(f"▶️ Job resumed: {self.spider.job_id}")
+        elif command == 'cancel':
+            logger.info(f"⏹️ Job cancelled: {self.spider.job_id}")
+            engine.unpause()
+            engine.close_spider(self.spider, 'cancelled')
+        else:
+            logger.warning(f"⚠️ Unknown job control command: {command!r}")
+
+    def _load_job_statuses(self, job_ids: Iterable[str]) -> Dict[str, str]:
+        try:
+            from app.database.database import SessionLocal
+            from app.database.models import ScrapingQueue
+
+            db = SessionLocal()
+            try:
+                rows = db.query(ScrapingQueue.job_id, ScrapingQueue.status).filter(
+                    ScrapingQueue.job_id.in_(list(job_ids)))
+                return {job_id: status for job_id, status in rows}
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Error checking job status: {e}")
+            return {}
+
+
+class JobControlMiddleware:
+    """
+    Retiene o descarta las peticiones de los jobs pausados o cancelados de un spider
+    batch (``LeadSpider.hold_batch_request``) antes de que ocupen la descarga.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy.exceptions import NotConfigured
+
+        if not crawler.settings.getbool('JOB_CONTROL_ENABLED', True):
+            raise NotConfigured
+        return cls()
+
+    def process_request(self, request, spider):
+        hold = getattr(spider, 'hold_batch_request', None)
+        if hold is not None and hold(request):
+            raise JobRequestHeld(f"Batch job paused or cancelled: {request.url}")
+        return None
+
+
+__all__ = [
+    'CONTROL_COMMANDS',
+    'get_control_dir',
+    'control_socket_path',
+    'send_job_command',
+    'resume_job_process',
+    'broadcast_job_command',
+    'JobControlExtension',
+    'JobControlMiddleware',
+    'JobRequestHeld',
+]
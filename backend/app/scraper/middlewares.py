@@ -6,11 +6,22 @@ import random
 import time
 import logging
 import json
+import queue
+import threading
 import uuid
 from collections import deque
-from scrapy.exceptions import NotConfigured
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet.task import deferLater
 from .settings import USER_AGENTS
+from .domain_scheduler import DomainDelayScheduler
+from .politeness import SharedDomainDelayScheduler, get_politeness_table
+from .concurrency import AdaptiveConcurrencyController, domain_failed, domain_throttled, parse_retry_after
+from .domain_health import create_domain_health, domain_blocked, get_domain_health
+from .storage import OrderedWriter, get_storage_executor
+from .telemetry import TelemetryRegistry
 
 
 class UserAgentRotationMiddleware:
@@ -28,7 +39,6 @@ class UserAgentRotationMiddleware:
         # Estrategias de rotación
         self.rotation_strategy = crawler.settings.get('USER_AGENT_ROTATION_STRATEGY', 'random')
         self.domain_user_agents = {}  # Cache de user agents por dominio
-        self.request_count = 0
 
         # Configuración adicional
         self.min_requests_per_agent = crawler.settings.getint('MIN_REQUESTS_PER_AGENT', 5)
@@ -57,7 +67,6 @@ class UserAgentRotationMiddleware:
         request.headers['User-Agent'] = user_agent
         request.meta['user_agent'] = user_agent  # Guardar para tracking
 
-        self.request_count += 1
         self.logger.debug(f"🔄 Rotated User-Agent for {domain}: {user_agent}")
 
     def _get_random_user_agent(self):
@@ -103,8 +112,91 @@ class UserAgentRotationMiddleware:
         return parsed.netloc
 
 
+class DomainHealthMiddleware:
+    """
+    Circuit breaker por host, persistente y compartido entre jobs.
+
+    Descarta con ``IgnoreRequest`` las peticiones a hosts con el circuito
+    abierto antes de que ``RateLimitingMiddleware`` las retenga, de modo que un
+    host caído o que nos banea no cuesta reintentos ni esperas. El estado vive
+    en ``DomainHealthStore`` (``app/scraper/domain_health.py``) y se alimenta de
+    las señales de ``ErrorHandlingMiddleware``: ``domain_failed`` y
+    ``domain_throttled`` cuentan como fallos y ``domain_blocked`` (403 que
+    persisten más allá de ``RETRY_TIMES``, 429 tras agotar los reintentos)
+    abre el circuito directamente. Las respuestas sanas reinician los
+    fallos seguidos y cierran el circuito tras la petición de prueba.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.logger = logging.getLogger(__name__)
+        # Con DOMAIN_HEALTH_PERSISTENT el estado es común a todos los jobs y workers
+        if crawler.settings.getbool('DOMAIN_HEALTH_PERSISTENT', False):
+            self.store = get_domain_health(crawler.settings)
+        else:
+            self.store = create_domain_health(crawler.settings)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Inicializa el middleware desde el crawler."""
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.domain_throttled, signal=domain_throttled)
+        crawler.signals.connect(middleware.domain_failed, signal=domain_failed)
+        crawler.signals.connect(middleware.domain_blocked, signal=domain_blocked)
+        return middleware
+
+    def domain_throttled(self, domain, status, retry_after=None):
+        """Señal de ErrorHandlingMiddleware: 429/503. Un Retry-After largo abre el circuito."""
+        if retry_after and retry_after >= self.store.open_seconds:
+            self.store.trip(domain, retry_after)
+        else:
+            self.store.record_failure(domain)
+
+    def domain_failed(self, domain, reason):
+        """Señal de ErrorHandlingMiddleware: timeout, error de conexión o del servidor."""
+        self.store.record_failure(domain)
+
+    def domain_blocked(self, domain, seconds, reason):
+        """Señal de ErrorHandlingMiddleware: el host nos bloquea (403 o 429 persistentes)."""
+        self.store.trip(domain, seconds)
+
+    def process_request(self, request, spider):
+        """Descarta la petición si el circuito del host está abierto."""
+        domain = urlparse_cached(request).netloc
+        if not self.store.allow(domain):
+            if self.crawler.stats:
+                self.crawler.stats.inc_value('domain_health/skipped')
+            raise IgnoreRequest(f"Circuit open for {domain}")
+
+    def process_response(self, request, response, spider):
+        """Registra las respuestas sanas del host."""
+        if response.status < 400:
+            self.store.record_success(urlparse_cached(request).netloc)
+        return response
+
+
 class RateLimitingMiddleware:
-    """Middleware para rate limiting avanzado por dominio con configuración específica."""
+    """
+    Middleware para rate limiting avanzado por dominio con configuración específica.
+
+    El delay lo marca un token bucket por dominio. Con
+    ``DomainReadyPriorityQueue`` como cola del scheduler la espera ocurre en
+    la cola: solo salen peticiones de dominios con hueco libre (``ready_in``)
+    y la reserva se hace al sacarlas (``claim``), así que una petición que
+    espera no ocupa ningún hueco de ``CONCURRENT_REQUESTS``. Las peticiones
+    que llegan sin reserva (robots.txt, otras colas) esperan su hueco aquí
+    con un ``Deferred``, sin bloquear el reactor. Con
+    ``POLITENESS_SHARED`` el token bucket de cada host es común a todos los
+    jobs y procesos (``app/scraper/politeness.py``), así que el ritmo de un
+    host no se multiplica por el número de jobs que lo crawlean.
+
+    El delay y la concurrencia de cada dominio los decide un
+    ``AdaptiveConcurrencyController`` a partir de la latencia de las
+    respuestas y de las señales ``domain_throttled`` / ``domain_failed`` de
+    ``ErrorHandlingMiddleware``. La concurrencia se aplica al slot del
+    downloader del dominio (``download_slot``), cuyo delay propio se anula:
+    el delay lo pone el token bucket.
+    """
 
     def __init__(self, crawler):
         self.crawler = crawler
@@ -129,17 +221,67 @@ class RateLimitingMiddleware:
         self.session_start_time = time.time()
         self.session_request_count = 0
 
-        # Configuración de backoff exponencial
-        self.backoff_base = crawler.settings.getfloat('RETRY_BACKOFF_BASE', 2.0)
-        self.backoff_max_delay = crawler.settings.getint('RETRY_BACKOFF_MAX_DELAY', 300)
+        # Planificador no bloqueante de delays por dominio; con POLITENESS_SHARED
+        # los buckets son comunes a todos los jobs y workers de la instalación
+        burst = crawler.settings.getfloat('RATE_LIMIT_BURST', 1.0)
+        table = get_politeness_table(crawler.settings) if crawler.settings.getbool('POLITENESS_SHARED', False) else None
+        if table is not None:
+            self.scheduler = SharedDomainDelayScheduler(table, burst=burst)
+        else:
+            self.scheduler = DomainDelayScheduler(burst=burst)
+
+        # Concurrencia y delay adaptativos por dominio
+        self.controller = AdaptiveConcurrencyController(
+            start_delay=self.min_delay,
+            min_delay=crawler.settings.getfloat('ADAPTIVE_MIN_DELAY', 0.1),
+            max_delay=crawler.settings.getfloat('ADAPTIVE_MAX_DELAY', self.max_delay),
+            start_concurrency=crawler.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 2),
+            min_concurrency=crawler.settings.getint('ADAPTIVE_MIN_CONCURRENCY', 1),
+            max_concurrency=crawler.settings.getint('ADAPTIVE_MAX_CONCURRENCY', 8),
+            latency_tolerance=crawler.settings.getfloat('ADAPTIVE_LATENCY_TOLERANCE', 1.5),
+            backoff=crawler.settings.getfloat('ADAPTIVE_BACKOFF_FACTOR', 0.5),
+            delay_floors=self.domain_delays,
+        )
 
     @classmethod
     def from_crawler(cls, crawler):
         """Inicializa el middleware desde el crawler."""
-        return cls(crawler)
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.domain_throttled, signal=domain_throttled)
+        crawler.signals.connect(middleware.domain_failed, signal=domain_failed)
+        return middleware
 
-    def process_request(self, request, spider):
-        """Aplica rate limiting avanzado antes de cada request."""
+    def domain_throttled(self, domain, status, retry_after=None):
+        """Señal de ErrorHandlingMiddleware: el dominio ha respondido 429/503."""
+        self.controller.on_throttle(domain, retry_after)
+        self._apply_slot_limits(domain)
+
+    def domain_failed(self, domain, reason):
+        """Señal de ErrorHandlingMiddleware: timeout, error de conexión o del servidor."""
+        self.controller.on_failure(domain)
+        self._apply_slot_limits(domain)
+
+    def process_response(self, request, response, spider):
+        """Alimenta el controlador con la latencia de las respuestas del host."""
+        latency = request.meta.get('download_latency')
+        # 429/503 y 5xx ya llegan como señales de ErrorHandlingMiddleware
+        if latency is not None and response.status < 500 and response.status != 429:
+            domain = self._get_domain(request.url)
+            self.controller.on_response(domain, latency)
+            self._apply_slot_limits(domain)
+        return response
+
+    def _apply_slot_limits(self, domain):
+        """Aplica la concurrencia del controlador al slot del downloader del dominio."""
+        engine = getattr(self.crawler, 'engine', None)
+        slot = engine.downloader.slots.get(domain) if engine is not None else None
+        if slot is not None:
+            slot.concurrency = self.controller.concurrency(domain)
+            # El delay lo aplica el token bucket de este middleware
+            slot.delay = 0.0
+
+    async def process_request(self, request, spider):
+        """Aplica rate limiting avanzado antes de cada request sin bloquear el reactor."""
         domain = self._get_domain(request.url)
 
         # Verificar límites de sesión
@@ -152,36 +294,17 @@ class RateLimitingMiddleware:
             self.logger.warning(f"🚫 Domain limits reached for {domain}, blocking request")
             return request  # Permitir que la solicitud continúe
 
-        # Calcular delay necesario
-        current_time = time.time()
-        last_request_time = self.domain_last_request.get(domain, 0)
-        time_since_last_request = current_time - last_request_time
-
-        # Obtener delay específico del dominio o usar delay adaptativo
-        domain_specific_delay = self.domain_delays.get(domain, self.min_delay)
+        # Reservar el siguiente hueco del dominio (o usar el que reservó
+        # DomainReadyPriorityQueue al sacarla del scheduler)
+        ready_at = request.meta.pop('rate_limit_ready_at', None)
+        if ready_at is None:
+            delay_needed = self._reserve(request, domain)
+        else:
+            delay_needed = max(0.0, ready_at - time.time())
 
-        # Calcular delay adaptativo basado en la frecuencia de requests
+        # Actualizar tracking antes de esperar, para que las peticiones concurrentes vean la reserva
         request_count = self.domain_request_count.get(domain, 0)
-        adaptive_delay = min(domain_specific_delay * (1 + request_count * 0.05), self.max_delay)
-
-        # Aplicar factor de aleatorización
-        if self.randomize_delay:
-            delay_factor = random.uniform(0.7, 1.3)  # Rango más conservador
-            adaptive_delay *= delay_factor
-
-        # Aplicar backoff exponencial si hay muchos requests al mismo dominio
-        if request_count > 10:
-            backoff_multiplier = min(self.backoff_base ** (request_count // 10), 5.0)
-            adaptive_delay *= backoff_multiplier
-
-        # Aplicar delay si es necesario
-        if time_since_last_request < adaptive_delay:
-            delay_needed = adaptive_delay - time_since_last_request
-            self.logger.debug(".2f")
-            time.sleep(delay_needed)
-
-        # Actualizar tracking
-        self.domain_last_request[domain] = time.time()
+        self.domain_last_request[domain] = time.time() + delay_needed
         self.domain_request_count[domain] = request_count + 1
         self.session_request_count += 1
 
@@ -193,6 +316,36 @@ class RateLimitingMiddleware:
         if self.session_request_count % 10 == 0:
             self._log_rate_limiting_stats()
 
+        # Retener solo esta petición; el resto de dominios sigue descargando
+        if delay_needed > 0:
+            from twisted.internet import reactor
+            self.logger.debug(f"⏳ Delaying request to {domain} by {delay_needed:.2f}s")
+            await maybe_deferred_to_future(deferLater(reactor, delay_needed, lambda: None))
+
+    def ready_in(self, domain):
+        """Segundos que faltan para que el dominio tenga hueco libre (sin reservar)."""
+        return self.scheduler.pending_wait(domain)
+
+    def claim(self, request):
+        """Reserva el hueco del dominio de una petición que sale del scheduler."""
+        delay_needed = self._reserve(request, self._get_domain(request.url))
+        request.meta['rate_limit_ready_at'] = time.time() + delay_needed
+
+    def _reserve(self, request, domain):
+        """Reserva el siguiente hueco del dominio y devuelve los segundos de espera."""
+        # Delay adaptativo del dominio (DOMAIN_DELAYS actúa como suelo)
+        adaptive_delay = self.controller.delay(domain)
+
+        # Aplicar factor de aleatorización
+        if self.randomize_delay:
+            delay_factor = random.uniform(0.7, 1.3)  # Rango más conservador
+            adaptive_delay *= delay_factor
+
+        # Un slot del downloader por dominio, con la concurrencia del controlador
+        request.meta.setdefault('download_slot', domain)
+        self._apply_slot_limits(domain)
+        return self.scheduler.reserve(domain, adaptive_delay)
+
     def _check_session_limits(self):
         """Verifica si se han alcanzado los límites de sesión."""
         # Verificar tiempo de sesión
@@ -212,10 +365,12 @@ class RateLimitingMiddleware:
 
     def _log_rate_limiting_stats(self):
         """Loggea estadísticas de rate limiting."""
+        top_domains = sorted(self.domain_request_count.items(), key=lambda x: x[1], reverse=True)[:5]
         stats = {
             'session_requests': self.session_request_count,
             'domains_tracked': len(self.domain_request_count),
-            'top_domains': sorted(self.domain_request_count.items(), key=lambda x: x[1], reverse=True)[:5]
+            'top_domains': top_domains,
+            'limits': {domain: self.controller.limits(domain).as_dict() for domain, _ in top_domains}
         }
         self.logger.info(f"📊 Rate limiting stats: {stats}")
 
@@ -254,7 +409,18 @@ class RequestFingerprintMiddleware:
 
 
 class ErrorHandlingMiddleware:
-    """Middleware para manejo avanzado y robusto de errores."""
+    """
+    Middleware para manejo avanzado y robusto de errores.
+
+    Además de reintentar, avisa de los problemas de cada host con las señales
+    ``domain_throttled`` (429/503), ``domain_failed`` (5xx, timeouts, errores
+    de conexión) y ``domain_blocked`` (403 seguidos más allá de ``RETRY_TIMES``,
+    429 tras agotar los reintentos), de las que se alimentan el control
+    adaptativo de ``RateLimitingMiddleware`` y el circuit breaker de
+    ``DomainHealthMiddleware``. Las páginas con palabras de bloqueo
+    (``BLOCKED_PATTERNS``) solo se registran en el job: una página de contacto
+    con un widget de CAPTCHA no debe cerrar el host a los demás jobs.
+    """
 
     def __init__(self, crawler):
         self.crawler = crawler
@@ -274,9 +440,10 @@ class ErrorHandlingMiddleware:
             'too many requests', 'temporarily unavailable', 'service unavailable'
         ])
 
-        # Tracking de errores por dominio
+        # Errores por dominio para las alertas (los bloqueos van a DomainHealthMiddleware)
         self.domain_errors = {}
-        self.domain_blocked_until = {}
+        # 403 seguidos por dominio en este job
+        self.forbidden_counts = {}
 
         # Configuración de alertas
         self.alert_threshold = crawler.settings.getint('ERROR_ALERT_THRESHOLD', 5)
@@ -291,19 +458,25 @@ class ErrorHandlingMiddleware:
     def process_response(self, request, response, spider):
         """Procesa la respuesta y decide si reintentar o manejar errores."""
         domain = self._get_domain(request.url)
-
-        # Verificar si el dominio está bloqueado temporalmente
-        if self._is_domain_blocked(domain):
-            self.logger.warning(f"🚫 Domain {domain} is temporarily blocked, skipping request")
-            return response  # Permitir que la respuesta continúe
+        if response.status < 400:
+            self.forbidden_counts.pop(domain, None)
+
+        # Avisar al control de concurrencia antes de decidir el reintento
+        if response.status in (429, 503):
+            self.crawler.signals.send_catch_log(
+                domain_throttled, domain=domain, status=response.status,
+                retry_after=parse_retry_after(response.headers.get('Retry-After'))
+            )
+        elif response.status >= 500:
+            self.crawler.signals.send_catch_log(domain_failed, domain=domain, reason=f"HTTP {response.status}")
 
         # Verificar códigos de error para reintento
         if response.status in self.retry_codes:
             return self._handle_retry(request, response, spider)
 
-        # Verificar contenido de bloqueo/CAPTCHA
+        # Verificar contenido de bloqueo/CAPTCHA (solo se registra en el job)
         if self._is_blocked_content(response):
-            return self._handle_blocked_content(request, response, spider, domain)
+            self._handle_blocked_content(request, response, spider, domain)
 
         # Verificar errores específicos
         if response.status == 429:  # Too Many Requests
@@ -317,10 +490,16 @@ class ErrorHandlingMiddleware:
 
     def process_exception(self, request, exception, spider):
         """Maneja excepciones durante el procesamiento de requests."""
+        # Peticiones descartadas por otros middlewares (circuito abierto...)
+        if isinstance(exception, IgnoreRequest):
+            return None
+
         domain = self._get_domain(request.url)
 
         # Incrementar contador de errores para el dominio
         self._increment_domain_error(domain)
+        if self._is_timeout_error(exception) or self._is_connection_error(exception):
+            self.crawler.signals.send_catch_log(domain_failed, domain=domain, reason=type(exception).__name__)
 
         # Loggear la excepción
         self.logger.error(f"❌ Exception in request to {request.url}: {str(exception)}")
@@ -358,14 +537,21 @@ class ErrorHandlingMiddleware:
             return new_request
         else:
             self.logger.error(f"❌ Max retries reached for {request.url} - Status: {response.status}")
+            if response.status == 429:
+                return self._handle_rate_limit(request, response, spider, self._get_domain(request.url))
             return response
 
     def _handle_blocked_content(self, request, response, spider, domain):
-        """Maneja contenido que indica bloqueo."""
-        self.logger.warning(f"🚫 Blocked content detected for {domain}")
+        """
+        Registra contenido que parece un bloqueo.
 
-        # Bloquear el dominio temporalmente
-        self._block_domain_temporarily(domain, 300)  # 5 minutos
+        Las palabras clave aparecen también en páginas normales (widgets de
+        reCAPTCHA, textos legales), así que no abren el circuito del host.
+        """
+        self.logger.warning(f"🚫 Blocked content detected for {domain}: {request.url}")
+        self._increment_domain_error(domain)
+        if self.crawler.stats:
+            self.crawler.stats.inc_value('errors/blocked_content')
 
         # Enviar alerta si es necesario
         self._send_alert_if_needed(f"Blocked content detected for domain {domain}")
@@ -377,7 +563,7 @@ class ErrorHandlingMiddleware:
         self.logger.warning(f"🚦 Rate limit detected for {domain}")
 
         # Bloquear dominio por más tiempo
-        self._block_domain_temporarily(domain, 600)  # 10 minutos
+        self._block_domain_temporarily(domain, 600, 'rate limit')  # 10 minutos
 
         # Enviar alerta
         self._send_alert_if_needed(f"Rate limit exceeded for domain {domain}")
@@ -388,8 +574,13 @@ class ErrorHandlingMiddleware:
         """Maneja respuestas 403 Forbidden."""
         self.logger.warning(f"🚫 Forbidden access to {domain}")
 
-        # Bloquear dominio por tiempo prolongado
-        self._block_domain_temporarily(domain, 1800)  # 30 minutos
+        # Un 403 suelto puede ser una página protegida: se bloquea el dominio
+        # por tiempo prolongado solo si persiste más allá de RETRY_TIMES
+        self.forbidden_counts[domain] = self.forbidden_counts.get(domain, 0) + 1
+        if self.forbidden_counts[domain] <= self.max_retries:
+            return response
+        self.forbidden_counts.pop(domain, None)
+        self._block_domain_temporarily(domain, 1800, 'forbidden')  # 30 minutos
 
         # Enviar alerta
         self._send_alert_if_needed(f"Forbidden access to domain {domain}")
@@ -415,9 +606,10 @@ class ErrorHandlingMiddleware:
         new_headers = original_request.headers.copy()
         if 'User-Agent' in new_headers:
             # Cambiar ligeramente el user agent para reintentos
+            # Los valores de las cabeceras de Scrapy son bytes
             ua = new_headers['User-Agent']
-            if 'Chrome' in ua:
-                new_headers['User-Agent'] = ua.replace('Chrome', 'Chromium')
+            if b'Chrome' in ua and b'Chromium' not in ua:
+                new_headers['User-Agent'] = ua.replace(b'Chrome', b'Chromium')
 
         new_request = Request(
             url=original_request.url,
@@ -442,16 +634,10 @@ class ErrorHandlingMiddleware:
         content_lower = response.text.lower()
         return any(pattern.lower() in content_lower for pattern in self.blocked_patterns)
 
-    def _is_domain_blocked(self, domain):
-        """Verifica si un dominio está bloqueado temporalmente."""
-        blocked_until = self.domain_blocked_until.get(domain, 0)
-        return time.time() < blocked_until
-
-    def _block_domain_temporarily(self, domain, duration_seconds):
-        """Bloquea un dominio temporalmente."""
-        blocked_until = time.time() + duration_seconds
-        self.domain_blocked_until[domain] = blocked_until
-        self.logger.warning(f"🚫 Domain {domain} blocked until {time.ctime(blocked_until)}")
+    def _block_domain_temporarily(self, domain, duration_seconds, reason='blocked'):
+        """Bloquea un dominio temporalmente (abre su circuito en DomainHealthMiddleware)."""
+        self.crawler.signals.send_catch_log(domain_blocked, domain=domain, seconds=duration_seconds, reason=reason)
+        self.logger.warning(f"🚫 Domain {domain} blocked for {duration_seconds}s ({reason})")
 
     def _increment_domain_error(self, domain):
         """Incrementa el contador de errores para un dominio."""
@@ -511,101 +697,203 @@ class ErrorHandlingMiddleware:
 
 
 class DatabaseLoggingHandler(logging.Handler):
-    """Handler personalizado para guardar logs en la base de datos."""
-
-    def __init__(self, crawler):
-        super().__init__()
+    """
+    Handler personalizado para guardar logs en la base de datos.
+
+    ``emit`` solo encola una tupla con los datos del registro (sin tocar la
+    base de datos ni bloquear): un hilo escritor propio agrupa los registros y
+    los inserta con un único ``executemany`` por lote, cuando se juntan
+    ``DB_LOG_BATCH_SIZE`` o pasan ``DB_LOG_FLUSH_INTERVAL`` segundos. Si la
+    base de datos va lenta y la cola (``DB_LOG_QUEUE_SIZE``) se llena, los
+    registros nuevos se descartan y se cuentan en ``dropped``.
+
+    El handler se añade al logger raíz, así que en un worker con varios spiders
+    cada uno filtra los registros de su spider (``record.spider``, que añaden
+    ``spider.logger`` y Scrapy). Los registros sin spider solo se guardan si es
+    el único handler activo del proceso.
+    """
+
+    _STOP = object()
+    # Handlers abiertos en el proceso (uno por crawler)
+    _active = set()
+
+    def __init__(self, crawler, db_engine=None):
+        super().__init__(level=getattr(logging, crawler.settings.get('DB_LOG_LEVEL', 'WARNING')))
         self.crawler = crawler
         self.session_id = str(uuid.uuid4())
-        self.log_buffer = deque(maxlen=crawler.settings.getint('DB_LOG_BATCH_SIZE', 10))
-        self.min_level = getattr(logging, crawler.settings.get('DB_LOG_LEVEL', 'WARNING'))
+        self.batch_size = max(1, crawler.settings.getint('DB_LOG_BATCH_SIZE', 100))
+        self.flush_interval = crawler.settings.getfloat('DB_LOG_FLUSH_INTERVAL', 1.0)
+        self.queue = queue.Queue(maxsize=crawler.settings.getint('DB_LOG_QUEUE_SIZE', 10000))
+        self.db_engine = db_engine
+        self.written = 0
+        self.dropped = 0
+        self._closed = False
+        DatabaseLoggingHandler._active.add(self)
+
+        # La sesión de scraping es lo primero que guarda el hilo escritor
+        self._thread = threading.Thread(
+            target=self._run, args=(self._session_values(),), name='db-log-writer', daemon=True
+        )
+        self._thread.start()
+
+    def _session_values(self):
+        """Datos de la sesión de scraping de este crawler."""
+        return {
+            'session_id': self.session_id,
+            'start_url': self.crawler.spider.start_url if hasattr(self.crawler.spider, 'start_url') else 'unknown',
+            'max_depth': self.crawler.settings.getint('DEPTH_LIMIT', 3),
+            'allowed_domains': json.dumps(self.crawler.spider.allowed_domains) if hasattr(self.crawler.spider, 'allowed_domains') else None,
+            'user_agent': self.crawler.settings.get('USER_AGENT'),
+            'delay': self.crawler.settings.getfloat('DOWNLOAD_DELAY', 1.0)
+        }
 
-        # Crear sesión de scraping
-        self._create_scraping_session()
+    def filter(self, record):
+        """Acepta solo los registros del spider de este crawler."""
+        spider = getattr(record, 'spider', None)
+        if spider is not None:
+            owned = spider is self.crawler.spider
+        else:
+            owned = len(DatabaseLoggingHandler._active) == 1
+        return owned and super().filter(record)
 
-    def _create_scraping_session(self):
-        """Crea una nueva sesión de scraping en la base de datos."""
+    def emit(self, record):
+        """Encola un registro de log (nunca bloquea)."""
+        # Los errores del propio hilo escritor no vuelven a la cola
+        if self._closed or threading.get_ident() == self._thread.ident:
+            return
         try:
+            self.queue.put_nowait((
+                getattr(record, 'url', '') or '',
+                record.levelname,
+                record.getMessage(),
+                getattr(record, 'category', 'general'),
+                getattr(record, 'metadata', None),
+            ))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self, session_values):
+        """Bucle del hilo escritor: agrupa registros y los guarda por lotes."""
+        engine = self.db_engine
+        if engine is None:
             from app.database.database import engine
+
+        self._save_scraping_session(engine, session_values)
+
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                entry = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if entry is self._STOP:
+                stopping = True
+            elif entry is not None:
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (stopping or entry is None or len(batch) >= self.batch_size):
+                self._save_logs(engine, batch)
+                batch = []
+                deadline = None
+
+    def _save_scraping_session(self, engine, values):
+        """Guarda la sesión de scraping (hilo escritor)."""
+        try:
             from app.database.models import ScrapingSession
-            from sqlalchemy.orm import sessionmaker
-
-            Session = sessionmaker(bind=engine)
-            session = Session()
-
-            scraping_session = ScrapingSession(
-                session_id=self.session_id,
-                start_url=self.crawler.spider.start_url if hasattr(self.crawler.spider, 'start_url') else 'unknown',
-                max_depth=self.crawler.settings.getint('DEPTH_LIMIT', 3),
-                allowed_domains=json.dumps(self.crawler.spider.allowed_domains) if hasattr(self.crawler.spider, 'allowed_domains') else None,
-                user_agent=self.crawler.settings.get('USER_AGENT'),
-                delay=self.crawler.settings.getfloat('DOWNLOAD_DELAY', 1.0)
-            )
 
-            session.add(scraping_session)
-            session.commit()
-            session.close()
+            with engine.begin() as connection:
+                connection.execute(ScrapingSession.__table__.insert(), [values])
 
         except Exception as e:
             logging.error(f"Error creating scraping session: {e}")
 
-    def emit(self, record):
-        """Procesa un registro de log."""
-        if record.levelno < self.min_level:
-            return
-
-        # Crear entrada de log
-        log_entry = {
-            'session_id': self.session_id,
-            'url': getattr(record, 'url', ''),
-            'level': record.levelname,
-            'message': record.getMessage(),
-            'category': getattr(record, 'category', 'general'),
-            'metadata': json.dumps(getattr(record, 'metadata', {}))
-        }
-
-        self.log_buffer.append(log_entry)
-
-        # Guardar en lote si el buffer está lleno
-        if len(self.log_buffer) >= self.log_buffer.maxlen:
-            self._flush_logs()
-
-    def _flush_logs(self):
-        """Guarda los logs acumulados en la base de datos."""
-        if not self.log_buffer:
-            return
-
+    def _save_logs(self, engine, entries):
+        """Guarda un lote de logs con un único executemany (hilo escritor)."""
+        rows = [
+            {
+                'session_id': self.session_id,
+                'url': url[:500],
+                # La columna no admite CRITICAL
+                'level': level if level in ('DEBUG', 'INFO', 'WARNING', 'ERROR') else 'ERROR',
+                'message': message,
+                'category': category,
+                'log_metadata': json.dumps(metadata if metadata is not None else {}, default=str)
+            }
+            for url, level, message, category, metadata in entries
+        ]
         try:
-            from app.database.database import engine
             from app.database.models import ScrapingLog
-            from sqlalchemy.orm import sessionmaker
-
-            Session = sessionmaker(bind=engine)
-            session = Session()
-
-            for log_entry in self.log_buffer:
-                log = ScrapingLog(**log_entry)
-                session.add(log)
 
-            session.commit()
-            session.close()
-            self.log_buffer.clear()
+            with engine.begin() as connection:
+                connection.execute(ScrapingLog.__table__.insert(), rows)
+            self.written += len(rows)
 
         except Exception as e:
             logging.error(f"Error saving logs to database: {e}")
 
     def close(self):
-        """Cierra el handler y guarda los logs restantes."""
-        self._flush_logs()
+        """Deja de aceptar registros y pide al hilo escritor que guarde los pendientes y termine."""
+        self.acquire()
+        try:
+            if not self._closed:
+                self._closed = True
+                DatabaseLoggingHandler._active.discard(self)
+                # La señal de parada no se descarta aunque la cola esté llena
+                self.queue.put(self._STOP)
+        finally:
+            self.release()
         super().close()
 
+    def wait_closed(self, timeout=30.0):
+        """
+        Espera a que el hilo escritor termine tras ``close``.
+
+        Returns:
+            Deferred que se dispara cuando se han guardado los últimos logs
+        """
+        from twisted.internet import defer, reactor
+
+        if not reactor.running:
+            self._thread.join(timeout)
+            return defer.succeed(None)
+
+        from twisted.internet.threads import deferToThread
+        return deferToThread(self._thread.join, timeout)
+
 
 class MonitoringMiddleware:
-    """Middleware para monitoreo avanzado del proceso de scraping."""
+    """
+    Middleware para monitoreo avanzado del proceso de scraping.
+
+    Cada request, respuesta y excepción se registra en ``self.telemetry``
+    (contadores e histogramas por dominio, O(1) por evento) en lugar de
+    generar un log por evento: solo las respuestas con error (>= 400) se
+    loguean siempre, el resto únicamente con ``LOG_REQUEST_DETAILS`` /
+    ``LOG_RESPONSE_DETAILS``. El estado se guarda en ``ScrapingStats`` cada
+    ``TELEMETRY_SNAPSHOT_INTERVAL`` segundos y al cerrar el spider.
+    """
 
     def __init__(self, crawler):
         self.crawler = crawler
         self.logger = logging.getLogger(__name__)
+        self.telemetry = TelemetryRegistry()
+        self.snapshot_interval = crawler.settings.getfloat('TELEMETRY_SNAPSHOT_INTERVAL', 30.0)
+        self.snapshot_loop = None
+        self.started_at = time.monotonic()
+        # Logs por evento opcionales: con la telemetría no hacen falta para las métricas
+        self.log_requests = crawler.settings.getbool('LOG_REQUEST_DETAILS', False)
+        self.log_responses = crawler.settings.getbool('LOG_RESPONSE_DETAILS', False)
+        # Engine de SQLAlchemy para las instantáneas (inyectable para tests)
+        self.db_engine = None
+        self.writer = OrderedWriter(get_storage_executor(crawler.settings))
 
         # Configurar logging a base de datos
         if crawler.settings.getbool('DB_LOG_ENABLED', True):
@@ -618,11 +906,21 @@ class MonitoringMiddleware:
     @classmethod
     def from_crawler(cls, crawler):
         """Inicializa el middleware desde el crawler."""
-        return cls(crawler)
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.process_spider_open, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.process_spider_close, signal=signals.spider_closed)
+        return middleware
 
     def process_spider_open(self, spider):
         """Se ejecuta cuando el spider se abre."""
+        self.started_at = time.monotonic()
+        if self.snapshot_interval > 0:
+            from twisted.internet import task
+            self.snapshot_loop = task.LoopingCall(self.save_snapshot, spider)
+            self.snapshot_loop.start(self.snapshot_interval, now=False)
+
         self.logger.info("🕷️ Spider opened", extra={
+            'spider': spider,
             'category': 'spider',
             'metadata': {
                 'spider_name': spider.name,
@@ -633,7 +931,20 @@ class MonitoringMiddleware:
 
     def process_spider_close(self, spider, reason):
         """Se ejecuta cuando el spider se cierra."""
+        from twisted.internet import defer
+
+        if self.snapshot_loop is not None and self.snapshot_loop.running:
+            self.snapshot_loop.stop()
+        # Instantánea final de la telemetría
+        pending = [self.save_snapshot(spider, final=True)]
+        self.crawler.stats.set_value('telemetry/domains', len(self.telemetry.domains), spider=spider)
+
+        # Métricas del hilo de almacenamiento (cola y latencia de escritura)
+        for key, value in get_storage_executor(self.crawler.settings).metrics().items():
+            self.crawler.stats.set_value(f'storage/{key}', value, spider=spider)
+
         self.logger.info("🕷️ Spider closed", extra={
+            'spider': spider,
             'category': 'spider',
             'metadata': {
                 'reason': reason,
@@ -641,40 +952,59 @@ class MonitoringMiddleware:
             }
         })
 
-        # Cerrar handler de base de datos
+        # Cerrar handler de base de datos (en un worker el proceso sigue vivo tras el job)
         if self.db_handler:
+            logging.getLogger().removeHandler(self.db_handler)
             self.db_handler.close()
+            self.crawler.stats.set_value('log/db_dropped', self.db_handler.dropped, spider=spider)
+            # El cierre del spider espera a que se guarden los últimos logs
+            d = self.db_handler.wait_closed()
+            d.addCallback(lambda _: self.crawler.stats.set_value(
+                'log/db_written', self.db_handler.written, spider=spider))
+            pending.append(d)
+        return defer.gatherResults(pending, consumeErrors=True)
 
     def process_request(self, request, spider):
         """Monitorea cada request."""
         # Añadir timestamp al request para medir tiempo de respuesta
         request.meta['request_start_time'] = time.time()
-
-        self.logger.debug(f"📤 Request started: {request.url}", extra={
-            'category': 'request',
-            'url': request.url,
-            'metadata': {
-                'method': request.method,
-                'headers_count': len(request.headers)
-            }
-        })
+        self.telemetry.record_request(urlparse_cached(request).netloc)
+
+        if self.log_requests:
+            self.logger.debug(f"📤 Request started: {request.url}", extra={
+                'spider': spider,
+                'category': 'request',
+                'url': request.url,
+                'metadata': {
+                    'method': request.method,
+                    'headers_count': len(request.headers)
+                }
+            })
 
     def process_response(self, request, response, spider):
         """Monitorea cada respuesta."""
-        # Calcular tiempo de respuesta
-        start_time = request.meta.get('request_start_time')
-        if start_time:
-            response_time = (time.time() - start_time) * 1000  # en ms
+        # Latencia medida por el downloader; si no está, desde process_request
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            response_time = latency * 1000  # en ms
         else:
-            response_time = 0
+            start_time = request.meta.get('request_start_time')
+            response_time = (time.time() - start_time) * 1000 if start_time else 0
+
+        self.telemetry.record_response(
+            urlparse_cached(request).netloc, response.status, response_time, len(response.body)
+        )
 
-        # Loggear respuesta
+        # Solo las respuestas con error generan un log
         if response.status >= 400:
             level = logging.WARNING
-        else:
+        elif self.log_responses:
             level = logging.DEBUG
+        else:
+            return response
 
         self.logger.log(level, f"📥 Response received: {response.url}", extra={
+            'spider': spider,
             'category': 'response',
             'url': response.url,
             'metadata': {
@@ -684,4 +1014,54 @@ class MonitoringMiddleware:
             }
         })
 
-        return response
\ No newline at end of file
+        return response
+
+    def process_exception(self, request, exception, spider):
+        """Cuenta las descargas fallidas por dominio (la excepción sigue su curso)."""
+        self.telemetry.record_exception(urlparse_cached(request).netloc)
+
+    def save_snapshot(self, spider, final=False):
+        """
+        Guarda el estado de la telemetría en ``ScrapingStats``.
+
+        El resumen se calcula en el reactor (sin locks: la telemetría solo se
+        modifica desde él) y la escritura se hace en el hilo de almacenamiento.
+
+        Returns:
+            Deferred que se dispara cuando la instantánea está guardada
+        """
+        snapshot = self.telemetry.snapshot()
+        totals = snapshot['totals']
+        finished = totals['responses'] + totals['errors']
+        ok = sum(count for code, count in totals['status'].items() if 0 < int(code) < 400)
+        elapsed_minutes = (time.monotonic() - self.started_at) / 60
+
+        values = {
+            'session_id': self.db_handler.session_id if self.db_handler else None,
+            'urls_per_minute': totals['responses'] / elapsed_minutes if elapsed_minutes > 0 else 0.0,
+            'avg_processing_time': totals['latency_ms']['mean'] / 1000,  # en segundos
+            'success_rate': ok / finished * 100 if finished else 0.0,
+            'failure_rate': (finished - ok) / finished * 100 if finished else 0.0,
+            'domain_stats': json.dumps(snapshot),
+            'extra_metadata': json.dumps({
+                'source': 'telemetry',
+                'job_id': getattr(spider, 'job_id', None),
+                'spider': spider.name,
+                'final': final,
+            }),
+        }
+        d = self.writer.submit(self._save_snapshot, values)
+        d.addErrback(lambda failure: self.logger.error(
+            f"Error saving telemetry snapshot: {failure.getErrorMessage()}"))
+        return d
+
+    def _save_snapshot(self, values):
+        """Inserta la instantánea (hilo de almacenamiento)."""
+        from app.database.models import ScrapingStats
+
+        engine = self.db_engine
+        if engine is None:
+            from app.database.database import engine
+
+        with engine.begin() as connection:
+            connection.execute(ScrapingStats.__table__.insert(), [values])
@@ -0,0 +1,206 @@
+"""
+Detección de casi-duplicados con MinHash y LSH (locality-sensitive hashing).
+
+Cada página se resume en una firma MinHash de ``num_perm`` enteros de 32 bits
+calculada sobre los shingles (n-gramas de palabras) de su texto visible. La
+fracción de posiciones iguales entre dos firmas estima la similitud de
+Jaccard de sus shingles.
+
+``MinHashLSH`` divide las firmas en bandas: dos páginas son candidatas solo
+si coinciden en una banda completa, así que una consulta compara con unas
+pocas firmas en lugar de con todo el corpus. El número de bandas se elige a
+partir de ``DUPLICATE_SIMILARITY_THRESHOLD``.
+
+La firma se calcula con *one permutation hashing* (una sola pasada por los
+shingles repartiéndolos en ``num_perm`` cubetas, con densificación de las
+cubetas vacías) en lugar de ``num_perm`` funciones hash por shingle.
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+_MASK32 = 0xFFFFFFFF
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_GOLDEN64 = 0x9E3779B97F4A7C15
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingle_hashes(text: str, size: int = 3) -> set:
+    """
+    Hashes de los n-gramas de palabras de un texto.
+
+    Args:
+        text: Texto visible de la página
+        size: Palabras por shingle
+
+    Returns:
+        Conjunto de hashes de 32 bits (vacío si no hay palabras)
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash_signature(text: str, num_perm: int = 64, shingle_size: int = 3,
+                      min_shingles: int = 1) -> Optional[Tuple[int, ...]]:
+    """
+    Calcula la firma MinHash de un texto.
+
+    Args:
+        text: Texto visible de la página
+        num_perm: Longitud de la firma
+        shingle_size: Palabras por shingle
+        min_shingles: Por debajo de este número de shingles el texto es demasiado
+            corto para compararlo y no se calcula firma
+
+    Returns:
+        Tupla de ``num_perm`` enteros de 32 bits, o None
+    """
+    hashes = shingle_hashes(text, shingle_size)
+    if not hashes or len(hashes) < min_shingles:
+        return None
+
+    bins: List[Optional[int]] = [None] * num_perm
+    for value in hashes:
+        mixed = (value * _GOLDEN64) & _MASK64
+        index = mixed % num_perm
+        value = (mixed // num_perm) & _MASK32
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    # Densificación: cada cubeta vacía copia la de otra cubeta elegida por hash
+    signature = list(bins)
+    for index in range(num_perm):
+        attempt = 0
+        while signature[index] is None:
+            attempt += 1
+            source = ((index + 1) * _GOLDEN64 + attempt * 0xC2B2AE3D27D4EB4F) & _MASK64
+            source = (source >> 17) % num_perm
+            if bins[source] is not None:
+                signature[index] = bins[source]
+    return tuple(signature)
+
+
+def estimate_similarity(signature1, signature2) -> float:
+    """Similitud de Jaccard estimada entre dos firmas de la misma longitud."""
+    if not signature1 or len(signature1) != len(signature2):
+        return 0.0
+    return sum(1 for a, b in zip(signature1, signature2) if a == b) / len(signature1)
+
+
+def optimal_bands(threshold: float, num_perm: int, min_recall: float = 0.9) -> Tuple[int, int]:
+    """
+    Elige (bandas, filas por banda) para un umbral de similitud.
+
+    Toma las bandas más largas (menos candidatos falsos que verificar) con
+    las que un par con similitud igual al umbral sigue siendo candidato con
+    probabilidad ``min_recall``; los candidatos se verifican con la firma
+    completa, así que un falso positivo solo cuesta una comparación.
+    """
+    for rows in range(num_perm, 0, -1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= min_recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class MinHashLSH:
+    """Índice LSH de firmas MinHash con un número máximo de documentos."""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, max_documents: int = 100_000):
+        """
+        Inicializa el índice.
+
+        Args:
+            threshold: Similitud de Jaccard a partir de la cual dos páginas son duplicadas
+            num_perm: Longitud de las firmas
+            max_documents: Firmas que se conservan; al superarlo se olvidan las más antiguas
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_documents = max(1, max_documents)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.signatures: 'OrderedDict[str, Tuple[int, ...]]' = OrderedDict()
+        self.payloads: Dict[str, object] = {}
+        # (banda, hash de la banda) -> claves; el hash de una tupla de enteros es
+        # determinista y los candidatos se verifican con la firma completa
+        self.buckets: Dict[Tuple[int, int], List[str]] = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, hash(tuple(signature[band * rows:(band + 1) * rows]))
+
+    def query(self, signature) -> Tuple[float, Optional[str]]:
+        """
+        Busca el documento más parecido entre los candidatos de las bandas.
+
+        Returns:
+            (similitud estimada, clave del documento) o (0.0, None) si no hay candidatos
+        """
+        if not signature or len(signature) != self.num_perm:
+            return 0.0, None
+
+        best_similarity, best_key = 0.0, None
+        checked = set()
+        for band_key in self._band_keys(signature):
+            for key in self.buckets.get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                similarity = estimate_similarity(signature, self.signatures[key])
+                if similarity > best_similarity:
+                    best_similarity, best_key = similarity, key
+        return best_similarity, best_key
+
+    def insert(self, key: str, signature, payload=None):
+        """
+        Añade una firma al índice (reemplaza la anterior de la misma clave).
+
+        Args:
+            key: Clave del documento (URL)
+            signature: Firma MinHash
+            payload: Dato pequeño asociado al documento (opcional)
+        """
+        if not signature or len(signature) != self.num_perm:
+            return
+        if key in self.signatures:
+            self.remove(key)
+        while len(self.signatures) >= self.max_documents:
+            self.remove(next(iter(self.signatures)))
+
+        self.signatures[key] = tuple(signature)
+        if payload is not None:
+            self.payloads[key] = payload
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def remove(self, key: str):
+        """Elimina una firma del índice."""
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        self.payloads.pop(key, None)
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.remove(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+
+__all__ = ['MinHashLSH', 'estimate_similarity', 'minhash_signature', 'optimal_bands', 'shingle_hashes']
@@ -0,0 +1,295 @@
+"""
+Características de una página extraídas en una sola pasada por el DOM.
+
+``extract_page_features`` recorre una vez el árbol lxml que ya ha parseado el
+selector de la respuesta y devuelve un ``PageFeatures`` inmutable con todo lo
+que necesitan el spider y los pipelines: título, meta description/keywords,
+enlaces, número de imágenes y de palabras visibles, una muestra del texto en
+minúsculas, las palabras clave presentes en título/descripción/URL y la firma
+MinHash del texto visible.
+
+Las funciones de puntuación (``detect_content_type``, ``contact_score``,
+``page_quality_score``) trabajan sobre ``PageFeatures`` en lugar de volver a
+consultar la respuesta, así que el spider y ``ContentValidationPipeline``
+comparten el mismo cálculo.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from .near_duplicates import minhash_signature
+from .rules import compile_keywords
+
+# Patrones de tipo de contenido, en orden de prioridad
+CONTENT_TYPE_KEYWORDS = (
+    ('business', ('empresa', 'compañía', 'negocio', 'servicio', 'producto',
+                  'contacto', 'acerca', 'nosotros', 'about', 'company')),
+    ('blog', ('blog', 'noticia', 'artículo', 'post', 'news', 'article')),
+    ('landing', ('landing', 'inicio', 'home', 'principal', 'main')),
+    ('contact', ('contacto', 'contact', 'teléfono', 'phone', 'dirección')),
+    ('portfolio', ('portafolio', 'portfolio', 'proyecto', 'project', 'trabajo')),
+)
+
+CONTACT_KEYWORDS = ('contacto', 'contact', 'teléfono', 'phone', 'dirección', 'address')
+
+# Palabras del título que indican una página de contacto o de equipo
+CONTACT_PAGE_KEYWORDS = ('contact', 'about', 'team', 'staff', 'nosotros')
+
+DEFAULT_BUSINESS_KEYWORDS = (
+    'empresa', 'compañía', 'servicio', 'producto', 'contacto', 'teléfono',
+    'dirección', 'email', 'sitio web', 'negocio', 'cliente', 'venta'
+)
+
+# Elementos cuyo texto no es visible
+_HIDDEN_TAGS = frozenset(('script', 'style', 'noscript'))
+_SPACES_RE = re.compile(r'\s+')
+
+
+def build_vocabulary(business_keywords: Iterable[str] = DEFAULT_BUSINESS_KEYWORDS) -> FrozenSet[str]:
+    """
+    Términos que se buscan al extraer las características (en minúsculas).
+
+    Siempre incluye las palabras de contacto y de tipo de contenido, de las
+    que dependen ``contact_score`` y ``detect_content_type``.
+    """
+    terms = {keyword.lower() for keyword in business_keywords}
+    terms.update(CONTACT_KEYWORDS)
+    for _, keywords in CONTENT_TYPE_KEYWORDS:
+        terms.update(keywords)
+    return frozenset(terms)
+
+
+DEFAULT_VOCABULARY = build_vocabulary()
+
+
+def _collapse(text: Optional[str]) -> str:
+    return _SPACES_RE.sub(' ', text).strip() if text else ''
+
+
+@dataclass(frozen=True)
+class PageFeatures:
+    """Características de una página (inmutables, compartidas por spider y pipelines)."""
+
+    url: str
+    title: Optional[str]
+    description: Optional[str]
+    keywords: Optional[str]
+    image_count: int
+    word_count: int
+    # Título, descripción y URL en minúsculas: el texto en el que se buscan palabras clave
+    summary: str
+    # Términos de ``vocabulary`` presentes en ``summary``
+    keyword_hits: FrozenSet[str]
+    links: Tuple[str, ...] = field(default=(), repr=False)
+    # Texto de cada enlace de ``links`` (mismo orden; vacío si no tiene)
+    link_texts: Tuple[str, ...] = field(default=(), repr=False)
+    # href de ``<link rel="canonical">`` tal cual aparece en la página (sin resolver)
+    canonical: Optional[str] = field(default=None, repr=False)
+    text_sample: str = field(default='', repr=False)
+    content_signature: Optional[Tuple[int, ...]] = field(default=None, repr=False)
+    vocabulary: FrozenSet[str] = field(default=DEFAULT_VOCABULARY, repr=False, compare=False)
+
+    @property
+    def link_count(self) -> int:
+        return len(self.links)
+
+    def has_keyword(self, keyword: str) -> bool:
+        """Indica si el término aparece en título, descripción o URL."""
+        term = keyword.lower()
+        if term in self.vocabulary:
+            return term in self.keyword_hits
+        return term in self.summary
+
+    def find_keywords(self, keywords: Iterable[str]) -> List[str]:
+        """Términos de ``keywords`` presentes en título, descripción o URL (en su orden)."""
+        return [keyword for keyword in keywords if self.has_keyword(keyword)]
+
+    @classmethod
+    def from_fields(cls, url: str, title: Optional[str] = None, description: Optional[str] = None,
+                    keywords: Optional[str] = None, vocabulary: FrozenSet[str] = DEFAULT_VOCABULARY,
+                    **extra) -> 'PageFeatures':
+        """Construye las características a partir de campos ya extraídos (p. ej. de un item)."""
+        summary = ' '.join([_collapse(title), _collapse(description), url or '']).lower()
+        hits = compile_keywords(vocabulary, ignore_case=False).find_all(summary)
+        extra.setdefault('image_count', 0)
+        extra.setdefault('word_count', 0)
+        return cls(url=url or '', title=title, description=description, keywords=keywords,
+                   summary=summary, keyword_hits=hits, vocabulary=vocabulary, **extra)
+
+    @classmethod
+    def from_item(cls, item, vocabulary: FrozenSet[str] = DEFAULT_VOCABULARY) -> 'PageFeatures':
+        """Características del item: las del spider si las trae, si no se reconstruyen de sus campos."""
+        features = item.get('page_features')
+        if isinstance(features, cls):
+            return features
+        return cls.from_fields(
+            str(item.get('url') or ''),
+            str(item.get('title')) if item.get('title') else None,
+            str(item.get('description')) if item.get('description') else None,
+            item.get('keywords'),
+            vocabulary=vocabulary,
+            image_count=item.get('image_count') or 0,
+            word_count=item.get('word_count') or 0,
+        )
+
+
+def extract_page_features(response, vocabulary: FrozenSet[str] = DEFAULT_VOCABULARY,
+                          sample_size: int = 1000, num_perm: int = 64,
+                          min_shingles: int = 20) -> PageFeatures:
+    """
+    Extrae las características de una respuesta HTML en una sola pasada.
+
+    Args:
+        response: Respuesta HTML de Scrapy
+        vocabulary: Términos (en minúsculas) que se buscan en título, descripción y URL
+        sample_size: Caracteres de texto visible que se guardan en ``text_sample`` (LANGUAGE_SAMPLE_SIZE)
+        num_perm: Longitud de la firma MinHash (NEAR_DUPLICATE_NUM_PERM)
+        min_shingles: Shingles mínimos para calcular la firma (páginas con muy poco texto no se comparan)
+
+    Returns:
+        PageFeatures de la página
+    """
+    from lxml import etree
+
+    title = None
+    meta_description = None
+    og_description = None
+    keywords = None
+    canonical = None
+    links = []
+    link_texts = []
+    # Texto del enlace abierto (el de ``links[-1]``) mientras se recorre su contenido
+    anchor = None
+    image_count = 0
+    texts = []
+    in_body = 0
+    hidden = 0
+
+    # Un solo recorrido del árbol ya parseado por el selector de la respuesta
+    for event, node in etree.iterwalk(response.selector.root, events=('start', 'end', 'comment', 'pi')):
+        tag = node.tag
+        if event in ('comment', 'pi'):
+            # Comentarios e instrucciones de procesamiento: solo cuenta el texto que les sigue
+            if in_body and not hidden and node.tail:
+                texts.append(node.tail)
+            continue
+        if event == 'end':
+            if tag == 'body':
+                in_body -= 1
+                continue
+            if tag in _HIDDEN_TAGS:
+                hidden -= 1
+            if tag == 'a' and anchor is not None:
+                link_texts.append(_collapse(''.join(anchor)) or _collapse(node.get('title')))
+                anchor = None
+            # El texto que sigue al elemento pertenece al padre
+            if in_body and not hidden and node.tail:
+                texts.append(node.tail)
+                if anchor is not None:
+                    anchor.append(node.tail)
+            continue
+
+        if tag == 'a':
+            href = node.get('href')
+            if href is not None:
+                # Un enlace dentro de otro (HTML inválido) cierra el anterior
+                if anchor is not None:
+                    link_texts.append(_collapse(''.join(anchor)))
+                links.append(href)
+                anchor = []
+        elif tag == 'img':
+            if node.get('src') is not None:
+                image_count += 1
+        elif tag in _HIDDEN_TAGS:
+            hidden += 1
+        elif tag == 'body':
+            in_body += 1
+        elif tag == 'meta':
+            name = node.get('name')
+            if name == 'description':
+                if meta_description is None:
+                    meta_description = node.get('content')
+            elif name == 'keywords':
+                if keywords is None:
+                    keywords = node.get('content')
+            elif node.get('property') == 'og:description' and og_description is None:
+                og_description = node.get('content')
+        elif tag == 'title':
+            if title is None and node.text:
+                title = node.text.strip()
+        elif tag == 'link':
+            if canonical is None and 'canonical' in (node.get('rel') or '').lower().split():
+                canonical = (node.get('href') or '').strip() or None
+
+        if in_body and not hidden and node.text:
+            texts.append(node.text)
+            if anchor is not None:
+                anchor.append(node.text)
+
+    visible_text = ' '.join(texts)
+    words = visible_text.split()
+
+    return PageFeatures.from_fields(
+        response.url,
+        title,
+        meta_description or og_description,
+        keywords,
+        vocabulary=vocabulary,
+        image_count=image_count,
+        word_count=len(words),
+        links=tuple(links),
+        link_texts=tuple(link_texts),
+        canonical=canonical,
+        text_sample=' '.join(words[:sample_size])[:sample_size].lower(),
+        content_signature=minhash_signature(visible_text, num_perm, min_shingles=min_shingles),
+    )
+
+
+def detect_content_type(features: PageFeatures) -> str:
+    """Tipo de contenido según las palabras de la URL, el título y la descripción."""
+    # build_vocabulary incluye siempre estas palabras: basta con keyword_hits
+    hits = features.keyword_hits
+    for content_type, keywords in CONTENT_TYPE_KEYWORDS:
+        if not hits.isdisjoint(keywords):
+            return content_type
+    return 'unknown'
+
+
+def contact_score(features: PageFeatures, emails) -> int:
+    """Puntuación de información de contacto (0-100)."""
+    score = len(emails or ()) * 10
+    score += 5 * len(features.keyword_hits.intersection(CONTACT_KEYWORDS))
+    return min(score, 100)
+
+
+def page_quality_score(features: PageFeatures, emails, content_length: int) -> int:
+    """
+    Puntuación de calidad de la página (0-100).
+
+    Args:
+        features: Características de la página
+        emails: Emails encontrados
+        content_length: Longitud del HTML en caracteres
+    """
+    score = 0
+    if features.title and len(features.title) > 10:
+        score += 20
+    if features.description and len(features.description) > 50:
+        score += 15
+    if features.keywords:
+        score += 10
+    if content_length > 1000:
+        score += 20 * min(content_length / 10000, 1.0)
+    if emails:
+        score += 15 * min(len(emails) / 5, 1.0)
+    title = (features.title or '').lower()
+    if any(keyword in title for keyword in CONTACT_PAGE_KEYWORDS):
+        score += 20
+    return int(score)
+
+
+__all__ = [
+    'PageFeatures', 'extract_page_features', 'build_vocabulary', 'detect_content_type',
+    'contact_score', 'page_quality_score', 'DEFAULT_VOCABULARY', 'DEFAULT_BUSINESS_KEYWORDS',
+]
@@ -3,143 +3,341 @@ Pipelines avanzados de Scrapy para procesar y guardar los items.
 """
 
 from sqlalchemy.orm import sessionmaker
+from scrapy import signals
 import sys
 import os
 import re
 import hashlib
 import logging
 from collections import defaultdict
-from typing import Set, Dict, List
+from typing import Dict, List
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from app.database.database import engine
 from app.database.models import Website, Email
+from app.scraper.storage import OrderedWriter, get_storage_executor
+from app.scraper.dedupe import get_dedupe_index
+from app.scraper.near_duplicates import MinHashLSH
+from app.scraper.rules import compile_keywords, compile_patterns
+from app.scraper.page_features import (
+    DEFAULT_BUSINESS_KEYWORDS, PageFeatures, build_vocabulary, contact_score, detect_content_type
+)
+from sqlalchemy import and_, case
+from sqlalchemy.sql import func
 
 
 class DatabasePipeline:
-    """Pipeline para guardar items en la base de datos."""
+    """
+    Pipeline para guardar items en la base de datos.
+
+    Los items se acumulan en memoria y se escriben en lote cuando se alcanza
+    ``DB_BATCH_SIZE`` o pasan ``DB_FLUSH_INTERVAL`` segundos, y siempre al
+    cerrar el spider. Cada lote es una única transacción con
+    ``INSERT ... ON CONFLICT DO UPDATE`` para los sitios web e
+    ``INSERT ... ON CONFLICT DO NOTHING`` para los emails. Tras cada commit
+    registra en el índice de duplicados las claves reservadas por los items
+    guardados; los items que no se pudieron guardar las liberan.
+    """
+
+    # Columnas que se actualizan si el item trae el campo (columna -> campo del item)
+    UPDATE_FIELDS = {
+        'page_quality_score': 'page_quality_score',
+        'email_quality_score': 'email_quality_score',
+        'contact_score': 'contact_score',
+        'content_type_detected': 'content_type',
+        'is_spam': 'is_spam',
+        'language_confidence': 'language_confidence',
+        'duplicate_hash': 'duplicate_hash',
+        'fingerprint': 'fingerprint',
+        'load_time': 'load_time',
+        'word_count': 'word_count',
+        'link_count': 'link_count',
+        'image_count': 'image_count',
+        'title': 'title',
+        'description': 'description',
+        'keywords': 'keywords',
+        'content_type_scraping': 'content_type',
+        'last_scraped': 'scraped_at',
+        'fetch_url': 'fetch_url',
+        'canonical_url': 'canonical_url',
+        'etag': 'etag',
+        'last_modified': 'last_modified',
+        'content_hash': 'content_hash',
+    }
+
+    def __init__(self, batch_size=100, flush_interval=2.0, db_engine=None, executor=None, dedupe=None):
+        """
+        Inicializa la sesión de base de datos.
+
+        Args:
+            batch_size: Items por lote (DB_BATCH_SIZE)
+            flush_interval: Segundos entre vaciados periódicos del buffer (DB_FLUSH_INTERVAL, 0 = solo por tamaño)
+            db_engine: Engine de SQLAlchemy (inyectable para tests)
+            executor: StorageExecutor donde se ejecutan las escrituras (por defecto el del proceso)
+            dedupe: DedupeIndex donde se registran las claves de los items guardados (None = ninguno)
+        """
+        self.engine = db_engine or engine
+        self.Session = sessionmaker(bind=self.engine)
+        self.writer = OrderedWriter(executor)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.flush_loop = None
+        self.dedupe = dedupe
+        self.upsert_supported = self.engine.dialect.name in ('sqlite', 'postgresql')
+        self.logger = logging.getLogger(__name__)
 
-    def __init__(self):
-        """Inicializa la sesión de base de datos."""
-        # Importar y crear las tablas si no existen
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            batch_size=crawler.settings.getint('DB_BATCH_SIZE', 100),
+            flush_interval=crawler.settings.getfloat('DB_FLUSH_INTERVAL', 2.0),
+            executor=get_storage_executor(crawler.settings),
+            dedupe=get_dedupe_index(crawler.settings)
+        )
+
+    def open_spider(self, spider):
+        """Prepara el esquema y programa el vaciado periódico del buffer."""
+        if self.flush_interval > 0:
+            from twisted.internet import task
+            self.flush_loop = task.LoopingCall(self.flush)
+            self.flush_loop.start(self.flush_interval, now=False)
+        return self.writer.submit(self._prepare_schema)
+
+    def _prepare_schema(self):
+        """Crea las tablas si no existen y asegura el índice único de emails (hilo de almacenamiento)."""
         from app.database.models import Base
-        Base.metadata.create_all(bind=engine)
-        self.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=self.engine)
+        try:
+            for index in Email.__table__.indexes:
+                if index.unique:
+                    index.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            # Base de datos antigua con emails duplicados: ejecutar database_migration.py
+            self.upsert_supported = False
+            self.logger.warning(f"⚠️ Email unique index unavailable, using per-item saves: {e}")
+
+    def close_spider(self, spider):
+        """Escribe los items pendientes antes de cerrar."""
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.flush()
+        return self.writer.drain()
 
     def process_item(self, item, spider):
-        """Procesa un item y lo guarda en la base de datos."""
-        spider.logger.info(f"🗄️ Pipeline processing item: {item}")
-        session = self.Session()
+        """
+        Añade el item al buffer y escribe el lote si está lleno.
+
+        Al llenarse el lote, el item no se devuelve hasta que el lote está
+        escrito: si la base de datos no da abasto, Scrapy frena el crawl.
+        """
+        self.buffer.append(item)
+        if len(self.buffer) >= self.batch_size:
+            return self.flush().addCallback(lambda _: item)
+        return item
 
-        try:
-            # Crear o actualizar el sitio web
-            website = session.query(Website).filter_by(url=item['url']).first()
-
-            if not website:
-                spider.logger.info(f"🆕 Creating new website entry for: {item['url']}")
-                website = Website(
-                    url=item['url'],
-                    domain=item['domain'],
-                    language=item.get('language'),
-                    status=item.get('status', 'processed'),
-                    depth_level=item.get('depth_level', 0),
-                    source_url=item.get('source_url'),
-
-                    # Campos avanzados de calidad
-                    page_quality_score=item.get('page_quality_score', 0),
-                    email_quality_score=item.get('email_quality_score', 0.0),
-                    contact_score=item.get('contact_score', 0),
-                    content_type_detected=item.get('content_type'),
-                    has_business_keywords=','.join(item.get('has_business_keywords', [])) if item.get('has_business_keywords') else None,
-
-                    # Campos de validación
-                    is_spam=item.get('is_spam', 0),
-                    language_confidence=item.get('language_confidence', 0.0),
-                    duplicate_hash=item.get('duplicate_hash'),
-                    fingerprint=item.get('fingerprint'),
-
-                    # Campos de rendimiento
-                    load_time=item.get('load_time'),
-                    word_count=item.get('word_count', 0),
-                    link_count=item.get('link_count', 0),
-                    image_count=item.get('image_count', 0),
-
-                    # Metadata adicional
-                    title=item.get('title'),
-                    description=item.get('description'),
-                    keywords=item.get('keywords'),
-
-                    # Campos existentes
-                    response_time=item.get('response_time'),
-                    page_size=item.get('page_size'),
-                    http_status=item.get('http_status'),
-                    content_type_scraping=item.get('content_type'),
-                    quality_score=item.get('quality_score', 0),
-                    email_count=len(item.get('emails', [])),
-                    last_scraped=item.get('scraped_at'),
-                    user_agent=item.get('user_agent'),
-                    ip_address=item.get('ip_address')
-                )
-                session.add(website)
-                session.flush()  # Para obtener el ID
-                spider.logger.info(f"✅ Website created with ID: {website.id}")
-            else:
-                spider.logger.info(f"🔍 Found existing website: {website.id}")
-                # Actualizar campos si es necesario
-                website.page_quality_score = item.get('page_quality_score', website.page_quality_score)
-                website.email_quality_score = item.get('email_quality_score', website.email_quality_score)
-                website.contact_score = item.get('contact_score', website.contact_score)
-                website.content_type_detected = item.get('content_type', website.content_type_detected)
-                website.has_business_keywords = ','.join(item.get('has_business_keywords', [])) if item.get('has_business_keywords') else website.has_business_keywords
-                website.is_spam = item.get('is_spam', website.is_spam)
-                website.language_confidence = item.get('language_confidence', website.language_confidence)
-                website.duplicate_hash = item.get('duplicate_hash', website.duplicate_hash)
-                website.fingerprint = item.get('fingerprint', website.fingerprint)
-                website.load_time = item.get('load_time', website.load_time)
-                website.word_count = item.get('word_count', website.word_count)
-                website.link_count = item.get('link_count', website.link_count)
-                website.image_count = item.get('image_count', website.image_count)
-                website.title = item.get('title', website.title)
-                website.description = item.get('description', website.description)
-                website.keywords = item.get('keywords', website.keywords)
-                website.content_type_scraping = item.get('content_type', website.content_type_scraping)
-                website.email_count = len(item.get('emails', []))
-                website.last_scraped = item.get('scraped_at', website.last_scraped)
-                website.scrape_count += 1
-
-            # Guardar emails encontrados
-            emails = item.get('emails', [])
-            for email_addr in emails:
-                # Verificar si el email ya existe para este sitio
-                existing_email = session.query(Email).filter_by(
-                    website_id=website.id,
-                    email=email_addr
-                ).first()
-
-                if not existing_email:
-                    # Calcular calidad del email
-                    email_quality = self._calculate_email_quality(email_addr, item)
-
-                    email_item = Email(
-                        website_id=website.id,
-                        email=email_addr,
-                        source_page=item['url'],
-                        quality_score=email_quality,
-                        context=item.get('email_context', {}).get(email_addr),
-                        anchor_text=item.get('email_anchors', {}).get(email_addr)
-                    )
-                    session.add(email_item)
-
-            session.commit()
-            spider.logger.info(f"💾 Successfully saved item to database")
+    def flush(self):
+        """
+        Envía el contenido del buffer al hilo de almacenamiento.
 
-        except Exception as e:
-            session.rollback()
-            spider.logger.error(f"Error saving item to database: {e}")
+        Returns:
+            Deferred que se dispara cuando el lote está escrito
+        """
+        from twisted.internet import defer
+
+        if not self.buffer:
+            return defer.succeed(None)
+        items, self.buffer = self.buffer, []
+        d = self.writer.submit(self._write_items, items)
+        d.addErrback(lambda failure: self.logger.error(f"Error saving batch to database: {failure.getErrorMessage()}"))
+        return d
+
+    def _write_items(self, items):
+        """Escribe un lote de items en la base de datos (hilo de almacenamiento)."""
+        session = self.Session()
+        try:
+            if self.upsert_supported:
+                try:
+                    email_count = self._write_batch(session, items)
+                    session.commit()
+                    self._settle_keys(items, saved=True)
+                    self.logger.info(f"💾 Flushed {len(items)} items ({email_count} emails) to database")
+                    return
+                except Exception as e:
+                    session.rollback()
+                    self.logger.error(f"Error saving batch to database, retrying item by item: {e}")
+
+            # Sin upsert (u error en el lote): un commit por item para no perder los demás
+            for item in items:
+                try:
+                    self._save_item(session, item)
+                    session.commit()
+                    self._settle_keys([item], saved=True)
+                except Exception as e:
+                    session.rollback()
+                    self._settle_keys([item], saved=False)
+                    self.logger.error(f"Error saving item to database: {e}")
         finally:
             session.close()
 
-        return item
+    def _settle_keys(self, items, saved):
+        """Registra (o libera si no se guardaron) las claves de duplicados reservadas por los items."""
+        if self.dedupe is None:
+            return
+        for item in items:
+            if saved:
+                self.dedupe.commit(item)
+            else:
+                self.dedupe.release(item)
+
+    def _write_batch(self, session, items):
+        """Escribe un lote de items con sentencias set-based. Devuelve el número de emails nuevos candidatos."""
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        # Si una URL aparece varias veces en el lote, cada aparición va en una ronda
+        # posterior para aplicar las actualizaciones en orden
+        rounds = []
+        occurrences = defaultdict(int)
+        for item in items:
+            position = occurrences[item['url']]
+            occurrences[item['url']] += 1
+            if position == len(rounds):
+                rounds.append([])
+            rounds[position].append(item)
+
+        for round_items in rounds:
+            # Agrupar por columnas a actualizar: cada grupo es una sentencia
+            groups = defaultdict(list)
+            for item in round_items:
+                groups[self._update_columns(item)].append(self._website_values(item))
+
+            for update_columns, rows in groups.items():
+                stmt = insert(Website)
+                set_ = {column: stmt.excluded[column] for column in update_columns}
+                set_['scrape_count'] = Website.scrape_count + 1
+                if 'content_hash' in update_columns:
+                    # Historial de cambios para estimar la frescura del dominio
+                    changed = and_(Website.content_hash.isnot(None),
+                                   Website.content_hash != stmt.excluded.content_hash)
+                    set_['change_count'] = Website.change_count + case((changed, 1), else_=0)
+                set_['updated_at'] = func.now()
+                session.execute(stmt.on_conflict_do_update(index_elements=['url'], set_=set_), rows)
+
+        website_ids = dict(
+            session.query(Website.url, Website.id).filter(Website.url.in_(list(occurrences))).all()
+        )
+
+        email_rows = []
+        seen = set()
+        for item in items:
+            website_id = website_ids[item['url']]
+            for email_addr in item.get('emails', []):
+                if (website_id, email_addr) in seen:
+                    continue
+                seen.add((website_id, email_addr))
+                email_rows.append({
+                    'website_id': website_id,
+                    'email': email_addr,
+                    'source_page': item['url'],
+                    'quality_score': self._calculate_email_quality(email_addr, item),
+                    'context': item.get('email_context', {}).get(email_addr),
+                    'anchor_text': item.get('email_anchors', {}).get(email_addr),
+                })
+
+        if email_rows:
+            stmt = insert(Email).on_conflict_do_nothing(index_elements=['website_id', 'email'])
+            session.execute(stmt, email_rows)
+        return len(email_rows)
+
+    def _update_columns(self, item):
+        """Columnas que la actualización de un sitio existente debe sobrescribir."""
+        columns = [column for column, field in self.UPDATE_FIELDS.items() if field in item]
+        if item.get('has_business_keywords'):
+            columns.append('has_business_keywords')
+        columns.append('email_count')
+        return tuple(columns)
+
+    def _website_values(self, item):
+        """Valores de inserción de un sitio web (mismos valores por defecto que el modelo)."""
+        return {
+            'url': item['url'],
+            'domain': item['domain'],
+            'language': item.get('language'),
+            'status': item.get('status', 'processed'),
+            'depth_level': item.get('depth_level', 0),
+            'source_url': item.get('source_url'),
+            'page_quality_score': item.get('page_quality_score', 0),
+            'email_quality_score': item.get('email_quality_score', 0.0),
+            'contact_score': item.get('contact_score', 0),
+            'content_type_detected': item.get('content_type'),
+            'has_business_keywords': ','.join(item.get('has_business_keywords', [])) if item.get('has_business_keywords') else None,
+            'is_spam': item.get('is_spam', 0),
+            'language_confidence': item.get('language_confidence', 0.0),
+            'duplicate_hash': item.get('duplicate_hash'),
+            'fingerprint': item.get('fingerprint'),
+            'load_time': item.get('load_time'),
+            'word_count': item.get('word_count', 0),
+            'link_count': item.get('link_count', 0),
+            'image_count': item.get('image_count', 0),
+            'title': item.get('title'),
+            'description': item.get('description'),
+            'keywords': item.get('keywords'),
+            'response_time': item.get('response_time'),
+            'page_size': item.get('page_size'),
+            'http_status': item.get('http_status'),
+            'content_type_scraping': item.get('content_type'),
+            'quality_score': item.get('quality_score', 0),
+            'email_count': len(item.get('emails', [])),
+            'last_scraped': item.get('scraped_at'),
+            'scrape_count': 0,
+            'change_count': 0,
+            'error_count': 0,
+            'user_agent': item.get('user_agent'),
+            'ip_address': item.get('ip_address'),
+            'fetch_url': item.get('fetch_url'),
+            'canonical_url': item.get('canonical_url'),
+            'etag': item.get('etag'),
+            'last_modified': item.get('last_modified'),
+            'content_hash': item.get('content_hash'),
+        }
+
+    def _save_item(self, session, item):
+        """Guarda un único item con el ORM (sin upsert)."""
+        website = session.query(Website).filter_by(url=item['url']).first()
+
+        if not website:
+            website = Website(**self._website_values(item))
+            session.add(website)
+            session.flush()  # Para obtener el ID
+        else:
+            content_hash = item.get('content_hash')
+            if content_hash and website.content_hash and website.content_hash != content_hash:
+                website.change_count += 1
+            for column in self._update_columns(item):
+                setattr(website, column, self._website_values(item)[column])
+            website.scrape_count += 1
+
+        # Guardar emails encontrados
+        for email_addr in item.get('emails', []):
+            # Verificar si el email ya existe para este sitio
+            existing_email = session.query(Email).filter_by(
+                website_id=website.id,
+                email=email_addr
+            ).first()
+
+            if not existing_email:
+                session.add(Email(
+                    website_id=website.id,
+                    email=email_addr,
+                    source_page=item['url'],
+                    quality_score=self._calculate_email_quality(email_addr, item),
+                    context=item.get('email_context', {}).get(email_addr),
+                    anchor_text=item.get('email_anchors', {}).get(email_addr)
+                ))
+                session.flush()
 
     def _calculate_email_quality(self, email, item):
         """Calcula la calidad de un email específico."""
@@ -200,46 +398,57 @@ class LanguageFilterPipeline:
 
 
 class DuplicateFilterPipeline:
-    """Pipeline avanzado para filtrar duplicados basado en contenido y URLs."""
+    """
+    Pipeline avanzado para filtrar duplicados basado en contenido y URLs.
+
+    Las URLs, hashes de contenido y emails vistos se guardan en el índice de
+    duplicados persistente (``DedupeIndex``), compartido entre jobs y workers.
+    Las claves de cada item solo se reservan: ``DatabasePipeline`` las registra
+    al guardarlo y se liberan si el item se descarta más adelante.
+    """
 
-    def __init__(self):
-        self.seen_urls: Set[str] = set()
-        self.seen_content_hashes: Set[str] = set()
-        self.seen_emails: Set[str] = set()
+    def __init__(self, dedupe=None):
+        self.dedupe = dedupe or get_dedupe_index()
         self.logger = logging.getLogger(__name__)
 
     @classmethod
     def from_crawler(cls, crawler):
         """Inicializa el pipeline desde el crawler."""
-        return cls()
+        pipeline = cls(get_dedupe_index(crawler.settings))
+        crawler.signals.connect(pipeline.release_item, signal=signals.item_dropped)
+        crawler.signals.connect(pipeline.release_item, signal=signals.item_error)
+        return pipeline
+
+    def release_item(self, item, **kwargs):
+        """Libera las claves reservadas por un item descartado o con error."""
+        self.dedupe.release(item)
 
     def process_item(self, item, spider):
         """Filtra items duplicados."""
-        # Verificar URL duplicada
+        # Verificar URL duplicada (una página recrawleada que cambió actualiza su registro)
         url = item.get('url')
-        if url in self.seen_urls:
+        recrawled = item.get('recrawled')
+        if not self.dedupe.reserve('url', url, item) and not recrawled:
             spider.logger.debug(f"🔄 Duplicate URL filtered: {url}")
             from scrapy.exceptions import DropItem
             raise DropItem(f"Duplicate URL: {url}")
 
         # Verificar contenido duplicado (hash del texto)
         content_hash = self._get_content_hash(item)
-        if content_hash and content_hash in self.seen_content_hashes:
+        if content_hash and not self.dedupe.reserve('content', content_hash, item) and not recrawled:
             spider.logger.debug(f"📄 Duplicate content filtered: {url}")
             from scrapy.exceptions import DropItem
             raise DropItem(f"Duplicate content: {url}")
 
-        # Verificar emails duplicados
+        # Verificar emails duplicados (los nuevos quedan reservados)
         emails = item.get('emails', [])
-        duplicate_emails = []
-        for email in emails:
-            if email in self.seen_emails:
-                duplicate_emails.append(email)
+        unique_emails = [email for email in emails if self.dedupe.reserve('email', email, item)]
 
-        if duplicate_emails:
+        if len(unique_emails) < len(emails):
+            duplicate_emails = [email for email in emails if email not in unique_emails]
             spider.logger.debug(f"📧 Duplicate emails filtered: {duplicate_emails}")
             # Remover emails duplicados pero mantener el item
-            item['emails'] = [email for email in emails if email not in self.seen_emails]
+            item['emails'] = unique_emails
 
         # Si no quedan emails después del filtrado, decidir si descartar el item
         if not item.get('emails') and emails:
@@ -247,13 +456,6 @@ class DuplicateFilterPipeline:
             from scrapy.exceptions import DropItem
             raise DropItem(f"No unique emails: {url}")
 
-        # Registrar como visto
-        self.seen_urls.add(url)
-        if content_hash:
-            self.seen_content_hashes.add(content_hash)
-        for email in item.get('emails', []):
-            self.seen_emails.add(email)
-
         return item
 
     def _get_content_hash(self, item):
@@ -274,6 +476,14 @@ class DuplicateFilterPipeline:
 class QualityFilterPipeline:
     """Pipeline avanzado para filtrar contenido basado en calidad y relevancia."""
 
+    # Palabras de emails temporales o genéricos (penalizan la calidad del email)
+    EMAIL_SPAM_KEYWORDS = (
+        'temp', 'spam', 'fake', 'test', 'example', 'sample',
+        'admin', 'root', 'noreply', 'do-not-reply', 'no-reply',
+        'system', 'mailer', 'daemon', 'postmaster', 'abuse',
+        'webmaster', 'hostmaster', 'info', 'support'
+    )
+
     def __init__(self, crawler):
         self.crawler = crawler
         self.logger = logging.getLogger(__name__)
@@ -301,6 +511,11 @@ class QualityFilterPipeline:
             r'/captcha/', r'/robot/', r'/bot/', r'/verification/'
         ])
 
+        # Reglas compiladas una vez por familia
+        self.spam_domain_set = frozenset(d.lower() for d in self.spam_domains)
+        self.spam_url_rules = compile_patterns(self.spam_url_patterns, re.IGNORECASE)
+        self.email_spam_rules = compile_keywords(self.EMAIL_SPAM_KEYWORDS)
+
         # Configuración de emails
         self.email_quality_weights = crawler.settings.getdict('EMAIL_QUALITY_WEIGHTS', {
             'has_name': 0.3,
@@ -398,14 +613,11 @@ class QualityFilterPipeline:
 
     def _is_spam_domain(self, domain):
         """Verifica si el dominio está en la lista negra."""
-        return domain.lower() in {d.lower() for d in self.spam_domains}
+        return domain.lower() in self.spam_domain_set
 
     def _is_spam_url(self, url):
         """Verifica si la URL contiene patrones spam."""
-        for pattern in self.spam_url_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                return True
-        return False
+        return self.spam_url_rules.search(url) is not None
 
     def _calculate_page_quality_score(self, item):
         """Calcula una puntuación de calidad para la página."""
@@ -478,17 +690,8 @@ class QualityFilterPipeline:
         if 5 <= len(email) <= 100:
             score += self.email_quality_weights['reasonable_length']
 
-        # Evitar emails temporales o spam
-        spam_patterns = [
-            r'temp', r'spam', r'fake', r'test', r'example', r'sample',
-            r'admin', r'root', r'noreply', r'do-not-reply', r'no-reply',
-            r'system', r'mailer', r'daemon', r'postmaster', r'abuse',
-            r'webmaster', r'hostmaster', r'info', r'support'
-        ]
-
-        for pattern in spam_patterns:
-            if re.search(pattern, email, re.IGNORECASE):
-                score -= 0.5  # Penalización
+        # Evitar emails temporales o spam (penalización por cada palabra encontrada)
+        score -= 0.5 * len(self.email_spam_rules.find_all(email))
 
         return score >= 0.6  # Umbral de calidad
 
@@ -519,10 +722,14 @@ class ContentValidationPipeline:
         self.max_description_length = crawler.settings.getint('MAX_DESCRIPTION_LENGTH', 500)
 
         # Palabras clave importantes por sector
-        self.business_keywords = crawler.settings.getlist('BUSINESS_KEYWORDS', [
-            'empresa', 'compañía', 'servicio', 'producto', 'contacto', 'teléfono',
-            'dirección', 'email', 'sitio web', 'negocio', 'cliente', 'venta'
-        ])
+        self.business_keywords = crawler.settings.getlist('BUSINESS_KEYWORDS', list(DEFAULT_BUSINESS_KEYWORDS))
+        self.keyword_vocabulary = build_vocabulary(self.business_keywords)
+
+        # Títulos genéricos o de prueba
+        self.title_spam_rules = compile_patterns([
+            r'^test', r'^demo', r'^sample', r'^untitled', r'^no title',
+            r'^home', r'^index', r'^page', r'^welcome', r'^default'
+        ], re.IGNORECASE)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -543,10 +750,13 @@ class ContentValidationPipeline:
         if description:
             item['description'] = description
 
-        # Extraer información adicional
-        item['has_business_keywords'] = self._has_business_keywords(item)
-        item['content_type'] = self._detect_content_type(item)
-        item['contact_score'] = self._calculate_contact_score(item)
+        # Extraer información adicional de las características de la página
+        # (las calcula el spider en una pasada; si el item no las trae se reconstruyen)
+        features = PageFeatures.from_item(item, self.keyword_vocabulary)
+        item['has_business_keywords'] = features.find_keywords(self.business_keywords)
+        item['content_type'] = detect_content_type(features)
+        emails = item.get('emails', []) or []
+        item['contact_score'] = contact_score(features, emails if isinstance(emails, list) else [])
 
         return item
 
@@ -563,14 +773,8 @@ class ContentValidationPipeline:
             return None
 
         # Evitar títulos spam
-        spam_patterns = [
-            r'^test', r'^demo', r'^sample', r'^untitled', r'^no title',
-            r'^home', r'^index', r'^page', r'^welcome', r'^default'
-        ]
-
-        for pattern in spam_patterns:
-            if re.search(pattern, title, re.IGNORECASE):
-                return None
+        if self.title_spam_rules.search(title):
+            return None
 
         return title
 
@@ -588,99 +792,6 @@ class ContentValidationPipeline:
 
         return description
 
-    def _has_business_keywords(self, item):
-        """Verifica si el contenido contiene palabras clave de negocio."""
-        # Asegurarse de que todos los valores sean strings antes de unirlos
-        title = item.get('title', '') or ''
-        description = item.get('description', '') or ''
-        url = item.get('url', '') or ''
-        
-        # Convertir a string si no lo son
-        title = str(title) if title is not None else ''
-        description = str(description) if description is not None else ''
-        url = str(url) if url is not None else ''
-        
-        text_content = ' '.join([title, description, url]).lower()
-
-        found_keywords = []
-        for keyword in self.business_keywords:
-            if keyword.lower() in text_content:
-                found_keywords.append(keyword)
-
-        return found_keywords
-
-    def _detect_content_type(self, item):
-        """Detecta el tipo de contenido de la página."""
-        url = (item.get('url', '') or '').lower()
-        title = (item.get('title', '') or '').lower()
-        description = (item.get('description', '') or '').lower()
-        
-        # Patrones para diferentes tipos de contenido
-        content_patterns = {
-            'business': [
-                r'empresa', r'compañía', r'negocio', r'servicio', r'producto',
-                r'contacto', r'acerca', r'nosotros', r'about', r'company'
-            ],
-            'blog': [
-                r'blog', r'noticia', r'artículo', r'post', r'news', r'article'
-            ],
-            'landing': [
-                r'landing', r'inicio', r'home', r'principal', r'main'
-            ],
-            'contact': [
-                r'contacto', r'contact', r'teléfono', r'phone', r'dirección'
-            ],
-            'portfolio': [
-                r'portafolio', r'portfolio', r'proyecto', r'project', r'trabajo'
-            ]
-        }
-        
-        # Asegurarse de que los valores sean strings
-        url = str(url) if url is not None else ''
-        title = str(title) if title is not None else ''
-        description = str(description) if description is not None else ''
-        
-        text_content = ' '.join([url, title, description])
-        
-        for content_type, patterns in content_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text_content):
-                    return content_type
-        
-        return 'unknown'
-
-    def _calculate_contact_score(self, item):
-        """Calcula una puntuación de información de contacto."""
-        score = 0
-        
-        # Emails encontrados
-        emails = item.get('emails', []) or []
-        # Asegurarse de que emails sea una lista
-        if not isinstance(emails, list):
-            emails = []
-        score += len(emails) * 10
-        
-        # Palabras clave de contacto
-        contact_keywords = ['contacto', 'contact', 'teléfono', 'phone', 'dirección', 'address']
-        
-        # Obtener valores y asegurarse de que sean strings
-        title = item.get('title', '') or ''
-        description = item.get('description', '') or ''
-        url = item.get('url', '') or ''
-        
-        # Convertir a string si no lo son
-        title = str(title) if title is not None else ''
-        description = str(description) if description is not None else ''
-        url = str(url) if url is not None else ''
-        
-        text_content = ' '.join([title, description, url]).lower()
-        
-        for keyword in contact_keywords:
-            if keyword in text_content:
-                score += 5
-        
-        return min(score, 100)  # Máximo 100
-
 
 class AdvancedDuplicatePipeline:
     """Pipeline avanzado para detectar duplicados usando fingerprints."""
@@ -691,8 +802,14 @@ class AdvancedDuplicatePipeline:
 
         # Configuración
         self.similarity_threshold = crawler.settings.getfloat('DUPLICATE_SIMILARITY_THRESHOLD', 0.85)
-        self.fingerprint_cache = {}
-        self.url_cache = set()
+        # URLs y fingerprints vistos: índice persistente compartido entre jobs
+        self.dedupe = get_dedupe_index(crawler.settings)
+        # Casi-duplicados: firmas MinHash del texto en un índice LSH acotado
+        self.near_duplicates = MinHashLSH(
+            threshold=self.similarity_threshold,
+            num_perm=crawler.settings.getint('NEAR_DUPLICATE_NUM_PERM', 64),
+            max_documents=crawler.settings.getint('NEAR_DUPLICATE_MAX_DOCUMENTS', 100000)
+        )
 
         # Configuración de fingerprinting
         self.fingerprint_weights = crawler.settings.getdict('FINGERPRINT_WEIGHTS', {
@@ -705,14 +822,22 @@ class AdvancedDuplicatePipeline:
     @classmethod
     def from_crawler(cls, crawler):
         """Inicializa el pipeline desde el crawler."""
-        return cls(crawler)
+        pipeline = cls(crawler)
+        crawler.signals.connect(pipeline.release_item, signal=signals.item_dropped)
+        crawler.signals.connect(pipeline.release_item, signal=signals.item_error)
+        return pipeline
+
+    def release_item(self, item, **kwargs):
+        """Libera las claves reservadas por un item descartado o con error."""
+        self.dedupe.release(item)
 
     def process_item(self, item, spider):
         """Detecta duplicados usando fingerprints avanzados."""
         url = item.get('url', '')
 
-        # Verificar URL duplicada primero
-        if url in self.url_cache:
+        # Verificar URL duplicada primero (una página recrawleada que cambió actualiza su registro)
+        recrawled = item.get('recrawled')
+        if not self.dedupe.reserve('url', url, item) and not recrawled:
             spider.logger.debug(f"🔄 Duplicate URL: {url}")
             from scrapy.exceptions import DropItem
             raise DropItem(f"Duplicate URL: {url}")
@@ -720,19 +845,28 @@ class AdvancedDuplicatePipeline:
         # Generar fingerprint
         fingerprint = self._generate_fingerprint(item)
 
-        # Verificar duplicados por fingerprint
-        if fingerprint in self.fingerprint_cache:
-            cached_item = self.fingerprint_cache[fingerprint]
-            similarity = self._calculate_similarity(item, cached_item)
+        # Verificar duplicados por fingerprint. Un fingerprint igual implica los
+        # mismos campos; solo cuenta como duplicado si cubre los suficientes
+        if not self.dedupe.reserve('fingerprint', fingerprint, item) and not recrawled:
+            coverage = self._fingerprint_coverage(item)
 
-            if similarity >= self.similarity_threshold:
-                spider.logger.debug(f"📄 Duplicate content (similarity: {similarity:.2f}): {url}")
+            if coverage >= self.similarity_threshold:
+                spider.logger.debug(f"📄 Duplicate content (fingerprint coverage: {coverage:.2f}): {url}")
                 from scrapy.exceptions import DropItem
-                raise DropItem(f"Duplicate content: {similarity:.2f}")
-
-        # Registrar como visto
-        self.url_cache.add(url)
-        self.fingerprint_cache[fingerprint] = item
+                raise DropItem(f"Duplicate content: {coverage:.2f}")
+
+        # Verificar casi-duplicados por el texto de la página. Una página casi
+        # igual que aporta emails nuevos (p. ej. fichas de un directorio) se conserva
+        signature = item.get('content_signature')
+        if signature:
+            emails = frozenset(item.get('emails') or ())
+            similarity, duplicate_of = self.near_duplicates.query(signature)
+            if (similarity >= self.similarity_threshold and duplicate_of != url
+                    and emails <= self.near_duplicates.payloads.get(duplicate_of, frozenset())):
+                spider.logger.debug(f"📄 Near-duplicate content (similarity: {similarity:.2f}) of {duplicate_of}: {url}")
+                from scrapy.exceptions import DropItem
+                raise DropItem(f"Near-duplicate content: {similarity:.2f}")
+            self.near_duplicates.insert(url, signature, emails)
 
         return item
 
@@ -741,12 +875,12 @@ class AdvancedDuplicatePipeline:
         components = []
 
         # Componente de título
-        title = item.get('title', '').lower().strip()
+        title = (item.get('title') or '').lower().strip()
         if title:
             components.append(f"title:{hashlib.md5(title.encode()).hexdigest()[:8]}")
 
         # Componente de descripción
-        description = item.get('description', '').lower().strip()
+        description = (item.get('description') or '').lower().strip()
         if description:
             components.append(f"desc:{hashlib.md5(description.encode()).hexdigest()[:8]}")
 
@@ -765,52 +899,17 @@ class AdvancedDuplicatePipeline:
         fingerprint = '|'.join(components)
         return hashlib.md5(fingerprint.encode()).hexdigest()
 
-    def _calculate_similarity(self, item1, item2):
-        """Calcula la similitud entre dos items."""
-        similarity_scores = []
-
-        # Similitud de título
-        title1 = item1.get('title', '').lower()
-        title2 = item2.get('title', '').lower()
-        if title1 and title2:
-            title_sim = self._text_similarity(title1, title2)
-            similarity_scores.append(title_sim * self.fingerprint_weights['title'])
-
-        # Similitud de descripción
-        desc1 = item1.get('description', '').lower()
-        desc2 = item2.get('description', '').lower()
-        if desc1 and desc2:
-            desc_sim = self._text_similarity(desc1, desc2)
-            similarity_scores.append(desc_sim * self.fingerprint_weights['description'])
-
-        # Similitud de emails
-        emails1 = set(item1.get('emails', []))
-        emails2 = set(item2.get('emails', []))
-        if emails1 and emails2:
-            email_sim = len(emails1.intersection(emails2)) / len(emails1.union(emails2))
-            similarity_scores.append(email_sim * self.fingerprint_weights['emails'])
-
-        # Similitud de dominio
-        domain1 = item1.get('domain', '')
-        domain2 = item2.get('domain', '')
-        if domain1 and domain2:
-            domain_sim = 1.0 if domain1 == domain2 else 0.0
-            similarity_scores.append(domain_sim * self.fingerprint_weights['domain'])
-
-        return sum(similarity_scores) / sum(self.fingerprint_weights.values()) if similarity_scores else 0
-
-    def _text_similarity(self, text1, text2):
-        """Calcula similitud de texto básica usando Jaccard."""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-
-        if not words1 or not words2:
-            return 0
-
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-
-        return intersection / union if union > 0 else 0
+    def _fingerprint_coverage(self, item):
+        """Peso de los campos presentes en el fingerprint sobre el total de FINGERPRINT_WEIGHTS."""
+        present = {
+            'title': bool((item.get('title') or '').strip()),
+            'description': bool((item.get('description') or '').strip()),
+            'emails': bool(item.get('emails')),
+            'domain': bool(item.get('domain')),
+        }
+        total = sum(self.fingerprint_weights.values())
+        covered = sum(weight for field, weight in self.fingerprint_weights.items() if present.get(field))
+        return covered / total if total else 0
 
 
 class StatsPipeline:
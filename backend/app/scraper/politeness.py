@@ -0,0 +1,260 @@
+"""
+Cortesía por host compartida entre jobs y procesos.
+
+Cada ``RateLimitingMiddleware`` tenía su propio ``DomainDelayScheduler``: cinco
+jobs sobre el mismo host (en el mismo worker o en workers distintos) lo
+golpeaban cinco veces más rápido de lo configurado. Aquí los token buckets de
+cada host viven en una tabla de tamaño fijo mapeada en memoria
+(``MAP_SHARED``) que consultan todos los crawlers antes de despachar una
+petición, de modo que el ritmo configurado para un host es global.
+
+- Cada entrada guarda el fingerprint del host, la tasa, la capacidad, los
+  tokens y el instante de la última actualización. Las reservas se serializan
+  con ``flock`` sobre el fichero y un lock del proceso.
+- El reloj es ``time.time`` (común a todos los procesos).
+- Un bucket que ya se ha rellenado del todo es igual a uno nuevo: cuando la
+  tabla se llena se compacta descartando esos buckets, sin perder estado. Si
+  aun así no hay hueco, el host se planifica solo dentro del proceso.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from .dedupe import fingerprint
+from .domain_scheduler import DomainDelayScheduler
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'LGPOLIT1'
+# magic, slots, count
+_HEADER = struct.Struct('<8sQQ')
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 16
+# fingerprint, rate, capacity, tokens, updated_at
+_ENTRY = struct.Struct('<Qdddd')
+_FP = struct.Struct('<Q')
+# Ocupación máxima de la tabla antes de compactar
+_MAX_LOAD = 0.75
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_politeness_path() -> str:
+    """
+    Fichero de la tabla compartida (POLITENESS_FILE).
+
+    Por defecto vive junto a la base de datos SQLite, que es lo que comparten
+    los workers de una misma instalación.
+    """
+    if os.environ.get('POLITENESS_FILE'):
+        return os.environ['POLITENESS_FILE']
+    from app.database.database import engine
+    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        return f"{os.path.abspath(engine.url.database)}.politeness"
+    return os.path.join(tempfile.gettempdir(), 'leads_generator.politeness')
+
+
+class SharedBucketTable:
+    """Token buckets por host en una tabla hash sobre un mmap compartido."""
+
+    def __init__(self, path: Optional[str] = None, slots: int = 16384):
+        """
+        Abre (o crea) la tabla.
+
+        Args:
+            path: Fichero compartido (None = tabla anónima solo en memoria del proceso)
+            slots: Huecos de la tabla; se redondea a potencia de dos (POLITENESS_SLOTS)
+        """
+        self.slots = 1 << max(4, (max(16, slots) - 1).bit_length())
+        self.size = _HEADER_SIZE + self.slots * _ENTRY.size
+        self.max_count = int(self.slots * _MAX_LOAD)
+        self.path = path
+        self.file = None
+        self._lock = threading.Lock()
+
+        if path is None:
+            self.mm = mmap.mmap(-1, self.size)
+            _HEADER.pack_into(self.mm, 0, _MAGIC, self.slots, 0)
+            return
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a+b')
+        self._flock(True)
+        try:
+            self.file.seek(0, os.SEEK_END)
+            if self.file.tell() != self.size or not self._header_matches():
+                # Fichero nuevo o creado con otro tamaño: se recrea vacío
+                self.file.truncate(0)
+                self.file.truncate(self.size)
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+                _HEADER.pack_into(self.mm, 0, _MAGIC, self.slots, 0)
+            else:
+                self.mm = mmap.mmap(self.file.fileno(), self.size)
+        finally:
+            self._flock(False)
+
+    def _header_matches(self) -> bool:
+        self.file.seek(0)
+        header = self.file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, slots, _ = _HEADER.unpack(header)
+        return (magic, slots) == (_MAGIC, self.slots)
+
+    def _flock(self, acquire: bool):
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX if acquire else fcntl.LOCK_UN)
+
+    @property
+    def count(self) -> int:
+        return _FP.unpack_from(self.mm, _COUNT_OFFSET)[0]
+
+    def _find_slot(self, fp: int):
+        """Devuelve (offset, encontrado) siguiendo el sondeo lineal."""
+        mask = self.slots - 1
+        slot = fp & mask
+        while True:
+            offset = _HEADER_SIZE + slot * _ENTRY.size
+            value = _FP.unpack_from(self.mm, offset)[0]
+            if value == fp or value == 0:
+                return offset, value == fp
+            slot = (slot + 1) & mask
+
+    def _compact(self, now: float) -> None:
+        """Descarta los buckets llenos (equivalentes a uno nuevo) y reinserta el resto."""
+        live = []
+        for slot in range(self.slots):
+            entry = _ENTRY.unpack_from(self.mm, _HEADER_SIZE + slot * _ENTRY.size)
+            fp, rate, capacity, tokens, updated_at = entry
+            if fp and tokens + max(0.0, now - updated_at) * rate < capacity:
+                live.append(entry)
+        self.mm[_HEADER_SIZE:self.size] = bytes(self.size - _HEADER_SIZE)
+        for entry in live:
+            offset, _ = self._find_slot(entry[0])
+            _ENTRY.pack_into(self.mm, offset, *entry)
+        _FP.pack_into(self.mm, _COUNT_OFFSET, len(live))
+
+    def reserve(self, domain: str, rate: float, capacity: float, now: Optional[float] = None) -> Optional[float]:
+        """
+        Consume un token del bucket compartido del host.
+
+        Args:
+            domain: Host de la petición
+            rate: Peticiones por segundo permitidas al host (1 / delay)
+            capacity: Peticiones que el host inactivo admite sin esperar
+            now: Instante actual (``time.time``, opcional)
+
+        Returns:
+            Segundos de espera, o None si la tabla está llena de hosts activos
+        """
+        fp = fingerprint(domain)
+        with self._lock:
+            self._flock(True)
+            try:
+                if now is None:
+                    now = time.time()
+                offset, found = self._find_slot(fp)
+                if found:
+                    _, _, _, tokens, updated_at = _ENTRY.unpack_from(self.mm, offset)
+                    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+                else:
+                    if self.count >= self.max_count:
+                        self._compact(now)
+                        if self.count >= self.max_count:
+                            return None
+                        offset, _ = self._find_slot(fp)
+                    _FP.pack_into(self.mm, _COUNT_OFFSET, self.count + 1)
+                    tokens = capacity
+                tokens -= 1.0
+                _ENTRY.pack_into(self.mm, offset, fp, rate, capacity, tokens, now)
+            finally:
+                self._flock(False)
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+    def pending_wait(self, domain: str, now: Optional[float] = None) -> float:
+        """Cuánto esperaría ahora una nueva petición al host, sin reservar."""
+        fp = fingerprint(domain)
+        with self._lock:
+            offset, found = self._find_slot(fp)
+            if not found:
+                return 0.0
+            _, rate, capacity, tokens, updated_at = _ENTRY.unpack_from(self.mm, offset)
+        if now is None:
+            now = time.time()
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+        return 0.0 if tokens >= 1.0 else (1.0 - tokens) / rate
+
+    def close(self):
+        self.mm.close()
+        if self.file is not None:
+            self.file.close()
+
+
+class SharedDomainDelayScheduler(DomainDelayScheduler):
+    """
+    ``DomainDelayScheduler`` cuyos buckets están en una ``SharedBucketTable``.
+
+    Mismo contrato que el planificador local: ``reserve`` devuelve los
+    segundos de espera y la espera la hace el middleware sin bloquear el
+    reactor. Si la tabla compartida no tiene hueco, el host se planifica con
+    los buckets locales del proceso.
+    """
+
+    def __init__(self, table: SharedBucketTable, burst: float = 1.0, clock=time.time):
+        super().__init__(burst=burst, clock=clock)
+        self.table = table
+
+    def reserve(self, domain: str, delay: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = self.clock()
+        if delay <= 0:
+            return 0.0
+        wait = self.table.reserve(domain, 1.0 / delay, self.burst, now)
+        if wait is None:
+            logger.warning(f"⚠️ Shared politeness table full, scheduling {domain} locally")
+            return super().reserve(domain, delay, now)
+        return wait
+
+    def pending_wait(self, domain: str, now: Optional[float] = None) -> float:
+        if domain in self.buckets:
+            return super().pending_wait(domain, now)
+        return self.table.pending_wait(domain, now)
+
+
+def get_politeness_table(settings=None) -> Optional[SharedBucketTable]:
+    """
+    Devuelve la tabla compartida del proceso (se crea en la primera llamada).
+
+    Args:
+        settings: Settings de Scrapy con POLITENESS_SHARED y POLITENESS_SLOTS (opcional)
+
+    Returns:
+        La tabla, o None si POLITENESS_SHARED está desactivado
+    """
+    global _table
+    with _table_lock:
+        if _table is None:
+            if settings is None:
+                from scrapy.settings import Settings
+                settings = Settings()
+                settings.setmodule('app.scraper.settings', priority='project')
+            if not settings.getbool('POLITENESS_SHARED', True):
+                return None
+            _table = SharedBucketTable(get_politeness_path(), settings.getint('POLITENESS_SLOTS', 16384))
+        return _table
+
+
+__all__ = ['SharedBucketTable', 'SharedDomainDelayScheduler', 'get_politeness_path', 'get_politeness_table']
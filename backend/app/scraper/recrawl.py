@@ -0,0 +1,253 @@
+"""
+Recrawl incremental con GET condicional y detección de cambios.
+
+Cada página guardada conserva sus validadores en ``Website``: ``etag``,
+``last_modified``, ``content_hash`` (hash del cuerpo) y ``fetch_url`` (la URL
+de la respuesta; la canónica no lleva barra final). Con
+``CONDITIONAL_GET_ENABLED``, en modo recrawl (``-a recrawl=1`` o
+``RECRAWL_ENABLED``), el spider carga al abrirse los validadores de sus
+dominios (``ValidatorStore``) y ``ConditionalGetMiddleware``:
+
+- Añade ``If-None-Match`` / ``If-Modified-Since`` a las peticiones de URLs ya
+  guardadas.
+- Corta con ``PageNotModified`` las respuestas 304 y las 200 cuyo cuerpo tiene
+  el mismo hash que la última vez (servidores sin validadores), antes de
+  parsear la página y de los pipelines.
+
+Una página sin cambios no se parsea, así que sus enlaces salen de la base de
+datos: las páginas descargadas con ella como origen (``crawl_outcomes``, con
+o sin emails, y ``Website.source_url``) se piden igual que si se hubieran
+encontrado en la página. Si no se sabe qué enlaces siguió la última vez (no
+quedó registro o se descargó en la última profundidad de su job) y el crawl
+aún sigue enlaces desde ella, la petición va sin validadores y la página se
+parsea. En modo recrawl el spider vuelve a pedir las URLs que el índice de
+duplicados ya conoce en lugar de saltarlas. Al cerrar, ``last_scraped`` y
+``scrape_count`` de las páginas sin cambios se actualizan en un solo UPDATE.
+"""
+
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class Validators(NamedTuple):
+    """Validadores HTTP y hash del cuerpo de una página guardada."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+class PageNotModified(IgnoreRequest):
+    """La página no cambió desde el último crawl (304 o mismo hash del cuerpo)."""
+
+
+def body_hash(body: bytes) -> str:
+    """Hash del cuerpo de la respuesta (``Website.content_hash``)."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _header(response, name: str) -> Optional[str]:
+    value = response.headers.get(name)
+    return value.decode('latin-1').strip() if value else None
+
+
+def response_validators(response) -> Validators:
+    """Validadores de una respuesta para guardarlos con la página."""
+    content_hash = response.meta.get('content_hash') if response.request is not None else None
+    return Validators(
+        etag=_header(response, 'ETag'),
+        last_modified=_header(response, 'Last-Modified'),
+        content_hash=content_hash or body_hash(response.body),
+    )
+
+
+class ValidatorStore:
+    """Validadores e hijos conocidos de las páginas guardadas de los dominios de un job."""
+
+    def __init__(self, validators: Optional[Dict[str, Validators]] = None,
+                 children: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            validators: URL canónica -> validadores
+            children: URL canónica -> URLs (tal como se pidieron) de las páginas descargadas
+                con ella como origen; solo las páginas cuyos enlaces seguidos se conocen
+                (una lista vacía es una página sin hijos)
+        """
+        self.validators = validators or {}
+        self.children = children or {}
+        # Páginas comprobadas sin cambios en este job (se anotan al cerrar)
+        self.unchanged = []
+
+    @classmethod
+    def load(cls, domains: Iterable[str], canonical: Callable[[str], str] = None, session_factory=None):
+        """
+        Carga las páginas guardadas de los dominios (hilo de almacenamiento).
+
+        Los hijos salen de ``crawl_outcomes`` (todas las descargas, también las
+        páginas sin emails) y de ``Website.source_url``. Una página descargada sin
+        error antes de la profundidad máxima de su job tiene sus hijos conocidos
+        aunque no tenga ninguno.
+
+        Args:
+            domains: Hosts del job (``allowed_domains``)
+            canonical: Canonicalización de ``source_url`` (las URLs ya se guardan canónicas)
+            session_factory: Fábrica de sesiones de SQLAlchemy (inyectable para tests)
+        """
+        from app.database.models import CrawlOutcome, ScrapingQueue, Website
+        if session_factory is None:
+            from app.database.database import SessionLocal as session_factory
+        canonical = canonical or (lambda url: url)
+
+        domains = list(domains)
+        validators = {}
+        # URL canónica -> hijos sin repetir, en orden (dict como conjunto ordenado)
+        children = defaultdict(dict)
+        if not domains:
+            return cls()
+        db = session_factory()
+        try:
+            rows = db.query(Website.url, Website.fetch_url, Website.etag, Website.last_modified,
+                            Website.content_hash, Website.source_url).filter(Website.domain.in_(domains))
+            for url, fetch_url, etag, last_modified, content_hash, source_url in rows:
+                validators[url] = Validators(etag, last_modified, content_hash)
+                if source_url:
+                    # La URL canónica puede no servirse (barra final): se pide la URL de la respuesta
+                    children[canonical(source_url)][fetch_url or url] = None
+            outcomes = db.query(CrawlOutcome.url, CrawlOutcome.source_url, CrawlOutcome.depth_level,
+                                CrawlOutcome.http_status, ScrapingQueue.max_depth).outerjoin(
+                ScrapingQueue, ScrapingQueue.job_id == CrawlOutcome.job_id).filter(CrawlOutcome.domain.in_(domains))
+            for url, source_url, depth_level, http_status, max_depth in outcomes:
+                if http_status is not None and http_status >= 400:
+                    continue
+                if source_url:
+                    children[canonical(source_url)][url] = None
+                if max_depth is not None and depth_level < max_depth:
+                    children.setdefault(canonical(url), {})
+        finally:
+            db.close()
+        logger.info(f"🔁 Loaded validators for {len(validators)} stored pages of {len(domains)} domains")
+        return cls(validators, {url: list(urls) for url, urls in children.items()})
+
+    def get(self, url: str) -> Optional[Validators]:
+        return self.validators.get(url)
+
+    def knows_children(self, url: str) -> bool:
+        """True si se sabe qué enlaces se siguieron desde la página la última vez."""
+        return url in self.children
+
+    def known_children(self, url: str) -> List[str]:
+        return self.children.get(url, [])
+
+    def __len__(self):
+        return len(self.validators)
+
+
+def touch_unchanged_pages(urls: List[str], session_factory=None) -> int:
+    """
+    Anota una visita sin cambios (``last_scraped`` y ``scrape_count``) en un solo UPDATE.
+
+    Returns:
+        Número de páginas actualizadas
+    """
+    from sqlalchemy import update
+    from sqlalchemy.sql import func
+    from app.database.models import Website
+    if session_factory is None:
+        from app.database.database import SessionLocal as session_factory
+
+    if not urls:
+        return 0
+    db = session_factory()
+    try:
+        result = db.execute(
+            update(Website).where(Website.url.in_(list(urls))).values(
+                last_scraped=func.now(), scrape_count=Website.scrape_count + 1)
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+class ConditionalGetMiddleware:
+    """
+    Peticiones condicionales para las páginas guardadas y corte de las que no cambiaron.
+
+    Debe ir antes (número menor) que ``HttpCacheMiddleware`` (300), que si no
+    respondería con la copia guardada sin preguntar al servidor, y que
+    ``HttpCompressionMiddleware`` (590) para comparar el hash del cuerpo
+    descomprimido. Las páginas guardadas se piden con ``dont_cache``.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CONDITIONAL_GET_ENABLED', False):
+            raise NotConfigured
+        return cls(crawler)
+
+    def _inc_stat(self, key: str) -> None:
+        if self.crawler.stats:
+            self.crawler.stats.inc_value(f'recrawl/{key}')
+
+    @staticmethod
+    def _store(spider) -> Optional[ValidatorStore]:
+        return getattr(spider, 'validators', None)
+
+    def process_request(self, request, spider):
+        # Una redirección copia meta y cabeceras de la petición original
+        if request.meta.pop('stored_validators', None) is not None:
+            request.headers.pop('If-None-Match', None)
+            request.headers.pop('If-Modified-Since', None)
+        store = self._store(spider)
+        if store is None or request.meta.get('dont_obey_robotstxt'):
+            return None
+        url = spider.url_canonicalizer.canonical(request.url)
+        validators = store.get(url)
+        if validators is None:
+            return None
+        # Ni la copia de la caché HTTP ni guardar la respuesta: el recrawl compara con el servidor
+        request.meta['dont_cache'] = True
+        # Sin hijos conocidos, una página sin cambios cortaría el crawl: se descarga y se parsea
+        if not store.knows_children(url) and spider.follows_links(request):
+            self._inc_stat('children_unknown')
+            return None
+        request.meta['stored_validators'] = validators
+        request.meta['stored_url'] = url
+        if validators.etag:
+            request.headers.setdefault('If-None-Match', validators.etag)
+        if validators.last_modified:
+            request.headers.setdefault('If-Modified-Since', validators.last_modified)
+        return None
+
+    def process_response(self, request, response, spider):
+        validators = request.meta.get('stored_validators')
+        if validators is None:
+            return response
+        store = self._store(spider)
+        if response.status == 304:
+            self._inc_stat('not_modified')
+            store.unchanged.append(request.meta['stored_url'])
+            raise PageNotModified(f"Not modified: {request.url}")
+        if response.status == 200:
+            content_hash = body_hash(response.body)
+            if content_hash == validators.content_hash:
+                self._inc_stat('unchanged_hash')
+                store.unchanged.append(request.meta['stored_url'])
+                raise PageNotModified(f"Unchanged content: {request.url}")
+            request.meta['content_hash'] = content_hash
+            self._inc_stat('changed')
+        return response
+
+
+__all__ = [
+    'ConditionalGetMiddleware', 'PageNotModified', 'ValidatorStore', 'Validators',
+    'body_hash', 'response_validators', 'touch_unchanged_pages',
+]
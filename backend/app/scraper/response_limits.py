@@ -0,0 +1,153 @@
+"""
+Corte temprano de descargas que el spider va a descartar.
+
+``LeadSpider._is_valid_response`` descarta los tipos de contenido que no son
+HTML, pero solo después de haber descargado y guardado en memoria el cuerpo
+entero (hasta ``DOWNLOAD_MAXSIZE``). ``ResponseLimitsExtension`` se conecta a
+las señales ``headers_received`` y ``bytes_received`` de Scrapy y corta la
+descarga con ``StopDownload(fail=False)``:
+
+- En cuanto llegan las cabeceras, si ``Content-Type`` no es HTML/XHTML
+  (``RESPONSE_ACCEPTED_CONTENT_TYPES``) o ``Content-Length`` supera
+  ``RESPONSE_MAX_CONTENT_LENGTH``. La respuesta llega al spider sin cuerpo y
+  con el flag ``download_stopped``, y el spider la descarta como antes.
+- Mientras llega el cuerpo, al pasar de ``RESPONSE_STREAM_CAP`` bytes. La
+  respuesta llega con lo leído hasta ahí (la cabecera y el principio de la
+  página, donde suele estar el contacto) y se procesa con normalidad.
+
+Las respuestas cortadas se marcan con ``dont_cache`` para que
+``HttpCacheMiddleware`` no guarde el cuerpo parcial: la siguiente petición de
+la URL (otro job, otro tope) se descarga de nuevo.
+
+El tope de cada job se puede cambiar con los atributos del spider
+``max_content_length`` y ``stream_cap`` (``-a max_content_length=...``), y el
+de cada petición con las mismas claves en ``request.meta`` (0 = sin límite;
+los sitemaps se leen enteros), ``accepted_content_types`` (p. ej. para
+sitemaps XML) o ``dont_abort_download``. Las peticiones de robots.txt no se
+tocan.
+"""
+
+import logging
+import weakref
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured, StopDownload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCEPTED_CONTENT_TYPES = ['text/html', 'application/xhtml']
+
+
+class ResponseLimitsExtension:
+    """Corta las descargas no HTML, demasiado grandes o que pasan del tope de lectura."""
+
+    def __init__(self, crawler, accepted_content_types=None, max_content_length: int = 0, stream_cap: int = 0):
+        """
+        Inicializa la extensión.
+
+        Args:
+            crawler: Crawler de Scrapy (para las estadísticas)
+            accepted_content_types: Prefijos de Content-Type aceptados (RESPONSE_ACCEPTED_CONTENT_TYPES)
+            max_content_length: Content-Length máximo en bytes; 0 = sin límite (RESPONSE_MAX_CONTENT_LENGTH)
+            stream_cap: Bytes de cuerpo que se leen como máximo; 0 = sin límite (RESPONSE_STREAM_CAP)
+        """
+        self.crawler = crawler
+        self.accepted_content_types = tuple(
+            content_type.lower().encode('latin-1')
+            for content_type in (accepted_content_types or DEFAULT_ACCEPTED_CONTENT_TYPES)
+        )
+        self.max_content_length = max(0, max_content_length)
+        self.stream_cap = max(0, stream_cap)
+        # Bytes recibidos por petición en curso (los reintentos son peticiones nuevas)
+        self.received = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('RESPONSE_LIMITS_ENABLED', True):
+            raise NotConfigured
+        ext = cls(
+            crawler,
+            accepted_content_types=settings.getlist('RESPONSE_ACCEPTED_CONTENT_TYPES', DEFAULT_ACCEPTED_CONTENT_TYPES),
+            max_content_length=settings.getint('RESPONSE_MAX_CONTENT_LENGTH', 2 * 1024 * 1024),
+            stream_cap=settings.getint('RESPONSE_STREAM_CAP', 512 * 1024),
+        )
+        crawler.signals.connect(ext.headers_received, signal=signals.headers_received)
+        crawler.signals.connect(ext.bytes_received, signal=signals.bytes_received)
+        return ext
+
+    def _inc_stat(self, key: str, count: int = 1) -> None:
+        if self.crawler.stats:
+            self.crawler.stats.inc_value(f'response_limits/{key}', count)
+
+    def _limit(self, request, spider, attribute: str, default: int) -> int:
+        """Tope de la petición (``meta``), del job (atributo del spider, texto con ``-a``) o el global."""
+        value = request.meta.get(attribute)
+        if value is None:
+            value = getattr(spider, attribute, None)
+        if value in (None, ''):
+            return default
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def _exempt(request) -> bool:
+        return bool(request.meta.get('dont_abort_download') or request.meta.get('dont_obey_robotstxt'))
+
+    def _accepted(self, request, content_type: bytes) -> bool:
+        accepted = request.meta.get('accepted_content_types')
+        if accepted is None:
+            accepted = self.accepted_content_types
+        else:
+            accepted = tuple(value.lower().encode('latin-1') for value in accepted)
+        content_type = content_type.strip().lower()
+        return content_type.startswith(accepted)
+
+    def headers_received(self, headers, body_length, request, spider):
+        """Corta la descarga al recibir las cabeceras si el cuerpo no se va a usar."""
+        if self._exempt(request):
+            return
+        content_type = headers.get(b'Content-Type')
+        # Sin Content-Type no se puede decidir: se deja pasar
+        if content_type and not self._accepted(request, content_type):
+            self._inc_stat('aborted_content_type')
+            self._count_saved(body_length)
+            logger.debug(f"✂️ Aborted {request.url}: Content-Type {content_type.decode('latin-1', 'replace')}")
+            self._stop(request)
+
+        max_content_length = self._limit(request, spider, 'max_content_length', self.max_content_length)
+        # Twisted indica la longitud desconocida con una constante que no es entera
+        if max_content_length and isinstance(body_length, int) and body_length > max_content_length:
+            self._inc_stat('aborted_content_length')
+            self._count_saved(body_length)
+            logger.debug(f"✂️ Aborted {request.url}: Content-Length {body_length} > {max_content_length}")
+            self._stop(request)
+
+    def bytes_received(self, data, request, spider):
+        """Deja de leer el cuerpo al pasar del tope de lectura del job."""
+        stream_cap = self._limit(request, spider, 'stream_cap', self.stream_cap)
+        if not stream_cap or self._exempt(request):
+            return
+        received = self.received.get(request, 0) + len(data)
+        if received < stream_cap:
+            self.received[request] = received
+            return
+        self.received.pop(request, None)
+        self._inc_stat('truncated')
+        logger.debug(f"✂️ Truncated {request.url} after {received} bytes")
+        self._stop(request)
+
+    @staticmethod
+    def _stop(request):
+        """Corta la descarga sin que la caché HTTP guarde la respuesta incompleta."""
+        request.meta['dont_cache'] = True
+        raise StopDownload(fail=False)
+
+    def _count_saved(self, body_length) -> None:
+        if isinstance(body_length, int) and body_length > 0:
+            self._inc_stat('bytes_saved', body_length)
+
+
+__all__ = ['ResponseLimitsExtension', 'DEFAULT_ACCEPTED_CONTENT_TYPES']
@@ -0,0 +1,249 @@
+"""
+Motor de reglas compiladas para patrones de URLs, spam y palabras clave.
+
+Cada familia de reglas (``BLOCKED_URL_PATTERNS``, ``SPAM_URL_PATTERNS``,
+palabras clave de negocio...) se prepara una sola vez, en lugar de recorrer
+la lista llamando a ``re.search`` patrón a patrón (con la búsqueda en la
+caché de ``re`` de cada llamada) para cada URL o texto:
+
+- ``PatternMatcher``: expresiones regulares. De cada regla se extrae el
+  literal que cualquier coincidencia debe contener (``login`` en
+  ``\\blogin\\b``); una pasada de búsquedas de subcadena en C descarta las
+  reglas cuyo literal no aparece y solo se evalúan las expresiones (ya
+  compiladas) de las restantes.
+- ``KeywordMatcher``: palabras literales; ``find_all`` devuelve todas las
+  presentes, incluidas las solapadas (``contact`` dentro de ``contacto``).
+
+Una única alternancia (``a|b|c``) o un autómata Aho-Corasick en Python puro
+son más lentos que esto con el motor de ``re`` de CPython: la alternancia
+prueba cada rama en cada posición y el autómata avanza carácter a carácter en
+Python, mientras que la búsqueda de subcadenas es C optimizado
+(``python tests/bench_rules.py``).
+
+``compile_patterns`` y ``compile_keywords`` cachean los matchers por familia,
+así que el spider y los pipelines comparten la misma compilación.
+"""
+
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+# Cuantificadores: el carácter al que siguen puede repetirse o faltar
+_QUANTIFIERS = '*+?{'
+# Escapes con dígitos hexadecimales (\xNN, \uNNNN, \UNNNNNNNN): longitud del código
+_HEX_ESCAPES = {'x': 2, 'u': 4, 'U': 8}
+
+
+def required_literal(pattern: str, flags: int = 0) -> Optional[str]:
+    """
+    Literal más largo que toda coincidencia de ``pattern`` contiene.
+
+    Solo considera los caracteres del nivel superior del patrón (el contenido
+    de los grupos y las clases se ignora). Devuelve None si no hay ninguno o
+    si el patrón tiene alternativas de primer nivel (``a|b``).
+    """
+    if flags & re.VERBOSE:
+        return None
+
+    runs: List[str] = []
+    current: List[str] = []
+    depth = 0
+    i = 0
+
+    def close():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            escaped = pattern[i + 1:i + 2]
+            i += 2
+            if depth == 0 and escaped and not escaped.isalnum():
+                current.append(escaped)
+                continue
+            # El código de \xNN, \N{...} o una referencia \1 no es texto literal
+            if escaped in _HEX_ESCAPES:
+                i += _HEX_ESCAPES[escaped]
+            elif escaped == 'N' and pattern[i:i + 1] == '{':
+                end = pattern.find('}', i)
+                i = len(pattern) if end < 0 else end + 1
+            elif escaped.isdigit():
+                while i < len(pattern) and pattern[i].isdigit():
+                    i += 1
+            close()
+        elif ch == '[':
+            # Saltar la clase completa ([^]...], [\]] ...)
+            i += 1
+            if pattern[i:i + 1] == '^':
+                i += 1
+            if pattern[i:i + 1] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            close()
+        elif ch == '(':
+            depth += 1
+            i += 1
+            close()
+        elif ch == ')':
+            depth -= 1
+            i += 1
+            close()
+        elif ch == '|':
+            if depth == 0:
+                return None
+            i += 1
+        elif ch in _QUANTIFIERS:
+            # El carácter anterior puede no aparecer (?, *, {0,n}): fuera del literal
+            if depth == 0 and current:
+                current.pop()
+            close()
+            if ch == '{':
+                end = pattern.find('}', i)
+                i = len(pattern) if end < 0 else end + 1
+            else:
+                i += 1
+        elif ch in '.^$':
+            i += 1
+            close()
+        else:
+            if depth == 0:
+                current.append(ch)
+            i += 1
+    close()
+
+    if not runs:
+        return None
+    literal = max(runs, key=len)
+    return literal.lower() if flags & re.IGNORECASE else literal
+
+
+class PatternMatcher:
+    """Familia de expresiones regulares con prefiltro de literales."""
+
+    def __init__(self, patterns: Iterable[str], flags: int = 0):
+        """
+        Compila la familia de reglas.
+
+        Args:
+            patterns: Expresiones regulares (el orden define la prioridad de ``search``)
+            flags: Flags de ``re`` comunes a todas las reglas
+        """
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(p for p in patterns if p))
+        self.flags = flags
+        self._fold = bool(flags & re.IGNORECASE)
+        # literal -> [(posición, patrón, regex)]; las reglas sin literal se evalúan siempre
+        self._by_literal = {}
+        self._always: List[Tuple[int, str, re.Pattern]] = []
+        for position, pattern in enumerate(self.patterns):
+            regex = re.compile(pattern, flags)
+            rule = (position, pattern, regex)
+            # Flags en línea como (?i) cambian cómo hay que buscar el literal
+            literal = required_literal(pattern, regex.flags)
+            if regex.flags & re.IGNORECASE and not self._fold:
+                literal = None
+            if literal:
+                self._by_literal.setdefault(literal, []).append(rule)
+            else:
+                self._always.append(rule)
+        self._literals = tuple(self._by_literal)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _candidates(self, text: str):
+        probe = text.lower() if self._fold else text
+        # filter() con el método de la cadena: el bucle y la búsqueda corren en C
+        present = list(filter(probe.__contains__, self._literals))
+        if not present:
+            return self._always
+        rules = list(self._always)
+        for literal in present:
+            rules.extend(self._by_literal[literal])
+        if len(present) > 1 or self._always:
+            rules.sort()
+        return rules
+
+    def search(self, text: str) -> Optional[str]:
+        """Primera regla de la lista que coincide con el texto, o None."""
+        if not text:
+            return None
+        for _, pattern, regex in self._candidates(text):
+            if regex.search(text):
+                return pattern
+        return None
+
+    def find_all(self, text: str) -> FrozenSet[str]:
+        """Todas las reglas que coinciden con el texto."""
+        if not text:
+            return frozenset()
+        return frozenset(pattern for _, pattern, regex in self._candidates(text) if regex.search(text))
+
+
+class KeywordMatcher:
+    """Familia de palabras literales buscadas todas a la vez."""
+
+    def __init__(self, keywords: Iterable[str], ignore_case: bool = True):
+        """
+        Compila la familia de palabras.
+
+        Args:
+            keywords: Palabras o frases literales
+            ignore_case: Comparar sin distinguir mayúsculas (las palabras se devuelven en minúsculas)
+        """
+        self.ignore_case = ignore_case
+        self.keywords: FrozenSet[str] = frozenset(
+            keyword.lower() if ignore_case else keyword for keyword in keywords if keyword
+        )
+        self._terms = tuple(sorted(self.keywords))
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def _prepare(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def search(self, text: str) -> bool:
+        """Indica si alguna palabra aparece en el texto."""
+        if not text:
+            return False
+        return any(filter(self._prepare(text).__contains__, self._terms))
+
+    def find_all(self, text: str) -> FrozenSet[str]:
+        """Todas las palabras que aparecen en el texto."""
+        if not text:
+            return frozenset()
+        return frozenset(filter(self._prepare(text).__contains__, self._terms))
+
+
+@lru_cache(maxsize=64)
+def _compile_patterns(patterns: Tuple[str, ...], flags: int) -> PatternMatcher:
+    return PatternMatcher(patterns, flags)
+
+
+@lru_cache(maxsize=64)
+def _compile_keywords(keywords: FrozenSet[str], ignore_case: bool) -> KeywordMatcher:
+    return KeywordMatcher(keywords, ignore_case)
+
+
+def compile_patterns(patterns: Iterable[str], flags: int = 0) -> PatternMatcher:
+    """Matcher compartido para una familia de expresiones regulares (se compila una vez)."""
+    return _compile_patterns(tuple(patterns), flags)
+
+
+def compile_keywords(keywords: Iterable[str], ignore_case: bool = True) -> KeywordMatcher:
+    """
+    Matcher compartido para una familia de palabras literales (se compila una vez).
+
+    Con un ``frozenset`` (p. ej. el vocabulario de ``page_features``) la
+    búsqueda en la caché no recorre las palabras: su hash ya está calculado.
+    """
+    if not isinstance(keywords, frozenset):
+        keywords = frozenset(keywords)
+    return _compile_keywords(keywords, ignore_case)
+
+
+__all__ = ['KeywordMatcher', 'PatternMatcher', 'compile_keywords', 'compile_patterns', 'required_literal']
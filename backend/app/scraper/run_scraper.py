@@ -11,7 +11,7 @@ from sqlalchemy import create_engine
 from ..database.models import ScrapingQueue
 
 
-def run_scraper(job_id: str, start_url: str, depth: int):
+def run_scraper(job_id: str, start_url: str, depth: int, recrawl: bool = False):
     """
     Ejecuta el scraper Scrapy para una URL específica.
 
@@ -19,6 +19,7 @@ def run_scraper(job_id: str, start_url: str, depth: int):
         job_id: ID del trabajo de scraping
         start_url: URL inicial para el scraping
         depth: Profundidad máxima de scraping
+        recrawl: Recrawl incremental de un dominio ya rastreado (``-a recrawl=1``)
     """
     try:
         # Obtener la ruta del directorio del scraper
@@ -35,6 +36,8 @@ def run_scraper(job_id: str, start_url: str, depth: int):
             "-a", f"job_id={job_id}",
             "-s", "LOG_LEVEL=INFO"
         ]
+        if recrawl:
+            cmd += ["-a", "recrawl=1"]
 
         # Configurar el entorno con PYTHONPATH
         env = {
@@ -99,7 +102,10 @@ def _update_job_status_in_db(job_id: str, status: str):
         # Buscar el job en la base de datos
         queue_item = db.query(ScrapingQueue).filter_by(job_id=job_id).first()
         
-        if queue_item:
+        if queue_item and queue_item.status == "cancelled":
+            # El job se canceló desde la API: el proceso terminó limpiamente pero no se completó
+            print(f"⏹️ Job {job_id} was cancelled, keeping 'cancelled' status")
+        elif queue_item:
             queue_item.status = status
             db.commit()
             print(f"🔄 Updated job status to '{status}' for job ID: {job_id}")
@@ -0,0 +1,92 @@
+"""
+Semillas del modo batch: un solo spider para muchos dominios.
+
+``LeadSpider`` con ``start_url`` crawlea un único sitio, así que una lista de
+miles de dominios son miles de jobs, cada uno con su arranque de spider, su
+pool de conexiones y su caché DNS. En modo batch un spider recibe la lista de
+semillas (``-a seeds_file=FICHERO``, ``-a seeds_file=-`` para stdin o
+``-a queue=N`` para reclamar N jobs pendientes de ``ScrapingQueue``) y cada
+semilla conserva su profundidad máxima, su dominio permitido y su job: las
+peticiones llevan la semilla en ``meta['seed']`` y los items el ``job_id``.
+
+Formato del fichero: una semilla por línea, ``URL [profundidad] [job_id]``
+separados por espacios, tabuladores o comas. Las líneas vacías y las que
+empiezan por ``#`` se ignoran; una URL sin esquema se pide por https.
+"""
+
+import logging
+import re
+import sys
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS_RE = re.compile(r'[\s,]+')
+
+
+@dataclass(frozen=True)
+class Seed:
+    """Sitio de partida de un crawl y job al que se atribuyen sus items."""
+    url: str
+    depth: int = 3
+    job_id: Optional[str] = None
+
+
+def parse_seeds(lines: Iterable[str], default_depth: int = 3) -> List[Seed]:
+    """
+    Semillas de las líneas de un fichero.
+
+    Args:
+        lines: Líneas ``URL [profundidad] [job_id]``
+        default_depth: Profundidad de las líneas que no la indican
+    """
+    seeds = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = _SEPARATORS_RE.split(line)
+        url = fields[0]
+        if '://' not in url:
+            url = f'https://{url}'
+        depth = default_depth
+        job_id = None
+        if len(fields) > 1:
+            try:
+                depth = int(fields[1])
+            except ValueError:
+                logger.warning(f"⚠️ Invalid depth in seed line {number}: {line!r}")
+                continue
+        if len(fields) > 2:
+            job_id = fields[2]
+        seeds.append(Seed(url, depth, job_id))
+    return seeds
+
+
+def read_seeds(path: str, default_depth: int = 3) -> List[Seed]:
+    """Semillas de un fichero (``-`` = entrada estándar)."""
+    if path == '-':
+        return parse_seeds(sys.stdin, default_depth)
+    with open(path, encoding='utf-8') as f:
+        return parse_seeds(f, default_depth)
+
+
+def claim_queue_seeds(limit: int, dispatcher=None) -> List[Seed]:
+    """
+    Reclama hasta ``limit`` jobs pendientes de ``ScrapingQueue`` (pending -> processing).
+
+    Por defecto sin límite global de jobs activos y con un job por dominio
+    registrado: cada semilla del batch es un sitio distinto.
+
+    Args:
+        limit: Número máximo de jobs
+        dispatcher: ``JobDispatcher`` que reclama los jobs (opcional)
+    """
+    if dispatcher is None:
+        from app.scraper.dispatcher import JobDispatcher
+        dispatcher = JobDispatcher(max_active_jobs=0, max_jobs_per_domain=1)
+    return [Seed(job['url'], job['max_depth'], job['job_id']) for job in dispatcher.claim(limit)]
+
+
+__all__ = ['Seed', 'claim_queue_seeds', 'parse_seeds', 'read_seeds']
@@ -26,7 +26,7 @@ DEPTH_STATS_VERBOSE = True
 DEPTH_PRIORITY = 1  # Prioridad para requests de mayor profundidad
 
 # Configuración de rate limiting avanzado y adaptativo
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = False  # Sustituido por el control adaptativo de RateLimitingMiddleware (ADAPTIVE_*)
 AUTOTHROTTLE_START_DELAY = 0.5  # Inicio más rápido
 AUTOTHROTTLE_MAX_DELAY = 15.0  # Máximo delay aumentado
 AUTOTHROTTLE_TARGET_CONCURRENCY = 1.5  # Concurrencia objetivo optimizada
@@ -109,7 +109,22 @@ LOG_FILE_BACKUP_COUNT = 5
 # Configuración de logging a base de datos
 DB_LOG_ENABLED = True
 DB_LOG_LEVEL = 'WARNING'  # Solo logs de warning en adelante a BD
-DB_LOG_BATCH_SIZE = 10  # Número de logs a guardar en lote
+DB_LOG_BATCH_SIZE = 100  # Número de logs a guardar en lote (un executemany)
+DB_LOG_FLUSH_INTERVAL = 1.0  # Segundos máximos que un log espera en la cola
+DB_LOG_QUEUE_SIZE = 10000  # Logs en cola; si se llena se descartan (log/db_dropped)
+
+# Escritura en lote de items (DatabasePipeline)
+DB_BATCH_SIZE = 100  # Items por transacción
+DB_FLUSH_INTERVAL = 2.0  # Segundos máximos que un item espera en el buffer
+
+# Hilo de almacenamiento: E/S de base de datos fuera del reactor
+STORAGE_THREADS = 2  # Hilos del pool de escritura
+STORAGE_MAX_PENDING = 200  # Tareas en el pool antes de encolar (backpressure)
+
+# Índice de duplicados persistente entre jobs (URLs, emails, contenido)
+DEDUPE_PERSISTENT = True  # False = índice solo en memoria del proceso
+DEDUPE_CAPACITY = 1000000  # Claves por tipo antes de empezar de cero (memoria fija)
+DEDUPE_ERROR_RATE = 0.01  # Falsos positivos del filtro de Bloom (se confirman en la tabla)
 
 # Configuración de cache (opcional)
 HTTPCACHE_ENABLED = True
@@ -127,6 +142,12 @@ DOWNLOAD_TIMEOUT = 30  # Timeout en segundos
 DOWNLOAD_MAXSIZE = 10 * 1024 * 1024  # Máximo 10MB por página
 DOWNLOAD_WARNSIZE = 5 * 1024 * 1024  # Warning a los 5MB
 
+# Corte temprano de descargas (ResponseLimitsExtension); por job con -a max_content_length / -a stream_cap
+RESPONSE_LIMITS_ENABLED = True
+RESPONSE_ACCEPTED_CONTENT_TYPES = ['text/html', 'application/xhtml']  # Otros Content-Type se cortan al recibir las cabeceras
+RESPONSE_MAX_CONTENT_LENGTH = 2 * 1024 * 1024  # Content-Length mayor: se corta sin leer el cuerpo (0 = sin límite)
+RESPONSE_STREAM_CAP = 512 * 1024  # Bytes de HTML que se leen como máximo; se procesa lo leído (0 = sin límite)
+
 # Configuración de red
 DNSCACHE_ENABLED = True
 DNSCACHE_SIZE = 1000
@@ -142,16 +163,30 @@ COOKIES_ENABLED = True
 DOWNLOADER_MIDDLEWARES = {
     # Middlewares estándar de Scrapy
     'scrapy.downloadermiddlewares.retry.RetryMiddleware': 90,
+    # Peticiones de los jobs pausados o cancelados de un spider batch, antes de ocupar la descarga
+    'app.scraper.job_control.JobControlMiddleware': 100,
+    # Antes que HttpCacheMiddleware (300): las páginas guardadas no salen de la caché en un recrawl;
+    # y antes que HttpCompressionMiddleware (590): compara el hash del cuerpo descomprimido
+    'app.scraper.recrawl.ConditionalGetMiddleware': 290,
     'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': 300,
 
     # Middlewares personalizados
     'app.scraper.middlewares.UserAgentRotationMiddleware': 400,
+    'app.scraper.middlewares.DomainHealthMiddleware': 405,
     'app.scraper.middlewares.RateLimitingMiddleware': 410,
     'app.scraper.middlewares.RequestFingerprintMiddleware': 420,
     'app.scraper.middlewares.ErrorHandlingMiddleware': 430,
     'app.scraper.middlewares.MonitoringMiddleware': 440,
 }
 
+# Extensiones: canal de control de jobs (pausa/reanudación/cancelación sin polling a la BD)
+EXTENSIONS = {
+    'app.scraper.job_control.JobControlExtension': 500,
+    'app.scraper.response_limits.ResponseLimitsExtension': 510,
+}
+JOB_CONTROL_ENABLED = True
+JOB_HEARTBEAT_INTERVAL = 30.0  # Segundos entre latidos de los jobs en ejecución (SCRAPER_JOB_LEASE_SECONDS)
+
 # User agent personalizado (sin dependencia externa)
 USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 
@@ -165,6 +200,27 @@ MIN_CONTENT_LENGTH = 200  # Longitud mínima de contenido
 MAX_REQUESTS_PER_DOMAIN = 100  # Máximo de requests por dominio por sesión
 MAX_REQUESTS_PER_SESSION = 1000  # Máximo de requests por sesión completa
 SESSION_TIMEOUT = 3600  # Timeout de sesión en segundos (1 hora)
+RATE_LIMIT_BURST = 1  # Peticiones que un dominio inactivo puede lanzar sin esperar (token bucket)
+# La espera del token bucket ocurre en la cola del scheduler y no ocupa huecos de CONCURRENT_REQUESTS
+SCHEDULER_PRIORITY_QUEUE = 'app.scraper.domain_scheduler.DomainReadyPriorityQueue'
+POLITENESS_SHARED = True  # Token buckets por host comunes a todos los jobs y workers (fichero junto a la BD)
+POLITENESS_SLOTS = 16384  # Hosts en la tabla compartida (se compacta al llenarse; POLITENESS_FILE para otra ruta)
+
+# Circuit breaker por host persistente y compartido entre jobs (DomainHealthMiddleware)
+DOMAIN_HEALTH_PERSISTENT = True  # False = estado solo en memoria del job (DOMAIN_HEALTH_FILE para otra ruta)
+DOMAIN_HEALTH_SLOTS = 4096  # Hosts con fallos registrados (se descartan los sanos al llenarse)
+DOMAIN_HEALTH_FAILURE_THRESHOLD = 5  # Fallos seguidos (timeouts, 5xx, 429/503) que abren el circuito
+DOMAIN_HEALTH_OPEN_SECONDS = 60  # Enfriamiento de la primera apertura (se duplica con cada apertura seguida)
+DOMAIN_HEALTH_MAX_OPEN_SECONDS = 3600  # Enfriamiento máximo
+
+# Control adaptativo de concurrencia y delay por dominio (AIMD, RateLimitingMiddleware)
+# Parte de DOWNLOAD_DELAY / CONCURRENT_REQUESTS_PER_DOMAIN (DOMAIN_DELAYS como suelo por dominio)
+ADAPTIVE_MIN_DELAY = 0.25  # Delay mínimo al que puede bajar un host sano
+ADAPTIVE_MAX_DELAY = 60.0  # Delay máximo tras 429/503/errores
+ADAPTIVE_MIN_CONCURRENCY = 1  # Concurrencia mínima por dominio
+ADAPTIVE_MAX_CONCURRENCY = 8  # Concurrencia máxima por dominio (hosts rápidos)
+ADAPTIVE_LATENCY_TOLERANCE = 1.5  # Latencia sana: hasta 1.5x la latencia base del host
+ADAPTIVE_BACKOFF_FACTOR = 0.5  # Reducción de concurrencia (y aumento de delay) ante 429/503/errores
 
 # Configuración de backoff exponencial para reintentos
 RETRY_BACKOFF_BASE = 2.0  # Base para backoff exponencial
@@ -183,6 +239,10 @@ LANGUAGE_SAMPLE_SIZE = 1000  # Tamaño de muestra para detección de idioma
 # Configuración de filtrado de URLs
 MAX_URL_LENGTH = 2048  # Longitud máxima de URL
 MIN_URL_LENGTH = 10  # Longitud mínima de URL
+# Patrones de URLs que no se siguen (única lista: el spider la lee de aquí). Se buscan
+# en la parte de la URL que sigue al host (ruta, query y fragmento), en minúsculas.
+# Solo esquemas, descargas y páginas de acceso: palabras como test, bot o 404
+# descartaban páginas válidas
 BLOCKED_URL_PATTERNS = [
     r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|zip|rar|exe|dmg|deb|rpm)$',
     r'mailto:',
@@ -205,41 +265,55 @@ BLOCKED_URL_PATTERNS = [
     r'\breset\b',
     r'\bverification\b',
     r'\bcaptcha\b',
-    r'\brobot\b',
-    r'\bbot\b',
-    r'\bspam\b',
-    r'\btest\b',
-    r'\bdemo\b',
-    r'\bexample\b',
-    r'\bsample\b',
-    r'\bplaceholder\b',
-    r'\btemplate\b',
-    r'\bdefault\b',
-    r'\bnull\b',
-    r'\bundefined\b',
-    r'\bnone\b',
-    r'\bempty\b',
-    r'\bblank\b',
-    r'\bna\b',
-    r'\bn/a\b',
-    r'\bnot\s+available\b',
-    r'\bcoming\s+soon\b',
-    r'\bunder\s+construction\b',
-    r'\bmaintenance\b',
-    r'\bout\s+of\s+service\b',
-    r'\btemporarily\s+unavailable\b',
-    r'\bservice\s+unavailable\b',
-    r'\bsite\s+down\b',
-    r'\bserver\s+error\b',
-    r'\berror\s+page\b',
-    r'\b404\b',
-    r'\b403\b',
-    r'\b500\b',
-    r'\b502\b',
-    r'\b503\b',
-    r'\b504\b',
 ]
 
+# Canonicalización de enlaces: parámetros de seguimiento y de sesión que se eliminan
+# antes de pedir la URL (patrones fnmatch, sin distinguir mayúsculas)
+URL_STRIP_PARAMS = [
+    'utm_*', 'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'igshid', 'ref_src', 'spm',
+    'phpsessid', 'jsessionid', 'aspsessionid*', 'sid', 'sessionid', 'session_id', 'cfid', 'cftoken',
+    'oscsid', 'zenid',
+]
+
+# Trampas de crawling: presupuesto de descargas por plantilla de URL (ruta con
+# números/fechas/ids sustituidos y nombres de parámetros). 0 = sin límite
+TRAP_DETECTION_ENABLED = True
+TRAP_TEMPLATE_BUDGET = 30  # Descargas sin emails nuevos por plantilla
+TRAP_TEMPLATE_PATIENCE = 10  # Páginas seguidas sin emails nuevos antes de podar la plantilla
+
+# Frontera con prioridad: los enlaces de contacto (texto, ruta y posición) se piden antes.
+# FRONTIER_STOP_AFTER_EMAILS > 0 deja de seguir enlaces de un dominio al encontrar ese
+# número de emails nuevos (por job con -a stop_after_emails=N)
+FRONTIER_ENABLED = True
+FRONTIER_STOP_AFTER_EMAILS = 0
+
+# Registro de cada descarga (con o sin emails, con el texto del enlace) en crawl_outcomes:
+# son los ejemplos de entrenamiento del modelo de rendimiento de URLs
+CRAWL_LOG_ENABLED = True
+CRAWL_LOG_BATCH_SIZE = 500
+
+# Modelo de rendimiento de URLs (python -m app.scraper.url_model lo entrena con crawl_outcomes).
+# Si existe el fichero, los enlaces con probabilidad de emails por debajo del umbral no se
+# siguen y el resto suma probabilidad * peso a su prioridad. Se activa cuando el registro
+# de descargas ya tiene suficientes páginas
+URL_YIELD_MODEL_ENABLED = False
+URL_YIELD_PRUNE_THRESHOLD = 0.02
+URL_YIELD_PRIORITY_WEIGHT = 100
+
+# Descubrimiento por robots.txt y sitemaps: las URLs de contacto de los sitemaps (índices y
+# .xml.gz incluidos, leídos en streaming) se piden directamente a profundidad 1. Desactivado
+# por defecto: la URL inicial espera a que termine el descubrimiento
+SITEMAP_SEEDING_ENABLED = False
+SITEMAP_MAX_FILES = 10  # Sitemaps que se descargan por job
+SITEMAP_MAX_URLS = 50000  # URLs que se leen como máximo de cada sitemap
+SITEMAP_MAX_SEEDS = 20  # URLs de contacto que se siembran por job
+SITEMAP_DOWNLOAD_TIMEOUT = 10  # Timeout de robots.txt y sitemaps (la URL inicial espera al descubrimiento)
+
+# Recrawl incremental (ver app/scraper/recrawl.py)
+CONDITIONAL_GET_ENABLED = True  # ETag/Last-Modified y hash del cuerpo: las páginas sin cambios no se parsean
+RECRAWL_ENABLED = False  # True = volver a pedir las URLs ya guardadas (por job: -a recrawl=1)
+
 # Configuración de calidad de emails
 EMAIL_QUALITY_WEIGHTS = {
     'has_name': 0.3,  # Email tiene nombre antes de @
@@ -268,6 +342,7 @@ MAX_DISK_USAGE_MB = 5000  # Máximo uso de disco para logs/cache
 # Configuración de monitoreo
 MONITORING_ENABLED = True
 MONITORING_INTERVAL = 30  # Intervalo de monitoreo en segundos
+TELEMETRY_SNAPSHOT_INTERVAL = 30.0  # Segundos entre instantáneas de telemetría en ScrapingStats (0 = solo al cerrar)
 MONITORING_METRICS = [
     'requests_count',
     'responses_count',
@@ -339,6 +414,8 @@ MIN_CONTENT_LENGTH = 200  # Longitud mínima de contenido
 
 # Configuración de duplicados avanzados
 DUPLICATE_SIMILARITY_THRESHOLD = 0.85  # Umbral de similitud para detectar duplicados
+NEAR_DUPLICATE_NUM_PERM = 64  # Enteros por firma MinHash del texto de la página
+NEAR_DUPLICATE_MAX_DOCUMENTS = 100000  # Firmas en el índice LSH (se olvidan las más antiguas)
 
 FINGERPRINT_WEIGHTS = {
     'title': 0.4,  # Peso del título en el fingerprint
@@ -386,7 +463,7 @@ MIN_DESCRIPTION_LENGTH = 50  # Longitud mínima de descripción
 MAX_DESCRIPTION_LENGTH = 500  # Longitud máxima de descripción
 
 # Configuración de logging avanzado
-LOG_REQUEST_DETAILS = True  # Log detallado de requests
+LOG_REQUEST_DETAILS = False  # Log DEBUG por request (la telemetría por dominio ya cuenta requests)
 LOG_RESPONSE_DETAILS = False  # Log detallado de responses (puede ser verbose)
 LOG_ITEM_DETAILS = True  # Log detallado de items procesados
 LOG_FILTERED_ITEMS = True  # Log de items filtrados
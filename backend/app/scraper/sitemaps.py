@@ -0,0 +1,103 @@
+"""
+Descubrimiento de páginas de contacto con robots.txt y sitemaps.
+
+``LeadSpider`` solo conoce la URL inicial y llega al resto siguiendo enlaces,
+así que la página de contacto de un sitio con un menú de tres niveles se
+descarga a profundidad 3. Con ``SITEMAP_SEEDING_ENABLED`` el spider lee
+además las directivas ``Sitemap:`` de robots.txt (o ``/sitemap.xml`` si no
+hay ninguna), recorre los sitemaps (índices de sitemaps y ``.xml.gz``
+incluidos) y pide directamente a profundidad 1 las URLs que ``LinkScorer``
+reconoce como de contacto.
+
+Los sitemaps se leen en streaming: ``iter_sitemap`` descomprime y parsea el
+XML por elementos y los libera al procesarlos, así que un sitemap de 50.000
+URLs no se convierte en un árbol en memoria. Un sitemap truncado (por
+``RESPONSE_STREAM_CAP``) o mal formado entrega las URLs leídas hasta el error.
+"""
+
+import gzip
+import io
+import zlib
+from typing import Iterator, List, Tuple
+
+from lxml import etree
+
+# Content-Type de robots.txt y de los sitemaps (XML, gzip o texto), que
+# ResponseLimitsExtension cortaría por no ser HTML
+SITEMAP_CONTENT_TYPES = [
+    'text/xml', 'application/xml', 'text/plain', 'application/x-gzip', 'application/gzip',
+    'application/octet-stream',
+]
+
+# robots.txt y los sitemaps se descargan antes que los enlaces de la portada (contacto y modelo
+# de rendimiento suman como mucho ~220)
+SITEMAP_REQUEST_PRIORITY = 300
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def robots_sitemaps(body: bytes) -> List[str]:
+    """URLs de las directivas ``Sitemap:`` de un robots.txt."""
+    sitemaps = []
+    for line in body.decode('utf-8', 'replace').splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap':
+            # El valor es una URL absoluta: se quitan los comentarios finales
+            value = value.split('#', 1)[0].strip()
+            if value:
+                sitemaps.append(value)
+    return sitemaps
+
+
+def _open(body: bytes):
+    """Fichero con el contenido del sitemap, descomprimido sobre la marcha si es gzip."""
+    source = io.BytesIO(body)
+    if body[:2] == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=source)
+    return source
+
+
+def iter_sitemap(body: bytes) -> Iterator[Tuple[str, str]]:
+    """
+    Recorre un sitemap en streaming.
+
+    Args:
+        body: Cuerpo de la respuesta (XML, XML comprimido con gzip o texto con una URL por línea)
+
+    Yields:
+        ('sitemap', url) por cada entrada de un índice de sitemaps y ('url', url) por cada página
+    """
+    source = _open(body)
+    try:
+        head = source.peek(64)[:64] if hasattr(source, 'peek') else body[:64]
+        if not head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<'):
+            # Sitemap de texto: una URL por línea
+            for line in io.TextIOWrapper(source, encoding='utf-8', errors='replace'):
+                line = line.strip()
+                if line.startswith(('http://', 'https://')):
+                    yield 'url', line
+            return
+
+        parser = etree.iterparse(
+            source, events=('end',), tag='{*}loc',
+            recover=True, resolve_entities=False, no_network=True, huge_tree=False,
+        )
+        for _, location in parser:
+            entry = location.getparent()
+            if entry is None:
+                continue
+            kind = 'sitemap' if entry.tag.endswith('sitemap') else 'url'
+            text = location.text
+            # Liberar las entradas ya procesadas: la memoria no crece con el sitemap
+            root = entry.getparent()
+            if root is not None:
+                while entry.getprevious() is not None:
+                    del root[0]
+            if text and text.strip():
+                yield kind, text.strip()
+    except (etree.XMLSyntaxError, EOFError, OSError, zlib.error):
+        # Truncado o mal formado: se queda con lo leído hasta aquí
+        return
+
+
+__all__ = ['SITEMAP_CONTENT_TYPES', 'SITEMAP_REQUEST_PRIORITY', 'iter_sitemap', 'robots_sitemaps']
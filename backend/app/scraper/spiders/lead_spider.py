@@ -2,19 +2,35 @@
 Spider principal para scraping de leads.
 """
 
+from collections import Counter, defaultdict
+import heapq
 import re
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import CloseSpider, DontCloseSpider
+from scrapy.spidermiddlewares.httperror import HttpError
 from urllib.parse import urlparse, urljoin
 from ..items import LeadItem, EmailItem
-import time
+from ..email_extractor import extract_emails
+from ..storage import OrderedWriter
+from ..rules import compile_patterns
+from ..dedupe import fingerprint, get_dedupe_index
+from ..urls import DEFAULT_STRIP_PARAMS, UrlCanonicalizer
+from ..traps import TrapDetector, url_template
+from ..frontier import CONTACT_SCORE_THRESHOLD, DEFAULT_CONTACT_KEYWORDS, DEFAULT_LOW_VALUE_KEYWORDS, LinkScorer
+from ..url_model import load_yield_model, save_crawl_outcomes, url_features
+from ..sitemaps import SITEMAP_CONTENT_TYPES, SITEMAP_REQUEST_PRIORITY, iter_sitemap, robots_sitemaps
+from .. import settings as scraper_settings
+from ..seeds import Seed, claim_queue_seeds, read_seeds
+from ..job_control import JobRequestHeld
+from ..recrawl import PageNotModified, ValidatorStore, response_validators, touch_unchanged_pages
+from ..page_features import (
+    DEFAULT_BUSINESS_KEYWORDS, build_vocabulary, contact_score, detect_content_type,
+    extract_page_features, page_quality_score
+)
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from app.database.database import engine
-from app.database.models import ScrapingQueue
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import func
-
 
 class LeadSpider(scrapy.Spider):
     """Spider para encontrar leads en páginas web."""
@@ -22,102 +38,656 @@ class LeadSpider(scrapy.Spider):
     name = 'lead_spider'
     allowed_domains = []  # Se configura dinámicamente
 
-    def __init__(self, start_url=None, depth=3, *args, **kwargs):
+    def __init__(self, start_url=None, depth=3, job_id=None, seeds=None, seeds_file=None, queue=None,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_url = start_url
+        # Pausa/cancelación llegan por el canal de control (JobControlExtension)
+        self.job_id = job_id
         self.max_depth = int(depth)  # Asegurar que sea entero
         self.current_depth = 0
+        # Escrituras de progreso en el hilo de almacenamiento, en orden
+        self.progress_writer = OrderedWriter()
+        # Índice de URLs ya procesadas en jobs anteriores (se asigna en from_crawler)
+        self.dedupe = None
+        self.signature_size = 64  # NEAR_DUPLICATE_NUM_PERM
+        # Palabras clave que se buscan al extraer las características de cada página
+        self.business_keywords = list(DEFAULT_BUSINESS_KEYWORDS)
+        self.keyword_vocabulary = build_vocabulary(self.business_keywords)
+        self.language_sample_size = 1000  # LANGUAGE_SAMPLE_SIZE
+        # Patrones de URLs que no se siguen, compilados una vez por familia de reglas (se asigna en from_crawler)
+        self.blocked_url_rules = None
+        # Canonicalización de enlaces (URL_STRIP_PARAMS) y URLs canónicas ya pedidas en este job
+        # (fingerprints de 64 bits en lugar de las cadenas)
+        self.url_canonicalizer = UrlCanonicalizer()
+        self.seen_urls = set()
+        # Presupuesto de descargas por plantilla de URL (calendarios, filtros, paginación...)
+        self.trap_detector = TrapDetector()
+        # Emails ya encontrados en este job (fingerprints), para saber qué páginas aportan
+        self.seen_emails = set()
+        # Prioridad de los enlaces (primero los de contacto) y regla de parada por dominio:
+        # con FRONTIER_STOP_AFTER_EMAILS (o -a stop_after_emails=N) emails nuevos en un
+        # dominio no se siguen más enlaces suyos
+        self.link_scorer = LinkScorer()
+        self.frontier_stop_after_emails = 0
+        # Recrawl: validadores de las páginas guardadas (CONDITIONAL_GET_ENABLED) y
+        # URLs conocidas que se vuelven a pedir (RECRAWL_ENABLED o -a recrawl=1)
+        self.validators = None
+        self.recrawl_enabled = False
+        self.domain_emails = {}
+        self.completed_domains = set()
+        # Modelo de rendimiento de URLs entrenado con los crawls anteriores (None = sin modelo)
+        self.yield_model = None
+        self.yield_prune_threshold = 0.02  # URL_YIELD_PRUNE_THRESHOLD
+        self.yield_priority_weight = 100  # URL_YIELD_PRIORITY_WEIGHT
+        # Resultado de cada descarga, con o sin emails, para entrenar el modelo
+        # (CRAWL_LOG_ENABLED; None = no se registra). Se guarda por lotes
+        self.crawl_log = None
+        self.crawl_log_batch_size = 500  # CRAWL_LOG_BATCH_SIZE
+        # Descubrimiento por robots.txt y sitemaps (SITEMAP_SEEDING_ENABLED): las URLs de
+        # contacto de los sitemaps se piden directamente a profundidad 1
+        self.sitemap_seeding = False
+        self.sitemap_max_files = 10  # SITEMAP_MAX_FILES
+        self.sitemap_max_urls = 50000  # SITEMAP_MAX_URLS
+        self.sitemap_max_seeds = 20  # SITEMAP_MAX_SEEDS
+        self.sitemap_timeout = 10  # SITEMAP_DOWNLOAD_TIMEOUT
+        # Por semilla: sitemaps pedidos, URLs sembradas y peticiones de descubrimiento pendientes
+        self.sitemap_files = {}
+        self.sitemap_seeded = {}
+        self.sitemap_pending = {}
+        # Semillas cuya URL inicial ya se pidió
+        self.released_seeds = set()
 
+        # Semillas del crawl por host (modo batch: -a seeds_file=FICHERO|-, -a queue=N o seeds=[Seed])
+        self.seeds = {}
+        # Jobs reclamados de ScrapingQueue por este spider: se cierran al terminar
+        # y mientras tanto se renueva su latido (JOB_HEARTBEAT_INTERVAL). Los que
+        # _add_seed descarta se marcan 'failed' al empezar
+        self.claimed_jobs = []
+        self.rejected_jobs = []
+        self.heartbeat = None
+        # Progreso de cada semilla: páginas descargadas (< 400) e items con emails
+        self.seed_pages = Counter()
+        self.seed_items = Counter()
+        # Jobs reclamados pausados (sus peticiones se retienen hasta reanudarlos) o cancelados
+        # desde la API, por su socket de control (JobControlExtension)
+        self.paused_jobs = set()
+        self.cancelled_jobs = set()
+        self.held_requests = defaultdict(list)
+        seed_list = list(seeds or [])
         if start_url:
-            parsed = urlparse(start_url)
-            self.allowed_domains = [parsed.netloc]
+            seed_list.insert(0, Seed(start_url, self.max_depth, job_id))
+        if seeds_file:
+            seed_list.extend(read_seeds(seeds_file, self.max_depth))
+        if queue:
+            claimed = claim_queue_seeds(int(queue))
+            self.claimed_jobs = [seed.job_id for seed in claimed]
+            seed_list.extend(claimed)
+        for seed in seed_list:
+            if not self._add_seed(seed) and seed.job_id in self.claimed_jobs:
+                self.claimed_jobs.remove(seed.job_id)
+                self.rejected_jobs.append(seed.job_id)
+        if self.seeds:
+            self.allowed_domains = list(self.seeds)
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.dedupe = get_dedupe_index(crawler.settings)
+        spider.signature_size = crawler.settings.getint('NEAR_DUPLICATE_NUM_PERM', 64)
+        spider.business_keywords = crawler.settings.getlist('BUSINESS_KEYWORDS', spider.business_keywords)
+        spider.keyword_vocabulary = build_vocabulary(spider.business_keywords)
+        spider.language_sample_size = crawler.settings.getint('LANGUAGE_SAMPLE_SIZE', 1000)
+        # Sin el módulo de settings del proyecto (tests, CrawlerRunner) se usa su lista igualmente
+        spider.blocked_url_rules = compile_patterns(
+            crawler.settings.getlist('BLOCKED_URL_PATTERNS', scraper_settings.BLOCKED_URL_PATTERNS)
+        )
+        spider.url_canonicalizer = UrlCanonicalizer(
+            crawler.settings.getlist('URL_STRIP_PARAMS', DEFAULT_STRIP_PARAMS)
+        )
+        if crawler.settings.getbool('TRAP_DETECTION_ENABLED', True):
+            spider.trap_detector = TrapDetector(
+                budget=crawler.settings.getint('TRAP_TEMPLATE_BUDGET', 30),
+                patience=crawler.settings.getint('TRAP_TEMPLATE_PATIENCE', 10),
+            )
+        else:
+            spider.trap_detector = None
+        if crawler.settings.getbool('FRONTIER_ENABLED', True):
+            spider.link_scorer = LinkScorer(
+                crawler.settings.getlist('FRONTIER_CONTACT_KEYWORDS', DEFAULT_CONTACT_KEYWORDS),
+                crawler.settings.getlist('FRONTIER_LOW_VALUE_KEYWORDS', DEFAULT_LOW_VALUE_KEYWORDS),
+            )
+        else:
+            spider.link_scorer = None
+        spider.frontier_stop_after_emails = crawler.settings.getint('FRONTIER_STOP_AFTER_EMAILS', 0)
+        spider.yield_model = load_yield_model(crawler.settings)
+        spider.yield_prune_threshold = crawler.settings.getfloat('URL_YIELD_PRUNE_THRESHOLD', 0.02)
+        spider.yield_priority_weight = crawler.settings.getint('URL_YIELD_PRIORITY_WEIGHT', 100)
+        if crawler.settings.getbool('CRAWL_LOG_ENABLED', False):
+            spider.crawl_log = []
+            spider.crawl_log_batch_size = max(1, crawler.settings.getint('CRAWL_LOG_BATCH_SIZE', 500))
+        spider.sitemap_seeding = crawler.settings.getbool('SITEMAP_SEEDING_ENABLED', False)
+        spider.sitemap_max_files = crawler.settings.getint('SITEMAP_MAX_FILES', 10)
+        spider.sitemap_max_urls = crawler.settings.getint('SITEMAP_MAX_URLS', 50000)
+        spider.sitemap_max_seeds = crawler.settings.getint('SITEMAP_MAX_SEEDS', 20)
+        spider.sitemap_timeout = crawler.settings.getint('SITEMAP_DOWNLOAD_TIMEOUT', 10)
+        if spider.sitemap_seeding:
+            crawler.signals.connect(spider._on_spider_idle, signal=signals.spider_idle)
+        spider.recrawl_enabled = crawler.settings.getbool('RECRAWL_ENABLED', False)
+        if crawler.settings.getbool('CONDITIONAL_GET_ENABLED', False):
+            crawler.signals.connect(spider._load_validators, signal=signals.spider_opened)
+        spider.heartbeat_interval = crawler.settings.getfloat('JOB_HEARTBEAT_INTERVAL', 30.0)
+        if spider.claimed_jobs and spider.heartbeat_interval > 0:
+            crawler.signals.connect(spider._start_heartbeat, signal=signals.spider_opened)
+        return spider
+
+    def _start_heartbeat(self, spider):
+        """Latido de los jobs reclamados de la cola (modo batch) mientras el spider corre."""
+        from twisted.internet import task
+        from app.scraper.worker import heartbeat_jobs
+
+        def beat():
+            d = self.progress_writer.submit(heartbeat_jobs, self.claimed_jobs)
+            d.addErrback(lambda failure: self.logger.error(
+                f"❌ Error sending job heartbeats: {failure.getErrorMessage()}"))
+
+        self.heartbeat = task.LoopingCall(beat)
+        self.heartbeat.start(self.heartbeat_interval, now=False)
+
+    def _load_validators(self, spider):
+        """
+        Carga los validadores de las páginas guardadas antes de la primera petición (solo
+        en modo recrawl: fuera de él los hijos de una página sin cambios no se piden).
+        """
+        if not self._recrawl():
+            return None
+        d = self.progress_writer.submit(ValidatorStore.load, self.allowed_domains, self.url_canonicalizer.canonical)
+
+        def loaded(store):
+            self.validators = store
+            self.crawler.stats.set_value('recrawl/stored_pages', len(store), spider=self)
+
+        d.addCallback(loaded)
+        d.addErrback(lambda failure: self.logger.warning(
+            f"⚠️ Stored validators unavailable, fetching without conditional GET: {failure.getErrorMessage()}"))
+        return d
+
+    def _recrawl(self):
+        """True si las URLs que el índice de duplicados ya conoce se vuelven a pedir."""
+        value = getattr(self, 'recrawl', None)
+        if value in (None, ''):
+            return self.recrawl_enabled
+        return str(value).lower() in ('1', 'true', 'yes')
+
+    def _add_seed(self, seed):
+        """Registra una semilla por su host (la primera gana si dos comparten host); False si se descarta."""
+        host = urlparse(self.url_canonicalizer.clean(seed.url)).netloc
+        if not host:
+            self.logger.warning(f"⚠️ Ignoring seed without host: {seed.url}")
+            return False
+        if host in self.seeds:
+            self.logger.warning(f"⚠️ Duplicate seed for {host}: {seed.url} (job {seed.job_id})")
+            return False
+        self.seeds[host] = seed
+        return True
+
+    def control_batch_job(self, job_id, command):
+        """Pausa, reanuda o cancela un job reclamado sin parar el resto del batch."""
+        if job_id not in self.claimed_jobs:
+            self.logger.warning(f"⚠️ Control command {command!r} for unknown batch job {job_id}")
+            return
+        if command == 'pause':
+            self.paused_jobs.add(job_id)
+            self.logger.info(f"⏸️ Batch job paused: {job_id}")
+        elif command == 'resume':
+            self.paused_jobs.discard(job_id)
+            held = self.held_requests.pop(job_id, [])
+            for request in held:
+                # Ya pasaron por el filtro de duplicados del scheduler
+                self.crawler.engine.crawl(request.replace(dont_filter=True))
+            self.logger.info(f"▶️ Batch job resumed: {job_id} ({len(held)} held requests)")
+        elif command == 'cancel':
+            self.cancelled_jobs.add(job_id)
+            self.paused_jobs.discard(job_id)
+            self.held_requests.pop(job_id, None)
+            self.logger.info(f"⏹️ Batch job cancelled: {job_id}")
+        else:
+            self.logger.warning(f"⚠️ Unknown job control command: {command!r}")
+
+    def hold_batch_request(self, request):
+        """True si la petición es de un job pausado (se retiene hasta reanudarlo) o cancelado (se descarta)."""
+        if not self.paused_jobs and not self.cancelled_jobs:
+            return False
+        job_id = self._seed_job_id(self._seed_key(request))
+        if job_id in self.cancelled_jobs:
+            return True
+        if job_id in self.paused_jobs:
+            self.held_requests[job_id].append(request)
+            return True
+        return False
+
+    def _seed_key(self, response):
+        """Host de la semilla de la que viene la respuesta (None si no es de ninguna)."""
+        key = response.meta.get('seed')
+        if key in self.seeds:
+            return key
+        host = urlparse(response.url).netloc
+        return host if host in self.seeds else None
+
+    def _seed_depth(self, key):
+        seed = self.seeds.get(key)
+        return seed.depth if seed else self.max_depth
+
+    def _seed_job_id(self, key):
+        seed = self.seeds.get(key)
+        return seed.job_id if seed else self.job_id
 
     def start_requests(self):
-        """Inicia el scraping desde la URL proporcionada."""
-        if self.start_url:
+        """Inicia el scraping desde la URL de cada semilla."""
+        self.crawler.stats.set_value('batch/seeds', len(self.seeds), spider=self)
+        if self.rejected_jobs:
+            from app.scraper.worker import finish_jobs
+            d = self.progress_writer.submit(finish_jobs, self.rejected_jobs, 'failed')
+            d.addErrback(lambda failure: self.logger.error(
+                f"💥 Error failing rejected batch jobs in database: {failure.getErrorMessage()}"))
+        for key, seed in self.seeds.items():
+            self._mark_seen(self.url_canonicalizer.canonical(seed.url))
+            if self.sitemap_seeding and seed.depth > 0:
+                # La URL inicial espera al descubrimiento (_release_start_request): si no, sus enlaces
+                # llenan la cola de descargas del dominio, que es FIFO, antes que las semillas
+                parsed = urlparse(self.url_canonicalizer.clean(seed.url))
+                self.sitemap_pending[key] = 1
+                yield scrapy.Request(
+                    url=f'{parsed.scheme}://{key}/robots.txt',
+                    callback=self.parse_robots,
+                    errback=self._sitemap_fallback,
+                    priority=SITEMAP_REQUEST_PRIORITY,
+                    meta={**self._discovery_meta(key), 'dont_obey_robotstxt': True}
+                )
+            else:
+                yield self._start_request(key)
+
+    def _discovery_meta(self, key):
+        """
+        robots.txt y sitemaps: XML/gzip/texto, timeout corto y sin reintentos (retrasan la URL
+        inicial). Se leen enteros (solo DOWNLOAD_MAXSIZE): los topes de las páginas HTML los truncarían.
+        """
+        return {'depth': 0, 'seed': key, 'download_timeout': self.sitemap_timeout, 'max_retry_times': 0,
+                'accepted_content_types': SITEMAP_CONTENT_TYPES, 'max_content_length': 0, 'stream_cap': 0}
+
+    def _start_request(self, key):
+        self.released_seeds.add(key)
+        return scrapy.Request(
+            url=self.seeds[key].url,
+            callback=self.parse,
+            errback=self._handle_request_error,
+            meta={'depth': 0, 'source_url': None, 'seed': key}
+        )
+
+    def _release_start_request(self, key):
+        """Pide la URL inicial de la semilla si aún no se pidió (fin del descubrimiento o spider inactivo)."""
+        if key in self.seeds and key not in self.released_seeds:
+            # Directamente al motor: desde un callback, DepthMiddleware le sumaría profundidad
+            self.crawler.engine.crawl(self._start_request(key))
+            return True
+        return False
+
+    def _sitemap_done(self, key):
+        """Una petición de descubrimiento menos; con la última de la semilla se pide su URL inicial."""
+        self.sitemap_pending[key] = self.sitemap_pending.get(key, 0) - 1
+        if self.sitemap_pending[key] <= 0:
+            self._release_start_request(key)
+
+    def _on_spider_idle(self, spider):
+        """Red de seguridad: una petición de descubrimiento perdida no deja semillas sin empezar."""
+        if spider is not self:
+            return
+        released = [key for key in self.seeds if self._release_start_request(key)]
+        if released:
+            raise DontCloseSpider
+
+    def _sitemap_request(self, url, key):
+        """Petición de un sitemap de la semilla, o None si ya se pidió o se agotó SITEMAP_MAX_FILES."""
+        if self.sitemap_files.get(key, 0) >= self.sitemap_max_files:
+            return None
+        fetch_url = self.url_canonicalizer.clean(url)
+        if urlparse(fetch_url).netloc != key:
+            return None
+        if not self._mark_seen(self.url_canonicalizer.canonical(fetch_url)):
+            return None
+        self.sitemap_files[key] = self.sitemap_files.get(key, 0) + 1
+        self.sitemap_pending[key] = self.sitemap_pending.get(key, 0) + 1
+        return scrapy.Request(
+            url=fetch_url,
+            callback=self.parse_sitemap,
+            errback=self._handle_sitemap_error,
+            priority=SITEMAP_REQUEST_PRIORITY,
+            meta=self._discovery_meta(key)
+        )
+
+    def parse_robots(self, response):
+        """Pide los sitemaps declarados en robots.txt (o /sitemap.xml si no declara ninguno)."""
+        key = self._seed_key(response)
+        sitemaps = robots_sitemaps(response.body) or [urljoin(response.url, '/sitemap.xml')]
+        for url in sitemaps:
+            request = self._sitemap_request(url, key)
+            if request is not None:
+                yield request
+        self._sitemap_done(key)
+
+    def _sitemap_fallback(self, failure):
+        """Sin robots.txt (error HTTP) se prueba /sitemap.xml."""
+        if failure.check(HttpError):
+            key = self._seed_key(failure.request)
+            request = self._sitemap_request(urljoin(failure.request.url, '/sitemap.xml'), key)
+            if request is not None:
+                yield request
+            self._sitemap_done(key)
+        else:
+            self._handle_sitemap_error(failure)
+
+    def _handle_sitemap_error(self, failure):
+        """Un sitemap que falta no es un error del job: el crawl sigue por los enlaces."""
+        self.logger.debug(f"🗺️ Sitemap not available: {failure.request.url} - {failure.getErrorMessage()}")
+        self._sitemap_done(self._seed_key(failure.request))
+
+    def parse_sitemap(self, response):
+        """Siembra a profundidad 1 las URLs de contacto del sitemap y sigue los índices de sitemaps."""
+        # DepthMiddleware da a cada petición la profundidad de esta respuesta + 1: el sitemap
+        # cuenta como la portada para que las semillas queden a profundidad 1
+        response.meta['depth'] = 0
+        key = self._seed_key(response)
+        if self.sitemap_seeded.get(key, 0) < self.sitemap_max_seeds:
+            yield from self._seed_from_sitemap(response, key)
+        # Las URLs sembradas ya están en el scheduler: con el último sitemap se pide la URL inicial
+        self._sitemap_done(key)
+
+    def _seed_from_sitemap(self, response, key):
+        budget = self.sitemap_max_seeds - self.sitemap_seeded.get(key, 0)
+        stats = self.crawler.stats
+        stats.inc_value('sitemap/files', spider=self)
+        scorer = self.link_scorer or LinkScorer()
+
+        # Las mejores URLs de contacto en un heap acotado: el sitemap no se guarda entero
+        candidates = []
+        scanned = 0
+        for kind, location in iter_sitemap(response.body):
+            if kind == 'sitemap':
+                request = self._sitemap_request(urljoin(response.url, location), key)
+                if request is not None:
+                    yield request
+                continue
+            scanned += 1
+            if scanned > self.sitemap_max_urls:
+                break
+            url = urljoin(response.url, location)
+            if not self._is_valid_url(url):
+                continue
+            fetch_url = self.url_canonicalizer.clean(url)
+            if urlparse(fetch_url).netloc != key:
+                continue
+            score = scorer.score(fetch_url)
+            if score < CONTACT_SCORE_THRESHOLD:
+                continue
+            entry = (score, -scanned, fetch_url)
+            if len(candidates) < budget:
+                heapq.heappush(candidates, entry)
+            else:
+                heapq.heappushpop(candidates, entry)
+        stats.inc_value('sitemap/urls_scanned', min(scanned, self.sitemap_max_urls), spider=self)
+
+        for score, _, fetch_url in sorted(candidates, reverse=True):
+            canonical_url = self.url_canonicalizer.canonical(fetch_url)
+            if not self._mark_seen(canonical_url):
+                continue
+            if self.dedupe is not None and not self._recrawl() and self.dedupe.contains('url', canonical_url):
+                stats.inc_value('dedupe/known_url_skipped', spider=self)
+                continue
+            self.sitemap_seeded[key] = self.sitemap_seeded.get(key, 0) + 1
+            stats.inc_value('sitemap/seeded', spider=self)
+            self.logger.info(f"🗺️ Seeding from sitemap: {fetch_url} (depth: 1, priority: {score})")
             yield scrapy.Request(
-                url=self.start_url,
+                url=fetch_url,
                 callback=self.parse,
-                meta={'depth': 0, 'source_url': None}
+                priority=score,
+                meta={
+                    'depth': 1,
+                    'source_url': response.url,
+                    'seed': key,
+                    'url_template': url_template(canonical_url)
+                },
+                errback=self._handle_request_error
             )
 
-    def _check_job_status(self, url):
-        """Verifica el estado del job en la base de datos."""
-        try:
-            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-            db = SessionLocal()
-            queue_item = db.query(ScrapingQueue).filter_by(url=url).first()
-            if queue_item:
-                status = queue_item.status
-                db.close()
-                return status
-            db.close()
-            return None
-        except Exception as e:
-            self.logger.error(f"Error checking job status: {e}")
-            return None
+    def _mark_seen(self, canonical_url):
+        """Registra la URL canónica en el conjunto del job; False si ya estaba."""
+        key = fingerprint(canonical_url)
+        if key in self.seen_urls:
+            return False
+        self.seen_urls.add(key)
+        return True
+
+    def _count_new_emails(self, emails):
+        """Registra los emails de la página en el conjunto del job y devuelve cuántos eran nuevos."""
+        new_emails = 0
+        for email in emails:
+            key = fingerprint(email.lower())
+            if key not in self.seen_emails:
+                self.seen_emails.add(key)
+                new_emails += 1
+        return new_emails
+
+    def _record_template_yield(self, response, canonical_url, new_emails):
+        """Anota si la página aportó emails nuevos a su plantilla de URL y poda la plantilla si no rinde."""
+        if self.trap_detector is None:
+            return
+        template = response.meta.get('url_template') or url_template(canonical_url)
+        if self.trap_detector.record(template, new_emails):
+            self.logger.info(f"🪤 Pruning URL template {template}: "
+                             f"{self.trap_detector.patience} pages in a row without new emails")
+            self.crawler.stats.set_value('traps/templates_pruned', len(self.trap_detector.pruned), spider=self)
 
-    def _update_job_progress(self, url, progress, total_items, processed_items):
-        """Actualiza el progreso del job en la base de datos."""
+    def _stop_after_emails(self):
+        """Emails nuevos por dominio que dan el dominio por terminado (0 = sin regla de parada)."""
+        value = getattr(self, 'stop_after_emails', None)
+        if value in (None, ''):
+            return self.frontier_stop_after_emails
         try:
-            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-            db = SessionLocal()
-            queue_item = db.query(ScrapingQueue).filter_by(url=url).first()
-            if queue_item:
-                queue_item.progress = progress
-                queue_item.total_items = total_items
-                queue_item.processed_items = processed_items
-                queue_item.updated_at = func.now()
-                db.commit()
-            db.close()
-        except Exception as e:
-            self.logger.error(f"Error updating job progress: {e}")
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return self.frontier_stop_after_emails
+
+    def _record_domain_emails(self, domain, new_emails):
+        """Aplica la regla de parada por dominio; True si el dominio queda terminado."""
+        target = self._stop_after_emails()
+        if not target or not new_emails or domain in self.completed_domains:
+            return domain in self.completed_domains
+        found = self.domain_emails.get(domain, 0) + new_emails
+        self.domain_emails[domain] = found
+        if found < target:
+            return False
+        self.completed_domains.add(domain)
+        self.crawler.stats.inc_value('frontier/domains_completed', spider=self)
+        self.crawler.stats.set_value(f'frontier/requests_to_complete/{domain}',
+                                     self.crawler.stats.get_value('downloader/request_count', 0), spider=self)
+        self.logger.info(f"🎯 Domain {domain} reached {found} emails: no more links followed")
+        return True
+
+    def _count_pruned_link(self, template):
+        """Estadísticas del job para un enlace descartado por su plantilla."""
+        stats = self.crawler.stats
+        stats.inc_value('traps/links_pruned', spider=self)
+        stats.inc_value(f'traps/pruned/{template}', spider=self)
+        stats.set_value('traps/templates_pruned', len(self.trap_detector.pruned), spider=self)
 
     def parse(self, response):
         """Parsea una página web en busca de leads con manejo robusto de errores."""
         try:
             current_depth = response.meta.get('depth', 0)
             source_url = response.meta.get('source_url')
-
-            # Verificar el estado del job cada 10 items procesados
-            if not hasattr(self, '_processed_count'):
-                self._processed_count = 0
-            self._processed_count += 1
-
-            if self._processed_count % 10 == 0:
-                job_status = self._check_job_status(self.start_url)
-                if job_status == "paused":
-                    self.logger.info(f"⏸️ Job paused: {self.start_url}")
-                    # Esperar hasta que el job sea reanudado
-                    while job_status == "paused":
-                        time.sleep(5)  # Esperar 5 segundos
-                        job_status = self._check_job_status(self.start_url)
-                elif job_status == "cancelled":
-                    self.logger.info(f"⏹️ Job cancelled: {self.start_url}")
-                    return
+            seed = self._seed_key(response)
+            if response.status < 400:
+                self.seed_pages[seed] += 1
 
             # Verificar si la respuesta es válida
             if not self._is_valid_response(response):
                 self.logger.warning(f"⚠️ Invalid response for URL: {response.url} - Status: {response.status}")
+                self._log_outcome(response, current_depth, 0, seed)
                 return
 
+            # Recorrer el DOM una sola vez: lo comparten la extracción del lead y los enlaces
+            features = self.extract_page_features(response)
+
+            # La URL final (tras redirecciones) ya no se vuelve a pedir, ni la
+            # canónica declarada si es una variante de esta misma página
+            canonical_url = self._canonical_page_url(response, features)
+            self._mark_seen(canonical_url)
+            declared = self._declared_canonical_url(response, features)
+            if declared and urlparse(declared).path == urlparse(canonical_url).path:
+                self._mark_seen(declared)
+
             # Extraer información de la página actual
-            lead_item = self.extract_lead_info(response, current_depth, source_url)
+            lead_item = self.extract_lead_info(response, current_depth, source_url, features, canonical_url)
+            if lead_item:
+                self.seed_items[seed] += 1
+                lead_item['job_id'] = self._seed_job_id(seed)
+                if len(self.seeds) > 1 and lead_item['job_id']:
+                    self.crawler.stats.inc_value(f"batch/items/{lead_item['job_id']}", spider=self)
+
+            self._log_outcome(response, current_depth, len(lead_item['emails']) if lead_item else 0, seed)
+
+            # Antes de seguir los enlaces: una plantilla que deja de rendir ya no se sigue desde esta página
+            new_emails = self._count_new_emails(lead_item['emails'] if lead_item else [])
+            self._record_template_yield(response, canonical_url, new_emails)
+            domain_completed = self._record_domain_emails(urlparse(canonical_url).netloc, new_emails)
 
             if lead_item:
-                self.logger.info(f"🔄 Yielding lead item for URL: {response.url}")
-                self.logger.info(f"📊 Item data: {dict(lead_item)}")
+                self.logger.info(f"🔄 Yielding lead item for URL: {response.url} ({len(lead_item['emails'])} emails)")
                 yield lead_item
             else:
                 self.logger.warning(f"⚠️ No lead item created for URL: {response.url}")
 
             # Si no hemos alcanzado la profundidad máxima, seguir explorando
-            if current_depth < self.max_depth:
-                yield from self._extract_and_follow_links(response, current_depth)
+            if current_depth < self._seed_depth(seed) and not domain_completed:
+                yield from self._extract_and_follow_links(response, current_depth, features.links,
+                                                          features.link_texts, seed)
 
         except Exception as e:
             self.logger.error(f"❌ Error parsing {response.url}: {str(e)}")
             self._handle_parse_error(response, e)
+            return
+
+        # Todos los dominios del job terminados: el resto de la frontera ya no hace falta
+        if self.allowed_domains and self.completed_domains.issuperset(self.allowed_domains):
+            raise CloseSpider('domain_emails_found')
+
+    def _log_outcome(self, response, depth, email_count, seed=None):
+        """Anota el resultado de una descarga para el modelo de rendimiento de URLs."""
+        if self.crawl_log is None:
+            return
+        url = self.url_canonicalizer.clean(response.url)
+        self.crawl_log.append({
+            'job_id': self._seed_job_id(seed),
+            'url': url[:500],
+            'domain': urlparse(url).netloc,
+            'source_url': (response.meta.get('source_url') or '')[:500] or None,
+            'anchor_text': (response.meta.get('anchor_text') or '')[:255] or None,
+            'depth_level': depth,
+            'http_status': response.status,
+            'email_count': email_count,
+        })
+        if len(self.crawl_log) >= self.crawl_log_batch_size:
+            self._flush_crawl_log()
+
+    def _flush_crawl_log(self):
+        """Guarda los resultados pendientes en el hilo de almacenamiento."""
+        if not self.crawl_log:
+            return None
+        rows, self.crawl_log = self.crawl_log, []
+        d = self.progress_writer.submit(save_crawl_outcomes, rows)
+        d.addErrback(lambda failure: self.logger.error(
+            f"💥 Error saving crawl outcomes to database: {failure.getErrorMessage()}"))
+        return d
+
+    def follows_links(self, request):
+        """True si se seguirán los enlaces de la página (no está en la profundidad máxima de su semilla)."""
+        return request.meta.get('depth', 0) < self._seed_depth(self._seed_key(request))
+
+    def _follow_known_children(self, request):
+        """
+        Enlaces de una página sin cambios: las páginas descargadas desde ella la última vez.
+
+        La página no se parsea, así que sus hijos salen de la base de datos (``ValidatorStore``).
+        """
+        current_depth = request.meta.get('depth', 0)
+        seed = self._seed_key(request)
+        url = request.meta.get('stored_url') or self.url_canonicalizer.canonical(request.url)
+        if self.validators is None or not self.follows_links(request):
+            return []
+        if urlparse(url).netloc in self.completed_domains:
+            return []
+
+        requests = []
+        for child in self.validators.known_children(url):
+            canonical_url = self.url_canonicalizer.canonical(child)
+            if (seed and urlparse(child).netloc != seed) or not self._mark_seen(canonical_url):
+                continue
+            template = url_template(canonical_url)
+            if self.trap_detector is not None and not self.trap_detector.allow(template):
+                self._count_pruned_link(template)
+                continue
+            priority = self.link_scorer.score(child) if self.link_scorer is not None else 0
+            requests.append(scrapy.Request(
+                url=child,
+                callback=self.parse,
+                priority=priority,
+                meta={
+                    'depth': current_depth + 1,
+                    'source_url': request.url,
+                    'seed': seed,
+                    'url_template': template
+                },
+                errback=self._handle_request_error
+            ))
+        self.crawler.stats.inc_value('recrawl/children_followed', len(requests), spider=self)
+        requests.sort(key=lambda request: -request.priority)
+        return requests
+
+    def closed(self, reason):
+        """
+        Anota las páginas sin cambios y cierra los jobs reclamados de la cola (modo
+        batch): 'completed' con sus items si se descargó alguna página de la semilla
+        y 'failed' si no; 'shutdown' devuelve los jobs a la cola.
+        """
+        if self.heartbeat is not None and self.heartbeat.running:
+            self.heartbeat.stop()
+        d = self._flush_crawl_log()
+        if self.validators is not None and self.validators.unchanged:
+            d = self.progress_writer.submit(touch_unchanged_pages, self.validators.unchanged)
+            d.addErrback(lambda failure: self.logger.error(
+                f"💥 Error updating unchanged pages in database: {failure.getErrorMessage()}"))
+        if self.claimed_jobs:
+            from app.scraper.worker import _REQUEUE_REASONS, finish_jobs, record_batch_jobs
+            if reason in _REQUEUE_REASONS:
+                d = self.progress_writer.submit(finish_jobs, self.claimed_jobs, 'pending')
+            else:
+                d = self.progress_writer.submit(record_batch_jobs, self._batch_results())
+            d.addErrback(lambda failure: self.logger.error(
+                f"💥 Error updating batch jobs in database: {failure.getErrorMessage()}"))
+        # OrderedWriter escribe en orden: la última escritura termina después de las demás
+        return d
+
+    def _batch_results(self):
+        """
+        Estado y items de cada job reclamado según lo descargado de su semilla; los pausados
+        y cancelados conservan su estado (un job pausado vuelve a la cola al reanudarlo).
+        """
+        results = {}
+        for key, seed in self.seeds.items():
+            if seed.job_id in self.claimed_jobs and seed.job_id not in self.paused_jobs | self.cancelled_jobs:
+                results[seed.job_id] = {'status': 'completed' if self.seed_pages[key] else 'failed',
+                                        'processed_items': self.seed_items[key]}
+        return results
 
     def _is_valid_response(self, response):
         """Verifica si la respuesta es válida para procesar."""
@@ -136,13 +706,17 @@ class LeadSpider(scrapy.Spider):
 
         return True
 
-    def _extract_and_follow_links(self, response, current_depth):
-        """Extrae y sigue enlaces con manejo de errores."""
+    def _extract_and_follow_links(self, response, current_depth, links=None, link_texts=None, seed=None):
+        """Extrae y sigue enlaces con manejo de errores (solo los del host de la semilla, si la hay)."""
+        allowed = [seed] if seed else self.allowed_domains
         try:
-            # Encontrar enlaces en la página
-            links = response.css('a::attr(href)').getall()
+            # Encontrar enlaces en la página (si no vienen ya de las características)
+            if links is None:
+                links = response.css('a::attr(href)').getall()
 
-            for link in links:
+            total = len(links)
+            requests = []
+            for position, link in enumerate(links):
                 try:
                     # Convertir URLs relativas a absolutas
                     absolute_url = urljoin(response.url, link)
@@ -151,24 +725,70 @@ class LeadSpider(scrapy.Spider):
                     if not self._is_valid_url(absolute_url):
                         continue
 
+                    # Sin fragmento, parámetros de seguimiento ni de sesión; host en minúsculas
+                    fetch_url = self.url_canonicalizer.clean(absolute_url)
+
                     # Verificar que el dominio esté permitido
-                    parsed_link = urlparse(absolute_url)
-                    if parsed_link.netloc in self.allowed_domains:
-                        self.logger.info(f"🔗 Following link: {absolute_url} (depth: {current_depth + 1})")
-                        yield scrapy.Request(
-                            url=absolute_url,
+                    parsed_link = urlparse(fetch_url)
+                    if parsed_link.netloc in allowed:
+                        # Variantes de una página ya pedida en este job (barra final, orden de parámetros...)
+                        canonical_url = self.url_canonicalizer.canonical(fetch_url)
+                        if not self._mark_seen(canonical_url):
+                            self.crawler.stats.inc_value('urls/duplicate_skipped', spider=self)
+                            continue
+
+                        # No volver a descargar páginas ya procesadas (en este job o en otro)
+                        if self.dedupe is not None and not self._recrawl() and self.dedupe.contains('url', canonical_url):
+                            self.crawler.stats.inc_value('dedupe/known_url_skipped', spider=self)
+                            continue
+
+                        # Prioridad según texto, ruta y posición del enlace (primero los de contacto)
+                        anchor_text = link_texts[position] if link_texts and position < len(link_texts) else None
+                        priority = 0
+                        if self.link_scorer is not None:
+                            priority = self.link_scorer.score(fetch_url, anchor_text, position, total)
+
+                        # Rendimiento estimado por el modelo: se poda si es muy bajo (salvo enlaces de
+                        # contacto) y si no se suma a la prioridad
+                        if self.yield_model is not None:
+                            probability = self.yield_model.predict(
+                                url_features(fetch_url, current_depth + 1, anchor_text))
+                            if probability < self.yield_prune_threshold and priority < CONTACT_SCORE_THRESHOLD:
+                                self.crawler.stats.inc_value('url_model/links_pruned', spider=self)
+                                continue
+                            priority += round(self.yield_priority_weight * probability)
+
+                        # Presupuesto de la plantilla (trampas de crawling)
+                        template = url_template(canonical_url)
+                        if self.trap_detector is not None and not self.trap_detector.allow(template):
+                            self._count_pruned_link(template)
+                            continue
+
+                        self.logger.info(f"🔗 Following link: {fetch_url} (depth: {current_depth + 1}, priority: {priority})")
+                        requests.append(scrapy.Request(
+                            url=fetch_url,
                             callback=self.parse,
+                            priority=priority,
                             meta={
                                 'depth': current_depth + 1,
-                                'source_url': response.url
+                                'source_url': response.url,
+                                'anchor_text': anchor_text,
+                                'seed': seed,
+                                'url_template': template
                             },
                             errback=self._handle_request_error
-                        )
+                        ))
 
                 except Exception as e:
                     self.logger.warning(f"⚠️ Error processing link '{link}': {str(e)}")
                     continue
 
+            # El motor empieza a sacar peticiones del scheduler mientras se procesan las de la
+            # página: se entregan de mayor a menor prioridad para que la de contacto salga primero
+            if self.link_scorer is not None:
+                requests.sort(key=lambda request: -request.priority)
+            yield from requests
+
         except Exception as e:
             self.logger.error(f"❌ Error extracting links from {response.url}: {str(e)}")
 
@@ -193,23 +813,11 @@ class LeadSpider(scrapy.Spider):
             if len(parsed.query) > 500:
                 return False
 
-            # Lista negra de patrones comunes de spam
-            blacklist_patterns = [
-                r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|zip|rar|exe|dmg|deb|rpm)$',
-                r'mailto:',
-                r'javascript:',
-                r'tel:',
-                r'#',
-                r'\bwp-admin\b',
-                r'\bwp-login\b',
-                r'\badmin\b',
-                r'\blogin\b'
-            ]
-
-            url_lower = url.lower()
-            for pattern in blacklist_patterns:
-                if re.search(pattern, url_lower):
-                    return False
+            # Lista negra de patrones (BLOCKED_URL_PATTERNS) sobre lo que sigue al host:
+            # un dominio como test-bot.com no descarta sus páginas
+            target = url[url.index(parsed.netloc) + len(parsed.netloc):]
+            if self.blocked_url_rules is not None and self.blocked_url_rules.search(target.lower()):
+                return False
 
             return True
 
@@ -218,6 +826,12 @@ class LeadSpider(scrapy.Spider):
 
     def _handle_request_error(self, failure):
         """Maneja errores de requests."""
+        if failure.check(PageNotModified):
+            self.seed_pages[self._seed_key(failure.request)] += 1
+            return self._follow_known_children(failure.request)
+        if failure.check(JobRequestHeld):
+            return None
+
         self.logger.error(f"❌ Request failed: {failure.request.url} - {failure.getErrorMessage()}")
 
         # Aquí se podría implementar lógica adicional como:
@@ -233,8 +847,43 @@ class LeadSpider(scrapy.Spider):
         self.logger.debug(f"Response status: {response.status}")
         self.logger.debug(f"Response length: {len(response.body) if hasattr(response, 'body') else 'N/A'}")
 
-    def extract_lead_info(self, response, depth, source_url):
+    def extract_page_features(self, response):
+        """Características de la página en una sola pasada por el DOM (ver ``page_features``)."""
+        return extract_page_features(
+            response,
+            vocabulary=self.keyword_vocabulary,
+            sample_size=self.language_sample_size,
+            num_perm=self.signature_size,
+            # Las páginas con muy poco texto no se comparan (no hay contenido que duplicar)
+            min_shingles=20
+        )
+
+    def _canonical_page_url(self, response, features=None):
+        """URL canónica de la página: la clave de la URL de la respuesta."""
+        return self.url_canonicalizer.canonical(response.url)
+
+    def _declared_canonical_url(self, response, features):
+        """
+        URL de ``<link rel="canonical">`` si apunta a una URL http(s) del mismo
+        host, o None. No sustituye a la URL de la página: muchos sitios
+        declaran la portada como canónica de todas sus páginas.
+        """
+        if not features.canonical:
+            return None
+        declared = self.url_canonicalizer.canonical(urljoin(response.url, features.canonical))
+        parsed = urlparse(declared)
+        if parsed.scheme in ('http', 'https') and parsed.netloc == urlparse(
+                self.url_canonicalizer.clean(response.url)).netloc:
+            return declared
+        return None
+
+    def extract_lead_info(self, response, depth, source_url, features=None, canonical_url=None):
         """Extrae información de lead de una página."""
+        if features is None:
+            features = self.extract_page_features(response)
+        if canonical_url is None:
+            canonical_url = self._canonical_page_url(response, features)
+
         # Extraer emails usando múltiples patrones avanzados
         emails = self.extract_emails_advanced(response.text)
         
@@ -247,34 +896,17 @@ class LeadSpider(scrapy.Spider):
         parsed_url = urlparse(response.url)
         domain = parsed_url.netloc
         
-        # Detectar idioma (básico - se puede mejorar)
-        language = self.detect_language(response.text)
-        
-        # Extraer título
-        title = response.css('title::text').get()
-        if title:
-            title = title.strip()
-        
-        # Extraer descripción
-        description = response.css('meta[name="description"]::attr(content)').get()
-        if not description:
-            description = response.css('meta[property="og:description"]::attr(content)').get()
-        
-        # Extraer palabras clave
-        keywords = response.css('meta[name="keywords"]::attr(content)').get()
+        # Detectar idioma sobre una muestra del texto visible (LANGUAGE_SAMPLE_SIZE)
+        language = self.detect_language(features.text_sample)
         
-        # Detectar tipo de contenido
-        content_type = self._detect_content_type(response, title, description)
-        
-        # Calcular puntuación de contacto
-        contact_score = self._calculate_contact_score(response, emails)
-        
-        # Buscar palabras clave de negocio
-        has_business_keywords = self._find_business_keywords(response, title, description)
+        title = features.title
+        description = features.description
         
         # Crear lead item con todos los campos necesarios
         lead_item = LeadItem()
-        lead_item['url'] = response.url
+        # Website.url es la URL canónica: las variantes de la página son un solo registro
+        lead_item['url'] = canonical_url
+        lead_item['canonical_url'] = self._declared_canonical_url(response, features)
         lead_item['domain'] = domain
         lead_item['language'] = language
         lead_item['status'] = 'processed'
@@ -283,18 +915,18 @@ class LeadSpider(scrapy.Spider):
         lead_item['emails'] = emails
         lead_item['title'] = title
         lead_item['description'] = description
-        lead_item['keywords'] = keywords
-        lead_item['content_type'] = content_type
-        lead_item['contact_score'] = contact_score
-        lead_item['has_business_keywords'] = has_business_keywords
-        lead_item['page_quality_score'] = self._calculate_page_quality_score(response, title, description, emails)
+        lead_item['keywords'] = features.keywords
+        lead_item['content_type'] = detect_content_type(features)
+        lead_item['contact_score'] = contact_score(features, emails)
+        lead_item['has_business_keywords'] = features.find_keywords(self.business_keywords)
+        lead_item['page_quality_score'] = page_quality_score(features, emails, len(response.text))
         lead_item['email_quality_score'] = self._calculate_email_quality_score(emails)
         lead_item['is_spam'] = 0  # Valor por defecto
         lead_item['language_confidence'] = 0.8  # Valor por defecto
         lead_item['load_time'] = response.meta.get('download_latency', 0) * 1000  # Convertir a ms
-        lead_item['word_count'] = len(response.text.split())
-        lead_item['link_count'] = len(response.css('a::attr(href)').getall())
-        lead_item['image_count'] = len(response.css('img::attr(src)').getall())
+        lead_item['word_count'] = features.word_count
+        lead_item['link_count'] = features.link_count
+        lead_item['image_count'] = features.image_count
         lead_item['response_time'] = response.meta.get('download_latency', 0) * 1000  # Convertir a ms
         lead_item['page_size'] = len(response.body)
         lead_item['http_status'] = response.status
@@ -309,121 +941,17 @@ class LeadSpider(scrapy.Spider):
         lead_item['scraped_at'] = None  # Se establecerá en la base de datos
         lead_item['email_context'] = {}  # Se puede mejorar para incluir contexto
         lead_item['email_anchors'] = {}  # Se puede mejorar para incluir texto de anclas
+        lead_item['content_signature'] = features.content_signature
+        lead_item['page_features'] = features
+        validators = response_validators(response)
+        lead_item['fetch_url'] = response.url
+        lead_item['etag'] = validators.etag
+        lead_item['last_modified'] = validators.last_modified
+        lead_item['content_hash'] = validators.content_hash
+        lead_item['recrawled'] = response.meta.get('stored_validators') is not None
         
         return lead_item
     
-    def _detect_content_type(self, response, title, description):
-        """Detecta el tipo de contenido de la página."""
-        url = response.url.lower()
-        title_text = (title or '').lower()
-        desc_text = (description or '').lower()
-        
-        # Patrones para diferentes tipos de contenido
-        content_patterns = {
-            'business': [
-                r'empresa', r'compañía', r'negocio', r'servicio', r'producto',
-                r'contacto', r'acerca', r'nosotros', r'about', r'company'
-            ],
-            'blog': [
-                r'blog', r'noticia', r'artículo', r'post', r'news', r'article'
-            ],
-            'landing': [
-                r'landing', r'inicio', r'home', r'principal', r'main'
-            ],
-            'contact': [
-                r'contacto', r'contact', r'teléfono', r'phone', r'dirección'
-            ],
-            'portfolio': [
-                r'portafolio', r'portfolio', r'proyecto', r'project', r'trabajo'
-            ]
-        }
-        
-        text_content = ' '.join([url, title_text, desc_text])
-        
-        for content_type, patterns in content_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text_content):
-                    return content_type
-        
-        return 'unknown'
-    
-    def _calculate_contact_score(self, response, emails):
-        """Calcula una puntuación de información de contacto."""
-        score = 0
-        
-        # Emails encontrados
-        score += len(emails) * 10
-        
-        # Palabras clave de contacto
-        contact_keywords = ['contacto', 'contact', 'teléfono', 'phone', 'dirección', 'address']
-        text_content = ' '.join([
-            response.css('title::text').get() or '',
-            response.css('meta[name="description"]::attr(content)').get() or '',
-            response.url
-        ]).lower()
-        
-        for keyword in contact_keywords:
-            if keyword in text_content:
-                score += 5
-        
-        return min(score, 100)  # Máximo 100
-    
-    def _find_business_keywords(self, response, title, description):
-        """Busca palabras clave de negocio."""
-        business_keywords = [
-            'empresa', 'compañía', 'servicio', 'producto', 'contacto', 'teléfono',
-            'dirección', 'email', 'sitio web', 'negocio', 'cliente', 'venta'
-        ]
-        
-        text_content = ' '.join([
-            title or '',
-            description or '',
-            response.url
-        ]).lower()
-        
-        found_keywords = []
-        for keyword in business_keywords:
-            if keyword.lower() in text_content:
-                found_keywords.append(keyword)
-        
-        return found_keywords
-    
-    def _calculate_page_quality_score(self, response, title, description, emails):
-        """Calcula una puntuación de calidad para la página."""
-        score = 0
-        
-        # Puntuación por título
-        if title and len(title) > 10:
-            score += 20
-        
-        # Puntuación por descripción
-        if description and len(description) > 50:
-            score += 15
-        
-        # Puntuación por palabras clave
-        keywords = response.css('meta[name="keywords"]::attr(content)').get()
-        if keywords:
-            score += 10
-        
-        # Puntuación por longitud de contenido
-        content_length = len(response.text)
-        if content_length > 1000:
-            content_score = min(content_length / 10000, 1.0)  # Máximo 1.0
-            score += 20 * content_score
-        
-        # Puntuación por emails
-        if emails:
-            email_score = min(len(emails) / 5, 1.0)  # Máximo 1.0 para 5+ emails
-            score += 15 * email_score
-        
-        # Puntuación por información de contacto
-        has_contact_info = any(keyword in (title or '').lower() for keyword in
-                              ['contact', 'about', 'team', 'staff', 'nosotros'])
-        if has_contact_info:
-            score += 20
-        
-        return int(score)
-    
     def _calculate_email_quality_score(self, emails):
         """Calcula una puntuación de calidad promedio para los emails."""
         if not emails:
@@ -462,114 +990,8 @@ class LeadSpider(scrapy.Spider):
         return total_score / len(emails) if emails else 0.0
 
     def extract_emails_advanced(self, text):
-        """Extrae emails usando múltiples patrones avanzados y robustos."""
-        # Asegurarse de que el texto sea una cadena
-        if not text:
-            return []
-        
-        # Convertir a string si no lo es
-        text = str(text)
-        
-        emails = set()  # Usar set para evitar duplicados
-
-        # Patrón básico mejorado con caracteres especiales adicionales
-        basic_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails.update(re.findall(basic_pattern, text, re.IGNORECASE))
-
-        # Patrón para emails con subdominios múltiples
-        subdomain_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails.update(re.findall(subdomain_pattern, text, re.IGNORECASE))
-
-        # Patrón para emails con TLDs largos (.museum, .international, etc.)
-        long_tld_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{3,}\b'
-        emails.update(re.findall(long_tld_pattern, text, re.IGNORECASE))
-
-        # Patrón para emails en texto con formato especial
-        special_patterns = [
-            r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # mailto: links
-            r'email:\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # email: prefix
-            r'correo:\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # correo: prefix (español)
-            r'e-mail:\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # e-mail: prefix
-            r'contact:\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # contact: prefix
-            r'contacto:\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # contacto: prefix (español)
-            r'info@\w+\.\w+',  # info@ pattern
-            r'contact@\w+\.\w+',  # contact@ pattern
-            r'support@\w+\.\w+',  # support@ pattern
-            r'sales@\w+\.\w+',  # sales@ pattern
-            r'admin@\w+\.\w+',  # admin@ pattern
-            r'hello@\w+\.\w+',  # hello@ pattern
-            r'hi@\w+\.\w+',  # hi@ pattern
-            r'team@\w+\.\w+',  # team@ pattern
-            r'help@\w+\.\w+',  # help@ pattern
-            r'service@\w+\.\w+',  # service@ pattern
-            r'business@\w+\.\w+',  # business@ pattern
-            r'inquiry@\w+\.\w+',  # inquiry@ pattern
-            r'feedback@\w+\.\w+',  # feedback@ pattern
-        ]
-
-        for pattern in special_patterns:
-            emails.update(re.findall(pattern, text, re.IGNORECASE))
-
-        # Patrón para emails ofuscados (comunes en web scraping)
-        obfuscated_patterns = [
-            r'([A-Za-z0-9._%+-]+)\s*@\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # email con espacios
-            r'([A-Za-z0-9._%+-]+)\s*\[at\]\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # [at] format
-            r'([A-Za-z0-9._%+-]+)\s*\(at\)\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # (at) format
-            r'([A-Za-z0-9._%+-]+)\s*@\s*s\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # @ s @ format
-            r'([A-Za-z0-9._%+-]+)\s*@\s*NOSPAM\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # @ NOSPAM @ format
-            r'([A-Za-z0-9._%+-]+)\s*@\s*no\s*spam\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # @ no spam @ format
-            r'([A-Za-z0-9._%+-]+)\s*@\s*remove\s*me\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',  # @ remove me @ format
-        ]
-
-        for pattern in obfuscated_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for user, domain in matches:
-                emails.add(f"{user}@{domain}")
-
-        # Patrón para emails en JavaScript
-        js_patterns = [
-            r'["\']([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})["\']',  # emails en strings JS
-            r'\\u0040',  # @ codificado en unicode
-            r'\\x40',  # @ codificado en hex
-        ]
-
-        for pattern in js_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if '@' in match:
-                    emails.add(match)
-                elif match in ['\\u0040', '\\x40']:
-                    # Manejar casos donde el @ está codificado
-                    # Esto requeriría lógica adicional para reconstruir el email completo
-                    pass
-
-        # Patrón para emails en formularios HTML
-        html_form_patterns = [
-            r'value\s*=\s*["\']([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})["\']',  # value en inputs
-            r'placeholder\s*=\s*["\']([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})["\']',  # placeholder
-        ]
-
-        for pattern in html_form_patterns:
-            emails.update(re.findall(pattern, text, re.IGNORECASE))
-
-        # Patrón para emails en metadatos y comentarios
-        metadata_patterns = [
-            r'<!--.*?([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}).*?-->',  # emails en comentarios HTML
-            r'<meta.*?content\s*=\s*["\']([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})["\']',  # emails en meta tags
-        ]
-
-        for pattern in metadata_patterns:
-            emails.update(re.findall(pattern, text, re.IGNORECASE | re.DOTALL))
-
-        # Filtrar emails válidos y limpiar
-        valid_emails = []
-        for email in emails:
-            email = email.strip().lower()
-            # Validación básica adicional
-            if self.is_valid_email_format(email):
-                valid_emails.append(email)
-
-        return list(valid_emails)
+        """Extrae emails (planos, ofuscados, en JS, formularios y meta) en una sola pasada."""
+        return extract_emails(text)
 
     def is_valid_email_format(self, email):
         """Valida el formato básico de un email."""
@@ -0,0 +1,243 @@
+"""
+Ejecutor de E/S de base de datos del scraper fuera del hilo del reactor.
+
+Las consultas y commits de SQLAlchemy son bloqueantes: ejecutados dentro de un
+callback de Twisted detienen todas las descargas del proceso mientras duran.
+``StorageExecutor`` los lleva a un pool de hilos propio y acotado
+(``STORAGE_THREADS``) y devuelve un ``Deferred`` con el resultado:
+
+- Como mucho ``STORAGE_MAX_PENDING`` tareas están en el pool; el resto espera
+  en una cola. Los pipelines devuelven el ``Deferred`` de su escritura, así
+  que mientras la cola está llena los items (y sus respuestas) siguen activos
+  en el scraper de Scrapy, que deja de pedir descargas al engine
+  (``SCRAPER_SLOT_MAX_ACTIVE_SIZE``): la presión se transmite al crawl en vez
+  de acumular memoria.
+- ``OrderedWriter`` serializa las escrituras de un componente para que se
+  apliquen en el orden en que se enviaron aunque el pool tenga varios hilos.
+- ``metrics()`` expone la profundidad de la cola y la latencia de escritura.
+
+Sin reactor en marcha (tests, scripts, arranque de ``scrapy crawl``) las
+tareas se ejecutan de forma síncrona.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class StorageExecutor:
+    """Pool de hilos acotado para la E/S de base de datos del scraper."""
+
+    def __init__(self, max_threads: int = 2, max_pending: int = 200,
+                 latency_window: int = 1000, clock=time.monotonic):
+        """
+        Inicializa el ejecutor.
+
+        Args:
+            max_threads: Hilos del pool (STORAGE_THREADS)
+            max_pending: Tareas simultáneas en el pool antes de encolar (STORAGE_MAX_PENDING)
+            latency_window: Número de muestras recientes para los percentiles
+            clock: Función de reloj (inyectable para tests)
+        """
+        self.max_threads = max(1, max_threads)
+        self.max_pending = max(1, max_pending)
+        self.clock = clock
+        self.in_flight = 0
+        self.waiting = deque()
+        self.write_latencies = deque(maxlen=latency_window)
+        self.queue_waits = deque(maxlen=latency_window)
+        self.counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'backpressure_waits': 0,
+            'max_queue_depth': 0,
+        }
+        self._drain_waiters = []
+        self._pool = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Tareas en el pool más tareas esperando hueco."""
+        return self.in_flight + len(self.waiting)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Ejecuta ``fn(*args, **kwargs)`` en el pool de almacenamiento.
+
+        Puede llamarse desde cualquier hilo.
+
+        Returns:
+            Deferred con el resultado de ``fn`` (se dispara en el hilo del reactor)
+        """
+        return self.call_in_reactor(self._submit, fn, args, kwargs)
+
+    def call_in_reactor(self, fn, *args, **kwargs):
+        """Llama a ``fn`` en el hilo del reactor y devuelve su resultado como Deferred."""
+        from twisted.internet import defer
+
+        if not self._use_threads():
+            return defer.maybeDeferred(fn, *args, **kwargs)
+
+        from twisted.python import threadable
+        if threadable.isInIOThread():
+            return defer.maybeDeferred(fn, *args, **kwargs)
+
+        from twisted.internet import reactor
+
+        result = defer.Deferred()
+        reactor.callFromThread(lambda: defer.maybeDeferred(fn, *args, **kwargs).chainDeferred(result))
+        return result
+
+    def drain(self):
+        """Deferred que se dispara cuando no quedan tareas pendientes."""
+        from twisted.internet import defer
+
+        if not self.queue_depth:
+            return defer.succeed(None)
+        d = defer.Deferred()
+        self._drain_waiters.append(d)
+        return d
+
+    def metrics(self) -> Dict[str, float]:
+        """Profundidad de la cola, contadores y latencias (ms) de las tareas recientes."""
+        write_latencies = list(self.write_latencies)
+        queue_waits = list(self.queue_waits)
+        metrics = dict(self.counters)
+        metrics.update({
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'waiting': len(self.waiting),
+            'write_latency_avg_ms': round(sum(write_latencies) / len(write_latencies) * 1000, 2) if write_latencies else 0.0,
+            'write_latency_p95_ms': round(_percentile(write_latencies, 0.95) * 1000, 2),
+            'write_latency_max_ms': round(max(write_latencies) * 1000, 2) if write_latencies else 0.0,
+            'queue_wait_avg_ms': round(sum(queue_waits) / len(queue_waits) * 1000, 2) if queue_waits else 0.0,
+            'queue_wait_p95_ms': round(_percentile(queue_waits, 0.95) * 1000, 2),
+        })
+        return metrics
+
+    def _submit(self, fn, args, kwargs):
+        from twisted.internet import defer
+
+        self.counters['submitted'] += 1
+        submitted_at = self.clock()
+        if not self._use_threads():
+            return defer.maybeDeferred(self._run, fn, args, kwargs, submitted_at).addBoth(self._count)
+
+        d = defer.Deferred()
+        if self.in_flight >= self.max_pending:
+            self.counters['backpressure_waits'] += 1
+            self.waiting.append((d, fn, args, kwargs, submitted_at))
+        else:
+            self._dispatch(d, fn, args, kwargs, submitted_at)
+        self.counters['max_queue_depth'] = max(self.counters['max_queue_depth'], self.queue_depth)
+        return d
+
+    def _dispatch(self, d, fn, args, kwargs, submitted_at):
+        self.in_flight += 1
+        task = self._defer_to_pool(self._run, fn, args, kwargs, submitted_at)
+        task.addBoth(self._task_done)
+        task.chainDeferred(d)
+
+    def _task_done(self, result):
+        self.in_flight -= 1
+        self._count(result)
+        while self.waiting and self.in_flight < self.max_pending:
+            self._dispatch(*self.waiting.popleft())
+        if not self.queue_depth:
+            waiters, self._drain_waiters = self._drain_waiters, []
+            for waiter in waiters:
+                waiter.callback(None)
+        return result
+
+    def _count(self, result):
+        from twisted.python.failure import Failure
+
+        if isinstance(result, Failure):
+            self.counters['failed'] += 1
+        else:
+            self.counters['completed'] += 1
+        return result
+
+    def _run(self, fn, args, kwargs, submitted_at):
+        """Se ejecuta en el hilo del pool."""
+        started = self.clock()
+        self.queue_waits.append(started - submitted_at)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.write_latencies.append(self.clock() - started)
+
+    def _use_threads(self) -> bool:
+        from twisted.internet import reactor
+        return reactor.running
+
+    def _defer_to_pool(self, fn, *args):
+        from twisted.internet import reactor
+        from twisted.internet.threads import deferToThreadPool
+
+        if self._pool is None:
+            from twisted.python.threadpool import ThreadPool
+
+            self._pool = ThreadPool(0, self.max_threads, name='scraper-storage')
+            self._pool.start()
+            # Terminar las escrituras pendientes antes de parar el pool
+            reactor.addSystemEventTrigger('before', 'shutdown', self.drain)
+            reactor.addSystemEventTrigger('during', 'shutdown', self._pool.stop)
+        return deferToThreadPool(reactor, self._pool, fn, *args)
+
+
+class OrderedWriter:
+    """Envía las escrituras de un componente al ejecutor de una en una y en orden."""
+
+    def __init__(self, executor: Optional[StorageExecutor] = None):
+        from twisted.internet import defer
+
+        self.executor = executor or get_storage_executor()
+        self._lock = defer.DeferredLock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Encola ``fn`` detrás de las escrituras anteriores de este componente (desde cualquier hilo)."""
+        return self.executor.call_in_reactor(self._lock.run, self.executor.submit, fn, *args, **kwargs)
+
+    def drain(self):
+        """Deferred que se dispara cuando han terminado las escrituras enviadas hasta ahora."""
+        return self.executor.call_in_reactor(self._lock.run, lambda: None)
+
+
+def get_storage_executor(settings=None) -> StorageExecutor:
+    """
+    Devuelve el ejecutor de almacenamiento del proceso (se crea en la primera llamada).
+
+    Args:
+        settings: Settings de Scrapy con STORAGE_THREADS y STORAGE_MAX_PENDING (opcional)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if settings is None:
+                from scrapy.settings import Settings
+                settings = Settings()
+                settings.setmodule('app.scraper.settings', priority='project')
+            _executor = StorageExecutor(
+                max_threads=settings.getint('STORAGE_THREADS', 2),
+                max_pending=settings.getint('STORAGE_MAX_PENDING', 200)
+            )
+        return _executor
+
+
+__all__ = ['StorageExecutor', 'OrderedWriter', 'get_storage_executor']
@@ -0,0 +1,239 @@
+"""
+Telemetría del crawl en memoria: contadores e histogramas por dominio.
+
+``MonitoringMiddleware`` registra cada request, respuesta y excepción en un
+``TelemetryRegistry`` en lugar de formatear un mensaje de log con su dict de
+metadatos por evento. El registro es O(1) y no reserva memoria por evento:
+
+- ``Histogram`` usa cubetas fijas log-lineales (al estilo HDR): valores
+  enteros agrupados por potencia de dos y 16 subcubetas por potencia, lo que
+  da un error relativo menor del 7% en los percentiles. Los contadores viven
+  en un ``array`` preasignado; registrar es calcular un índice y sumar uno.
+- ``DomainTelemetry`` agrupa por dominio la latencia de descarga (ms), el
+  tamaño del cuerpo (bytes), los códigos de estado (un array indexado por el
+  código) y los contadores de requests, respuestas y errores.
+
+Todo el registro se hace desde el hilo del reactor (los middlewares de
+descarga se ejecutan en él), así que no hay locks. ``snapshot()`` también se
+llama desde el reactor y devuelve un dict serializable que el middleware guarda
+periódicamente en ``ScrapingStats.domain_stats`` (``TELEMETRY_SNAPSHOT_INTERVAL``)
+y que la API lee en ``/api/v1/advanced-stats/telemetry``.
+"""
+
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, compress
+from operator import add
+from typing import Dict, List, Optional
+
+# 2**4 subcubetas por potencia de dos
+_SUB_BITS = 4
+_SUB_COUNT = 1 << _SUB_BITS
+# Los valores menores que esto tienen una cubeta cada uno
+_LINEAR_LIMIT = _SUB_COUNT << 1
+
+# Códigos de estado HTTP válidos (los demás se cuentan en el 0)
+_MAX_STATUS = 600
+
+PERCENTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99))
+
+
+def _bucket_index(value: int) -> int:
+    if value < _LINEAR_LIMIT:
+        return value
+    shift = value.bit_length() - _SUB_BITS - 1
+    return shift * _SUB_COUNT + (value >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """Mayor valor que cae en la cubeta ``index``."""
+    if index < _LINEAR_LIMIT:
+        return index
+    shift = index // _SUB_COUNT - 1
+    mantissa = index - shift * _SUB_COUNT
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Histograma de enteros no negativos con cubetas log-lineales fijas."""
+
+    __slots__ = ('max_value', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, max_value: int = 1 << 31):
+        """
+        Preasigna las cubetas.
+
+        Args:
+            max_value: Valor máximo representable (los mayores se registran como este)
+        """
+        self.max_value = max(_LINEAR_LIMIT, int(max_value))
+        self.counts = array('Q', bytes(8 * (_bucket_index(self.max_value) + 1)))
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value) -> None:
+        """Registra un valor (se trunca a entero y se acota a [0, max_value])."""
+        value = int(value)
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.counts[_bucket_index(value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        """Suma los valores de otro histograma con el mismo ``max_value``."""
+        if not other.count:
+            return
+        # Suma cubeta a cubeta con el bucle en C
+        self.counts = array('Q', map(add, self.counts, other.counts))
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    @classmethod
+    def combined(cls, histograms, max_value: int = 1 << 31) -> 'Histogram':
+        """Histograma con la suma de varios (mismo ``max_value``), sumando cada cubeta en C."""
+        result = cls(max_value)
+        histograms = [histogram for histogram in histograms if histogram.count]
+        if histograms:
+            result.counts = array('Q', map(sum, zip(*(histogram.counts for histogram in histograms))))
+            result.count = sum(histogram.count for histogram in histograms)
+            result.total = sum(histogram.total for histogram in histograms)
+            result.min = min(histogram.min for histogram in histograms)
+            result.max = max(histogram.max for histogram in histograms)
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, fractions) -> List[int]:
+        """
+        Valores por debajo de los cuales queda cada fracción de las muestras,
+        con una sola suma acumulada de las cubetas. Cada valor es el límite
+        superior de su cubeta.
+        """
+        if not self.count:
+            return [0] * len(fractions)
+        cumulative = list(accumulate(self.counts))
+        return [
+            min(_bucket_upper(bisect_left(cumulative, max(1, int(round(fraction * self.count))))), self.max)
+            for fraction in fractions
+        ]
+
+    def percentile(self, fraction: float) -> int:
+        """Valor por debajo del cual queda ``fraction`` de las muestras (límite superior de su cubeta)."""
+        return self.percentiles((fraction,))[0]
+
+    def summary(self) -> Dict[str, float]:
+        """Resumen serializable: count, mean, min, percentiles y max."""
+        result = {'count': self.count, 'mean': round(self.mean, 2), 'min': self.min}
+        values = self.percentiles([fraction for _, fraction in PERCENTILES])
+        for (name, _), value in zip(PERCENTILES, values):
+            result[name] = value
+        result['max'] = self.max
+        return result
+
+
+class DomainTelemetry:
+    """Contadores e histogramas de un dominio."""
+
+    __slots__ = ('requests', 'responses', 'errors', 'latency', 'size', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0
+        # Latencia de descarga en ms (hasta ~17 minutos) y tamaño del cuerpo en bytes
+        self.latency = Histogram(1 << 20)
+        self.size = Histogram(1 << 31)
+        self.statuses = array('Q', bytes(8 * _MAX_STATUS))
+
+    @classmethod
+    def combined(cls, items) -> 'DomainTelemetry':
+        """Agregado de varios dominios."""
+        items = list(items)
+        total = cls()
+        if items:
+            total.requests = sum(item.requests for item in items)
+            total.responses = sum(item.responses for item in items)
+            total.errors = sum(item.errors for item in items)
+            total.latency = Histogram.combined((item.latency for item in items), 1 << 20)
+            total.size = Histogram.combined((item.size for item in items), 1 << 31)
+            total.statuses = array('Q', map(sum, zip(*(item.statuses for item in items))))
+        return total
+
+    def summary(self) -> Dict[str, object]:
+        """Resumen serializable del dominio."""
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'errors': self.errors,
+            'status': {str(code): self.statuses[code] for code in compress(range(_MAX_STATUS), self.statuses)},
+            'latency_ms': self.latency.summary(),
+            'size_bytes': self.size.summary(),
+        }
+
+
+class TelemetryRegistry:
+    """Registro de telemetría del crawl por dominio (solo desde el hilo del reactor)."""
+
+    def __init__(self):
+        self.domains: Dict[str, DomainTelemetry] = {}
+
+    def _domain(self, domain: str) -> DomainTelemetry:
+        telemetry = self.domains.get(domain)
+        if telemetry is None:
+            # Única reserva de memoria: la primera vez que se ve el dominio
+            telemetry = self.domains[domain] = DomainTelemetry()
+        return telemetry
+
+    def record_request(self, domain: str) -> None:
+        """Cuenta un request enviado al downloader."""
+        self._domain(domain).requests += 1
+
+    def record_response(self, domain: str, status: int, latency_ms: float, size: int) -> None:
+        """Registra una respuesta: código de estado, latencia de descarga (ms) y tamaño del cuerpo."""
+        telemetry = self._domain(domain)
+        telemetry.responses += 1
+        telemetry.statuses[status if 0 < status < _MAX_STATUS else 0] += 1
+        telemetry.latency.record(latency_ms)
+        telemetry.size.record(size)
+
+    def record_exception(self, domain: str) -> None:
+        """Cuenta una descarga fallida (timeout, DNS, conexión...)."""
+        self._domain(domain).errors += 1
+
+    def totals(self) -> DomainTelemetry:
+        """Agregado de todos los dominios."""
+        return DomainTelemetry.combined(self.domains.values())
+
+    def snapshot(self, domain: Optional[str] = None) -> Dict[str, object]:
+        """
+        Estado actual serializable.
+
+        Args:
+            domain: Limitar ``domains`` a este dominio (los totales son siempre de todo el crawl)
+
+        Returns:
+            Dict con ``domains`` (resumen por dominio) y ``totals``
+        """
+        domains = self.domains if domain is None else {
+            name: telemetry for name, telemetry in self.domains.items() if name == domain
+        }
+        return {
+            'domains': {name: telemetry.summary() for name, telemetry in domains.items()},
+            'totals': self.totals().summary(),
+        }
+
+
+__all__ = ['Histogram', 'DomainTelemetry', 'TelemetryRegistry']
@@ -0,0 +1,138 @@
+"""
+Detección de trampas de crawling por plantilla de URL.
+
+Calendarios, filtros facetados, archivos paginados y queries que crecen sin
+fin generan URLs distintas sin límite, y la profundidad (``DEPTH_LIMIT``) es
+lo único que las frena. ``url_template`` agrupa las URLs por plantilla: los
+segmentos numéricos, fechas e identificadores largos de la ruta se sustituyen
+por marcadores, los segmentos repetidos seguidos se colapsan y de la query
+solo quedan los nombres de los parámetros::
+
+    https://tienda.com/agenda/2024-05-12/?vista=mes&dia=3
+    -> tienda.com/agenda/{date}?dia={v}&vista={v}
+
+``TrapDetector`` da a cada plantilla un presupuesto de descargas que no
+aportan emails nuevos (``TRAP_TEMPLATE_BUDGET``; las páginas con emails nuevos
+devuelven su descarga) y deja de seguirla si encadena demasiadas páginas sin
+emails nuevos (``TRAP_TEMPLATE_PATIENCE``). Una plantilla podada no se vuelve
+a seguir en el job.
+"""
+
+import re
+from typing import Dict
+from urllib.parse import parse_qsl, urlsplit
+
+# Fechas en un segmento: 2024-05-12, 2024_05, 20240512...
+_DATE_RE = re.compile(r'(?:19|20)\d{2}(?:[-_./]?\d{1,2}){1,2}')
+# Identificadores largos: UUID, hashes hexadecimales, tokens
+_ID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,}'
+                    r'|(?=[a-z_-]*\d)[a-z0-9_-]{24,}', re.IGNORECASE)
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _segment_template(segment: str) -> str:
+    if not segment:
+        return segment
+    if _ID_RE.fullmatch(segment):
+        return '{id}'
+    segment = _DATE_RE.sub('{date}', segment)
+    return _DIGITS_RE.sub('{n}', segment)
+
+
+def url_template(url: str) -> str:
+    """
+    Plantilla de una URL: host y ruta con marcadores, y nombres de parámetros ordenados.
+
+    Args:
+        url: URL absoluta (mejor ya canonicalizada, ver ``urls.UrlCanonicalizer``)
+    """
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        segment = _segment_template(segment.lower())
+        # /a/b/b/b/... (enlaces relativos que se repiten) cuenta como una sola plantilla
+        if segments and segments[-1] == segment:
+            continue
+        segments.append(segment)
+    template = parts.netloc.lower() + ('/'.join(segments).rstrip('/') or '/')
+    if parts.query:
+        names = sorted({name.lower() for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+        if names:
+            template += '?' + '&'.join(f'{name}={{v}}' for name in names)
+    return template
+
+
+class _TemplateState:
+    """Contadores de una plantilla."""
+
+    __slots__ = ('fetched', 'productive', 'fruitless_streak')
+
+    def __init__(self):
+        self.fetched = 0
+        self.productive = 0
+        self.fruitless_streak = 0
+
+
+class TrapDetector:
+    """Presupuesto de descargas por plantilla de URL dentro de un job."""
+
+    def __init__(self, budget: int = 30, patience: int = 10):
+        """
+        Inicializa el detector.
+
+        Args:
+            budget: Descargas sin emails nuevos por plantilla; 0 = sin límite (TRAP_TEMPLATE_BUDGET)
+            patience: Páginas seguidas sin emails nuevos antes de podar; 0 = sin límite (TRAP_TEMPLATE_PATIENCE)
+        """
+        self.budget = max(0, budget)
+        self.patience = max(0, patience)
+        self.templates: Dict[str, _TemplateState] = {}
+        # Plantillas podadas y enlaces descartados de cada una
+        self.pruned: Dict[str, int] = {}
+
+    def allow(self, template: str) -> bool:
+        """
+        Indica si se puede descargar otra URL de la plantilla y, si es así, la cuenta.
+
+        Returns:
+            False si la plantilla está podada o ha agotado su presupuesto
+        """
+        if template in self.pruned:
+            self.pruned[template] += 1
+            return False
+        state = self.templates.get(template)
+        if state is None:
+            state = self.templates[template] = _TemplateState()
+        if self.budget and state.fetched - state.productive >= self.budget:
+            self.pruned[template] = 1
+            return False
+        state.fetched += 1
+        return True
+
+    def record(self, template: str, new_emails: int) -> bool:
+        """
+        Registra el resultado de una página de la plantilla.
+
+        Args:
+            template: Plantilla de la URL descargada
+            new_emails: Emails de la página que no se habían visto en el job
+
+        Returns:
+            True si la plantilla queda podada con este resultado
+        """
+        state = self.templates.get(template)
+        if state is None:
+            state = self.templates[template] = _TemplateState()
+            state.fetched = 1
+        if new_emails:
+            state.productive += 1
+            state.fruitless_streak = 0
+            return False
+        state.fruitless_streak += 1
+        if self.patience and state.fruitless_streak >= self.patience and template not in self.pruned:
+            self.pruned[template] = 0
+            return True
+        return False
+
+
+__all__ = ['TrapDetector', 'url_template']
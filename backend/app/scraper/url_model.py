@@ -0,0 +1,333 @@
+"""
+Modelo de rendimiento de URLs aprendido de los crawls anteriores.
+
+Con ``CRAWL_LOG_ENABLED`` el spider anota en ``crawl_outcomes`` cada página
+descargada, tenga emails o no, con el texto del enlace que llevó a ella
+(``save_crawl_outcomes``). La tabla ``websites`` no sirve para esto: solo
+guarda las páginas que pasan los filtros de calidad, casi todas con emails.
+``train_from_database`` ajusta con esos resultados un naive Bayes binario
+sobre las características que se conocen antes de descargar un enlace
+(``url_features``): palabras de la ruta, primer segmento, número de
+segmentos, si lleva query, profundidad y palabras del texto del enlace.
+
+El modelo se guarda en JSON junto a la base de datos (``URL_YIELD_MODEL_FILE``)
+y el spider lo carga al arrancar si existe: suma a la prioridad de cada enlace
+la probabilidad estimada de que tenga emails (``URL_YIELD_PRIORITY_WEIGHT``) y
+descarta los que quedan por debajo de ``URL_YIELD_PRUNE_THRESHOLD``.
+
+Entrenamiento::
+
+    cd backend && python -m app.scraper.url_model [--output FICHERO] [--min-count N]
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _tokens(text: str) -> List[str]:
+    return [_DIGITS_RE.sub('#', token) for token in _TOKEN_RE.findall(text.lower())]
+
+
+def url_features(url: str, depth: int = 0, anchor_text: Optional[str] = None) -> List[str]:
+    """
+    Características de un enlace que se conocen antes de descargarlo.
+
+    Args:
+        url: URL absoluta del enlace
+        depth: Profundidad a la que se descargaría
+        anchor_text: Texto del enlace
+    """
+    parts = urlsplit(url)
+    segments = [segment for segment in unquote(parts.path).split('/') if segment]
+    features = {f'd:{min(depth, 5)}', f'n:{min(len(segments), 5)}'}
+    if parts.query:
+        features.add('q')
+    if segments:
+        first = _tokens(segments[0])
+        features.add(f'p0:{first[0] if first else "#"}')
+    else:
+        features.add('p0:/')
+    for segment in segments:
+        features.update(f'p:{token}' for token in _tokens(segment))
+    if anchor_text:
+        features.update(f'a:{token}' for token in _tokens(anchor_text)[:12])
+    return sorted(features)
+
+
+class UrlYieldModel:
+    """Naive Bayes binario: probabilidad de que una página tenga emails."""
+
+    def __init__(self, alpha: float = 1.0):
+        """
+        Inicializa un modelo vacío.
+
+        Args:
+            alpha: Suavizado de Laplace de los recuentos
+        """
+        self.alpha = alpha
+        self.positives = 0
+        self.negatives = 0
+        # Característica -> [páginas con emails, páginas sin emails]
+        self.counts: Dict[str, List[int]] = {}
+        self._weights: Dict[str, float] = {}
+        self._bias = 0.0
+
+    @property
+    def examples(self) -> int:
+        return self.positives + self.negatives
+
+    @property
+    def base_rate(self) -> float:
+        """Proporción de páginas con emails en el entrenamiento."""
+        return self.positives / self.examples if self.examples else 0.0
+
+    def fit(self, examples: Iterable[Tuple[Sequence[str], bool]], min_count: int = 2) -> 'UrlYieldModel':
+        """
+        Ajusta el modelo.
+
+        Args:
+            examples: Pares (características, la página tenía emails)
+            min_count: Apariciones mínimas de una característica para usarla
+        """
+        for features, label in examples:
+            if label:
+                self.positives += 1
+            else:
+                self.negatives += 1
+            for feature in set(features):
+                counts = self.counts.setdefault(feature, [0, 0])
+                counts[0 if label else 1] += 1
+        self.counts = {feature: counts for feature, counts in self.counts.items() if sum(counts) >= min_count}
+        self._compile()
+        return self
+
+    def _compile(self) -> None:
+        """Pesos (log-odds) de cada característica presente."""
+        alpha = self.alpha
+        positives = self.positives + 2 * alpha
+        negatives = self.negatives + 2 * alpha
+        self._bias = math.log((self.positives + alpha) / (self.negatives + alpha))
+        self._weights = {
+            feature: math.log((pos + alpha) / positives) - math.log((neg + alpha) / negatives)
+            for feature, (pos, neg) in self.counts.items()
+        }
+
+    def predict(self, features: Iterable[str]) -> float:
+        """Probabilidad estimada de que la página tenga emails."""
+        if not self.examples:
+            return 0.0
+        weights = self._weights
+        score = self._bias + sum(weights.get(feature, 0.0) for feature in features)
+        if score >= 0:
+            return 1.0 / (1.0 + math.exp(-score))
+        odds = math.exp(score)
+        return odds / (1.0 + odds)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': MODEL_VERSION,
+            'alpha': self.alpha,
+            'positives': self.positives,
+            'negatives': self.negatives,
+            'counts': self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'UrlYieldModel':
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"Unsupported URL yield model version: {data.get('version')}")
+        model = cls(alpha=data.get('alpha', 1.0))
+        model.positives = int(data['positives'])
+        model.negatives = int(data['negatives'])
+        model.counts = {feature: [int(pos), int(neg)] for feature, (pos, neg) in data['counts'].items()}
+        model._compile()
+        return model
+
+    def save(self, path: str) -> None:
+        """Guarda el modelo (escritura atómica: los spiders en marcha leen el anterior o el nuevo)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.url_model_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'UrlYieldModel':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def get_model_path() -> str:
+    """
+    Fichero del modelo (URL_YIELD_MODEL_FILE).
+
+    Por defecto vive junto a la base de datos SQLite, como el índice de duplicados.
+    """
+    if os.environ.get('URL_YIELD_MODEL_FILE'):
+        return os.environ['URL_YIELD_MODEL_FILE']
+    from app.database.database import engine
+    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        return f"{os.path.abspath(engine.url.database)}.url_model.json"
+    return os.path.join(tempfile.gettempdir(), 'leads_generator.url_model.json')
+
+
+def load_yield_model(settings) -> Optional[UrlYieldModel]:
+    """Modelo del fichero configurado, o None si está desactivado, no existe o no se puede leer."""
+    if not settings.getbool('URL_YIELD_MODEL_ENABLED', False):
+        return None
+    path = get_model_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        model = UrlYieldModel.load(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"⚠️ Could not load URL yield model {path}: {e}")
+        return None
+    logger.info(f"🧠 URL yield model loaded: {model.examples} pages, {len(model.counts)} features")
+    return model
+
+
+def save_crawl_outcomes(rows: List[dict], session_factory=None) -> int:
+    """
+    Guarda en ``crawl_outcomes`` los resultados de un lote de descargas.
+
+    Args:
+        rows: Valores de ``CrawlOutcome`` por página
+        session_factory: Fábrica de sesiones (por defecto la de la aplicación)
+
+    Returns:
+        Filas guardadas
+    """
+    from app.database.models import CrawlOutcome
+    if session_factory is None:
+        from app.database.database import SessionLocal as session_factory
+
+    if not rows:
+        return 0
+    db = session_factory()
+    try:
+        db.execute(CrawlOutcome.__table__.insert(), rows)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def database_examples(db) -> List[Tuple[List[str], bool]]:
+    """
+    Ejemplos de entrenamiento de la tabla ``crawl_outcomes``.
+
+    Args:
+        db: Sesión de SQLAlchemy
+
+    Returns:
+        Pares (características, la página tenía emails) de las páginas descargadas sin error
+    """
+    from sqlalchemy import or_
+    from app.database.models import CrawlOutcome
+
+    rows = (
+        db.query(CrawlOutcome.url, CrawlOutcome.depth_level, CrawlOutcome.anchor_text, CrawlOutcome.email_count)
+        .filter(or_(CrawlOutcome.http_status.is_(None), CrawlOutcome.http_status < 400))
+        .yield_per(1000)
+    )
+    return [
+        (url_features(url, depth or 0, anchor_text), bool(email_count))
+        for url, depth, anchor_text, email_count in rows
+    ]
+
+
+def train_from_database(db, min_count: int = 2, holdout: float = 0.0,
+                        seed: int = 0) -> Tuple[UrlYieldModel, Optional[dict]]:
+    """
+    Entrena el modelo con los resultados de las descargas anteriores.
+
+    Args:
+        db: Sesión de SQLAlchemy
+        min_count: Apariciones mínimas de una característica
+        holdout: Fracción de páginas que se reserva para evaluar (0 = ninguna)
+        seed: Semilla del reparto entrenamiento/evaluación
+
+    Returns:
+        (modelo entrenado con todas las páginas, evaluación de un modelo entrenado sin
+        las páginas reservadas o None)
+    """
+    examples = database_examples(db)
+    evaluation = None
+    if holdout > 0 and len(examples) >= 10:
+        shuffled = list(examples)
+        random.Random(seed).shuffle(shuffled)
+        cut = int(len(shuffled) * (1 - holdout))
+        evaluation = evaluate(UrlYieldModel().fit(shuffled[:cut], min_count), shuffled[cut:])
+    # El modelo que se guarda usa todas las páginas
+    return UrlYieldModel().fit(examples, min_count), evaluation
+
+
+def evaluate(model: UrlYieldModel, examples: Sequence[Tuple[Sequence[str], bool]],
+             thresholds: Sequence[float] = (0.02, 0.05, 0.1)) -> dict:
+    """
+    Cuánto se ahorra y cuánto se pierde al podar por debajo de cada umbral.
+
+    Returns:
+        Por umbral: fracción de páginas podadas y de páginas con emails conservadas
+    """
+    scored = [(model.predict(features), label) for features, label in examples]
+    positives = sum(1 for _, label in scored if label) or 1
+    result = {'pages': len(scored), 'positives': sum(1 for _, label in scored if label)}
+    for threshold in thresholds:
+        pruned = [label for probability, label in scored if probability < threshold]
+        result[threshold] = {
+            'pruned': len(pruned) / len(scored) if scored else 0.0,
+            'recall': 1 - sum(pruned) / positives,
+        }
+    return result
+
+
+__all__ = [
+    'UrlYieldModel', 'database_examples', 'evaluate', 'get_model_path', 'load_yield_model',
+    'save_crawl_outcomes', 'train_from_database', 'url_features',
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de rendimiento de URLs con la base de datos")
+    parser.add_argument('--output', default=None, help='Fichero del modelo (por defecto URL_YIELD_MODEL_FILE)')
+    parser.add_argument('--min-count', type=int, default=2, help='Apariciones mínimas de una característica')
+    parser.add_argument('--holdout', type=float, default=0.2, help='Fracción de páginas para evaluar')
+    args = parser.parse_args()
+
+    from app.database.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield_model, report = train_from_database(session, args.min_count, args.holdout)
+    finally:
+        session.close()
+    if not yield_model.examples:
+        print("❌ No hay descargas registradas para entrenar (CRAWL_LOG_ENABLED)")
+        raise SystemExit(1)
+    output = args.output or get_model_path()
+    yield_model.save(output)
+    print(f"🧠 Modelo guardado en {output}: {yield_model.examples} páginas "
+          f"({yield_model.base_rate:.1%} con emails), {len(yield_model.counts)} características")
+    if report:
+        for key, values in report.items():
+            if isinstance(key, float):
+                print(f"   umbral {key:<5} poda {values['pruned']:6.1%} de las páginas, "
+                      f"conserva {values['recall']:6.1%} de las páginas con emails")
@@ -0,0 +1,102 @@
+"""
+Canonicalización de URLs para no descargar varias veces la misma página.
+
+Los CMS enlazan la misma página con muchas variantes: con y sin barra final,
+con parámetros de seguimiento (``utm_*``, ``fbclid``...), con identificadores
+de sesión, con los parámetros en otro orden, con el host en mayúsculas o con
+el puerto por defecto. El fingerprint del scheduler de Scrapy solo unifica el
+orden de los parámetros y el fragmento, así que el resto se descargaba una
+vez por variante.
+
+``UrlCanonicalizer`` da dos formas de cada URL:
+
+- ``clean``: la URL que se descarga. Sin fragmento, sin parámetros de
+  seguimiento ni de sesión (``URL_STRIP_PARAMS``), con el host en minúsculas
+  y sin puerto por defecto. La ruta no se toca: quitar la barra final en un
+  WordPress costaría una redirección por página.
+- ``canonical``: la clave de la página. Es ``clean`` con los parámetros
+  ordenados, los escapes ``%xx`` normalizados y sin barra final. Es la que
+  se usa en el conjunto de URLs vistas del spider, en el índice de
+  duplicados y como ``Website.url``.
+"""
+
+import re
+from fnmatch import translate
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parámetros de seguimiento y de sesión (patrones fnmatch, sin distinguir mayúsculas)
+DEFAULT_STRIP_PARAMS = (
+    'utm_*', 'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'igshid', 'ref_src', 'spm',
+    'phpsessid', 'jsessionid', 'aspsessionid*', 'sid', 'sessionid', 'session_id', 'cfid', 'cftoken',
+    'oscsid', 'zenid',
+)
+
+_DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+# Parámetros de sesión en la ruta (``/pagina;jsessionid=ABC``)
+_PATH_SESSION_RE = re.compile(r';(?:jsessionid|phpsessid|sid)=[^/?#]*', re.IGNORECASE)
+_ESCAPE_RE = re.compile(r'%([0-9A-Fa-f]{2})')
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else '%' + match.group(1).upper()
+
+
+class UrlCanonicalizer:
+    """Limpia y canonicaliza URLs con una lista compilada de parámetros a eliminar."""
+
+    def __init__(self, strip_params: Iterable[str] = DEFAULT_STRIP_PARAMS):
+        """
+        Compila los patrones.
+
+        Args:
+            strip_params: Nombres de parámetros que se eliminan, con comodines fnmatch (URL_STRIP_PARAMS)
+        """
+        patterns = [translate(pattern.lower()) for pattern in strip_params]
+        self._strip_re = re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
+
+    def _split(self, url: str):
+        """Partes limpias de la URL: (scheme, netloc, path, pares de la query)."""
+        scheme, netloc, path, query, _ = urlsplit(url.strip())
+        scheme = scheme.lower()
+        netloc = netloc.lower()
+        default_port = _DEFAULT_PORTS.get(scheme)
+        if default_port and netloc.endswith(default_port):
+            netloc = netloc[:-len(default_port)]
+        if netloc.endswith('.'):
+            netloc = netloc[:-1]
+        if ';' in path:
+            path = _PATH_SESSION_RE.sub('', path)
+        pairs = parse_qsl(query, keep_blank_values=True) if query else []
+        if pairs and self._strip_re is not None:
+            pairs = [(name, value) for name, value in pairs if not self._strip_re.fullmatch(name)]
+        return scheme, netloc, path or '/', pairs
+
+    def clean(self, url: str) -> str:
+        """URL a descargar: sin fragmento, seguimiento ni sesión; host en minúsculas y sin puerto por defecto."""
+        scheme, netloc, path, pairs = self._split(url)
+        return urlunsplit((scheme, netloc, path, urlencode(pairs), ''))
+
+    def canonical(self, url: str) -> str:
+        """Clave de la página: ``clean`` con la query ordenada, escapes normalizados y sin barra final."""
+        scheme, netloc, path, pairs = self._split(url)
+        if '%' in path:
+            path = _ESCAPE_RE.sub(_normalize_escape, path)
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+        pairs.sort()
+        return urlunsplit((scheme, netloc, path, urlencode(pairs), ''))
+
+
+_default = UrlCanonicalizer()
+
+
+def canonicalize_url(url: str, canonicalizer: Optional[UrlCanonicalizer] = None) -> str:
+    """Clave canónica de una URL con los parámetros a eliminar por defecto."""
+    return (canonicalizer or _default).canonical(url)
+
+
+__all__ = ['DEFAULT_STRIP_PARAMS', 'UrlCanonicalizer', 'canonicalize_url']
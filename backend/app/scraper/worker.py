@@ -0,0 +1,399 @@
+"""
+Servicio de workers de scraping de larga duración.
+
+En lugar de lanzar un proceso ``scrapy crawl`` por cada job, cada worker es un
+proceso con un reactor de Twisted y un ``CrawlerRunner`` permanentes que
+reclama jobs pendientes de ``ScrapingQueue`` (a través de ``JobDispatcher``,
+por prioridad y con límites global y por dominio) y ejecuta varios spiders a la vez.
+Así se evita pagar en cada job el arranque de Python, Scrapy y SQLAlchemy, y
+se conservan entre jobs la caché DNS y las conexiones keep-alive.
+
+La API despierta a los workers con un datagrama en su socket de control
+(``notify_workers``); el sondeo periódico de la cola queda como respaldo.
+
+Uso:
+    cd backend && python -m app.scraper.worker [--workers N] [--concurrency N]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from app.database.database import SessionLocal
+from app.database.models import ScrapingQueue
+from app.scraper.job_control import get_control_dir
+from app.scraper.dispatcher import JobDispatcher
+from app.scraper.domain_health import get_domain_health
+from app.scraper.storage import get_storage_executor
+
+logger = logging.getLogger(__name__)
+
+# Motivos de cierre de Scrapy que indican que el job debe volver a la cola
+_REQUEUE_REASONS = {'shutdown'}
+
+# Estados puestos desde la API que el cierre de un spider batch no pisa
+_USER_STATUSES = ("cancelled", "paused")
+
+
+def get_worker_control_dir(control_dir: Optional[str] = None) -> str:
+    """Directorio de los sockets de aviso de los workers."""
+    return os.path.join(control_dir or get_control_dir(), 'workers')
+
+
+def notify_workers(control_dir: Optional[str] = None) -> int:
+    """
+    Avisa a los workers de que hay jobs nuevos en la cola.
+
+    Returns:
+        Número de workers notificados
+    """
+    worker_dir = get_worker_control_dir(control_dir)
+    try:
+        names = os.listdir(worker_dir)
+    except OSError:
+        return 0
+
+    notified = 0
+    for name in names:
+        if not name.endswith('.sock'):
+            continue
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.setblocking(False)
+                sock.sendto(b'wake', os.path.join(worker_dir, name))
+            notified += 1
+        except OSError:
+            continue
+    return notified
+
+
+def finish_job(job_id: str, status: str, session_factory=SessionLocal):
+    """
+    Registra el estado final de un job sin pisar una cancelación hecha desde la API.
+
+    Args:
+        job_id: ID del job
+        status: Estado final ('completed', 'failed' o 'pending' para reencolar)
+        session_factory: Fábrica de sesiones de SQLAlchemy (inyectable para tests)
+    """
+    db = session_factory()
+    try:
+        queue_item = db.query(ScrapingQueue).filter_by(job_id=job_id).first()
+        if not queue_item:
+            logger.warning(f"⚠️ Job not found in database for job ID: {job_id}")
+            return
+        if queue_item.status == "cancelled":
+            logger.info(f"⏹️ Job {job_id} was cancelled, keeping 'cancelled' status")
+            return
+        queue_item.status = status
+        db.commit()
+        logger.info(f"🔄 Updated job status to '{status}' for job ID: {job_id}")
+    finally:
+        db.close()
+
+
+def heartbeat_jobs(job_ids: List[str], session_factory=SessionLocal) -> int:
+    """
+    Renueva ``updated_at`` de los jobs en ejecución: el despachador reencola los que
+    pasan ``SCRAPER_JOB_LEASE_SECONDS`` sin latido.
+
+    Returns:
+        Número de jobs renovados
+    """
+    if not job_ids:
+        return 0
+    from sqlalchemy.sql import func
+
+    db = session_factory()
+    try:
+        updated = db.query(ScrapingQueue).filter(
+            ScrapingQueue.job_id.in_(list(job_ids)),
+            ScrapingQueue.status == "processing"
+        ).update({ScrapingQueue.updated_at: func.now()}, synchronize_session=False)
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+def finish_jobs(job_ids: List[str], status: str, session_factory=SessionLocal) -> int:
+    """
+    ``finish_job`` para los jobs de un spider batch, en un solo UPDATE.
+
+    Returns:
+        Número de jobs actualizados (los cancelados y pausados desde la API se conservan)
+    """
+    if not job_ids:
+        return 0
+    db = session_factory()
+    try:
+        updated = db.query(ScrapingQueue).filter(
+            ScrapingQueue.job_id.in_(list(job_ids)),
+            ScrapingQueue.status.notin_(_USER_STATUSES)
+        ).update({ScrapingQueue.status: status}, synchronize_session=False)
+        db.commit()
+        logger.info(f"🔄 Updated {updated} batch jobs to '{status}'")
+        return updated
+    finally:
+        db.close()
+
+
+def record_batch_jobs(results: Dict[str, Dict], session_factory=SessionLocal) -> int:
+    """
+    Estado final y progreso de cada job de un spider batch, en una sola transacción.
+
+    Args:
+        results: ``{job_id: {'status': ..., 'processed_items': n}}``
+        session_factory: Fábrica de sesiones de SQLAlchemy (inyectable para tests)
+
+    Returns:
+        Número de jobs actualizados (los cancelados y pausados desde la API se conservan)
+    """
+    if not results:
+        return 0
+    db = session_factory()
+    try:
+        queue_items = db.query(ScrapingQueue).filter(
+            ScrapingQueue.job_id.in_(list(results)),
+            ScrapingQueue.status.notin_(_USER_STATUSES)
+        ).all()
+        for queue_item in queue_items:
+            result = results[queue_item.job_id]
+            queue_item.status = result['status']
+            queue_item.processed_items = result.get('processed_items', 0)
+            queue_item.progress = 100
+        db.commit()
+        failed = sum(1 for queue_item in queue_items if queue_item.status == 'failed')
+        logger.info(f"🔄 Updated {len(queue_items)} batch jobs ({failed} failed)")
+        return len(queue_items)
+    finally:
+        db.close()
+
+
+class CrawlWorker:
+    """Worker con un reactor y un CrawlerRunner permanentes que ejecuta varios jobs a la vez."""
+
+    def __init__(self, settings, concurrency: int = 4, poll_interval: float = 2.0,
+                 control_dir: Optional[str] = None, dispatcher: Optional[JobDispatcher] = None):
+        from scrapy.crawler import CrawlerRunner
+
+        self.settings = settings
+        self.runner = CrawlerRunner(settings)
+        self.dispatcher = dispatcher or JobDispatcher()
+        self.storage = get_storage_executor(settings)
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.control_dir = get_worker_control_dir(control_dir)
+        self.active = {}
+        self.stopping = False
+        self._polling = False
+        self._loop = None
+        self._heartbeat = None
+        self.heartbeat_interval = settings.getfloat('JOB_HEARTBEAT_INTERVAL', 30.0)
+        self._port = None
+        self._socket_path = None
+
+    def start(self):
+        """Arranca el sondeo de la cola y el socket de aviso."""
+        from twisted.internet import reactor, task
+        from twisted.internet.protocol import DatagramProtocol
+
+        worker = self
+
+        class _WakeProtocol(DatagramProtocol):
+            def datagramReceived(self, data, addr):
+                worker.poll()
+
+        os.makedirs(self.control_dir, exist_ok=True)
+        self._socket_path = os.path.join(self.control_dir, f"{os.getpid()}.sock")
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._port = reactor.listenUNIXDatagram(self._socket_path, _WakeProtocol())
+
+        self._loop = task.LoopingCall(self.poll)
+        self._loop.start(self.poll_interval, now=True)
+        if self.heartbeat_interval > 0:
+            self._heartbeat = task.LoopingCall(self.heartbeat)
+            self._heartbeat.start(self.heartbeat_interval, now=False)
+        reactor.addSystemEventTrigger('before', 'shutdown', self.shutdown)
+        logger.info(f"👷 Crawl worker {os.getpid()} started (concurrency={self.concurrency})")
+
+    def poll(self):
+        """Reclama jobs pendientes si hay huecos libres."""
+        free_slots = self.concurrency - len(self.active)
+        if self.stopping or self._polling or free_slots <= 0:
+            return
+
+        self._polling = True
+        d = self.storage.submit(self.dispatcher.claim, free_slots)
+        d.addCallback(self._start_jobs)
+        d.addErrback(lambda failure: logger.error(f"❌ Error claiming jobs: {failure.getErrorMessage()}"))
+        d.addBoth(self._poll_done)
+
+    def heartbeat(self):
+        """Renueva el latido de los jobs activos del worker."""
+        if self.stopping or not self.active:
+            return
+        d = self.storage.submit(heartbeat_jobs, list(self.active))
+        d.addErrback(lambda failure: logger.error(f"❌ Error sending job heartbeats: {failure.getErrorMessage()}"))
+
+    def _poll_done(self, _):
+        self._polling = False
+
+    def _start_jobs(self, jobs: List[Dict]):
+        for job in jobs:
+            self.start_job(job['job_id'], job['url'], job['max_depth'], job.get('recrawl', False))
+
+    def start_job(self, job_id: str, start_url: str, depth: int, recrawl: bool = False):
+        """Lanza el spider de un job dentro del reactor del worker."""
+        from app.scraper.spiders.lead_spider import LeadSpider
+
+        crawler = self.runner.create_crawler(LeadSpider)
+        kwargs = {'recrawl': '1'} if recrawl else {}
+        d = self.runner.crawl(crawler, start_url=start_url, depth=depth, job_id=job_id, **kwargs)
+        self.active[job_id] = d
+        d.addBoth(self._job_finished, job_id, crawler)
+        logger.info(f"🚀 Job {job_id} started in worker {os.getpid()}: {start_url}")
+
+    def _job_finished(self, result, job_id: str, crawler):
+        from twisted.python.failure import Failure
+
+        self.active.pop(job_id, None)
+        reason = crawler.stats.get_value('finish_reason') if crawler.stats else None
+        if isinstance(result, Failure):
+            logger.error(f"❌ Scraping job {job_id} failed: {result.getErrorMessage()}")
+            status = "failed"
+        elif reason in _REQUEUE_REASONS:
+            status = "pending"
+        else:
+            logger.info(f"✅ Scraping job {job_id} completed ({reason})")
+            status = "completed"
+
+        if self.stopping:
+            # Durante el apagado el pool de hilos puede no estar disponible
+            finish_job(job_id, status)
+            return None
+
+        d = self.storage.submit(finish_job, job_id, status)
+        d.addErrback(lambda failure: logger.error(f"💥 Error updating job status in database: {failure.getErrorMessage()}"))
+        d.addBoth(lambda _: self.poll())
+        return d
+
+    def shutdown(self):
+        """Detiene los spiders activos y devuelve sus jobs a la cola."""
+        from twisted.internet import defer
+
+        self.stopping = True
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+        if self._heartbeat is not None and self._heartbeat.running:
+            self._heartbeat.stop()
+        if self._port is not None:
+            self._port.stopListening()
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+        pending = list(self.active.values())
+        self.runner.stop()
+        return defer.DeferredList(pending)
+
+
+def get_worker_settings():
+    """Carga la configuración de Scrapy del proyecto."""
+    from scrapy.settings import Settings
+
+    settings = Settings()
+    settings.setmodule('app.scraper.settings', priority='project')
+    return settings
+
+
+def run_worker(concurrency: int = 4, poll_interval: float = 2.0):
+    """Punto de entrada de un proceso worker: ejecuta el reactor hasta recibir SIGTERM/SIGINT."""
+    from scrapy.utils.log import configure_logging
+    from scrapy.utils.reactor import install_reactor
+    from app.core.config import settings as app_settings
+
+    settings = get_worker_settings()
+    configure_logging(settings)
+    if settings.get('TWISTED_REACTOR'):
+        install_reactor(settings.get('TWISTED_REACTOR'))
+
+    from twisted.internet import reactor
+
+    dispatcher = JobDispatcher(
+        max_active_jobs=app_settings.SCRAPER_MAX_ACTIVE_JOBS,
+        max_jobs_per_domain=app_settings.SCRAPER_MAX_JOBS_PER_DOMAIN,
+        health=get_domain_health(settings) if settings.getbool('DOMAIN_HEALTH_PERSISTENT') else None,
+        lease_seconds=app_settings.SCRAPER_JOB_LEASE_SECONDS
+    )
+    worker = CrawlWorker(settings, concurrency=concurrency, poll_interval=poll_interval, dispatcher=dispatcher)
+    reactor.callWhenRunning(worker.start)
+    reactor.run()
+
+
+def start_worker_pool(workers: int, concurrency: int = 4, poll_interval: float = 2.0) -> List:
+    """
+    Lanza ``workers`` procesos worker en segundo plano.
+
+    Returns:
+        Lista de procesos lanzados
+    """
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for _ in range(workers):
+        process = context.Process(
+            target=run_worker,
+            args=(concurrency, poll_interval),
+            name='crawl-worker',
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_worker_pool(processes: List, timeout: float = 30.0):
+    """Detiene los workers (SIGTERM) esperando a que devuelvan sus jobs a la cola."""
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+
+
+__all__ = [
+    'CrawlWorker',
+    'finish_job',
+    'finish_jobs',
+    'heartbeat_jobs',
+    'notify_workers',
+    'record_batch_jobs',
+    'run_worker',
+    'start_worker_pool',
+    'stop_worker_pool',
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio de workers de scraping")
+    parser.add_argument('--workers', type=int, default=2, help='Número de procesos worker')
+    parser.add_argument('--concurrency', type=int, default=4, help='Jobs simultáneos por worker')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos entre sondeos de la cola')
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.concurrency, args.poll_interval)
+    else:
+        pool = start_worker_pool(args.workers, args.concurrency, args.poll_interval)
+        try:
+            for worker_process in pool:
+                worker_process.join()
+        except KeyboardInterrupt:
+            stop_worker_pool(pool)
@@ -39,8 +39,11 @@ def migrate_database():
                     id INTEGER PRIMARY KEY,
                     job_id TEXT UNIQUE,
                     url TEXT NOT NULL,
+                    domain TEXT,
                     priority INTEGER DEFAULT 0,
                     depth_level INTEGER DEFAULT 0,
+                    max_depth INTEGER DEFAULT 3,
+                    recrawl INTEGER DEFAULT 0,
                     status TEXT DEFAULT 'pending',
                     attempts INTEGER DEFAULT 0,
                     progress INTEGER DEFAULT 0,
@@ -89,6 +92,47 @@ def migrate_database():
             if 'processed_items' not in columns:
                 print("➕ Agregando campo 'processed_items'...")
                 cursor.execute("ALTER TABLE scraping_queue ADD COLUMN processed_items INTEGER DEFAULT 0")
+
+            if 'max_depth' not in columns:
+                print("➕ Agregando campo 'max_depth'...")
+                cursor.execute("ALTER TABLE scraping_queue ADD COLUMN max_depth INTEGER DEFAULT 3")
+
+            if 'domain' not in columns:
+                print("➕ Agregando campo 'domain'...")
+                cursor.execute("ALTER TABLE scraping_queue ADD COLUMN domain TEXT")
+
+            if 'recrawl' not in columns:
+                print("➕ Agregando campo 'recrawl'...")
+                cursor.execute("ALTER TABLE scraping_queue ADD COLUMN recrawl INTEGER DEFAULT 0")
+
+        # Calcular el dominio registrado de los jobs que no lo tienen
+        from app.scraper.dispatcher import registered_domain
+        cursor.execute("SELECT id, url FROM scraping_queue WHERE domain IS NULL")
+        for row_id, url in cursor.fetchall():
+            cursor.execute("UPDATE scraping_queue SET domain = ? WHERE id = ?", (registered_domain(url), row_id))
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_scraping_queue_domain ON scraping_queue(domain)")
+
+        # Validadores HTTP de cada página y cambios detectados (recrawl y frescura)
+        cursor.execute("PRAGMA table_info(websites)")
+        website_columns = [column[1] for column in cursor.fetchall()]
+        if website_columns:
+            for column, column_type in [('fetch_url', 'VARCHAR(500)'), ('etag', 'VARCHAR(255)'), ('last_modified', 'VARCHAR(64)'),
+                                        ('content_hash', 'VARCHAR(64)'), ('change_count', 'INTEGER DEFAULT 0'),
+                                        ('canonical_url', 'VARCHAR(500)')]:
+                if column not in website_columns:
+                    print(f"➕ Agregando campo '{column}' a websites...")
+                    cursor.execute(f"ALTER TABLE websites ADD COLUMN {column} {column_type}")
+
+        # Índice único de emails por sitio web (upserts en lote del DatabasePipeline)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='emails'")
+        if cursor.fetchone():
+            print("🧹 Eliminando emails duplicados por sitio web...")
+            cursor.execute("""
+                DELETE FROM emails WHERE id NOT IN (
+                    SELECT MIN(id) FROM emails GROUP BY website_id, email
+                )
+            """)
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_emails_website_email ON emails(website_id, email)")
         
         # Verificar y agregar nuevos estados al enum
         # En SQLite, los enums no se verifican, pero en SQLAlchemy sí
@@ -0,0 +1,241 @@
+"""
+Benchmark de simulación: heurística de delays anterior vs. control adaptativo AIMD.
+
+Levanta un servidor HTTP local por "host" con latencia y capacidad
+configurables. Cada host sirve un árbol de páginas; si recibe más peticiones
+simultáneas que su capacidad, la latencia crece en proporción (cola) y por
+encima del doble de su capacidad responde 503. Se crawlean todos los hosts a
+la vez con:
+
+- la heurística anterior de ``RateLimitingMiddleware`` (delay que crece con el
+  número de peticiones al dominio y concurrencia fija
+  ``CONCURRENT_REQUESTS_PER_DOMAIN``), y
+- el ``AdaptiveConcurrencyController`` actual (``app/scraper/concurrency.py``),
+
+y se muestra por host el tiempo hasta completar sus páginas, los 503 que ha
+devuelto y los límites finales del controlador.
+
+Uso:
+    cd backend && python tests/bench_adaptive_concurrency.py [--pages N] [--hosts "0.01:8,0.05:3,0.3:1"]
+"""
+
+import argparse
+import random
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.middlewares import RateLimitingMiddleware
+
+
+class AdaptiveRateLimitingMiddleware(RateLimitingMiddleware):
+    """RateLimitingMiddleware actual; guarda la instancia para leer los límites finales."""
+
+    instance = None
+
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        type(self).instance = self
+
+
+class HeuristicRateLimitingMiddleware(RateLimitingMiddleware):
+    """Implementación anterior: el delay crece con las peticiones al dominio, sano o no."""
+
+    instance = None
+
+    def process_response(self, request, response, spider):
+        return response
+
+    def _apply_slot_limits(self, domain):
+        pass
+
+    def process_request(self, request, spider):
+        domain = self._get_domain(request.url)
+        request.meta.setdefault('download_slot', domain)
+        request_count = self.domain_request_count.get(domain, 0)
+        adaptive_delay = min(self.domain_delays.get(domain, self.min_delay) * (1 + request_count * 0.05),
+                             self.max_delay)
+        if self.randomize_delay:
+            adaptive_delay *= random.uniform(0.7, 1.3)
+        if request_count > 10:
+            adaptive_delay *= min(self.backoff_base ** (request_count // 10), 5.0)
+        delay_needed = self.scheduler.reserve(domain, adaptive_delay)
+        self.domain_request_count[domain] = request_count + 1
+        if request_count > 50:
+            self.domain_request_count[domain] = 25
+        if delay_needed > 0:
+            from twisted.internet import reactor
+            from twisted.internet.task import deferLater
+            return deferLater(reactor, delay_needed, lambda: None)
+
+
+def _handler_for(latency, capacity, pages):
+    """Handler de un host simulado con su latencia, capacidad y contadores."""
+
+    class _HostHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        active = 0
+        rejected = 0
+
+        def do_GET(self):
+            cls = type(self)
+            with cls.lock:
+                cls.active += 1
+                active = cls.active
+            try:
+                if active > capacity * 2:
+                    with cls.lock:
+                        cls.rejected += 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                # Por encima de su capacidad el host encola: la latencia crece
+                time.sleep(latency * max(1.0, active / capacity))
+                try:
+                    index = int(self.path.rstrip('/').split('/')[-1])
+                except ValueError:
+                    index = 0
+                links = ''.join(f'<a href="/p/{child}">p{child}</a>'
+                                for child in (2 * index + 1, 2 * index + 2) if child < pages)
+                body = f'<html><body><p>Página {index}</p>{links}</body></html>'.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                with cls.lock:
+                    cls.active -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    return _HostHandler
+
+
+class BenchSpider(scrapy.Spider):
+    """Spider mínimo que recorre el árbol de páginas de cada host."""
+
+    name = 'bench_adaptive_concurrency'
+
+    def __init__(self, seeds=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seeds = seeds or []
+        self.started = time.perf_counter()
+        self.pages = {}
+        self.finished_at = {}
+
+    def start_requests(self):
+        self.started = time.perf_counter()
+        for seed in self.seeds:
+            yield scrapy.Request(seed, callback=self.parse)
+
+    def parse(self, response):
+        host = response.url.split('/')[2]
+        self.pages[host] = self.pages.get(host, 0) + 1
+        self.finished_at[host] = time.perf_counter() - self.started
+        for href in response.css('a::attr(href)').getall():
+            yield response.follow(href, callback=self.parse)
+
+
+def run_benchmark(hosts=((0.01, 8), (0.05, 3), (0.3, 1)), pages=60, delay=0.1):
+    """Crawlea los hosts simulados con ambos controles en el mismo reactor."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    servers = []
+    for latency, capacity in hosts:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_for(latency, capacity, pages))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    seeds = [f'http://127.0.0.1:{server.server_address[1]}/p/0' for server in servers]
+    results = {}
+
+    def settings_for(middleware):
+        return {
+            'ROBOTSTXT_OBEY': False,
+            'LOG_LEVEL': 'ERROR',
+            'CONCURRENT_REQUESTS': 32,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+            'DOWNLOAD_DELAY': delay,
+            'RANDOMIZE_DOWNLOAD_DELAY': False,
+            'AUTOTHROTTLE_ENABLED': False,
+            'TELNETCONSOLE_ENABLED': False,
+            'MAX_REQUESTS_PER_DOMAIN': 10000,
+            'MAX_REQUESTS_PER_SESSION': 100000,
+            'ADAPTIVE_MIN_DELAY': 0.02,
+            'RETRY_HTTP_CODES': [503],
+            'RETRY_TIMES': 10,
+            'DOWNLOADER_MIDDLEWARES': {
+                'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+                f'{__name__}.{middleware.__name__}': 410,
+                'app.scraper.middlewares.ErrorHandlingMiddleware': 430,
+            },
+        }
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, middleware in [
+            ('heurística (anterior)', HeuristicRateLimitingMiddleware),
+            ('AIMD adaptativo (actual)', AdaptiveRateLimitingMiddleware),
+        ]:
+            for server in servers:
+                server.RequestHandlerClass.rejected = 0
+            runner = CrawlerRunner(settings_for(middleware))
+            crawler = runner.create_crawler(BenchSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, seeds=seeds)
+            elapsed = time.perf_counter() - started
+            results[label] = {
+                'elapsed': elapsed,
+                'pages': dict(crawler.spider.pages),
+                'finished_at': dict(crawler.spider.finished_at),
+                'rejected': {seed.split('/')[2]: server.RequestHandlerClass.rejected
+                             for seed, server in zip(seeds, servers)},
+                'limits': middleware.instance.controller.snapshot() if middleware.instance else {},
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+
+    for server in servers:
+        server.shutdown()
+
+    print("🎛️ Benchmark de concurrencia adaptativa por host")
+    print("=" * 78)
+    print(f"   Páginas/host: {pages}, delay inicial: {delay}s")
+    for label, result in results.items():
+        total = sum(result['pages'].values())
+        print(f"\n   {label}: {total} páginas en {result['elapsed']:.2f}s -> {total / result['elapsed']:.1f} páginas/s")
+        for (latency, capacity), seed in zip(hosts, seeds):
+            host = seed.split('/')[2]
+            line = (f"     latencia {latency * 1000:>5.0f} ms, capacidad {capacity}: "
+                    f"{result['pages'].get(host, 0):>4} páginas en {result['finished_at'].get(host, 0):6.2f}s, "
+                    f"{result['rejected'][host]:>3} respuestas 503")
+            limits = result['limits'].get(host)
+            if limits:
+                line += f" (concurrencia {limits['concurrency']}, delay {limits['delay']:.2f}s)"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--hosts', default='0.01:8,0.05:3,0.3:1',
+                        help='latencia_en_segundos:capacidad por host, separados por comas')
+    args = parser.parse_args()
+    hosts = tuple((float(latency), int(capacity))
+                  for latency, capacity in (host.split(':') for host in args.hosts.split(',')))
+    run_benchmark(hosts, args.pages, args.delay)
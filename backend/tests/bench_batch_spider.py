@@ -0,0 +1,138 @@
+"""
+Benchmark del modo batch: un spider con muchas semillas frente a un job por dominio.
+
+Levanta N sitios HTTP locales (un servidor por puerto, así cada sitio es un
+host distinto) con latencia, cada uno con portada, página de contacto y unos
+productos. Se crawlean con ``LeadSpider``:
+
+- un job por dominio, uno detrás de otro (implementación anterior: un arranque
+  de spider por job), y
+- un solo spider batch con las N semillas (``seeds``).
+
+Muestra el tiempo total, las peticiones y que cada item llega atribuido al
+job de su semilla.
+
+Uso:
+    cd backend && python tests/bench_batch_spider.py [--sites N] [--pages N] [--latency S]
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.seeds import Seed
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def _handler_for(pages, latency, hits):
+    """Sitio simulado: portada con enlaces a contacto y a ``pages`` productos."""
+    links = ['/contacto/'] + [f'/producto/{index}/' for index in range(pages)]
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.update([self.server.server_address[1]])
+            time.sleep(latency)
+            if self.path != '/' and self.path not in links:
+                self.send_error(404)
+                return
+            anchors = ''.join(f'<a href="{href}">{href}</a>' for href in links) if self.path == '/' else ''
+            email = f'<p>Escríbenos: ventas@sitio{self.server.server_address[1]}.com</p>' \
+                if self.path == '/contacto/' else ''
+            body = (f'<html><head><title>Sitio {self.path}</title></head><body>{email}{anchors}'
+                    f'<p>{"texto " * 40}</p></body></html>').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _SiteHandler
+
+
+def run_benchmark(sites=30, pages=5, latency=0.05):
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    hits = Counter()
+    servers = []
+    for _ in range(sites):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_for(pages, latency, hits))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    seeds = [Seed(f'http://127.0.0.1:{server.server_address[1]}/', 1, f'job-{index}')
+             for index, server in enumerate(servers)]
+
+    runner = CrawlerRunner({
+        'ROBOTSTXT_OBEY': False,
+        'LOG_LEVEL': 'CRITICAL',
+        'TELNETCONSOLE_ENABLED': False,
+        'CONCURRENT_REQUESTS': 12,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+        'DEPTH_PRIORITY': 1,
+        'DEDUPE_PERSISTENT': False,
+        # Los sitios locales llevan puerto, que OffsiteMiddleware no admite en allowed_domains
+        # (el spider ya filtra los enlaces por el host de cada semilla)
+        'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+    })
+    results = {}
+
+    def _collect(crawler, items):
+        crawler.signals.connect(lambda item, **kwargs: items.update([item.get('job_id')]),
+                                signal=signals.item_scraped, weak=False)
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        items = Counter()
+        hits.clear()
+        started = time.perf_counter()
+        for seed in seeds:
+            crawler = runner.create_crawler(LeadSpider)
+            _collect(crawler, items)
+            yield runner.crawl(crawler, start_url=seed.url, depth=seed.depth, job_id=seed.job_id)
+        results['un job por dominio (anterior)'] = (time.perf_counter() - started, sum(hits.values()), items)
+
+        items = Counter()
+        hits.clear()
+        started = time.perf_counter()
+        crawler = runner.create_crawler(LeadSpider)
+        _collect(crawler, items)
+        yield runner.crawl(crawler, seeds=seeds)
+        results['spider batch'] = (time.perf_counter() - started, sum(hits.values()), items)
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    for server in servers:
+        server.shutdown()
+
+    print("🧺 Benchmark del modo batch")
+    print("=" * 70)
+    print(f"   {sites} sitios de {pages + 2} páginas, profundidad 1, latencia {latency * 1000:.0f} ms")
+    for label, (elapsed, requests, items) in results.items():
+        attributed = sum(1 for seed in seeds if items[seed.job_id] == pages + 2)
+        print(f"   {label:<30} {elapsed:6.2f}s, {requests:>4} peticiones, {sum(items.values()):>4} items, "
+              f"{attributed}/{sites} jobs con todos sus items")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sites', type=int, default=30)
+    parser.add_argument('--pages', type=int, default=5, help='Productos por sitio')
+    parser.add_argument('--latency', type=float, default=0.05, help='Segundos de respuesta del servidor')
+    args = parser.parse_args()
+    run_benchmark(args.sites, args.pages, args.latency)
@@ -0,0 +1,159 @@
+"""
+Benchmark de la frontera con prioridad de contacto: peticiones hasta encontrar los emails.
+
+Levanta un sitio HTTP local cuyas páginas enlazan en el menú a contacto,
+quiénes somos y equipo (las únicas páginas con email) y después a decenas de
+entradas de blog, que a su vez enlazan a más entradas y a un archivo
+paginado. Se crawlea con ``LeadSpider`` con la configuración del proyecto
+(``DEPTH_PRIORITY = 1``, ``CONCURRENT_REQUESTS_PER_DOMAIN = 3`` y la cola LIFO
+por defecto de Scrapy, con la que los primeros enlaces de la página salen los
+últimos):
+
+- en el orden de la página (implementación anterior),
+- con la prioridad de ``LinkScorer`` (``FRONTIER_ENABLED``), y
+- con la prioridad y la regla de parada (``FRONTIER_STOP_AFTER_EMAILS``).
+
+Muestra en qué petición al sitio llegan el primer email y el último, y las
+peticiones totales del job.
+
+Uso:
+    cd backend && python tests/bench_contact_frontier.py [--posts N] [--depth N]
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_CONTACT_PAGES = {
+    'contacto': ('Contacto', 'ventas@tienda.com'),
+    'quienes-somos': ('Quiénes somos', 'direccion@tienda.com'),
+    'equipo': ('Nuestro equipo', 'rrhh@tienda.com'),
+}
+
+
+def _handler_for(posts):
+    """Sitio simulado: portada, blog con archivo paginado y tres páginas de contacto en el menú."""
+
+    menu = ''.join(f'<a href="/{slug}/">{text}</a>' for slug, (text, _) in _CONTACT_PAGES.items())
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        hits = 0
+        # Número de petición en la que se sirvió cada página de contacto
+        found_at = {}
+
+        def do_GET(self):
+            with type(self).lock:
+                type(self).hits += 1
+                hit = type(self).hits
+            segments = self.path.strip('/').split('/')
+            email = ''
+            links = []
+            if segments[0] == '':
+                links = [(f'/blog/entrada-{index}/', f'Entrada {index}') for index in range(posts)]
+            elif segments[:2] == ['blog', 'page']:
+                # Archivo paginado sin fin
+                page = int(segments[2])
+                links = [(f'/blog/entrada-{page * 10 + offset}/', 'Entrada') for offset in range(10)]
+                links.append((f'/blog/page/{page + 1}/', 'Entradas anteriores'))
+            elif segments[0] == 'blog':
+                index = int(segments[1].split('-')[1])
+                links = [(f'/blog/entrada-{index * 7 + offset}/', 'Relacionada') for offset in range(1, 6)]
+                links.append((f'/blog/page/{index % 20 + 2}/', 'Entradas anteriores'))
+            else:
+                email = _CONTACT_PAGES[segments[0]][1]
+                type(self).found_at.setdefault(segments[0], hit)
+            anchors = ''.join(f'<a href="{href}">{text}</a>' for href, text in links)
+            contact = f'<p>Escríbenos: {email}</p>' if email else ''
+            body = (f'<html><head><title>Tienda {self.path}</title></head><body>{contact}'
+                    f'<nav>{menu}</nav><main>{anchors}</main><p>{"texto " * 40}</p></body></html>').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _SiteHandler
+
+
+def run_benchmark(posts=40, depth=3):
+    """Crawlea el sitio simulado en orden de página, con prioridad y con prioridad y parada."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    handler = _handler_for(posts)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    results = {}
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        modes = [
+            ('orden de la página (anterior)', False, 0),
+            ('prioridad de contacto', True, 0),
+            ('prioridad + parada a 3 emails', True, len(_CONTACT_PAGES)),
+        ]
+        for label, enabled, stop_after in modes:
+            handler.hits = 0
+            handler.found_at = {}
+            runner = CrawlerRunner({
+                'ROBOTSTXT_OBEY': False,
+                'LOG_LEVEL': 'CRITICAL',
+                'TELNETCONSOLE_ENABLED': False,
+                'CONCURRENT_REQUESTS': 12,
+                'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+                'DEPTH_PRIORITY': 1,
+                'DEDUPE_PERSISTENT': False,
+                'TRAP_DETECTION_ENABLED': False,
+                'FRONTIER_ENABLED': enabled,
+                'FRONTIER_STOP_AFTER_EMAILS': stop_after,
+                # El sitio local lleva puerto, que OffsiteMiddleware no admite en allowed_domains
+                # (el spider ya filtra los enlaces por host)
+                'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+            })
+            crawler = runner.create_crawler(LeadSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url, depth=depth)
+            results[label] = {
+                'elapsed': time.perf_counter() - started,
+                'first': min(handler.found_at.values(), default=None),
+                'all': max(handler.found_at.values()) if len(handler.found_at) == len(_CONTACT_PAGES) else None,
+                'total': handler.hits,
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+
+    print("🎯 Benchmark de frontera con prioridad de contacto")
+    print("=" * 70)
+    print(f"   Menú con {len(_CONTACT_PAGES)} páginas de contacto y {posts} entradas de blog en la portada, "
+          f"profundidad {depth}")
+    for label, result in results.items():
+        print(f"   {label:<32} primer email en la petición {result['first']!s:>4}, "
+              f"todos en la {result['all']!s:>4}, {result['total']:>5} peticiones en {result['elapsed']:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=40)
+    parser.add_argument('--depth', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.posts, args.depth)
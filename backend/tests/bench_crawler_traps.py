@@ -0,0 +1,151 @@
+"""
+Benchmark de la detección de trampas: peticiones gastadas en calendarios y filtros.
+
+Levanta un sitio HTTP local con páginas de contacto y de equipo (cada una con
+un email) y dos trampas sin emails: un calendario en el que cada día enlaza
+al anterior, al siguiente y a su vista mensual, y un catálogo con filtros
+facetados que se pueden combinar sin fin. Se crawlea con ``LeadSpider`` con
+la misma profundidad:
+
+- sin presupuesto por plantilla (implementación anterior: solo la profundidad
+  frena las trampas), y
+- con ``TrapDetector`` (``TRAP_TEMPLATE_BUDGET`` / ``TRAP_TEMPLATE_PATIENCE``).
+
+Muestra las peticiones, los emails encontrados y las peticiones por email.
+
+Uso:
+    cd backend && python tests/bench_crawler_traps.py [--depth N] [--team N]
+"""
+
+import argparse
+import datetime
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_FACETS = {'color': ['rojo', 'azul', 'verde', 'negro'], 'talla': ['s', 'm', 'l', 'xl'], 'marca': ['a', 'b', 'c']}
+
+
+def _handler_for(team):
+    """Sitio simulado: portada, contacto, equipo, calendario y catálogo facetado."""
+
+    def calendar_links(day):
+        return [f'/agenda/{day - datetime.timedelta(days=1)}/', f'/agenda/{day + datetime.timedelta(days=1)}/',
+                f'/agenda/{day}/?vista=mes']
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        hits = 0
+
+        def do_GET(self):
+            with type(self).lock:
+                type(self).hits += 1
+            parts = urlsplit(self.path)
+            segments = parts.path.strip('/').split('/')
+            links = ['/', '/contacto/', '/agenda/2024-06-01/', '/catalogo/']
+            email = ''
+            if segments[0] == '':
+                links += ['/nosotros/'] + [f'/equipo/{index}/' for index in range(team)]
+            elif segments[0] in ('contacto', 'nosotros'):
+                email = f'{segments[0]}@tienda.com'
+            elif segments[0] == 'equipo':
+                email = f'persona{segments[1]}@tienda.com'
+            elif segments[0] == 'agenda':
+                links += calendar_links(datetime.date.fromisoformat(segments[1]))
+            elif segments[0] == 'catalogo':
+                # Cada filtro añade otro parámetro a la query actual
+                current = parse_qsl(parts.query)
+                for name, values in _FACETS.items():
+                    for value in values:
+                        links.append('/catalogo/?' + urlencode(current + [(name, value)]))
+            anchors = ''.join(f'<a href="{link}">enlace</a>' for link in links)
+            contact = f'<p>Escríbenos: {email}</p>' if email else ''
+            body = (f'<html><head><title>Tienda {parts.path}</title></head><body>{contact}'
+                    f'<nav>{anchors}</nav><p>{"texto " * 40}</p></body></html>').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _SiteHandler
+
+
+def run_benchmark(depth=4, team=12):
+    """Crawlea el sitio simulado con y sin presupuesto por plantilla."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    handler = _handler_for(team)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    results = {}
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, enabled in [('solo profundidad (anterior)', False), ('presupuesto por plantilla (actual)', True)]:
+            handler.hits = 0
+            emails = set()
+            runner = CrawlerRunner({
+                'ROBOTSTXT_OBEY': False,
+                'LOG_LEVEL': 'CRITICAL',
+                'TELNETCONSOLE_ENABLED': False,
+                'CONCURRENT_REQUESTS': 16,
+                'DEDUPE_PERSISTENT': False,
+                'TRAP_DETECTION_ENABLED': enabled,
+                # El sitio local lleva puerto, que OffsiteMiddleware no admite en allowed_domains
+                # (el spider ya filtra los enlaces por host)
+                'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+            })
+            crawler = runner.create_crawler(LeadSpider)
+            # Las señales guardan referencias débiles: el receptor debe seguir vivo durante el crawl
+            collect = lambda item, **kwargs: emails.update(item.get('emails') or ())  # noqa: E731
+            crawler.signals.connect(collect, signal=signals.item_scraped)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url, depth=depth)
+            results[label] = {
+                'elapsed': time.perf_counter() - started,
+                'hits': handler.hits,
+                'emails': len(emails),
+                'templates_pruned': crawler.stats.get_value('traps/templates_pruned', 0),
+                'links_pruned': crawler.stats.get_value('traps/links_pruned', 0),
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+
+    print("🪤 Benchmark de detección de trampas de crawling")
+    print("=" * 70)
+    print(f"   Profundidad {depth}, {team + 2} páginas con email, calendario y catálogo facetado sin emails")
+    for label, result in results.items():
+        per_lead = result['hits'] / result['emails'] if result['emails'] else 0
+        print(f"   {label:<36} {result['hits']:>6} peticiones, {result['emails']:>3} emails, "
+              f"{per_lead:7.2f} peticiones/email en {result['elapsed']:6.2f}s "
+              f"({result['templates_pruned']} plantillas podadas, {result['links_pruned']} enlaces descartados)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--team', type=int, default=12)
+    args = parser.parse_args()
+    run_benchmark(args.depth, args.team)
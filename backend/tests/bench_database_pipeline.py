@@ -0,0 +1,111 @@
+"""
+Benchmark de DatabasePipeline: guardado item a item vs. escritura en lote.
+
+Procesa los mismos items sintéticos (con URLs y emails repetidos) sobre dos
+bases de datos SQLite temporales, mide los items por segundo de cada modo y
+comprueba que ambas bases de datos quedan con el mismo contenido.
+
+Uso:
+    cd backend && python tests/bench_database_pipeline.py [--items N] [--batch-size N]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Email, Website
+from app.scraper.items import LeadItem
+from app.scraper.pipelines import DatabasePipeline
+
+
+def _make_items(count, seed=42):
+    rng = random.Random(seed)
+    domains = [f"empresa{index}.com" for index in range(max(1, count // 10))]
+    items = []
+    for index in range(count):
+        domain = rng.choice(domains)
+        # Páginas repetidas: actualizaciones además de inserciones
+        page = rng.randint(0, 10)
+        emails = [f"{name}@{domain}" for name in rng.sample(['info', 'ventas', 'contacto', 'rrhh'], rng.randint(0, 3))]
+        items.append(LeadItem(
+            url=f"https://{domain}/pagina{page}",
+            domain=domain,
+            language='es',
+            emails=emails,
+            title=f"Página {page} de {domain}",
+            page_quality_score=rng.randint(0, 100),
+            word_count=rng.randint(100, 2000),
+            scraped_at=datetime(2024, 1, 1),
+            email_context={email: 'Contacto' for email in emails}
+        ))
+    return items
+
+
+def _snapshot(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        websites = sorted(
+            (w.url, w.title, w.page_quality_score, w.word_count, w.email_count, w.scrape_count)
+            for w in session.query(Website).all()
+        )
+        emails = sorted(
+            (e.website.url, e.email, e.source_page, e.quality_score, e.context)
+            for e in session.query(Email).all()
+        )
+        return websites, emails
+    finally:
+        session.close()
+
+
+def _run(items, db_path, batched, batch_size):
+    engine = create_engine(f"sqlite:///{db_path}")
+    pipeline = DatabasePipeline(batch_size=batch_size if batched else 1, flush_interval=0, db_engine=engine)
+    pipeline.open_spider(None)
+    pipeline.upsert_supported = batched
+    started = time.perf_counter()
+    for item in items:
+        pipeline.process_item(item, None)
+    pipeline.close_spider(None)
+    elapsed = time.perf_counter() - started
+    return elapsed, _snapshot(engine)
+
+
+def run_benchmark(item_count=2000, batch_size=100):
+    """Ejecuta ambos modos y muestra el rendimiento de cada uno."""
+    logging.getLogger('app.scraper.pipelines').setLevel(logging.WARNING)
+
+    items = _make_items(item_count)
+    tmp_dir = tempfile.mkdtemp(prefix='bench_database_pipeline_')
+
+    print("🗄️ Benchmark de DatabasePipeline")
+    print("=" * 50)
+
+    legacy_elapsed, legacy_rows = _run(items, os.path.join(tmp_dir, 'legacy.db'), False, batch_size)
+    print(f"   Item a item: {item_count} items en {legacy_elapsed:7.2f}s -> {item_count / legacy_elapsed:9.1f} items/s")
+
+    batched_elapsed, batched_rows = _run(items, os.path.join(tmp_dir, 'batched.db'), True, batch_size)
+    print(f"   En lote:     {item_count} items en {batched_elapsed:7.2f}s -> {item_count / batched_elapsed:9.1f} items/s "
+          f"(lotes de {batch_size})")
+
+    print(f"   Mejora: x{legacy_elapsed / batched_elapsed:.1f}")
+    print(f"   Sitios: {len(batched_rows[0])}, emails: {len(batched_rows[1])}")
+    print(f"   Contenido idéntico: {'sí' if legacy_rows == batched_rows else 'NO'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.items, args.batch_size)
@@ -0,0 +1,135 @@
+"""
+Benchmark del circuit breaker persistente: coste de un host caído en jobs sucesivos.
+
+Levanta un host HTTP local que responde siempre 503 con cierta latencia y lanza
+varios jobs seguidos con semillas en ese host:
+
+- sin ``DomainHealthMiddleware`` (implementación anterior: cada job gasta sus
+  reintentos en el host), y
+- con el circuit breaker persistente (``DOMAIN_HEALTH_PERSISTENT``), que abre el
+  circuito en el primer job y lo comparte con los siguientes.
+
+Muestra por job las peticiones que llegan al host y el tiempo hasta terminar.
+
+Uso:
+    cd backend && python tests/bench_domain_health.py [--jobs N] [--urls N] [--latency S]
+"""
+
+import argparse
+import sys
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+
+def _handler_for(latency):
+    """Handler de un host caído que responde 503 tras ``latency`` segundos."""
+
+    class _DeadHostHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        hits = 0
+
+        def do_GET(self):
+            with type(self).lock:
+                type(self).hits += 1
+            time.sleep(latency)
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return _DeadHostHandler
+
+
+class BenchSpider(scrapy.Spider):
+    """Spider mínimo con ``urls`` semillas en el host caído."""
+
+    name = 'bench_domain_health'
+
+    def __init__(self, base=None, urls=20, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base = base
+        self.urls = urls
+
+    def start_requests(self):
+        for index in range(self.urls):
+            yield scrapy.Request(f'{self.base}/p/{index}', callback=self.parse)
+
+    def parse(self, response):
+        pass
+
+
+def run_benchmark(jobs=3, urls=20, latency=0.2):
+    """Lanza ``jobs`` jobs seguidos contra el host caído con y sin circuit breaker."""
+    os.environ['DOMAIN_HEALTH_FILE'] = os.path.join(tempfile.mkdtemp(prefix='bench_health_'), 'leads.db.health')
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    handler = _handler_for(latency)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    results = {}
+
+    def settings_for(breaker):
+        middlewares = {
+            'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+            'app.scraper.middlewares.ErrorHandlingMiddleware': 430,
+        }
+        if breaker:
+            middlewares['app.scraper.middlewares.DomainHealthMiddleware'] = 405
+        return {
+            'ROBOTSTXT_OBEY': False,
+            'LOG_LEVEL': 'CRITICAL',
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
+            'TELNETCONSOLE_ENABLED': False,
+            'RETRY_TIMES': 3,
+            'RETRY_HTTP_CODES': [503],
+            'DOMAIN_HEALTH_PERSISTENT': True,
+            'DOWNLOADER_MIDDLEWARES': middlewares,
+        }
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, breaker in [('sin circuit breaker (anterior)', False), ('circuit breaker persistente (actual)', True)]:
+            runs = []
+            for _ in range(jobs):
+                handler.hits = 0
+                runner = CrawlerRunner(settings_for(breaker))
+                started = time.perf_counter()
+                yield runner.crawl(BenchSpider, base=base, urls=urls)
+                runs.append((handler.hits, time.perf_counter() - started))
+            results[label] = runs
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+
+    print("🔌 Benchmark de circuit breaker persistente")
+    print("=" * 70)
+    print(f"   {jobs} jobs seguidos, {urls} URLs por job, host caído (503 tras {latency * 1000:.0f} ms)")
+    for label, runs in results.items():
+        print(f"\n   {label}:")
+        for index, (hits, elapsed) in enumerate(runs, 1):
+            print(f"     job {index}: {hits:>4} peticiones al host en {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=3)
+    parser.add_argument('--urls', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+    run_benchmark(args.jobs, args.urls, args.latency)
@@ -0,0 +1,181 @@
+"""
+Benchmark de extracción de emails: método multi-patrón anterior vs. extractor de una sola pasada.
+
+Uso:
+    cd backend && python tests/bench_email_extraction.py [--pages N] [--size KB]
+"""
+
+import argparse
+import random
+import re
+import string
+import sys
+import os
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.email_extractor import extract_emails
+
+_EMAIL = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}'
+
+# Patrones del método LeadSpider.extract_emails_advanced original (referencia)
+LEGACY_PATTERNS = [
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{3,}\b',
+] + [
+    rf'mailto:({_EMAIL})', rf'email:\s*({_EMAIL})', rf'correo:\s*({_EMAIL})',
+    rf'e-mail:\s*({_EMAIL})', rf'contact:\s*({_EMAIL})', rf'contacto:\s*({_EMAIL})',
+] + [
+    rf'{prefix}@\w+\.\w+' for prefix in (
+        'info', 'contact', 'support', 'sales', 'admin', 'hello', 'hi', 'team',
+        'help', 'service', 'business', 'inquiry', 'feedback'
+    )
+]
+
+LEGACY_OBFUSCATED_PATTERNS = [
+    r'([A-Za-z0-9._%+-]+)\s*@\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*\[at\]\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*\(at\)\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*@\s*s\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*@\s*NOSPAM\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*@\s*no\s*spam\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+    r'([A-Za-z0-9._%+-]+)\s*@\s*remove\s*me\s*([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+]
+
+LEGACY_TAIL_PATTERNS = [
+    (rf'["\']({_EMAIL})["\']', re.IGNORECASE),
+    (r'\\u0040', re.IGNORECASE),
+    (r'\\x40', re.IGNORECASE),
+    (rf'value\s*=\s*["\']({_EMAIL})["\']', re.IGNORECASE),
+    (rf'placeholder\s*=\s*["\']({_EMAIL})["\']', re.IGNORECASE),
+    (rf'<!--.*?({_EMAIL}).*?-->', re.IGNORECASE | re.DOTALL),
+    (rf'<meta.*?content\s*=\s*["\']({_EMAIL})["\']', re.IGNORECASE | re.DOTALL),
+]
+
+
+def legacy_extract_emails(text):
+    """Reproduce el método anterior: ~40 pasadas de re.findall más validación."""
+    if not text:
+        return []
+    text = str(text)
+    emails = set()
+
+    for pattern in LEGACY_PATTERNS:
+        emails.update(re.findall(pattern, text, re.IGNORECASE))
+
+    for pattern in LEGACY_OBFUSCATED_PATTERNS:
+        for user, domain in re.findall(pattern, text, re.IGNORECASE):
+            emails.add(f"{user}@{domain}")
+
+    for pattern, flags in LEGACY_TAIL_PATTERNS:
+        for match in re.findall(pattern, text, flags):
+            if '@' in match:
+                emails.add(match)
+
+    valid_emails = []
+    for email in emails:
+        email = email.strip().lower()
+        if len(email) <= 254 and re.match(rf'^{_EMAIL}$', email, re.IGNORECASE):
+            valid_emails.append(email)
+    return valid_emails
+
+
+def is_legacy_artifact(email, current):
+    """
+    Indica si un email del método anterior es un artefacto de sus patrones.
+
+    - El patrón "@ s" recortaba la 's' inicial del dominio (user@sdominio.com -> user@dominio.com)
+    - El patrón de TLD largo truncaba dominios compuestos (user@dominio.com.mx -> user@dominio.com)
+    """
+    user, domain = email.split('@', 1)
+    if f"{user}@s{domain}" in current:
+        return True
+    return any(other.startswith(f"{email}.") for other in current)
+
+
+def _random_word(rng, min_len=3, max_len=10):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len)))
+
+
+def build_page(rng, size_kb):
+    """Genera una página HTML sintética con emails en distintos formatos."""
+    email_templates = [
+        '<a href="mailto:{u}@{d}.com">Escríbenos</a>',
+        '<p>Email: {u}@{d}.es</p>',
+        '<p>{u} [at] {d}.org</p>',
+        '<p>{u} (at) {d}.net</p>',
+        '<span>{u} @ {d}.com.mx</span>',
+        '<script>var contact = "{u}@{d}.io";</script>',
+        '<input type="email" value="{u}@{d}.com">',
+        '<!-- soporte: {u}@{d}.co -->',
+        '<meta name="reply-to" content="{u}@{d}.com">',
+    ]
+    chunks = ['<html><head><title>Empresa de ejemplo</title></head><body>']
+    size = 0
+    target = size_kb * 1024
+    while size < target:
+        if rng.random() < 0.02:
+            chunk = rng.choice(email_templates).format(u=_random_word(rng), d=_random_word(rng))
+        else:
+            words = ' '.join(_random_word(rng) for _ in range(rng.randint(8, 20)))
+            chunk = f'<div class="c-{_random_word(rng, 2, 4)}"><p>{words}</p><a href="/{_random_word(rng)}">ver</a></div>'
+        chunks.append(chunk)
+        size += len(chunk)
+    chunks.append('</body></html>')
+    return '\n'.join(chunks)
+
+
+def _measure(func, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            func(page)
+    elapsed = time.perf_counter() - start
+    return (len(pages) * rounds) / elapsed
+
+
+def run_benchmark(page_count=20, size_kb=200, rounds=3, seed=42):
+    """Ejecuta el benchmark y muestra páginas/segundo y diferencias de recall."""
+    rng = random.Random(seed)
+    pages = [build_page(rng, size_kb) for _ in range(page_count)]
+
+    print("📧 Benchmark de extracción de emails")
+    print("=" * 50)
+    print(f"   Páginas: {page_count} x {size_kb} KB, rondas: {rounds}")
+
+    legacy_rate = _measure(legacy_extract_emails, pages, rounds)
+    single_pass_rate = _measure(extract_emails, pages, rounds)
+
+    print(f"   Método anterior:     {legacy_rate:10.1f} páginas/s")
+    print(f"   Una sola pasada:     {single_pass_rate:10.1f} páginas/s")
+    print(f"   Aceleración:         {single_pass_rate / legacy_rate:10.1f}x")
+
+    missing = set()
+    artifacts = set()
+    extra = set()
+    for page in pages:
+        legacy = set(legacy_extract_emails(page))
+        current = set(extract_emails(page))
+        for email in legacy - current:
+            if is_legacy_artifact(email, current):
+                artifacts.add(email)
+            else:
+                missing.add(email)
+        extra |= current - legacy
+    print(f"   Emails perdidos respecto al método anterior:   {len(missing)}")
+    print(f"   Artefactos de patrones anteriores descartados: {len(artifacts)}")
+    print(f"   Emails adicionales del nuevo extractor:        {len(extra)}")
+    for email in sorted(missing)[:10]:
+        print(f"     - {email}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--size', type=int, default=200, help='Tamaño de cada página en KB')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.size, args.rounds)
@@ -0,0 +1,112 @@
+"""
+Benchmark del planificador de revisitas por frescura.
+
+Simula ``--domains`` dominios durante ``--days`` días. Cada dominio tiene
+entre 5 y 50 páginas, una tasa real de cambio por página (de un cambio al día
+a uno cada 180 días) y una probabilidad de que una página cambiada traiga un
+email nuevo. Cada día hay capacidad para ``--capacity`` crawls de dominio:
+
+- por turnos (implementación anterior: se revisita el dominio que lleva más
+  tiempo sin rastrearse, cambie mucho o poco), y
+- con ``plan_revisits``: solo dominios caducados, por rendimiento esperado
+  estimado con el historial de visitas y cambios de cada dominio.
+
+Muestra los crawls lanzados, los crawls que no encontraron ninguna página
+cambiada, los emails nuevos encontrados y los emails por crawl.
+
+Uso:
+    cd backend && python tests/bench_freshness.py [--domains N] [--days N] [--capacity N]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.freshness import DomainStats, FreshnessEstimator
+
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _domains(count, rng):
+    return [
+        {
+            'domain': f'sitio{index}.com',
+            'pages': rng.randint(5, 50),
+            'rate': math.exp(rng.uniform(math.log(1 / 180), 0)),  # Cambios por página y día
+            'density': rng.uniform(0.02, 0.5),  # Emails nuevos por página cambiada
+        }
+        for index in range(count)
+    ]
+
+
+def _simulate(domains, days, capacity, planner, seed):
+    rng = random.Random(seed)
+    # Historial observado: primer crawl completo el día 0
+    state = {site['domain']: {'last': 0, 'visits': 0, 'changes': 0, 'emails': 0} for site in domains}
+    totals = {'crawls': 0, 'empty': 0, 'emails': 0}
+    for day in range(1, days + 1):
+        for site in planner(domains, state, day, capacity):
+            history = state[site['domain']]
+            changed_probability = 1 - math.exp(-site['rate'] * (day - history['last']))
+            changed = sum(rng.random() < changed_probability for _ in range(site['pages']))
+            emails = sum(rng.random() < site['density'] for _ in range(changed))
+            history['last'] = day
+            history['visits'] += site['pages']
+            history['changes'] += changed
+            history['emails'] += emails
+            totals['crawls'] += 1
+            totals['empty'] += changed == 0
+            totals['emails'] += emails
+    return totals
+
+
+def _round_robin(domains, state, day, capacity):
+    return sorted(domains, key=lambda site: state[site['domain']]['last'])[:capacity]
+
+
+def _freshness_planner(estimator):
+    def plan(domains, state, day, capacity):
+        now = _START + timedelta(days=day)
+        candidates = []
+        for site in domains:
+            history = state[site['domain']]
+            stats = DomainStats(site['domain'], site['pages'], history['emails'], history['visits'],
+                                history['changes'], _START, _START + timedelta(days=history['last']),
+                                f"https://{site['domain']}/", 2)
+            if not estimator.is_fresh(stats, now):
+                candidates.append((estimator.expected_yield(stats, now), site))
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [site for _, site in candidates[:capacity]]
+    return plan
+
+
+def run_benchmark(domain_count=300, days=120, capacity=40):
+    domains = _domains(domain_count, random.Random(7))
+    runs = {
+        'por turnos (anterior)': _round_robin,
+        'plan_revisits (frescura)': _freshness_planner(FreshnessEstimator(default_change_days=30.0,
+                                                                          max_staleness=0.2)),
+    }
+    print("🔁 Benchmark del planificador de revisitas")
+    print("=" * 70)
+    print(f"   {domain_count} dominios, {days} días, capacidad {capacity} crawls/día")
+    for label, planner in runs.items():
+        totals = _simulate(domains, days, capacity, planner, seed=11)
+        per_crawl = totals['emails'] / totals['crawls'] if totals['crawls'] else 0.0
+        print(f"   {label:<26} {totals['crawls']:>6} crawls ({totals['empty']:>5} sin cambios), "
+              f"{totals['emails']:>6} emails nuevos, {per_crawl:5.2f} emails/crawl")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--domains', type=int, default=300)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--capacity', type=int, default=40, help='Crawls de dominio por día')
+    args = parser.parse_args()
+    run_benchmark(args.domains, args.days, args.capacity)
@@ -0,0 +1,96 @@
+"""
+Benchmark del índice de casi-duplicados (MinHash LSH) según crece el corpus.
+
+Para cada tamaño de corpus indexa firmas de textos sintéticos y lanza
+consultas: la mitad son variantes editadas de páginas indexadas (deben
+detectarse) y la otra mitad páginas nuevas. Compara el coste por consulta del
+índice LSH con el de recorrer todas las firmas, y mide cuántas variantes se
+detectan con cada método y con el fingerprint exacto anterior.
+
+Uso:
+    cd backend && python tests/bench_near_duplicates.py [--sizes 1000,5000,20000] [--queries N]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.near_duplicates import MinHashLSH, estimate_similarity, minhash_signature
+
+_VOCABULARY = [f"palabra{index}" for index in range(20000)]
+
+
+def _text(rng, words=300):
+    return ' '.join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _near_duplicate(rng, text):
+    """Variante con ~1% de palabras cambiadas (fecha, contador de visitas...): Jaccard ~0.94."""
+    words = text.split()
+    for index in rng.sample(range(len(words)), max(1, len(words) // 100)):
+        words[index] = rng.choice(_VOCABULARY)
+    return ' '.join(words)
+
+
+def _linear_query(signatures, signature):
+    return max((estimate_similarity(signature, other) for other in signatures), default=0.0)
+
+
+def run_benchmark(sizes=(1000, 5000, 20000), queries=200, threshold=0.85):
+    """Ejecuta el benchmark para cada tamaño de corpus."""
+    print("🔍 Benchmark de casi-duplicados (MinHash LSH)")
+    print("=" * 78)
+    print(f"{'corpus':>8} {'LSH µs/consulta':>16} {'lineal µs/consulta':>19} "
+          f"{'recall LSH':>11} {'recall lineal':>14} {'recall MD5':>11}")
+
+    for size in sizes:
+        rng = random.Random(size)
+        texts = [_text(rng) for _ in range(size)]
+        signatures = [minhash_signature(text) for text in texts]
+        fingerprints = {hashlib.md5(text.encode()).hexdigest() for text in texts}
+
+        index = MinHashLSH(threshold=threshold, max_documents=size)
+        for position, signature in enumerate(signatures):
+            index.insert(str(position), signature)
+
+        duplicates = [_near_duplicate(rng, texts[rng.randrange(size)]) for _ in range(queries // 2)]
+        fresh = [_text(rng) for _ in range(queries - len(duplicates))]
+        probes = [(minhash_signature(text), text, True) for text in duplicates]
+        probes += [(minhash_signature(text), text, False) for text in fresh]
+
+        started = time.perf_counter()
+        lsh_hits = [index.query(signature)[0] >= threshold for signature, _, _ in probes]
+        lsh_cost = (time.perf_counter() - started) / len(probes) * 1e6
+
+        linear_probes = probes[:min(len(probes), 50)]
+        started = time.perf_counter()
+        linear_hits = [_linear_query(signatures, signature) >= threshold for signature, _, _ in linear_probes]
+        linear_cost = (time.perf_counter() - started) / len(linear_probes) * 1e6
+
+        expected = [is_duplicate for _, _, is_duplicate in probes]
+        exact_hits = [hashlib.md5(text.encode()).hexdigest() in fingerprints for _, text, _ in probes]
+
+        def recall(hits, expected_flags):
+            found = sum(1 for hit, flag in zip(hits, expected_flags) if hit and flag)
+            return found / max(1, sum(expected_flags))
+
+        false_positives = sum(1 for hit, flag in zip(lsh_hits, expected) if hit and not flag)
+        print(f"{size:>8} {lsh_cost:>16.1f} {linear_cost:>19.1f} "
+              f"{recall(lsh_hits, expected):>11.0%} {recall(linear_hits, expected[:len(linear_hits)]):>14.0%} "
+              f"{recall(exact_hits, expected):>11.0%}"
+              + (f"  ({false_positives} falsos positivos)" if false_positives else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,5000,20000')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=0.85)
+    args = parser.parse_args()
+    run_benchmark(tuple(int(size) for size in args.sizes.split(',')), args.queries, args.threshold)
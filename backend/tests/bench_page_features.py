@@ -0,0 +1,99 @@
+"""
+Benchmark de la extracción de características de página.
+
+Compara, sobre páginas sintéticas con un número creciente de enlaces, la
+extracción anterior del spider (varias consultas CSS sobre la respuesta,
+``response.text.split()`` para contar palabras y una consulta XPath para el
+texto visible) con ``extract_page_features``, que recorre el documento una
+sola vez. Ambos caminos calculan la firma MinHash, que no cambia.
+
+Uso:
+    cd backend && python tests/bench_page_features.py [--links 100,1000,5000] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse
+
+from app.scraper.near_duplicates import minhash_signature
+from app.scraper.page_features import extract_page_features
+
+
+def _page(links):
+    items = ''.join(
+        f'<li><a href="/producto/{index}">Producto {index}</a> <img src="/img/{index}.png"> '
+        f'descripción breve del producto número {index} con envío</li>'
+        for index in range(links)
+    )
+    return (
+        '<html><head><title>Catálogo de la empresa</title>'
+        '<meta name="description" content="Catálogo completo de productos y servicios de la empresa">'
+        '<meta name="keywords" content="catálogo, productos"><script>var x = 1;</script></head>'
+        f'<body><h1>Catálogo</h1><ul>{items}</ul><p>Contacto: info@empresa.com</p></body></html>'
+    )
+
+
+def _legacy(response):
+    """Extracción anterior: cada dato con su propia consulta sobre la respuesta."""
+    title = response.css('title::text').get()
+    description = response.css('meta[name="description"]::attr(content)').get()
+    if not description:
+        description = response.css('meta[property="og:description"]::attr(content)').get()
+    keywords = response.css('meta[name="keywords"]::attr(content)').get()
+    # _calculate_contact_score y _calculate_page_quality_score volvían a consultar
+    response.css('title::text').get()
+    response.css('meta[name="description"]::attr(content)').get()
+    response.css('meta[name="keywords"]::attr(content)').get()
+    word_count = len(response.text.split())
+    link_count = len(response.css('a::attr(href)').getall())
+    image_count = len(response.css('img::attr(src)').getall())
+    visible = ' '.join(response.xpath(
+        '//body//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::noscript)]'
+    ).getall())
+    signature = minhash_signature(visible, min_shingles=20)
+    # _extract_and_follow_links volvía a extraer los enlaces
+    links = response.css('a::attr(href)').getall()
+    return title, description, keywords, word_count, link_count, image_count, signature, links
+
+
+def _fresh(body, url='https://empresa.com/catalogo'):
+    # Respuesta nueva en cada iteración: el parseo del DOM se cachea por respuesta
+    return HtmlResponse(url=url, body=body, encoding='utf-8')
+
+
+def run_benchmark(link_counts=(100, 1000, 5000), repeat=20):
+    """Mide el tiempo por página de ambos caminos para cada tamaño."""
+    print("🧩 Benchmark de extracción de características de página")
+    print("=" * 64)
+    print(f"{'enlaces':>8} {'anterior ms/página':>19} {'una pasada ms/página':>21} {'mejora':>8}")
+
+    for links in link_counts:
+        body = _page(links).encode('utf-8')
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            legacy = _legacy(_fresh(body))
+        legacy_ms = (time.perf_counter() - started) / repeat * 1000
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            features = extract_page_features(_fresh(body))
+        features_ms = (time.perf_counter() - started) / repeat * 1000
+
+        assert legacy[0] == features.title and legacy[4] == features.link_count
+        assert legacy[6] == features.content_signature and list(features.links) == legacy[7]
+        print(f"{links:>8} {legacy_ms:>19.2f} {features_ms:>21.2f} {legacy_ms / features_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--links', default='100,1000,5000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(tuple(int(count) for count in args.links.split(',')), args.repeat)
@@ -0,0 +1,170 @@
+"""
+Benchmark de rate limiting: time.sleep en el reactor vs. delays por dominio no bloqueantes.
+
+Levanta varios servidores HTTP locales (un "dominio" por puerto), lanza un crawl
+con semillas de todos ellos y mide el throughput agregado (páginas/segundo) con
+la implementación bloqueante anterior y con el RateLimitingMiddleware actual.
+
+Uso:
+    cd backend && python tests/bench_rate_limiting.py [--domains N] [--pages N] [--delay S]
+"""
+
+import argparse
+import random
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.middlewares import RateLimitingMiddleware
+
+
+class BlockingRateLimitingMiddleware(RateLimitingMiddleware):
+    """Implementación anterior: calcula el delay y duerme dentro del reactor."""
+
+    def process_request(self, request, spider):
+        domain = self._get_domain(request.url)
+        current_time = time.time()
+        time_since_last_request = current_time - self.domain_last_request.get(domain, 0)
+
+        domain_specific_delay = self.domain_delays.get(domain, self.min_delay)
+        request_count = self.domain_request_count.get(domain, 0)
+        adaptive_delay = min(domain_specific_delay * (1 + request_count * 0.05), self.max_delay)
+        if self.randomize_delay:
+            adaptive_delay *= random.uniform(0.7, 1.3)
+        if request_count > 10:
+            adaptive_delay *= min(self.backoff_base ** (request_count // 10), 5.0)
+
+        if time_since_last_request < adaptive_delay:
+            time.sleep(adaptive_delay - time_since_last_request)
+
+        self.domain_last_request[domain] = time.time()
+        self.domain_request_count[domain] = request_count + 1
+        self.session_request_count += 1
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Sirve páginas encadenadas /p/0 -> /p/1 -> ... con algo de latencia."""
+
+    pages_per_domain = 10
+    latency = 0.02
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        try:
+            index = int(self.path.rstrip('/').split('/')[-1])
+        except ValueError:
+            index = 0
+        links = ''.join(
+            f'<a href="/p/{i}">p{i}</a>'
+            for i in range(index + 1, min(index + 4, self.pages_per_domain))
+        )
+        body = f'<html><body><p>Página {index}</p>{links}</body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchSpider(scrapy.Spider):
+    """Spider mínimo que sigue todos los enlaces de cada dominio semilla."""
+
+    name = 'bench_rate_limiting'
+
+    def __init__(self, seeds=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seeds = seeds or []
+        self.pages = 0
+
+    def start_requests(self):
+        for seed in self.seeds:
+            yield scrapy.Request(seed, callback=self.parse)
+
+    def parse(self, response):
+        self.pages += 1
+        for href in response.css('a::attr(href)').getall():
+            yield response.follow(href, callback=self.parse)
+
+
+def _start_servers(domain_count, pages_per_domain, latency):
+    _PageHandler.pages_per_domain = pages_per_domain
+    _PageHandler.latency = latency
+    servers = []
+    for _ in range(domain_count):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def run_benchmark(domain_count=8, pages_per_domain=10, delay=0.3, latency=0.02):
+    """Ejecuta ambos crawls en el mismo reactor y muestra el throughput agregado."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    servers = _start_servers(domain_count, pages_per_domain, latency)
+    seeds = [f'http://127.0.0.1:{server.server_address[1]}/p/0' for server in servers]
+    results = {}
+
+    def settings_for(middleware):
+        # El delay lo aplica solo el middleware (DOMAIN_DELAYS), no el downloader de Scrapy
+        return {
+            'ROBOTSTXT_OBEY': False,
+            'LOG_LEVEL': 'WARNING',
+            'CONCURRENT_REQUESTS': 12,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+            'DOWNLOAD_DELAY': 0,
+            'DOMAIN_DELAYS': {seed.split('/')[2]: delay for seed in seeds},
+            'RANDOMIZE_DOWNLOAD_DELAY': False,
+            'AUTOTHROTTLE_ENABLED': False,
+            'TELNETCONSOLE_ENABLED': False,
+            'DOWNLOADER_MIDDLEWARES': {f'{__name__}.{middleware.__name__}': 410},
+        }
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, middleware in [
+            ('time.sleep (anterior)', BlockingRateLimitingMiddleware),
+            ('token bucket (actual)', RateLimitingMiddleware),
+        ]:
+            runner = CrawlerRunner(settings_for(middleware))
+            crawler = runner.create_crawler(BenchSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, seeds=seeds)
+            elapsed = time.perf_counter() - started
+            results[label] = (crawler.spider.pages, elapsed)
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+
+    for server in servers:
+        server.shutdown()
+
+    print("🚦 Benchmark de rate limiting con semillas de varios dominios")
+    print("=" * 60)
+    print(f"   Dominios: {domain_count}, páginas/dominio: {pages_per_domain}, delay: {delay}s")
+    for label, (pages, elapsed) in results.items():
+        print(f"   {label:<24} {pages:4d} páginas en {elapsed:6.2f}s -> {pages / elapsed:6.1f} páginas/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--domains', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--delay', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    run_benchmark(args.domains, args.pages, args.delay, args.latency)
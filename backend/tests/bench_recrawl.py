@@ -0,0 +1,208 @@
+"""
+Benchmark del recrawl incremental: refresco de un sitio donde casi nada cambió.
+
+Levanta en un proceso aparte un sitio HTTP local de ``--sections`` secciones
+con ``--pages`` páginas cada una (unos 20 KB por página). La mitad de las
+páginas envía ``ETag`` y responde 304 a ``If-None-Match``; la otra mitad no
+tiene validadores. Tras un primer crawl que guarda todo en una base de datos
+SQLite temporal, cambia el email de un ``--changed`` de las páginas y se
+refresca el sitio con ``-a recrawl=1``:
+
+- sin GET condicional (implementación anterior: se descarga y parsea todo), y
+- con ``CONDITIONAL_GET_ENABLED`` (304 o mismo hash: ni se parsea ni pasa por
+  los pipelines; los hijos salen de la base de datos).
+
+Antes de cada refresco cambian páginas distintas. Muestra las peticiones, los
+bytes descargados, las páginas parseadas, el tiempo de CPU del crawler y los
+emails nuevos encontrados.
+
+Uso:
+    cd backend && python tests/bench_recrawl.py [--sections N] [--pages N] [--changed F]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Base de datos e índice de duplicados temporales antes de importar la aplicación
+_TMP = tempfile.mkdtemp(prefix='bench_recrawl_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP, 'leads.db')}"
+os.environ['DEDUPE_DIR'] = os.path.join(_TMP, 'dedupe')
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.database.database import SessionLocal, engine
+from app.database.models import Base, Email
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def _paths(sections, pages):
+    return ['/'] + [f'/seccion/{section}/' for section in range(sections)] + [
+        f'/seccion/{section}/pagina-{page}/' for section in range(sections) for page in range(pages)]
+
+
+def _serve(sections, pages, versions, counters, port):
+    """Proceso del sitio: cada página lleva la versión actual de su email."""
+    paths = _paths(sections, pages)
+    index = {path: position for position, path in enumerate(paths)}
+    filler = ' '.join(f'texto{word % 97}' for word in range(3000))
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path not in index:
+                self.send_error(404)
+                return
+            position = index[self.path]
+            version = versions[position]
+            etag = f'"{position}-{version}"'
+            with counters.get_lock():
+                counters[0] += 1
+            # Las páginas pares tienen ETag; las impares solo se pueden comparar por hash
+            if position % 2 == 0 and self.headers.get('If-None-Match') == etag:
+                with counters.get_lock():
+                    counters[2] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if self.path == '/':
+                links = [f'/seccion/{section}/' for section in range(sections)]
+            elif self.path.count('/') == 3:
+                section = self.path.split('/')[2]
+                links = [f'/seccion/{section}/pagina-{page}/' for page in range(pages)]
+            else:
+                links = []
+            anchors = ''.join(f'<a href="{href}">{href}</a>' for href in links)
+            body = (f'<html><head><title>Tienda {self.path}</title></head><body>'
+                    f'<p>Contacto: equipo{position}v{version}@tienda.com</p><main>{anchors}</main>'
+                    f'<p>{filler}</p></body></html>').encode()
+            with counters.get_lock():
+                counters[1] += len(body)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if position % 2 == 0:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SiteHandler)
+    server.daemon_threads = True
+    port.value = server.server_address[1]
+    server.serve_forever()
+
+
+def _email_count():
+    db = SessionLocal()
+    try:
+        return db.query(Email).count()
+    finally:
+        db.close()
+
+
+def run_benchmark(sections=20, pages=15, changed=0.1):
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    Base.metadata.create_all(bind=engine)
+    total = len(_paths(sections, pages))
+    context = multiprocessing.get_context('fork')
+    versions = context.Array('i', total)
+    # Peticiones, bytes de cuerpo enviados y respuestas 304
+    counters = context.Array('q', 3)
+    port = context.Value('i', 0)
+    server = context.Process(target=_serve, args=(sections, pages, versions, counters, port), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.05)
+    start_url = f'http://127.0.0.1:{port.value}/'
+    rng = random.Random(7)
+    results = {}
+
+    def _settings(conditional):
+        return {
+            'ROBOTSTXT_OBEY': False,
+            'LOG_LEVEL': 'CRITICAL',
+            'TELNETCONSOLE_ENABLED': False,
+            'CONCURRENT_REQUESTS': 12,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 12,
+            'CONDITIONAL_GET_ENABLED': conditional,
+            # Cada descarga queda registrada: de ahí salen los hijos de las páginas sin cambios
+            'CRAWL_LOG_ENABLED': True,
+            # Las páginas de las secciones comparten plantilla de URL: sin presupuesto de trampas
+            'TRAP_DETECTION_ENABLED': False,
+            'DOWNLOADER_MIDDLEWARES': {'app.scraper.recrawl.ConditionalGetMiddleware': 290},
+            'ITEM_PIPELINES': {'app.scraper.pipelines.DatabasePipeline': 300},
+            # El sitio local lleva puerto, que OffsiteMiddleware no admite en allowed_domains
+            # (el spider ya filtra los enlaces por host)
+            'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+        }
+
+    def _change_pages():
+        for position in rng.sample(range(total), max(1, int(total * changed))):
+            versions[position] += 1
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        runs = [('primer crawl', False, False), ('refresco sin GET condicional (anterior)', False, True),
+                ('refresco con GET condicional', True, True)]
+        for label, conditional, refresh in runs:
+            if refresh:
+                _change_pages()
+            for position in range(3):
+                counters[position] = 0
+            emails = _email_count()
+            runner = CrawlerRunner(_settings(conditional))
+            crawler = runner.create_crawler(LeadSpider)
+            cpu, started = time.process_time(), time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url, depth=2, recrawl='1' if refresh else '0')
+            stats = crawler.stats
+            results[label] = {
+                'requests': counters[0],
+                'bytes': counters[1],
+                'not_modified': counters[2],
+                'parsed': stats.get_value('item_scraped_count', 0),
+                'cpu': time.process_time() - cpu,
+                'elapsed': time.perf_counter() - started,
+                'new_emails': _email_count() - emails,
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(lambda: crawl_all().addErrback(lambda f: (print(f.getTraceback()), reactor.stop())))
+    reactor.run()
+    server.terminate()
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+    print("🔁 Benchmark del recrawl incremental")
+    print("=" * 70)
+    print(f"   {total} páginas de ~20 KB (la mitad con ETag), {changed:.0%} cambian antes de cada refresco")
+    for label, run in results.items():
+        print(f"   {label:<41} {run['requests']:>4} peticiones ({run['not_modified']:>3} 304), "
+              f"{run['bytes'] / 1024:7.0f} KB, {run['parsed']:>4} parseadas, CPU {run['cpu']:5.2f}s, "
+              f"{run['elapsed']:5.2f}s, {run['new_emails']:>3} emails nuevos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sections', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=15, help='Páginas por sección')
+    parser.add_argument('--changed', type=float, default=0.1, help='Fracción de páginas que cambian')
+    args = parser.parse_args()
+    run_benchmark(args.sections, args.pages, args.changed)
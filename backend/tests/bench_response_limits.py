@@ -0,0 +1,164 @@
+"""
+Benchmark del corte temprano de descargas: cuerpo completo vs. ResponseLimitsExtension.
+
+Levanta un sitio HTTP local cuyas páginas enlazan, con URLs de aspecto normal,
+a PDFs y vídeos grandes y a páginas HTML enormes (sin Content-Length). Se
+crawlea con la validación del spider (solo HTML) con la extensión desactivada
+(implementación anterior: se descarga todo y se descarta después) y activada,
+y se muestran los bytes descargados, el tiempo y las páginas procesadas.
+
+Uso:
+    cd backend && python tests/bench_response_limits.py [--pages N] [--media-mb N]
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+_CHUNK = b'x' * 65536
+
+
+def _handler_for(pages, media_bytes):
+    """Sitio simulado: /p/N HTML pequeño, /doc/N PDF, /video/N vídeo y /big/N HTML enorme."""
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            kind, _, index = self.path.strip('/').partition('/')
+            if kind == 'p':
+                index = int(index)
+                links = ''.join(
+                    f'<a href="/{target}/{index}">{target}</a>' for target in ('doc', 'video', 'big')
+                ) + (f'<a href="/p/{index + 1}">siguiente</a>' if index + 1 < pages else '')
+                body = (f'<html><body><p>Contacto: info{index}@tienda.com</p>{links}'
+                        f'<p>{"texto " * 50}</p></body></html>').encode()
+                self._send(200, 'text/html; charset=utf-8', body)
+            elif kind in ('doc', 'video'):
+                content_type = 'application/pdf' if kind == 'doc' else 'video/mp4'
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(media_bytes))
+                self.end_headers()
+                self._stream(media_bytes)
+            else:
+                # HTML enorme sin Content-Length: solo el tope de lectura lo corta
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.wfile.write(b'<html><body><p>Contacto: ventas@tienda.com</p>')
+                self._stream(media_bytes)
+                self.close_connection = True
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, size):
+            try:
+                while size > 0:
+                    chunk = _CHUNK[:size]
+                    self.wfile.write(chunk)
+                    size -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # El crawler ha cortado la descarga
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return _SiteHandler
+
+
+class BenchSpider(scrapy.Spider):
+    """Spider mínimo con la misma validación de respuestas que LeadSpider."""
+
+    name = 'bench_response_limits'
+
+    def __init__(self, start_url=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.start_url = start_url
+        self.processed = 0
+
+    def start_requests(self):
+        yield scrapy.Request(self.start_url, callback=self.parse)
+
+    def parse(self, response):
+        content_type = response.headers.get('Content-Type', b'').decode('utf-8').lower()
+        if 'text/html' not in content_type or len(response.body) < 100:
+            return
+        self.processed += 1
+        for href in response.css('a::attr(href)').getall():
+            yield response.follow(href, callback=self.parse)
+
+
+def run_benchmark(pages=20, media_mb=8):
+    """Crawlea el sitio simulado con y sin el corte temprano."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_for(pages, media_mb * 1024 * 1024))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{server.server_address[1]}/p/0'
+    results = {}
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, enabled in [('cuerpo completo (anterior)', False), ('corte temprano (actual)', True)]:
+            runner = CrawlerRunner({
+                'ROBOTSTXT_OBEY': False,
+                'LOG_LEVEL': 'CRITICAL',
+                'TELNETCONSOLE_ENABLED': False,
+                'DOWNLOAD_MAXSIZE': 64 * 1024 * 1024,
+                'DOWNLOAD_WARNSIZE': 0,
+                'EXTENSIONS': {'app.scraper.response_limits.ResponseLimitsExtension': 510} if enabled else {},
+                'RESPONSE_MAX_CONTENT_LENGTH': 2 * 1024 * 1024,
+                'RESPONSE_STREAM_CAP': 512 * 1024,
+            })
+            crawler = runner.create_crawler(BenchSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url)
+            results[label] = {
+                'elapsed': time.perf_counter() - started,
+                'bytes': crawler.stats.get_value('downloader/response_bytes', 0),
+                'responses': crawler.stats.get_value('downloader/response_count', 0),
+                'processed': crawler.spider.processed,
+                'aborted': sum(crawler.stats.get_value(f'response_limits/{key}', 0)
+                               for key in ('aborted_content_type', 'aborted_content_length', 'truncated')),
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+
+    print("✂️ Benchmark de corte temprano de descargas")
+    print("=" * 70)
+    print(f"   {pages} páginas HTML, cada una enlaza a un PDF, un vídeo y un HTML de {media_mb} MB")
+    for label, result in results.items():
+        print(f"   {label:<28} {result['bytes'] / 1024 / 1024:8.1f} MB descargados en {result['elapsed']:6.2f}s, "
+              f"{result['responses']} respuestas, {result['processed']} páginas HTML procesadas, "
+              f"{result['aborted']} cortadas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--media-mb', type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.media_mb)
@@ -0,0 +1,105 @@
+"""
+Benchmark del motor de reglas compiladas.
+
+Compara el filtrado de los enlaces de una página contra una familia de
+patrones recorriendo la lista con ``re.search`` (como hacían el spider y los
+pipelines) con una única expresión compilada (``app/scraper/rules.py``), para
+``BLOCKED_URL_PATTERNS``, ``SPAM_URL_PATTERNS`` y las palabras clave de
+``page_features`` (tipo de contenido, negocio y contacto). Comprueba que ambos caminos dan el mismo resultado.
+
+Uso:
+    cd backend && python tests/bench_rules.py [--links 1000,5000,20000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper import settings as scraper_settings
+from app.scraper.page_features import (
+    CONTACT_KEYWORDS, CONTENT_TYPE_KEYWORDS, DEFAULT_BUSINESS_KEYWORDS, DEFAULT_VOCABULARY
+)
+from app.scraper.rules import compile_keywords, compile_patterns
+
+_SEGMENTS = ['productos', 'servicios', 'blog', 'equipo', 'contacto', 'catalogo', 'noticias',
+             'empresa', 'clientes', 'proyectos', 'login', 'test', 'ficha.pdf', 'user']
+
+
+def _links(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        f"https://empresa{rng.randint(0, 50)}.com/" + '/'.join(rng.choice(_SEGMENTS) for _ in range(rng.randint(1, 4)))
+        + (f"?id={rng.randint(0, 10000)}" if rng.random() < 0.3 else '')
+        for _ in range(count)
+    ]
+
+
+def _loop(patterns, texts, flags):
+    return [any(re.search(pattern, text, flags) for pattern in patterns) for text in texts]
+
+
+def _legacy_keywords(text):
+    """Las tres familias como las recorrían el spider y ContentValidationPipeline."""
+    content_type = 'unknown'
+    for candidate, keywords in CONTENT_TYPE_KEYWORDS:
+        if any(re.search(keyword, text) for keyword in keywords):
+            content_type = candidate
+            break
+    business = [keyword for keyword in DEFAULT_BUSINESS_KEYWORDS if keyword.lower() in text]
+    contact = sum(1 for keyword in CONTACT_KEYWORDS if keyword in text)
+    return content_type, business, contact
+
+
+def _compiled_keywords(text, rules=compile_keywords(DEFAULT_VOCABULARY, ignore_case=False)):
+    """Una búsqueda con la familia compilada y las tres respuestas a partir de ella."""
+    hits = rules.find_all(text)
+    content_type = next((candidate for candidate, keywords in CONTENT_TYPE_KEYWORDS
+                         if not hits.isdisjoint(keywords)), 'unknown')
+    business = [keyword for keyword in DEFAULT_BUSINESS_KEYWORDS if keyword in hits]
+    return content_type, business, len(hits.intersection(CONTACT_KEYWORDS))
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run_benchmark(link_counts=(1000, 5000, 20000)):
+    """Mide el coste por página de cada familia con ambos caminos."""
+    print("🧮 Benchmark del motor de reglas")
+    print("=" * 70)
+    print(f"{'familia':<22} {'enlaces':>8} {'bucle ms':>10} {'compilado ms':>13} {'mejora':>8}")
+
+    families = [
+        ('BLOCKED_URL_PATTERNS', scraper_settings.BLOCKED_URL_PATTERNS, 0),
+        ('SPAM_URL_PATTERNS', scraper_settings.SPAM_URL_PATTERNS, re.IGNORECASE),
+    ]
+    for count in link_counts:
+        links = _links(count)
+        lowered = [link.lower() for link in links]
+        for name, patterns, flags in families:
+            expected, loop_ms = _timed(lambda: _loop(patterns, lowered, flags))
+            rules = compile_patterns(patterns, flags)
+            result, rules_ms = _timed(lambda: [rules.search(link) is not None for link in lowered])
+            assert result == expected
+            print(f"{name:<22} {count:>8} {loop_ms:>10.1f} {rules_ms:>13.1f} {loop_ms / rules_ms:>7.1f}x")
+
+        # Palabras clave de negocio, contacto y tipo de contenido en título+descripción+URL
+        summaries = [f"catálogo de productos y servicios de la empresa {link}" for link in lowered]
+        expected, loop_ms = _timed(lambda: [_legacy_keywords(summary) for summary in summaries])
+        result, rules_ms = _timed(lambda: [_compiled_keywords(summary) for summary in summaries])
+        assert result == expected
+        print(f"{'palabras clave':<22} {count:>8} {loop_ms:>10.1f} {rules_ms:>13.1f} {loop_ms / rules_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--links', default='1000,5000,20000')
+    args = parser.parse_args()
+    run_benchmark(tuple(int(count) for count in args.links.split(',')))
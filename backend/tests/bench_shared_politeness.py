@@ -0,0 +1,93 @@
+"""
+Benchmark de cortesía entre procesos: token buckets locales vs. tabla compartida.
+
+Lanza N procesos (como N jobs en workers distintos) que despachan peticiones al
+mismo host durante unos segundos respetando el delay configurado con:
+
+- un ``DomainDelayScheduler`` local por proceso (implementación anterior), y
+- un ``SharedDomainDelayScheduler`` sobre la misma ``SharedBucketTable``,
+
+y muestra el ritmo real que recibe el host frente al configurado, además del
+coste de cada ``reserve()``.
+
+Uso:
+    cd backend && python tests/bench_shared_politeness.py [--processes N] [--delay S] [--seconds S]
+"""
+
+import argparse
+import multiprocessing
+import sys
+import os
+import tempfile
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.domain_scheduler import DomainDelayScheduler
+from app.scraper.politeness import SharedBucketTable, SharedDomainDelayScheduler
+
+
+def _dispatch(path, delay, seconds, start_at, queue):
+    """Proceso job: despacha peticiones al host respetando el planificador."""
+    if path:
+        scheduler = SharedDomainDelayScheduler(SharedBucketTable(path))
+    else:
+        scheduler = DomainDelayScheduler(clock=time.time)
+    time.sleep(max(0.0, start_at - time.time()))
+    sent = []
+    while time.time() < start_at + seconds:
+        wait = scheduler.reserve('tienda.com', delay)
+        if wait:
+            time.sleep(wait)
+        sent.append(time.time())
+    queue.put(sent)
+
+
+def _run(path, processes, delay, seconds):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    start_at = time.time() + 2.0
+    workers = [context.Process(target=_dispatch, args=(path, delay, seconds, start_at, queue))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    sent = [timestamp for _ in workers for timestamp in queue.get()]
+    for worker in workers:
+        worker.join()
+    sent = [timestamp for timestamp in sent if timestamp < start_at + seconds]
+    return len(sent) / seconds
+
+
+def _reserve_cost(scheduler, calls=100000):
+    hosts = [f'host{index}.com' for index in range(1000)]
+    started = time.perf_counter()
+    for index in range(calls):
+        scheduler.reserve(hosts[index % 1000], 0.001)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def run_benchmark(processes=5, delay=0.1, seconds=5.0):
+    """Mide el ritmo que recibe un host con N jobs en paralelo."""
+    directory = tempfile.mkdtemp(prefix='bench_politeness_')
+    path = os.path.join(directory, 'leads.db.politeness')
+
+    print("🤝 Benchmark de cortesía entre procesos")
+    print("=" * 70)
+    print(f"   {processes} procesos, delay configurado {delay}s -> {1 / delay:.1f} peticiones/s al host")
+    for label, table_path in [('buckets locales (anterior)', None), ('tabla compartida (actual)', path)]:
+        rate = _run(table_path, processes, delay, seconds)
+        print(f"   {label:<28} {rate:6.1f} peticiones/s ({rate * delay:.2f}x el configurado)")
+
+    local = _reserve_cost(DomainDelayScheduler(clock=time.time))
+    shared = _reserve_cost(SharedDomainDelayScheduler(SharedBucketTable(path)))
+    print(f"\n   reserve(): local {local:.2f} µs, compartido {shared:.2f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=5)
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    run_benchmark(args.processes, args.delay, args.seconds)
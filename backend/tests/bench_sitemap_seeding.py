@@ -0,0 +1,221 @@
+"""
+Benchmark del descubrimiento por sitemaps: peticiones hasta la página de contacto.
+
+Levanta un sitio HTTP local (con latencia) cuya página de contacto, la única
+con email, está a tres niveles de la portada: portada -> una de las
+colecciones -> empresa -> contacto, y cada colección enlaza además a diez
+productos. robots.txt declara
+un índice de sitemaps que apunta a un sitemap ``.xml.gz`` con todas las
+páginas. Se crawlea con ``LeadSpider`` con la configuración del proyecto
+(``DEPTH_PRIORITY = 1``, frontera de contacto y ``ResponseLimitsExtension``):
+
+- solo siguiendo enlaces (implementación anterior), y
+- con ``SITEMAP_SEEDING_ENABLED``.
+
+Muestra en qué petición al sitio llega el email de contacto y las peticiones
+totales. Después compara la memoria de parsear un sitemap de 50.000 URLs con
+``iter_sitemap`` (streaming) y con ``etree.fromstring`` (árbol completo).
+
+Uso:
+    cd backend && python tests/bench_sitemap_seeding.py [--collections N] [--sitemap-urls N] [--latency S]
+"""
+
+import argparse
+import gzip
+import multiprocessing
+import resource
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.sitemaps import iter_sitemap
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _urlset(paths, host=''):
+    entries = ''.join(f'<url><loc>{host}{path}</loc></url>' for path in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {_NS}>{entries}</urlset>'.encode()
+
+
+def _site_pages(collections):
+    """Ruta -> enlaces de cada página: colecciones, productos y la empresa enlazada desde una colección."""
+    middle = collections // 2
+    pages = {'/': [(f'/coleccion/{index}/', f'Colección {index}') for index in range(collections)]}
+    for index in range(collections):
+        links = [(f'/producto/{index}-{product}/', f'Producto {product}') for product in range(10)]
+        if index == middle:
+            links.insert(5, ('/empresa/', 'La empresa'))
+        pages[f'/coleccion/{index}/'] = links
+        for product in range(10):
+            pages[f'/producto/{index}-{product}/'] = [(f'/coleccion/{index}/', 'Volver')]
+    pages['/empresa/'] = [('/empresa/contacto/', 'Contacto')]
+    pages['/empresa/contacto/'] = []
+    return pages
+
+
+def _handler_for(collections, latency):
+    """Sitio simulado: contacto a tres niveles de la portada, detrás de una de las colecciones."""
+    pages = _site_pages(collections)
+
+    class _SiteHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        hits = 0
+        found_at = None
+
+        def _send(self, body, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with type(self).lock:
+                type(self).hits += 1
+                hit = type(self).hits
+            time.sleep(latency)
+            host = f'http://{self.headers["Host"]}'
+            if self.path == '/robots.txt':
+                return self._send(f'User-agent: *\nDisallow:\nSitemap: {host}/sitemap_index.xml\n'.encode(),
+                                  'text/plain')
+            if self.path == '/sitemap_index.xml':
+                return self._send(f'<sitemapindex {_NS}><sitemap><loc>{host}/sitemap-pages.xml.gz</loc>'
+                                  f'</sitemap></sitemapindex>'.encode(), 'application/xml')
+            if self.path == '/sitemap-pages.xml.gz':
+                return self._send(gzip.compress(_urlset(pages, host)), 'application/x-gzip')
+            if self.path not in pages:
+                self.send_error(404)
+                return
+
+            email = ''
+            if self.path == '/empresa/contacto/':
+                email = 'ventas@tienda.com'
+                type(self).found_at = type(self).found_at or hit
+            anchors = ''.join(f'<a href="{href}">{text}</a>' for href, text in pages[self.path])
+            contact = f'<p>Escríbenos: {email}</p>' if email else ''
+            self._send((f'<html><head><title>Tienda {self.path}</title></head><body>{contact}'
+                        f'<main>{anchors}</main><p>{"texto " * 40}</p></body></html>').encode(),
+                       'text/html; charset=utf-8')
+
+        def log_message(self, format, *args):
+            pass
+
+    return _SiteHandler
+
+
+def crawl_benchmark(collections, depth, latency):
+    """Crawlea el sitio simulado sin y con descubrimiento por sitemaps."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    handler = _handler_for(collections, latency)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    results = {}
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, enabled in [('solo enlaces (anterior)', False), ('con sitemaps', True)]:
+            handler.hits = 0
+            handler.found_at = None
+            runner = CrawlerRunner({
+                'ROBOTSTXT_OBEY': False,
+                'LOG_LEVEL': 'CRITICAL',
+                'TELNETCONSOLE_ENABLED': False,
+                'CONCURRENT_REQUESTS': 12,
+                'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+                'DEPTH_PRIORITY': 1,
+                'DEDUPE_PERSISTENT': False,
+                'EXTENSIONS': {'app.scraper.response_limits.ResponseLimitsExtension': 500},
+                'SITEMAP_SEEDING_ENABLED': enabled,
+                # El sitio local lleva puerto, que OffsiteMiddleware no admite en allowed_domains
+                # (el spider ya filtra los enlaces por host)
+                'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+            })
+            crawler = runner.create_crawler(LeadSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url, depth=depth)
+            results[label] = (handler.found_at, handler.hits, time.perf_counter() - started,
+                              crawler.stats.get_value('sitemap/seeded', 0))
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+    return results
+
+
+def _measure(parse, body, queue):
+    """Proceso hijo: crecimiento del RSS máximo y tiempo de un parseo."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    count = parse(body)
+    elapsed = time.perf_counter() - started
+    queue.put((count, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before, elapsed))
+
+
+def _full_tree(body):
+    root = etree.fromstring(gzip.decompress(body))
+    return len(root.findall('.//{*}loc'))
+
+
+def _streaming(body):
+    return sum(1 for _ in iter_sitemap(body))
+
+
+def memory_benchmark(urls):
+    """
+    Memoria al leer un sitemap grande en streaming y como árbol completo.
+
+    Cada parseo corre en un proceso hijo y se mide el crecimiento de su RSS máximo
+    (tracemalloc no ve la memoria de libxml2).
+    """
+    body = gzip.compress(_urlset([f'/producto/{index}/' for index in range(urls)], 'https://tienda.com'))
+    context = multiprocessing.get_context('fork')
+    results = {}
+    for label, parse in [('árbol completo (fromstring)', _full_tree), ('streaming (iter_sitemap)', _streaming)]:
+        queue = context.Queue()
+        process = context.Process(target=_measure, args=(parse, body, queue))
+        process.start()
+        results[label] = queue.get()
+        process.join()
+    return len(body), results
+
+
+def run_benchmark(collections=12, depth=3, sitemap_urls=50000, latency=0.02):
+    results = crawl_benchmark(collections, depth, latency)
+    compressed, memory = memory_benchmark(sitemap_urls)
+
+    print("🗺️ Benchmark de descubrimiento por sitemaps")
+    print("=" * 70)
+    print(f"   Contacto a 3 niveles de la portada detrás de 1 de {collections} colecciones de 10 productos, "
+          f"profundidad {depth}")
+    for label, (found_at, total, elapsed, seeded) in results.items():
+        print(f"   {label:<26} email en la petición {found_at!s:>4}, {total:>4} peticiones, "
+              f"{seeded} semillas, {elapsed:5.2f}s")
+    print(f"   Sitemap de {sitemap_urls} URLs ({compressed / 1024:.0f} KB comprimido)")
+    for label, (count, peak_kb, elapsed) in memory.items():
+        print(f"   {label:<30} {count} URLs, +{peak_kb / 1024:6.1f} MB de RSS máximo en {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--collections', type=int, default=12)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--sitemap-urls', type=int, default=50000)
+    parser.add_argument('--latency', type=float, default=0.02, help='Segundos de respuesta del servidor')
+    args = parser.parse_args()
+    run_benchmark(args.collections, args.depth, args.sitemap_urls, args.latency)
@@ -0,0 +1,166 @@
+"""
+Benchmark de un dominio lento entre muchos rápidos: espera en el downloader vs. en la cola del scheduler.
+
+Levanta un servidor HTTP local lento (delay alto por dominio) y varios rápidos
+(un "dominio" por puerto). Las semillas del dominio lento salen primero. Con la
+espera dentro de ``RateLimitingMiddleware`` (cola por defecto de Scrapy) esas
+peticiones ocupan los huecos de ``CONCURRENT_REQUESTS`` mientras esperan su
+turno; con ``DomainReadyPriorityQueue`` esperan en el scheduler y los dominios
+rápidos siguen descargando. Se mide cuándo termina el último dominio rápido.
+
+Uso:
+    cd backend && python tests/bench_slow_domain.py [--fast-domains N] [--slow-pages N] [--slow-delay S]
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Sirve páginas encadenadas /p/0 -> /p/1 -> ... con algo de latencia."""
+
+    pages_per_domain = 10
+    latency = 0.02
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        try:
+            index = int(self.path.rstrip('/').split('/')[-1])
+        except ValueError:
+            index = 0
+        links = ''.join(
+            f'<a href="/p/{i}">p{i}</a>'
+            for i in range(index + 1, min(index + 4, self.pages_per_domain))
+        )
+        body = f'<html><body><p>Página {index}</p>{links}</body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchSpider(scrapy.Spider):
+    """Pide todas las páginas del dominio lento y sigue los enlaces de los rápidos."""
+
+    name = 'bench_slow_domain'
+
+    def __init__(self, slow_urls=None, fast_seeds=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slow_urls = slow_urls or []
+        self.fast_seeds = fast_seeds or []
+        self.started = time.perf_counter()
+        self.fast_pages = 0
+        self.fast_done_at = 0.0
+        self.slow_pages = 0
+
+    def start_requests(self):
+        for url in self.slow_urls:
+            yield scrapy.Request(url, callback=self.parse_slow)
+        for seed in self.fast_seeds:
+            yield scrapy.Request(seed, callback=self.parse)
+
+    def parse_slow(self, response):
+        self.slow_pages += 1
+
+    def parse(self, response):
+        self.fast_pages += 1
+        self.fast_done_at = time.perf_counter() - self.started
+        for href in response.css('a::attr(href)').getall():
+            yield response.follow(href, callback=self.parse)
+
+
+def _start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_benchmark(fast_domains=12, pages_per_domain=10, slow_pages=24, slow_delay=1.0,
+                  fast_delay=0.05, latency=0.02):
+    """Ejecuta ambos crawls en el mismo reactor y muestra cuándo acaban los dominios rápidos."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    _PageHandler.pages_per_domain = pages_per_domain
+    _PageHandler.latency = latency
+    slow_server = _start_server()
+    fast_servers = [_start_server() for _ in range(fast_domains)]
+    slow_netloc = f'127.0.0.1:{slow_server.server_address[1]}'
+    slow_urls = [f'http://{slow_netloc}/p/{i}' for i in range(slow_pages)]
+    fast_seeds = [f'http://127.0.0.1:{server.server_address[1]}/p/0' for server in fast_servers]
+    domain_delays = {seed.split('/')[2]: fast_delay for seed in fast_seeds}
+    domain_delays[slow_netloc] = slow_delay
+    results = {}
+
+    def settings_for(priority_queue):
+        return {
+            'ROBOTSTXT_OBEY': False,
+            'LOG_LEVEL': 'WARNING',
+            'CONCURRENT_REQUESTS': 12,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 3,
+            'DOWNLOAD_DELAY': 0,
+            'DOMAIN_DELAYS': domain_delays,
+            'ADAPTIVE_MIN_DELAY': fast_delay,
+            'RANDOMIZE_DOWNLOAD_DELAY': False,
+            'AUTOTHROTTLE_ENABLED': False,
+            'TELNETCONSOLE_ENABLED': False,
+            'SCHEDULER_PRIORITY_QUEUE': priority_queue,
+            'DOWNLOADER_MIDDLEWARES': {'app.scraper.middlewares.RateLimitingMiddleware': 410},
+        }
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, priority_queue in [
+            ('espera en el downloader', 'scrapy.pqueues.ScrapyPriorityQueue'),
+            ('espera en el scheduler', 'app.scraper.domain_scheduler.DomainReadyPriorityQueue'),
+        ]:
+            runner = CrawlerRunner(settings_for(priority_queue))
+            crawler = runner.create_crawler(BenchSpider)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, slow_urls=slow_urls, fast_seeds=fast_seeds)
+            elapsed = time.perf_counter() - started
+            spider = crawler.spider
+            results[label] = (spider.fast_pages, spider.fast_done_at, spider.slow_pages, elapsed)
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+
+    for server in [slow_server] + fast_servers:
+        server.shutdown()
+
+    print("🐢 Benchmark de un dominio lento entre dominios rápidos")
+    print("=" * 60)
+    print(f"   Dominio lento: {slow_pages} páginas con delay {slow_delay}s")
+    print(f"   Dominios rápidos: {fast_domains} x {pages_per_domain} páginas con delay {fast_delay}s")
+    for label, (fast_pages, fast_done_at, slow_done, elapsed) in results.items():
+        print(f"   {label:<24} rápidos: {fast_pages:4d} páginas en {fast_done_at:6.2f}s "
+              f"-> {fast_pages / max(fast_done_at, 1e-9):6.1f} páginas/s | "
+              f"lento: {slow_done} páginas, total {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fast-domains', type=int, default=12)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--slow-pages', type=int, default=24)
+    parser.add_argument('--slow-delay', type=float, default=1.0)
+    parser.add_argument('--fast-delay', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    run_benchmark(args.fast_domains, args.pages, args.slow_pages, args.slow_delay, args.fast_delay, args.latency)
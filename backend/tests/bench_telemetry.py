@@ -0,0 +1,120 @@
+"""
+Benchmark de la telemetría del crawl en MonitoringMiddleware.
+
+Compara el coste por par request/respuesta del monitoreo anterior (un mensaje
+de log formateado y un dict ``extra`` por evento, aunque el nivel DEBUG esté
+desactivado) con el registro en ``TelemetryRegistry`` (contadores e
+histogramas por dominio, ``app/scraper/telemetry.py``), y el coste de una
+instantánea con cientos de dominios.
+
+Uso:
+    cd backend && python tests/bench_telemetry.py [--events 20000,100000] [--domains 200]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.test import get_crawler
+
+from app.scraper.middlewares import MonitoringMiddleware
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.telemetry import TelemetryRegistry
+
+logger = logging.getLogger('bench.telemetry')
+
+
+def _legacy_monitoring(request, response):
+    """process_request + process_response como estaban (log por evento)."""
+    request.meta['request_start_time'] = time.time()
+    logger.debug(f"📤 Request started: {request.url}", extra={
+        'category': 'request',
+        'url': request.url,
+        'metadata': {'method': request.method, 'headers_count': len(request.headers)}
+    })
+    start_time = request.meta.get('request_start_time')
+    response_time = (time.time() - start_time) * 1000 if start_time else 0
+    level = logging.WARNING if response.status >= 400 else logging.DEBUG
+    logger.log(level, f"📥 Response received: {response.url}", extra={
+        'category': 'response',
+        'url': response.url,
+        'metadata': {'status': response.status, 'response_time': response_time,
+                     'content_length': len(response.body)}
+    })
+
+
+def _events(count, domains, seed=11):
+    rng = random.Random(seed)
+    # Cuerpos compartidos: solo cuenta su longitud
+    bodies = [b'x' * rng.randint(500, 50000) for _ in range(64)]
+    events = []
+    for index in range(count):
+        url = f"https://empresa{rng.randrange(domains)}.com/pagina{index}"
+        request = Request(url, meta={'download_latency': rng.lognormvariate(-1.5, 1)})
+        # En un crawl OffsiteMiddleware ya ha parseado (y cacheado) la URL del request
+        urlparse_cached(request)
+        events.append((request, HtmlResponse(url=url, status=200, body=rng.choice(bodies),
+                                             request=request)))
+    return events
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def _crawl_logging():
+    """
+    Logging como en un worker: ``configure_logging`` de Scrapy deja el root en
+    NOTSET y filtra en los handlers (consola en INFO, base de datos en WARNING),
+    así que cada ``logger.debug`` crea un LogRecord y recorre los handlers.
+    """
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    for level in (logging.INFO, logging.WARNING):
+        logger.addHandler(logging.NullHandler(level))
+
+
+def run_benchmark(event_counts=(20000, 100000), domains=200):
+    """Mide el monitoreo por evento con ambos caminos y el coste de la instantánea."""
+    _crawl_logging()
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'DB_LOG_ENABLED': False})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://empresa0.com/')
+
+    print("📈 Benchmark de telemetría del crawl")
+    print("=" * 70)
+    print(f"{'pares':>8} {'logs µs/par':>15} {'telemetría µs/par':>21} {'mejora':>8}")
+    for count in event_counts:
+        events = _events(count, domains)
+        legacy_ms = _timed(lambda: [_legacy_monitoring(request, response) for request, response in events])
+
+        middleware = MonitoringMiddleware(crawler)
+        def telemetry():
+            for request, response in events:
+                middleware.process_request(request, spider)
+                middleware.process_response(request, response, spider)
+        telemetry_ms = _timed(telemetry)
+        print(f"{count:>8} {legacy_ms * 1000 / count:>15.2f} {telemetry_ms * 1000 / count:>21.2f} "
+              f"{legacy_ms / telemetry_ms:>7.1f}x")
+
+    registry = middleware.telemetry
+    assert isinstance(registry, TelemetryRegistry)
+    snapshot_ms = _timed(registry.snapshot)
+    print(f"\n📸 Instantánea de {len(registry.domains)} dominios: {snapshot_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', default='20000,100000')
+    parser.add_argument('--domains', type=int, default=200)
+    args = parser.parse_args()
+    run_benchmark(tuple(int(count) for count in args.events.split(',')), args.domains)
@@ -0,0 +1,181 @@
+"""
+Benchmark de la canonicalización de enlaces: peticiones por lead en un sitio tipo CMS.
+
+Levanta un sitio HTTP local que imita un CMS: cada página enlaza a la portada,
+a las categorías y a los productos con las variantes habituales (con y sin
+barra final, con ``utm_*``/``fbclid``, con identificador de sesión y con los
+parámetros en otro orden). Cada producto tiene un email distinto. Se crawlea
+con ``LeadSpider``:
+
+- sin canonicalizar (implementación anterior: se pide la URL tal cual y solo
+  el fingerprint del scheduler filtra repetidos), y
+- con ``UrlCanonicalizer`` y el conjunto de URLs vistas del job.
+
+Muestra las peticiones, las páginas distintas, los emails encontrados y las
+peticiones por email.
+
+Uso:
+    cd backend && python tests/bench_url_canonicalization.py [--products N] [--categories N]
+"""
+
+import argparse
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def _handler_for(products, categories):
+    """Sitio simulado: portada, /categoria/N/ y /producto/N/ con enlaces en varias variantes."""
+
+    def product_links(index):
+        # Variantes con las que un CMS enlaza el mismo producto desde distintos bloques
+        return [
+            f'/producto/{index}/',
+            f'/producto/{index}',
+            f'/producto/{index}/?utm_source=home&utm_medium=banner',
+            f'/producto/{index}/?fbclid=IwAR{index}',
+            f'/producto/{index}/?sessionid=s{index % 7}',
+        ]
+
+    def category_links(index):
+        return [
+            f'/categoria/{index}/?orden=precio&vista=lista',
+            f'/categoria/{index}/?vista=lista&orden=precio',
+            f'/categoria/{index}?orden=precio&vista=lista&utm_campaign=menu',
+        ]
+
+    class _CmsHandler(BaseHTTPRequestHandler):
+        lock = threading.Lock()
+        hits = 0
+        pages = set()
+
+        def do_GET(self):
+            path = urlsplit(self.path).path.rstrip('/') or '/'
+            with type(self).lock:
+                type(self).hits += 1
+                type(self).pages.add(path)
+            links = ['/', '/contacto/', '/?utm_source=logo']
+            for category in range(categories):
+                links += category_links(category)
+            email = 'info@tienda.com'
+            parts = path.strip('/').split('/')
+            if parts[0] == 'categoria':
+                category = int(parts[1])
+                for index in range(category, products, categories):
+                    links += product_links(index)
+            elif parts[0] == 'producto':
+                index = int(parts[1])
+                email = f'ventas{index}@tienda.com'
+                for related in (index + 1, index + 2):
+                    if related < products:
+                        links += product_links(related)
+            anchors = ''.join(f'<a href="{link}">enlace</a>' for link in links)
+            body = (f'<html><head><title>Tienda {path}</title></head><body>'
+                    f'<p>Contacto: {email}</p><nav>{anchors}</nav><p>{"texto " * 40}</p></body></html>').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _CmsHandler
+
+
+class _IdentityCanonicalizer:
+    """Sin canonicalización: se pide cada URL tal cual (comportamiento anterior)."""
+
+    def clean(self, url):
+        return url
+
+    def canonical(self, url):
+        return url
+
+
+class BaseLineSpider(LeadSpider):
+    """LeadSpider con los enlaces sin canonicalizar."""
+
+    name = 'bench_url_baseline'
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.url_canonicalizer = _IdentityCanonicalizer()
+        return spider
+
+
+def run_benchmark(products=60, categories=6):
+    """Crawlea el sitio simulado con y sin canonicalización."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import reactor, defer
+
+    handler = _handler_for(products, categories)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    results = {}
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        for label, spider_cls in [('sin canonicalizar (anterior)', BaseLineSpider), ('canonicalizado (actual)', LeadSpider)]:
+            handler.hits = 0
+            handler.pages = set()
+            emails = set()
+            runner = CrawlerRunner({
+                'ROBOTSTXT_OBEY': False,
+                'LOG_LEVEL': 'CRITICAL',
+                'TELNETCONSOLE_ENABLED': False,
+                'CONCURRENT_REQUESTS': 16,
+                'DEDUPE_PERSISTENT': False,
+                # El sitio local lleva puerto, que OffsiteMiddleware no admite en allowed_domains
+                # (el spider ya filtra los enlaces por host)
+                'SPIDER_MIDDLEWARES': {'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': None},
+            })
+            crawler = runner.create_crawler(spider_cls)
+            # Las señales guardan referencias débiles: el receptor debe seguir vivo durante el crawl
+            collect = lambda item, **kwargs: emails.update(item.get('emails') or ())  # noqa: E731
+            crawler.signals.connect(collect, signal=signals.item_scraped)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start_url, depth=5)
+            results[label] = {
+                'elapsed': time.perf_counter() - started,
+                'hits': handler.hits,
+                'pages': len(handler.pages),
+                'emails': len(emails),
+            }
+        reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    server.shutdown()
+
+    print("🔗 Benchmark de canonicalización de enlaces")
+    print("=" * 70)
+    print(f"   Sitio tipo CMS: {products} productos en {categories} categorías, 5 variantes por enlace a producto")
+    for label, result in results.items():
+        per_lead = result['hits'] / result['emails'] if result['emails'] else 0
+        print(f"   {label:<30} {result['hits']:>5} peticiones, {result['pages']:>4} páginas distintas, "
+              f"{result['emails']:>4} emails, {per_lead:5.2f} peticiones/email en {result['elapsed']:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=60)
+    parser.add_argument('--categories', type=int, default=6)
+    args = parser.parse_args()
+    run_benchmark(args.products, args.categories)
@@ -0,0 +1,179 @@
+"""
+Benchmark del modelo de rendimiento de URLs: peticiones por lead sobre un corpus reproducido.
+
+Genera un corpus de sitios de empresa sin red: portada, contacto, equipo y
+sucursales (con emails) y blog, etiquetas y catálogo (sin emails), con nombres
+y tamaños distintos en cada sitio. El crawl se reproduce con ``LeadSpider``
+sobre las páginas del corpus con una cola de prioridades como la del
+scheduler de Scrapy (``DEPTH_PRIORITY = 1``, LIFO entre iguales):
+
+1. Se crawlean los sitios de entrenamiento sin modelo y el resultado de cada
+   descarga (``CRAWL_LOG_ENABLED``) se guarda como fila ``CrawlOutcome`` en
+   una base de datos temporal.
+2. ``train_from_database`` entrena el modelo con esa base de datos.
+3. Se crawlean otros sitios sin modelo (implementación anterior) y con él.
+
+Muestra peticiones, emails encontrados y peticiones por email.
+
+Uso:
+    cd backend && python tests/bench_url_yield_model.py [--train-sites N] [--test-sites N] [--depth N]
+"""
+
+import argparse
+import heapq
+import random
+import sys
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, CrawlOutcome
+from app.scraper.items import LeadItem
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.url_model import train_from_database
+
+_NAMES = ['ana', 'luis', 'marta', 'jorge', 'sofia', 'pablo', 'elena', 'diego', 'lucia', 'raul']
+_CITIES = ['madrid', 'sevilla', 'valencia', 'bilbao', 'malaga', 'zaragoza', 'murcia', 'vigo']
+_WORDS = ['ofertas', 'novedades', 'guia', 'consejos', 'tendencias', 'evento', 'lanzamiento', 'resumen']
+
+
+def build_site(rng, host):
+    """Páginas de un sitio: ruta -> (título, [(enlace, texto)], [emails])."""
+    team = rng.sample(_NAMES, rng.randint(3, 6))
+    cities = rng.sample(_CITIES, rng.randint(2, 5))
+    posts = [f'{rng.choice(_WORDS)}-{index}' for index in range(rng.randint(20, 40))]
+    products = list(range(rng.randint(15, 30)))
+    tags = rng.sample(_WORDS, 4)
+    nav = [('/contacto/', 'Contacto'), ('/equipo/', 'Equipo'), ('/sucursales/', 'Dónde estamos'),
+           ('/blog/', 'Blog'), ('/productos/', 'Catálogo')]
+    pages = {
+        '/': ('Inicio', nav + [(f'/blog/{post}/', post.replace('-', ' ')) for post in posts[:8]], []),
+        '/contacto': ('Contacto', nav, [f'info@{host}']),
+        '/equipo': ('Nuestro equipo', nav + [(f'/equipo/{name}/', name.title()) for name in team], []),
+        '/sucursales': ('Sucursales', nav + [(f'/sucursales/{city}/', city.title()) for city in cities], []),
+        '/blog': ('Blog', nav + [(f'/blog/{post}/', post) for post in posts] + [(f'/tag/{tag}/', tag) for tag in tags], []),
+        '/productos': ('Catálogo', nav + [(f'/productos/{product}/?ref=catalogo', f'Producto {product}')
+                                          for product in products], []),
+    }
+    for name in team:
+        pages[f'/equipo/{name}'] = (name.title(), nav, [f'{name}@{host}'])
+    for city in cities:
+        pages[f'/sucursales/{city}'] = (f'Oficina {city.title()}', nav, [f'{city}@{host}'])
+    for post in posts:
+        related = [(f'/blog/{other}/', other) for other in rng.sample(posts, 3)]
+        pages[f'/blog/{post}'] = (post.replace('-', ' ').title(), nav + related + [(f'/tag/{rng.choice(tags)}/', 'tag')], [])
+    for tag in tags:
+        pages[f'/tag/{tag}'] = (f'Etiqueta {tag}', nav + [(f'/blog/{post}/', post) for post in rng.sample(posts, 10)], [])
+    for product in products:
+        related = [(f'/productos/{other}/?ref=relacionados', f'Producto {other}') for other in rng.sample(products, 3)]
+        pages[f'/productos/{product}'] = (f'Producto {product}', nav + related, [])
+    return pages
+
+
+def render(host, path, page):
+    title, links, emails = page
+    anchors = ''.join(f'<a href="{href}">{text}</a>' for href, text in links)
+    contact = ''.join(f'<p>Escríbenos a {email}</p>' for email in emails)
+    return (f'<html><head><title>{title}</title></head><body><h1>{title}</h1>{contact}'
+            f'<nav>{anchors}</nav><p>{"texto de relleno " * 30}</p></body></html>').encode()
+
+
+def replay(host, pages, depth, model=None):
+    """
+    Reproduce el crawl de un sitio con ``LeadSpider``.
+
+    Returns:
+        (peticiones, emails encontrados, items generados, resultados de las descargas)
+    """
+    # El registro de descargas se queda en memoria (lote sin límite): lo guarda el benchmark
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'LOG_LEVEL': 'CRITICAL',
+                                                     'CRAWL_LOG_ENABLED': True, 'CRAWL_LOG_BATCH_SIZE': 10 ** 9})
+    spider = LeadSpider.from_crawler(crawler, start_url=f'https://{host}/', depth=depth)
+    spider.yield_model = model
+    crawler.stats.open_spider(spider)
+
+    counter = 0
+    frontier = []
+    for request in spider.start_requests():
+        heapq.heappush(frontier, (-request.priority, counter, request))
+    fetches, emails, items = 0, set(), []
+    while frontier:
+        _, _, request = heapq.heappop(frontier)
+        path = urlsplit(request.url).path.rstrip('/') or '/'
+        if path not in pages:
+            continue
+        fetches += 1
+        response = HtmlResponse(request.url, body=render(host, path, pages[path]),
+                                headers={'Content-Type': 'text/html'}, request=request)
+        for result in spider.parse(response):
+            if isinstance(result, Request):
+                # Como el scheduler: más prioridad primero, la profundidad resta (DEPTH_PRIORITY = 1)
+                # y entre iguales sale la última encolada (cola LIFO)
+                counter -= 1
+                priority = result.priority - result.meta.get('depth', 0)
+                heapq.heappush(frontier, (-priority, counter, result))
+            elif isinstance(result, LeadItem):
+                items.append(result)
+                emails.update(result.get('emails') or ())
+    return fetches, emails, items, spider.crawl_log
+
+
+def run_benchmark(train_sites=30, test_sites=20, depth=3, seed=7):
+    """Entrena con sitios reproducidos y compara el crawl de sitios nuevos con y sin modelo."""
+    rng = random.Random(seed)
+    train_corpus = {f'empresa{index}.com': build_site(rng, f'empresa{index}.com') for index in range(train_sites)}
+    test_corpus = {f'negocio{index}.es': build_site(rng, f'negocio{index}.es') for index in range(test_sites)}
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_url_model_'), 'train.db')}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for host, pages in train_corpus.items():
+        session.add_all(CrawlOutcome(**outcome) for outcome in replay(host, pages, depth)[3])
+    session.commit()
+
+    started = time.perf_counter()
+    model, evaluation = train_from_database(session, holdout=0.2)
+    train_time = time.perf_counter() - started
+    session.close()
+
+    results = {}
+    for label, used_model in [('sin modelo (anterior)', None), ('con modelo (actual)', model)]:
+        fetches, emails = 0, 0
+        started = time.perf_counter()
+        for host, pages in test_corpus.items():
+            site_fetches, site_emails, _, _ = replay(host, pages, depth, used_model)
+            fetches += site_fetches
+            emails += len(site_emails)
+        results[label] = (fetches, emails, time.perf_counter() - started)
+    reachable = sum(len(page[2]) for pages in test_corpus.values() for page in pages.values())
+
+    print("🧠 Benchmark del modelo de rendimiento de URLs (corpus reproducido)")
+    print("=" * 70)
+    print(f"   Entrenamiento: {train_sites} sitios, {model.examples} páginas ({model.base_rate:.1%} con emails), "
+          f"{len(model.counts)} características en {train_time * 1000:.0f} ms")
+    for key, values in evaluation.items():
+        if isinstance(key, float):
+            print(f"   Evaluación (20% reservado), umbral {key}: poda {values['pruned']:.1%} de las páginas, "
+                  f"conserva {values['recall']:.1%} de las que tienen emails")
+    print(f"   Prueba: {test_sites} sitios nuevos, {reachable} emails en total, profundidad {depth}")
+    for label, (fetches, emails, elapsed) in results.items():
+        print(f"   {label:<24} {fetches:>6} peticiones, {emails:>4} emails, "
+              f"{fetches / emails if emails else 0:6.2f} peticiones/email ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--train-sites', type=int, default=30)
+    parser.add_argument('--test-sites', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.train_sites, args.test_sites, args.depth)
@@ -0,0 +1,150 @@
+"""
+Benchmark de lanzamiento de jobs: un subproceso ``scrapy crawl`` por job vs. pool de workers.
+
+Crea una base de datos SQLite temporal, encola muchos jobs pequeños (una página
+cada uno, servidas por un servidor HTTP local) y mide el tiempo por job con
+``run_scraper`` (subproceso por job) y con el pool de workers persistentes.
+
+Uso:
+    cd backend && python tests/bench_worker_pool.py [--jobs N] [--subprocess-jobs N] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# La base de datos temporal debe configurarse antes de importar la aplicación.
+# Los workers (spawn) reimportan este módulo y heredan el entorno del padre.
+if 'BENCH_WORKER_POOL_DIR' not in os.environ:
+    os.environ['BENCH_WORKER_POOL_DIR'] = tempfile.mkdtemp(prefix='bench_worker_pool_')
+_TMP_DIR = os.environ['BENCH_WORKER_POOL_DIR']
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP_DIR, 'bench.db')}"
+os.environ['JOB_CONTROL_DIR'] = os.path.join(_TMP_DIR, 'control')
+# Todos los jobs van al mismo servidor local: sin límites del despachador
+os.environ['SCRAPER_MAX_ACTIVE_JOBS'] = '0'
+os.environ['SCRAPER_MAX_JOBS_PER_DOMAIN'] = '0'
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database.database import SessionLocal, create_tables
+from app.database.models import ScrapingQueue
+from app.scraper.dispatcher import registered_domain
+from app.scraper.run_scraper import run_scraper
+from app.scraper.worker import notify_workers, start_worker_pool, stop_worker_pool
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Sirve una página pequeña con un email por ruta."""
+
+    def do_GET(self):
+        if self.path == '/robots.txt':
+            body = b'User-agent: *\nAllow: /\n'
+            content_type = 'text/plain'
+        else:
+            name = self.path.strip('/').replace('/', '-') or 'home'
+            body = (
+                f'<html lang="es"><head><title>Empresa {name}</title></head>'
+                f'<body><p>Contacto: info@{name}.example.com</p></body></html>'
+            ).encode()
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _enqueue(base_url, count):
+    db = SessionLocal()
+    try:
+        job_ids = []
+        for index in range(count):
+            job_id = uuid.uuid4().hex[:8]
+            db.add(ScrapingQueue(
+                job_id=job_id,
+                url=f"{base_url}/empresa{index}",
+                domain=registered_domain(base_url),
+                priority=0,
+                depth_level=0,
+                max_depth=0,
+                status="pending",
+                attempts=0
+            ))
+            job_ids.append(job_id)
+        db.commit()
+        return job_ids
+    finally:
+        db.close()
+
+
+def _count_finished(job_ids):
+    db = SessionLocal()
+    try:
+        return db.query(ScrapingQueue).filter(
+            ScrapingQueue.job_id.in_(job_ids),
+            ScrapingQueue.status.in_(["completed", "failed"])
+        ).count()
+    finally:
+        db.close()
+
+
+def run_benchmark(job_count=200, subprocess_jobs=5, workers=2, concurrency=8, timeout=600):
+    """Ejecuta ambos modos y muestra el coste medio por job."""
+    create_tables()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("👷 Benchmark de lanzamiento de jobs")
+    print("=" * 50)
+
+    # 1. Un subproceso por job (secuencial, como las BackgroundTasks de FastAPI)
+    job_ids = _enqueue(base_url, subprocess_jobs)
+    started = time.perf_counter()
+    db = SessionLocal()
+    jobs = db.query(ScrapingQueue).filter(ScrapingQueue.job_id.in_(job_ids)).all()
+    db.close()
+    for job in jobs:
+        run_scraper(job.job_id, job.url, 0)
+    subprocess_elapsed = time.perf_counter() - started
+    print(f"   Subproceso por job: {subprocess_jobs} jobs en {subprocess_elapsed:7.2f}s "
+          f"-> {subprocess_elapsed / subprocess_jobs * 1000:8.1f} ms/job")
+
+    # 2. Pool de workers persistentes (arranque en caliente antes de encolar)
+    pool = start_worker_pool(workers, concurrency=concurrency, poll_interval=1.0)
+    try:
+        time.sleep(5)
+        job_ids = _enqueue(base_url, job_count)
+        started = time.perf_counter()
+        notify_workers()
+        finished = 0
+        while finished < job_count and time.perf_counter() - started < timeout:
+            time.sleep(0.2)
+            finished = _count_finished(job_ids)
+        pool_elapsed = time.perf_counter() - started
+    finally:
+        stop_worker_pool(pool)
+        server.shutdown()
+
+    print(f"   Pool de workers:    {finished} jobs en {pool_elapsed:7.2f}s "
+          f"-> {pool_elapsed / max(finished, 1) * 1000:8.1f} ms/job "
+          f"({workers} workers x {concurrency} jobs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--subprocess-jobs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.jobs, args.subprocess_jobs, args.workers, args.concurrency)
@@ -0,0 +1,132 @@
+"""
+Tests para el control adaptativo de concurrencia y delay por dominio.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from twisted.internet.error import TimeoutError
+
+from app.scraper.concurrency import AdaptiveConcurrencyController, parse_retry_after
+from app.scraper.middlewares import ErrorHandlingMiddleware, RateLimitingMiddleware
+
+
+def _controller(**kwargs):
+    kwargs.setdefault('start_delay', 1.0)
+    kwargs.setdefault('min_delay', 0.1)
+    kwargs.setdefault('start_concurrency', 2)
+    kwargs.setdefault('max_concurrency', 8)
+    return AdaptiveConcurrencyController(clock=lambda: 0.0, **kwargs)
+
+
+def test_healthy_host_ramps_up_to_capacity():
+    """Con latencia estable la concurrencia sube de forma aditiva y el delay baja hasta el suelo."""
+    controller = _controller(min_delay=0.01)
+    concurrency = []
+    for _ in range(200):
+        controller.on_response('rapido.com', 0.1)
+        concurrency.append(controller.concurrency('rapido.com'))
+
+    # +1 por ventana: de 2 a 3 tras ~2 respuestas, a 4 tras ~3 más...
+    assert concurrency[0] == 2
+    assert concurrency == sorted(concurrency)
+    assert controller.concurrency('rapido.com') == 8
+    assert controller.delay('rapido.com') == 0.01
+
+    # Si el delay ya limita las peticiones en vuelo, la concurrencia no sube
+    controller = _controller(min_delay=0.5)
+    for _ in range(200):
+        controller.on_response('limitado.com', 0.1)
+    assert controller.concurrency('limitado.com') == 2
+    assert controller.delay('limitado.com') == 0.5
+
+    # Los delays configurados a mano son el suelo del dominio
+    controller = _controller(delay_floors={'lento.com': 3.0})
+    for _ in range(50):
+        controller.on_response('lento.com', 0.05)
+    assert controller.delay('lento.com') == 3.0
+
+
+def test_throttling_backs_off_once_per_window():
+    """429/503 reducen a la mitad y duplican el delay una sola vez por ventana."""
+    now = [0.0]
+    controller = AdaptiveConcurrencyController(start_delay=0.5, start_concurrency=8, max_concurrency=8,
+                                               clock=lambda: now[0])
+    for _ in range(5):
+        controller.on_response('a.com', 0.2)
+
+    controller.on_throttle('a.com')
+    controller.on_throttle('a.com')
+    controller.on_failure('a.com')
+    limits = controller.limits('a.com')
+    assert controller.concurrency('a.com') == 4
+    # El delay (ya rebajado por las respuestas sanas) se duplica
+    assert 0.55 < limits.delay < 0.65
+    assert (limits.throttled, limits.failed) == (2, 1)
+
+    # Pasada la ventana (una latencia o un delay), otro 429 vuelve a recortar
+    now[0] = 1.0
+    controller.on_throttle('a.com')
+    assert controller.concurrency('a.com') == 2
+    # Retry-After manda sobre el delay calculado, sin pasar del máximo
+    controller.on_throttle('a.com', retry_after=12.0)
+    assert controller.delay('a.com') == 12.0
+    controller.on_throttle('a.com', retry_after=3600)
+    assert controller.delay('a.com') == controller.max_delay
+    # Otros dominios no se ven afectados
+    assert controller.concurrency('b.com') == 8
+
+
+def test_latency_inflation_reduces_concurrency():
+    """Si la latencia supera la tolerancia sobre la base del host, la concurrencia baja."""
+    now = [0.0]
+    controller = AdaptiveConcurrencyController(start_concurrency=8, max_concurrency=8, clock=lambda: now[0])
+    for _ in range(10):
+        controller.on_response('a.com', 0.1)
+    assert controller.concurrency('a.com') == 8
+
+    for step in range(30):
+        now[0] = step * 2.0
+        controller.on_response('a.com', 1.0)
+    assert controller.concurrency('a.com') == 1
+
+    assert parse_retry_after(b'120') == 120.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('pronto') is None
+
+
+def test_error_handling_signals_feed_rate_limiter():
+    """Las señales de ErrorHandlingMiddleware ajustan los límites de RateLimitingMiddleware."""
+    crawler = get_crawler(settings_dict={
+        'DOWNLOAD_DELAY': 0.5,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
+        'ADAPTIVE_MAX_CONCURRENCY': 4,
+        'RETRY_HTTP_CODES': [503, 429],
+    })
+    rate_limiter = RateLimitingMiddleware.from_crawler(crawler)
+    errors = ErrorHandlingMiddleware.from_crawler(crawler)
+    spider = None
+
+    request = Request('https://tienda.com/productos', headers={'User-Agent': 'Mozilla Chrome/91'},
+                      meta={'download_latency': 0.2})
+    ok = HtmlResponse(url=request.url, status=200, body=b'<html></html>', request=request)
+    assert errors.process_response(request, ok, spider) is ok
+    assert rate_limiter.process_response(request, ok, spider) is ok
+    assert rate_limiter.controller.limits('tienda.com').latency == 0.2
+
+    throttled = HtmlResponse(url=request.url, status=503, headers={'Retry-After': '20'},
+                             body=b'', request=request)
+    retry = errors.process_response(request, throttled, spider)
+    assert isinstance(retry, Request)
+    assert retry.headers['User-Agent'] == b'Mozilla Chromium/91'
+    assert rate_limiter.controller.concurrency('tienda.com') == 2
+    assert rate_limiter.controller.delay('tienda.com') == 20.0
+
+    errors.process_exception(Request('https://lento.com/'), TimeoutError(), spider)
+    assert rate_limiter.controller.limits('lento.com').failed == 1
+    assert rate_limiter.controller.concurrency('lento.com') == 2
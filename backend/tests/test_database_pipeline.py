@@ -0,0 +1,92 @@
+"""
+Tests para la escritura en lote de DatabasePipeline.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Email, Website
+from app.scraper.items import LeadItem
+from app.scraper.pipelines import DatabasePipeline
+
+
+def _pipeline(tmp_path, name='pipeline.db', **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    kwargs.setdefault('flush_interval', 0)
+    pipeline = DatabasePipeline(db_engine=engine, **kwargs)
+    pipeline.open_spider(None)
+    return pipeline
+
+
+def _item(url, emails, **fields):
+    return LeadItem(
+        url=url,
+        domain=url.split('/')[2],
+        emails=emails,
+        language='es',
+        scraped_at=datetime(2024, 1, 1),
+        **fields
+    )
+
+
+def _rows(pipeline):
+    session = sessionmaker(bind=pipeline.engine)()
+    websites = {w.url: (w.title, w.email_count, w.scrape_count) for w in session.query(Website).all()}
+    emails = sorted((e.website.url, e.email) for e in session.query(Email).all())
+    session.close()
+    return websites, emails
+
+
+def test_items_are_buffered_until_batch_size(tmp_path):
+    """Los items no se escriben hasta completar el lote o cerrar el spider."""
+    pipeline = _pipeline(tmp_path, batch_size=3)
+
+    pipeline.process_item(_item("https://a.com/", ["info@a.com"]), None)
+    pipeline.process_item(_item("https://b.com/", ["ventas@b.com"]), None)
+    assert _rows(pipeline) == ({}, [])
+
+    pipeline.process_item(_item("https://c.com/", []), None)
+    websites, emails = _rows(pipeline)
+    assert set(websites) == {"https://a.com/", "https://b.com/", "https://c.com/"}
+    assert emails == [("https://a.com/", "info@a.com"), ("https://b.com/", "ventas@b.com")]
+
+    pipeline.process_item(_item("https://d.com/", []), None)
+    pipeline.close_spider(None)
+    assert "https://d.com/" in _rows(pipeline)[0]
+
+
+def test_batch_upsert_matches_per_item_saves(tmp_path):
+    """El lote con URLs y emails repetidos deja lo mismo que guardar item a item."""
+    items = [
+        _item("https://a.com/", ["info@a.com"], title="Primera"),
+        _item("https://b.com/", ["ventas@b.com", "ventas@b.com"]),
+        _item("https://a.com/", ["info@a.com", "rrhh@a.com"], title="Segunda"),
+        _item("https://a.com/", ["info@a.com"]),
+    ]
+
+    batched = _pipeline(tmp_path, 'batched.db', batch_size=100)
+    for item in items:
+        batched.process_item(item, None)
+    batched.close_spider(None)
+
+    legacy = _pipeline(tmp_path, 'legacy.db')
+    legacy.upsert_supported = False
+    for item in items:
+        legacy.process_item(item, None)
+        legacy.flush()
+
+    assert _rows(batched) == _rows(legacy)
+    websites, emails = _rows(batched)
+    assert websites["https://a.com/"] == ("Segunda", 1, 2)
+    assert emails == [
+        ("https://a.com/", "info@a.com"),
+        ("https://a.com/", "rrhh@a.com"),
+        ("https://b.com/", "ventas@b.com"),
+    ]
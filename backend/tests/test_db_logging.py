@@ -0,0 +1,137 @@
+"""
+Tests para el handler de logs en base de datos con hilo escritor.
+"""
+
+import sys
+import os
+import json
+import logging
+import threading
+import time
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from scrapy.utils.test import get_crawler
+
+from app.database.models import Base, ScrapingLog, ScrapingSession
+from app.scraper.middlewares import DatabaseLoggingHandler
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def _engine():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _crawler(**settings):
+    settings.setdefault('DEDUPE_PERSISTENT', False)
+    crawler = get_crawler(LeadSpider, settings_dict=settings)
+    crawler.spider = LeadSpider(start_url='https://empresa.com/')
+    return crawler
+
+
+def _logger(handler, name):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    return logger
+
+
+class _SlowHandler(DatabaseLoggingHandler):
+    """Handler cuyo hilo escritor queda parado hasta que el test lo libera."""
+
+    def __init__(self, *args, **kwargs):
+        self.release_writer = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _save_scraping_session(self, engine, values):
+        self.release_writer.wait(5)
+        super()._save_scraping_session(engine, values)
+
+
+def test_writer_thread_batches_logs():
+    """Los registros se guardan por lotes en el hilo escritor junto con la sesión."""
+    engine = _engine()
+    handler = DatabaseLoggingHandler(_crawler(DB_LOG_BATCH_SIZE=3, DB_LOG_LEVEL='WARNING'), db_engine=engine)
+    logger = _logger(handler, 'test.db_logging.batches')
+
+    logger.info("no se guarda")
+    for index in range(4):
+        logger.warning(f"aviso {index}", extra={'url': 'https://empresa.com/', 'category': 'response',
+                                                'metadata': {'status': 500 + index}})
+    logger.critical("crítico")
+
+    handler.close()
+    handler.wait_closed()
+    logger.removeHandler(handler)
+
+    session = sessionmaker(bind=engine)()
+    try:
+        assert session.query(ScrapingSession).filter_by(session_id=handler.session_id).count() == 1
+        logs = session.query(ScrapingLog).order_by(ScrapingLog.id).all()
+        assert [log.message for log in logs] == [f"aviso {index}" for index in range(4)] + ["crítico"]
+        assert json.loads(logs[1].log_metadata) == {'status': 501}
+        assert logs[0].category == 'response'
+        assert logs[-1].level == 'ERROR'
+    finally:
+        session.close()
+    assert handler.written == 5
+    assert handler.dropped == 0
+    assert not handler._thread.is_alive()
+
+
+def test_full_queue_drops_without_blocking():
+    """Con la base de datos lenta la cola se llena y los registros se descartan sin esperar."""
+    engine = _engine()
+    handler = _SlowHandler(_crawler(DB_LOG_QUEUE_SIZE=5, DB_LOG_FLUSH_INTERVAL=0.01), db_engine=engine)
+    logger = _logger(handler, 'test.db_logging.drops')
+
+    started = time.monotonic()
+    for index in range(50):
+        logger.error(f"error {index}")
+    assert time.monotonic() - started < 1.0
+    assert handler.dropped == 45
+
+    handler.release_writer.set()
+    handler.close()
+    handler.wait_closed()
+    logger.removeHandler(handler)
+
+    # Tras cerrar no se aceptan más registros
+    handler.emit(logging.makeLogRecord({'msg': 'tarde', 'levelname': 'ERROR', 'levelno': logging.ERROR}))
+    session = sessionmaker(bind=engine)()
+    try:
+        assert session.query(ScrapingLog).count() == 5
+    finally:
+        session.close()
+
+
+def test_handlers_keep_only_their_spider_records():
+    """Con varios spiders en el proceso cada handler guarda los registros de su spider."""
+    engine = _engine()
+    first = DatabaseLoggingHandler(_crawler(DB_LOG_LEVEL='INFO'), db_engine=engine)
+    second = DatabaseLoggingHandler(_crawler(DB_LOG_LEVEL='INFO'), db_engine=engine)
+    logger = _logger(first, 'test.db_logging.spiders')
+    logger.addHandler(second)
+
+    logger.info("del primero", extra={'spider': first.crawler.spider})
+    logger.info("del segundo", extra={'spider': second.crawler.spider})
+    logger.info("sin spider")
+
+    for handler in (first, second):
+        handler.close()
+        handler.wait_closed()
+        logger.removeHandler(handler)
+
+    session = sessionmaker(bind=engine)()
+    try:
+        rows = {(log.session_id, log.message) for log in session.query(ScrapingLog).all()}
+    finally:
+        session.close()
+    assert rows == {(first.session_id, "del primero"), (second.session_id, "del segundo")}
@@ -0,0 +1,123 @@
+"""
+Tests para el índice de duplicados persistente.
+"""
+
+import sys
+import os
+import logging
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from sqlalchemy import create_engine
+
+from app.database.models import Base
+from app.scraper.dedupe import DedupeIndex
+from app.scraper.items import LeadItem
+from app.scraper.pipelines import DatabasePipeline, DuplicateFilterPipeline
+
+
+class _Spider:
+    logger = logging.getLogger('test')
+
+
+def test_keys_persist_and_are_shared_between_instances(tmp_path):
+    """Las claves registradas sobreviven al job y se ven desde otro proceso/instancia."""
+    first = DedupeIndex(str(tmp_path), capacity=1000)
+    second = DedupeIndex(str(tmp_path), capacity=1000)
+
+    assert first.add('url', 'https://a.com/') is True
+    assert first.add('url', 'https://a.com/') is False
+    assert second.contains('url', 'https://a.com/')
+    assert not second.contains('email', 'https://a.com/')
+    first.close()
+    second.close()
+
+    reopened = DedupeIndex(str(tmp_path), capacity=1000)
+    assert reopened.contains('url', 'https://a.com/')
+    assert not reopened.contains('url', 'https://b.com/')
+    assert reopened.stats() == {'url': 1}
+
+
+def test_memory_is_fixed_and_full_index_starts_over(tmp_path):
+    """El fichero no crece con las claves y al llenarse el índice empieza de cero."""
+    index = DedupeIndex(str(tmp_path), capacity=100)
+    index.add('url', 'https://a.com/0')
+    size = os.path.getsize(tmp_path / 'url.idx')
+
+    for value in range(1, 100):
+        assert index.add('url', f'https://a.com/{value}')
+    assert all(index.contains('url', f'https://a.com/{value}') for value in range(100))
+    assert os.path.getsize(tmp_path / 'url.idx') == size
+
+    index.add('url', 'https://a.com/100')
+    assert index.stats() == {'url': 1}
+    assert not index.contains('url', 'https://a.com/0')
+
+
+def test_same_item_gets_the_same_answer_in_every_pipeline():
+    """Varios pipelines pueden registrar la URL del mismo item sin descartarlo."""
+    index = DedupeIndex(capacity=1000)
+    item = LeadItem(url='https://a.com/')
+
+    assert index.add('url', item['url'], owner=item) is True
+    assert index.add('url', item['url'], owner=item) is True
+    assert index.add('url', item['url'], owner=LeadItem(url='https://a.com/')) is False
+
+
+def test_duplicate_filter_uses_index_across_jobs():
+    """Los emails y URLs de un job anterior se filtran en el siguiente."""
+    index = DedupeIndex(capacity=1000)
+    stored = DuplicateFilterPipeline(index).process_item(
+        LeadItem(url='https://a.com/', domain='a.com', emails=['info@a.com']), _Spider()
+    )
+    index.commit(stored)
+
+    pipeline = DuplicateFilterPipeline(index)
+    with pytest.raises(DropItem):
+        pipeline.process_item(LeadItem(url='https://a.com/', domain='a.com', emails=[]), _Spider())
+
+    item = pipeline.process_item(
+        LeadItem(url='https://a.com/contacto', domain='a.com', emails=['info@a.com', 'ventas@a.com']), _Spider()
+    )
+    assert item['emails'] == ['ventas@a.com']
+
+
+def test_reserved_keys_are_registered_only_when_the_item_is_saved(tmp_path):
+    """Un item descartado o que no se pudo guardar no marca sus claves como vistas."""
+    index = DedupeIndex(capacity=1000)
+    first = LeadItem(url='https://a.com/', emails=['info@a.com'])
+    assert index.reserve('url', first['url'], first) is True
+    assert index.reserve('url', first['url'], first) is True
+    # Mientras el primero no se guarda, otro item con la misma URL es duplicado
+    assert index.reserve('url', first['url'], LeadItem(url=first['url'])) is False
+    assert not index.contains('url', first['url'])
+
+    index.release(first)
+    second = LeadItem(url='https://a.com/')
+    assert index.reserve('url', second['url'], second) is True
+    assert index.commit(second) == 1
+    assert index.contains('url', second['url'])
+    assert index.reserve('url', second['url'], LeadItem(url=second['url'])) is False
+
+    # Un item que desaparece sin guardarse libera su reserva
+    index.reserve('email', 'ventas@a.com', LeadItem(url='https://a.com/otra'))
+    assert index.reserve('email', 'ventas@a.com', LeadItem(url='https://a.com/ventas')) is True
+
+    # DatabasePipeline registra las claves de lo guardado y libera las del item que falla
+    engine = create_engine(f"sqlite:///{tmp_path / 'dedupe.db'}")
+    Base.metadata.create_all(bind=engine)
+    pipeline = DatabasePipeline(db_engine=engine, flush_interval=0, dedupe=index)
+    pipeline.upsert_supported = False
+    saved = LeadItem(url='https://b.com/', domain='b.com', emails=['info@b.com'])
+    broken = LeadItem(url='https://c.com/', domain='c.com', emails=['info@c.com'])
+    for item in (saved, broken):
+        DuplicateFilterPipeline(index).process_item(item, _Spider())
+    broken['emails'] = None  # Hace fallar la escritura
+    pipeline._write_items([saved, broken])
+    assert index.contains('url', 'https://b.com/') and index.contains('email', 'info@b.com')
+    assert not index.contains('url', 'https://c.com/') and not index.contains('email', 'info@c.com')
+    assert index.reserve('url', 'https://c.com/', LeadItem(url='https://c.com/')) is True
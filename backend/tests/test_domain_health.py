@@ -0,0 +1,130 @@
+"""
+Tests para el circuit breaker por host persistente.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from twisted.internet.error import TimeoutError
+
+from app.scraper.domain_health import CLOSED, HALF_OPEN, OPEN, DomainHealthStore
+from app.scraper.middlewares import DomainHealthMiddleware, ErrorHandlingMiddleware
+
+
+def test_circuit_opens_probes_and_closes():
+    """Umbral de fallos, enfriamiento creciente y una sola petición de prueba."""
+    store = DomainHealthStore(failure_threshold=3, open_seconds=10.0, max_open_seconds=25.0)
+
+    for _ in range(2):
+        store.record_failure('caido.com', now=0.0)
+    store.record_success('caido.com')
+    assert store.get('caido.com').consecutive_failures == 0
+    for _ in range(3):
+        store.record_failure('caido.com', now=0.0)
+    assert store.get('caido.com').state == OPEN
+    assert not store.allow('caido.com', now=5.0)
+    # Respuestas de lo enviado antes de abrir no cierran el circuito
+    store.record_success('caido.com')
+    assert store.is_open('caido.com', now=5.0)
+
+    # Vencido el enfriamiento sale una única prueba; si falla, el enfriamiento se duplica
+    assert store.allow('caido.com', now=10.0)
+    assert store.get('caido.com').state == HALF_OPEN
+    assert not store.allow('caido.com', now=10.5)
+    store.record_failure('caido.com', now=11.0)
+    health = store.get('caido.com')
+    assert (health.state, health.trips, health.open_until) == (OPEN, 2, 31.0)
+
+    # La siguiente prueba va bien: circuito cerrado y enfriamiento reiniciado
+    assert store.allow('caido.com', now=31.0)
+    store.record_success('caido.com')
+    health = store.get('caido.com')
+    assert (health.state, health.trips, health.failures, health.successes) == (CLOSED, 0, 6, 3)
+    assert store.allow('caido.com', now=31.0)
+
+    # Los hosts que nunca han fallado no ocupan entrada
+    store.record_success('sano.com')
+    assert store.get('sano.com') is None
+    assert store.count == 1
+
+
+def test_state_is_shared_between_jobs(tmp_path):
+    """Un bloqueo registrado por un job se ve desde otro job y tras reabrir la tabla."""
+    path = str(tmp_path / 'leads.db.health')
+    first = DomainHealthStore(path, clock=lambda: 100.0)
+    second = DomainHealthStore(path, clock=lambda: 100.0)
+
+    first.trip('hostil.com', 1800)
+    assert not second.allow('hostil.com')
+    first.close()
+    second.close()
+
+    reopened = DomainHealthStore(path, clock=lambda: 200.0)
+    assert reopened.is_open('hostil.com')
+    snapshot = reopened.snapshot(state='open')
+    assert [(item['domain'], item['failures'], item['open_until']) for item in snapshot] == [
+        ('hostil.com', 1, 1900.0)]
+    # El enfriamiento nunca pasa del máximo
+    reopened.trip('baneo.com', 10 ** 9)
+    assert reopened.get('baneo.com').open_until == 200.0 + reopened.max_open_seconds
+
+
+def test_error_handling_signals_open_the_circuit():
+    """403 y timeouts de ErrorHandlingMiddleware abren el circuito y las peticiones se descartan."""
+    crawler = get_crawler(settings_dict={'RETRY_TIMES': 0, 'DOMAIN_HEALTH_FAILURE_THRESHOLD': 2})
+    health = DomainHealthMiddleware.from_crawler(crawler)
+    errors = ErrorHandlingMiddleware.from_crawler(crawler)
+    spider = None
+
+    request = Request('https://hostil.com/contacto')
+    assert health.process_request(request, spider) is None
+    forbidden = HtmlResponse(url=request.url, status=403, body=b'<html></html>', request=request)
+    errors.process_response(request, forbidden, spider)
+    with pytest.raises(IgnoreRequest):
+        health.process_request(Request('https://hostil.com/otra'), spider)
+    # Las peticiones descartadas no cuentan como errores del host
+    assert errors.process_exception(request, IgnoreRequest(), spider) is None
+    assert errors.domain_errors == {}
+
+    slow = Request('https://lento.com/')
+    errors.process_exception(slow, TimeoutError(), spider)
+    ok = HtmlResponse(url=slow.url, status=200, body=b'<html></html>', request=slow)
+    assert health.process_response(slow, ok, spider) is ok
+    errors.process_exception(slow, TimeoutError(), spider)
+    assert health.process_request(slow, spider) is None
+    errors.process_exception(slow, TimeoutError(), spider)
+    assert health.store.is_open('lento.com')
+
+
+def test_only_persistent_blocks_open_the_circuit():
+    """Un CAPTCHA en una página normal o un 403 suelto no cierran el host a los demás jobs."""
+    crawler = get_crawler(settings_dict={'RETRY_TIMES': 1})
+    health = DomainHealthMiddleware.from_crawler(crawler)
+    errors = ErrorHandlingMiddleware.from_crawler(crawler)
+    spider = None
+
+    def respond(url, status, body=b'<html></html>'):
+        request = Request(url)
+        return errors.process_response(request, HtmlResponse(url=url, status=status, body=body, request=request),
+                                       spider)
+
+    page = respond('https://tienda.com/contacto', 200, b'<div class="g-recaptcha"></div> Access denied?')
+    assert page.status == 200
+    assert errors.domain_errors == {'tienda.com': 1}
+    assert health.process_request(Request('https://tienda.com/'), spider) is None
+
+    # Un 403 aislado (seguido de respuestas sanas) tampoco
+    respond('https://tienda.com/privado', 403)
+    respond('https://tienda.com/', 200)
+    respond('https://tienda.com/privado', 403)
+    assert not health.store.is_open('tienda.com')
+    # Los 403 que persisten más allá de RETRY_TIMES sí
+    respond('https://tienda.com/otra', 403)
+    assert health.store.is_open('tienda.com')
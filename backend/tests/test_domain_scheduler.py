@@ -0,0 +1,91 @@
+"""
+Tests para el planificador de delays por dominio.
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+from scrapy import Request
+from scrapy.settings import Settings
+from scrapy.squeues import FifoMemoryQueue
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.domain_scheduler import DomainDelayScheduler, DomainReadyPriorityQueue
+
+
+def test_consecutive_requests_are_spaced_by_delay():
+    """Verifica que las peticiones del mismo dominio reservan huecos consecutivos."""
+    scheduler = DomainDelayScheduler()
+
+    assert scheduler.reserve('a.com', 1.0, now=0.0) == 0.0
+    assert scheduler.reserve('a.com', 1.0, now=0.0) == 1.0
+    assert scheduler.reserve('a.com', 1.0, now=0.0) == 2.0
+    assert scheduler.reserve('a.com', 1.0, now=5.0) == 0.0
+
+
+def test_domains_do_not_block_each_other():
+    """Verifica que un dominio limitado no retrasa a los demás."""
+    scheduler = DomainDelayScheduler()
+
+    for _ in range(5):
+        scheduler.reserve('lento.com', 2.0, now=0.0)
+
+    assert scheduler.pending_wait('lento.com', now=0.0) == 10.0
+    assert scheduler.reserve('rapido.com', 2.0, now=0.0) == 0.0
+
+
+def test_burst_allows_initial_requests_without_wait():
+    """Verifica que el burst permite varias peticiones iniciales sin espera."""
+    scheduler = DomainDelayScheduler(burst=3)
+
+    waits = [scheduler.reserve('a.com', 1.0, now=0.0) for _ in range(4)]
+    assert waits == [0.0, 0.0, 0.0, 1.0]
+
+
+class _FakeLimiter:
+    """Rate limiter con esperas fijas por dominio que registra las reservas."""
+
+    def __init__(self, waits):
+        self.waits = waits
+        self.claimed = []
+
+    def ready_in(self, domain):
+        return self.waits.get(domain, 0.0)
+
+    def claim(self, request):
+        self.claimed.append(request.url)
+        request.meta['rate_limit_ready_at'] = 0.0
+
+
+def _ready_queue(limiter):
+    downloader = SimpleNamespace(slots={}, middleware=SimpleNamespace(middlewares=[object(), limiter]))
+    crawler = SimpleNamespace(settings=Settings(), engine=SimpleNamespace(downloader=downloader, slot=None))
+    return DomainReadyPriorityQueue(crawler, FifoMemoryQueue, 'bench')
+
+
+def test_ready_queue_skips_domains_without_free_slot():
+    """Las peticiones del dominio en espera se quedan en la cola y salen las de otros dominios."""
+    limiter = _FakeLimiter({'lento.com': 5.0})
+    queue = _ready_queue(limiter)
+    for i in range(3):
+        queue.push(Request(f'http://lento.com/{i}'))
+    queue.push(Request('http://rapido.com/'))
+
+    request = queue.pop()
+    assert request.url == 'http://rapido.com/'
+    assert limiter.claimed == ['http://rapido.com/']
+    assert 'rate_limit_ready_at' in request.meta
+
+    # Ningún dominio listo: no sale nada y el engine se despierta cuando lo esté
+    assert queue.pop() is None
+    assert len(queue) == 3 and queue.wakeup is not None
+    assert queue.wakeup.getTime() - queue.wakeup.seconds() == pytest.approx(5.0, abs=0.5)
+
+    limiter.waits['lento.com'] = 0.0
+    assert queue.pop().url == 'http://lento.com/0'
+    queue.close()
+    assert queue.wakeup is None
@@ -0,0 +1,63 @@
+"""
+Tests para el extractor de emails de una sola pasada.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.email_extractor import extract_emails
+from bench_email_extraction import legacy_extract_emails, is_legacy_artifact
+
+
+SAMPLE_PAGE = """
+<html><head>
+<meta name="reply-to" content="Ventas@Empresa.com">
+<title>Contacto</title></head>
+<body>
+<a href="mailto:info@empresa.com">Escríbenos</a>
+<p>Correo: soporte@empresa.com.mx</p>
+<p>juan [at] empresa.org y maria (AT) empresa.net</p>
+<p>pedro @ empresa.es</p>
+<p>luis@NOSPAMempresa.io</p>
+<script>var c = "js.user@empresa.co";</script>
+<input type="email" value="form@empresa.com">
+<!-- oculto: comentario@empresa.com -->
+</body></html>
+"""
+
+
+def test_extracts_all_formats():
+    """Verifica que se extraen emails planos, ofuscados, de JS, formularios y meta."""
+    emails = set(extract_emails(SAMPLE_PAGE))
+
+    for expected in [
+        'ventas@empresa.com', 'info@empresa.com', 'soporte@empresa.com.mx',
+        'juan@empresa.org', 'maria@empresa.net', 'pedro@empresa.es',
+        'luis@empresa.io', 'luis@nospamempresa.io', 'js.user@empresa.co',
+        'form@empresa.com', 'comentario@empresa.com'
+    ]:
+        assert expected in emails
+
+
+def test_encoded_at_markers():
+    """Verifica que se reconocen arrobas codificadas en JS y entidades HTML."""
+    text = 'a: "hola\\u0040empresa.com" b: ventas&#64;empresa.com c: rrhh&#x40;empresa.com'
+    assert extract_emails(text) == ['hola@empresa.com', 'ventas@empresa.com', 'rrhh@empresa.com']
+
+
+def test_recall_matches_legacy_method():
+    """Verifica que el extractor encuentra todo lo que encontraba el método anterior."""
+    current = set(extract_emails(SAMPLE_PAGE))
+    legacy_only = set(legacy_extract_emails(SAMPLE_PAGE)) - current
+    assert all(is_legacy_artifact(email, current) for email in legacy_only)
+
+
+def test_rejects_invalid_candidates():
+    """Verifica que se descartan textos que no son emails."""
+    assert extract_emails('') == []
+    assert extract_emails(None) == []
+    assert extract_emails('usuario@localhost, @empresa.com') == []
+    assert extract_emails('x' * 80 + '@empresa.com') == []
@@ -0,0 +1,161 @@
+"""
+Tests para la frescura de los dominios y la planificación de revisitas.
+"""
+
+import asyncio
+import math
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import jobs
+from app.api.jobs import JobConfig, create_job
+from app.database.models import Base, Email, ScrapingQueue, Website
+from app.scraper.freshness import (
+    DomainStats, FreshnessEstimator, cached_leads, load_domain_stats, plan_revisits, schedule_revisits
+)
+from app.scraper.items import LeadItem
+from app.scraper.pipelines import DatabasePipeline
+
+_NOW = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'freshness.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _add_domain(db, domain, pages, visits, changes, last_crawled, emails=()):
+    """Páginas de un dominio rastreado desde 60 días antes de ``last_crawled``."""
+    for index in range(pages):
+        website = Website(url=f'https://{domain}/p{index}', domain=domain, depth_level=min(index, 2),
+                          scrape_count=visits, change_count=changes, email_count=len(emails) if index == 0 else 0,
+                          created_at=last_crawled - timedelta(days=60), updated_at=last_crawled)
+        db.add(website)
+        if index == 0:
+            db.flush()
+            for quality, email in enumerate(emails):
+                db.add(Email(website_id=website.id, email=email, source_page=website.url, quality_score=quality))
+    db.commit()
+
+
+def test_estimator_uses_change_history_and_prior():
+    """Un sitio que cambia en cada visita caduca antes que uno estable; sin revisitas se usa la tasa a priori."""
+    estimator = FreshnessEstimator(default_change_days=30.0, max_staleness=0.2)
+    crawled = _NOW - timedelta(days=1)
+
+    def stats(visits, changes):
+        return DomainStats('tienda.com', 10, 5, visits, changes, crawled - timedelta(days=60), crawled,
+                           'https://tienda.com/', 2)
+
+    volatile, stable, unseen = stats(60, 60), stats(60, 0), stats(0, 0)
+    assert estimator.change_rate(volatile) > estimator.change_rate(stable) > 0
+    assert estimator.change_rate(unseen) == pytest.approx(1 / (30 * 86400))
+    assert not estimator.is_fresh(volatile, _NOW)
+    assert estimator.is_fresh(stable, _NOW) and estimator.is_fresh(unseen, _NOW)
+
+    # Caduca justo cuando la fracción esperada de páginas cambiadas llega al umbral
+    expiry = estimator.fresh_until(unseen)
+    assert expiry - crawled == pytest.approx(timedelta(days=-30 * math.log(0.8)), abs=timedelta(seconds=1))
+    assert estimator.staleness(unseen, expiry) == pytest.approx(0.2)
+    assert estimator.expected_yield(volatile, _NOW) > estimator.expected_yield(stable, _NOW)
+
+
+def test_pipeline_counts_changes_and_revisits_are_planned_by_yield(tmp_path):
+    """El upsert cuenta los cambios de hash y las revisitas se encolan por rendimiento esperado."""
+    session_factory = _session_factory(tmp_path)
+    pipeline = DatabasePipeline(db_engine=session_factory.kw['bind'], flush_interval=0)
+    pipeline.open_spider(None)
+    for content_hash in ['h1', 'h1', 'h2']:
+        pipeline.process_item(LeadItem(url='https://tienda.com/', domain='tienda.com', emails=[],
+                                       content_hash=content_hash), None)
+        pipeline.close_spider(None)
+    db = session_factory()
+    page = db.query(Website).one()
+    assert (page.scrape_count, page.change_count) == (2, 1)
+    db.query(Website).delete()
+    db.commit()
+
+    old = _NOW - timedelta(days=20)
+    _add_domain(db, 'rica.com', 10, 6, 5, old, emails=['a@rica.com', 'b@rica.com', 'c@rica.com'])
+    _add_domain(db, 'pobre.com', 10, 6, 5, old)
+    _add_domain(db, 'estable.com', 10, 6, 0, old)
+    _add_domain(db, 'encolada.com', 10, 6, 5, old)
+    db.add(ScrapingQueue(job_id='activo', url='https://www.encolada.com/', domain='encolada.com', status='pending'))
+    db.commit()
+
+    stats = load_domain_stats(db)
+    assert stats['rica.com'].start_url == 'https://rica.com/' and stats['rica.com'].max_depth == 2
+    plans = plan_revisits(db, FreshnessEstimator(max_staleness=0.2), limit=5, now=_NOW)
+    assert [plan.stats.domain for plan in plans] == ['rica.com', 'pobre.com']
+    assert [lead['email'] for lead in cached_leads(db, 'rica.com', limit=2)] == ['c@rica.com', 'b@rica.com']
+    db.close()
+
+    job_ids = schedule_revisits(1, FreshnessEstimator(max_staleness=0.2), session_factory, now=_NOW)
+    db = session_factory()
+    job = db.query(ScrapingQueue).filter_by(job_id=job_ids[0]).one()
+    assert (job.url, job.domain, job.max_depth, job.recrawl, job.status) == (
+        'https://rica.com/', 'rica.com', 2, 1, 'pending')
+    db.close()
+
+
+def test_create_job_returns_cached_leads_for_fresh_domains(tmp_path, monkeypatch):
+    """
+    Un dominio fresco rastreado a la profundidad pedida no se rastrea (con o sin www); uno caducado
+    se encola como recrawl; uno más profundo, sin job completado o con force pide el crawl completo.
+    """
+    session_factory = _session_factory(tmp_path)
+    db = session_factory()
+    _add_domain(db, 'fresca.com', 5, 0, 0, datetime.now(timezone.utc) - timedelta(hours=1), emails=['hola@fresca.com'])
+    _add_domain(db, 'vieja.com', 5, 4, 4, datetime.now(timezone.utc) - timedelta(days=90), emails=['info@vieja.com'])
+    _add_domain(db, 'www.sinjob.com', 5, 0, 0, datetime.now(timezone.utc) - timedelta(hours=1))
+    db.add_all([
+        ScrapingQueue(job_id='previo-fresca', url='https://www.fresca.com/', domain='fresca.com', max_depth=3,
+                      status='completed'),
+        ScrapingQueue(job_id='previo-vieja', url='https://vieja.com/', domain='vieja.com', max_depth=2,
+                      status='completed'),
+        ScrapingQueue(job_id='previo-sinjob', url='https://www.sinjob.com/', domain='sinjob.com', max_depth=3,
+                      status='failed'),
+    ])
+    db.commit()
+    monkeypatch.setattr(jobs, 'notify_workers', lambda: 0)
+    monkeypatch.setattr(jobs.settings, 'SCRAPER_WORKERS', 1)
+
+    def submit(url, **kwargs):
+        return asyncio.run(create_job(JobConfig(start_url=url, **kwargs), BackgroundTasks(), db))
+
+    fresh = submit('https://fresca.com/')
+    assert fresh.status == 'fresh'
+    assert [lead.email for lead in fresh.cached_leads] == ['hola@fresca.com']
+    fresh_www = submit('https://www.fresca.com/', depth=2)
+    assert fresh_www.status == 'fresh' and len(fresh_www.cached_leads) == 1
+
+    deeper = submit('https://fresca.com/', depth=5)
+    assert deeper.status == 'starting' and len(deeper.cached_leads) == 1
+
+    stale = submit('https://vieja.com/', depth=2)
+    assert stale.status == 'starting' and [lead.email for lead in stale.cached_leads] == ['info@vieja.com']
+    stale_deeper = submit('https://vieja.com/')
+
+    unfinished = submit('https://sinjob.com/')
+    assert unfinished.status == 'starting'
+
+    forced = submit('https://fresca.com/', force=True)
+    assert forced.status == 'starting' and forced.cached_leads == []
+
+    new = submit('https://nueva.com/')
+    jobs_by_id = {item.job_id: (item.status, item.recrawl) for item in db.query(ScrapingQueue).all()}
+    assert {job_id: jobs_by_id[job_id] for job_id in jobs_by_id if not job_id.startswith('previo-')} == {
+        fresh.job_id: ('completed', 0), fresh_www.job_id: ('completed', 0), deeper.job_id: ('pending', 0),
+        stale.job_id: ('pending', 1), stale_deeper.job_id: ('pending', 0), unfinished.job_id: ('pending', 0),
+        forced.job_id: ('pending', 0), new.job_id: ('pending', 0)}
+    db.close()
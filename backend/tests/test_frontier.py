@@ -0,0 +1,67 @@
+"""
+Tests para la prioridad de enlaces de contacto y la regla de parada por dominio.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.exceptions import CloseSpider
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from app.scraper.frontier import LinkScorer
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def test_contact_links_score_above_content_links():
+    """Ruta y texto de contacto suben la prioridad; blog y etiquetas la bajan; los bordes de la página suman."""
+    scorer = LinkScorer()
+    contact = scorer.score('https://tienda.com/contacto/', 'Contacto', 50, 101)
+    about = scorer.score('https://tienda.com/quienes-somos', 'Quiénes somos', 50, 101)
+    anchor_only = scorer.score('https://tienda.com/p/12', 'Contáctanos', 50, 101)
+    product = scorer.score('https://tienda.com/vintage-bolsos', 'Bolsos', 50, 101)
+    post = scorer.score('https://tienda.com/blog/rebajas-de-verano', 'Rebajas de verano', 50, 101)
+
+    assert contact == about > anchor_only > product > post
+    assert product == 0
+    # El mismo enlace en el pie de la página puntúa más que en el centro
+    assert scorer.score('https://tienda.com/contacto/', 'Contacto', 100, 101) == contact + 10
+
+
+def _response(url, body, depth=0):
+    return HtmlResponse(url, body=body.encode(), headers={'Content-Type': 'text/html'},
+                        request=Request(url, meta={'depth': depth}))
+
+
+def test_spider_prioritizes_contact_links_and_stops_per_domain():
+    """La petición del enlace de contacto lleva más prioridad y la regla de parada cierra el job."""
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'FRONTIER_STOP_AFTER_EMAILS': 2})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/')
+    crawler.stats.open_spider(spider)
+
+    posts = ''.join(f'<a href="/blog/post-{index}">Entrada {index}</a>' for index in range(20))
+    home = _response('https://tienda.com/', f'<html><body><p>{"texto " * 30}</p>{posts}'
+                                            f'<footer><a href="/contacto"><b>Contacto</b></a></footer></body></html>')
+    requests = {request.url: request.priority for request in spider.parse(home) if isinstance(request, Request)}
+    assert max(requests, key=requests.get) == 'https://tienda.com/contacto'
+    assert requests['https://tienda.com/contacto'] > 100 > requests['https://tienda.com/blog/post-19']
+
+    # Dos emails nuevos en el dominio: no se siguen más enlaces y el job termina
+    contact = _response('https://tienda.com/contacto', f'<html><body><p>{"texto " * 30}</p>'
+                                                       f'<p>ventas@tienda.com, soporte@tienda.com</p>'
+                                                       f'<a href="/equipo">Equipo</a></body></html>', depth=1)
+    output = []
+    with pytest.raises(CloseSpider) as closed:
+        for result in spider.parse(contact):
+            output.append(result)
+    assert closed.value.reason == 'domain_emails_found'
+    assert [item['url'] for item in output] == ['https://tienda.com/contacto']
+    assert crawler.stats.get_value('frontier/domains_completed') == 1
+
+    # Por job se puede desactivar (-a stop_after_emails=0)
+    spider.stop_after_emails = '0'
+    assert spider._stop_after_emails() == 0
@@ -0,0 +1,110 @@
+"""
+Pruebas para el canal de control de jobs (pausa/reanudación/cancelación).
+"""
+
+import socket
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.job_control import (
+    JobControlExtension,
+    broadcast_job_command,
+    control_socket_path,
+    send_job_command,
+)
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.paused = False
+        self.slot = None
+        self.closed_reason = None
+
+    def pause(self):
+        self.paused = True
+
+    def unpause(self):
+        self.paused = False
+
+    def close_spider(self, spider, reason):
+        self.closed_reason = reason
+
+
+class _FakeCrawler:
+    def __init__(self):
+        self.engine = _FakeEngine()
+
+
+class _FakeSpider:
+    job_id = 'job-123'
+
+
+def _listen(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(1)
+    return sock
+
+
+def test_send_job_command_reaches_listener(tmp_path):
+    """El comando llega al socket del job y no a otros."""
+    control_dir = str(tmp_path)
+    listener = _listen(control_socket_path('job-123', control_dir))
+    try:
+        assert send_job_command('job-123', 'pause', control_dir)
+        assert listener.recv(64) == b'pause'
+        # Sin proceso escuchando el envío no falla, solo devuelve False
+        assert not send_job_command('otro-job', 'pause', control_dir)
+    finally:
+        listener.close()
+
+
+def test_broadcast_job_command(tmp_path):
+    """El broadcast llega a todos los procesos en ejecución."""
+    control_dir = str(tmp_path)
+    listeners = [_listen(control_socket_path(job_id, control_dir)) for job_id in ('a', 'b')]
+    try:
+        assert broadcast_job_command('cancel', control_dir) == 2
+        assert [sock.recv(64) for sock in listeners] == [b'cancel', b'cancel']
+    finally:
+        for sock in listeners:
+            sock.close()
+
+
+def test_extension_applies_commands_to_engine(tmp_path):
+    """pause/resume/cancel se traducen en operaciones del engine."""
+    crawler = _FakeCrawler()
+    extension = JobControlExtension(crawler, str(tmp_path))
+    extension.spider = _FakeSpider()
+
+    extension.handle_command('pause')
+    assert crawler.engine.paused
+
+    extension.handle_command('resume')
+    assert not crawler.engine.paused
+
+    extension.handle_command('pause')
+    extension.handle_command('cancel')
+    assert crawler.engine.closed_reason == 'cancelled'
+    assert not crawler.engine.paused
+
+
+def test_extension_routes_batch_job_commands_to_their_seed(tmp_path):
+    """Los comandos de un job reclamado por un spider batch no paran el engine."""
+    crawler = _FakeCrawler()
+    extension = JobControlExtension(crawler, str(tmp_path))
+    commands = []
+    extension.spider = _FakeSpider()
+    extension.spider.control_batch_job = lambda job_id, command: commands.append((job_id, command))
+
+    extension.handle_command('pause', 'job-b')
+    extension.handle_command('cancel', 'job-c')
+    assert commands == [('job-b', 'pause'), ('job-c', 'cancel')]
+    assert not crawler.engine.paused and crawler.engine.closed_reason is None
+
+    # El socket del propio job del spider sigue actuando sobre el engine
+    extension.handle_command('pause', 'job-123')
+    assert crawler.engine.paused
@@ -0,0 +1,88 @@
+"""
+Tests para la detección de casi-duplicados con MinHash LSH.
+"""
+
+import sys
+import os
+import logging
+import random
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from app.scraper.dedupe import DedupeIndex
+from app.scraper.items import LeadItem
+from app.scraper.near_duplicates import MinHashLSH, minhash_signature, optimal_bands
+from app.scraper.pipelines import AdvancedDuplicatePipeline
+
+_VOCABULARY = [f"palabra{index}" for index in range(3000)]
+
+
+class _Spider:
+    logger = logging.getLogger('test')
+
+
+def _text(seed, words=400):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _edit(text, every=60):
+    words = text.split()
+    for index in range(0, len(words), every):
+        words[index] = 'cambio'
+    return ' '.join(words)
+
+
+def test_signature_similarity_tracks_text_similarity():
+    """Textos casi iguales dan firmas parecidas y textos distintos no."""
+    base = _text(1)
+    assert len(minhash_signature(base)) == 64
+    assert minhash_signature(base) == minhash_signature(base)
+    assert minhash_signature("hola mundo", min_shingles=5) is None
+
+    index = MinHashLSH(threshold=0.85)
+    index.insert('original', minhash_signature(base))
+    similarity, key = index.query(minhash_signature(_edit(base)))
+    assert key == 'original' and similarity >= 0.85
+    assert index.query(minhash_signature(_text(2)))[0] < 0.2
+
+
+def test_bands_keep_recall_at_threshold():
+    """Las bandas elegidas mantienen candidatos los pares con similitud igual al umbral."""
+    for threshold in (0.5, 0.85, 0.95):
+        bands, rows = optimal_bands(threshold, 64)
+        assert bands * rows == 64
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.9
+
+
+def test_index_size_is_bounded():
+    """Al superar max_documents se olvidan las firmas más antiguas."""
+    index = MinHashLSH(max_documents=3)
+    for seed in range(5):
+        index.insert(f"doc{seed}", minhash_signature(_text(seed)), payload=seed)
+    assert list(index.signatures) == ['doc2', 'doc3', 'doc4']
+    assert set(index.payloads) == {'doc2', 'doc3', 'doc4'}
+    assert index.query(minhash_signature(_text(0)))[1] is None
+
+
+def test_pipeline_drops_near_duplicates_without_new_emails():
+    """Una página casi igual se descarta salvo que aporte emails nuevos."""
+    crawler = get_crawler(settings_dict={'DEDUPE_PERSISTENT': False})
+    pipeline = AdvancedDuplicatePipeline(crawler)
+    pipeline.dedupe = DedupeIndex(capacity=1000)
+    base = _text(3)
+
+    def item(path, text, emails):
+        return LeadItem(url=f"https://a.com/{path}", domain='a.com', title=path, emails=emails,
+                        content_signature=minhash_signature(text))
+
+    pipeline.process_item(item('uno', base, ['info@a.com']), _Spider())
+    with pytest.raises(DropItem):
+        pipeline.process_item(item('dos', _edit(base), ['info@a.com']), _Spider())
+    pipeline.process_item(item('tres', _edit(base), ['ana@a.com']), _Spider())
+    pipeline.process_item(item('cuatro', _text(4), []), _Spider())
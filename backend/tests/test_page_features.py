@@ -0,0 +1,117 @@
+"""
+Tests para la extracción de características de página en una pasada.
+"""
+
+import sys
+import os
+import logging
+from dataclasses import FrozenInstanceError
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from app.scraper.items import LeadItem
+from app.scraper.page_features import (
+    PageFeatures, contact_score, detect_content_type, extract_page_features, page_quality_score
+)
+from app.scraper.pipelines import ContentValidationPipeline
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_PAGE = """
+<html>
+  <head>
+    <title>  Contacto - Empresa Ejemplo  </title>
+    <meta name="description" content="Servicios de consultoría para empresas y negocios locales en toda la región">
+    <meta name="keywords" content="consultoría, empresa">
+    <meta property="og:description" content="Descripción alternativa">
+    <style>.oculto { display: none }</style>
+  </head>
+  <body>
+    <h1>Bienvenidos a la empresa</h1>
+    <!-- comentario --><p>Escríbanos a <a href="mailto:info@ejemplo.com">info@ejemplo.com</a> o visite <a href="/equipo">el equipo</a>.</p>
+    <img src="logo.png"><img alt="sin src">
+    <script>var texto = "no visible";</script>
+    <noscript>tampoco visible</noscript>
+    <a>sin enlace</a>
+  </body>
+</html>
+"""
+
+
+def _response(url="https://ejemplo.com/contacto", body=_PAGE):
+    return HtmlResponse(url=url, body=body.encode('utf-8'), encoding='utf-8',
+                        request=Request(url, meta={'depth': 0}))
+
+
+class _Spider:
+    logger = logging.getLogger('test')
+
+
+def test_extract_page_features_single_pass():
+    """Una pasada obtiene título, metas, enlaces, imágenes y texto visible."""
+    features = extract_page_features(_response(), min_shingles=1)
+
+    assert features.title == 'Contacto - Empresa Ejemplo'
+    assert features.description.startswith('Servicios de consultoría')
+    assert features.keywords == 'consultoría, empresa'
+    assert features.links == ('mailto:info@ejemplo.com', '/equipo')
+    assert features.image_count == 1
+    assert 'no visible' not in features.text_sample
+    assert 'tampoco' not in features.text_sample
+    assert 'comentario' not in features.text_sample
+    assert features.text_sample.startswith('bienvenidos a la empresa')
+    assert features.word_count == len("Bienvenidos a la empresa Escríbanos a info@ejemplo.com o visite el equipo . sin enlace".split())
+    assert features.content_signature is not None
+
+    # Inmutable
+    with pytest.raises(FrozenInstanceError):
+        features.title = 'otro'
+
+    # Sin meta description se usa og:description
+    body = _PAGE.replace('name="description"', 'name="otra"')
+    assert extract_page_features(_response(body=body)).description == 'Descripción alternativa'
+
+
+def test_scorers_use_keyword_hits():
+    """Los puntuadores trabajan sobre las palabras clave encontradas en la extracción."""
+    features = extract_page_features(_response())
+
+    assert detect_content_type(features) == 'business'
+    # 1 email + 'contacto' + 'contact' (subcadena)
+    assert contact_score(features, ['info@ejemplo.com']) == 20
+    assert features.find_keywords(['empresa', 'negocio', 'venta', 'consultoría']) == ['empresa', 'negocio', 'consultoría']
+    assert page_quality_score(features, ['info@ejemplo.com'], content_length=500) == 20 + 15 + 10 + 3 + 20
+
+    assert detect_content_type(PageFeatures.from_fields('https://x.com/blog/1', 'Noticias')) == 'blog'
+    assert detect_content_type(PageFeatures.from_fields('https://x.com/', 'Nada')) == 'unknown'
+
+
+def test_spider_and_pipeline_share_features():
+    """El spider adjunta las características y el pipeline obtiene los mismos resultados con o sin ellas."""
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://ejemplo.com/')
+    response = _response()
+
+    item = spider.extract_lead_info(response, 0, None)
+    assert isinstance(item['page_features'], PageFeatures)
+    assert item['title'] == 'Contacto - Empresa Ejemplo'
+    assert item['link_count'] == 2
+    assert item['image_count'] == 1
+    assert item['language'] == 'es'
+
+    pipeline = ContentValidationPipeline(crawler)
+    with_features = pipeline.process_item(item, _Spider())
+    rebuilt = LeadItem({key: value for key, value in dict(item).items() if key != 'page_features'})
+    without_features = pipeline.process_item(rebuilt, _Spider())
+
+    for field in ('has_business_keywords', 'content_type', 'contact_score'):
+        assert with_features[field] == without_features[field]
+    assert 'empresa' in with_features['has_business_keywords']
+
+    # Los enlaces a seguir salen de las mismas características
+    requests = list(spider._extract_and_follow_links(response, 0, item['page_features'].links))
+    assert [request.url for request in requests] == ['https://ejemplo.com/equipo']
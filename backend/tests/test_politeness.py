@@ -0,0 +1,71 @@
+"""
+Tests para los token buckets por host compartidos entre jobs y procesos.
+"""
+
+import sys
+import os
+import multiprocessing
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scraper.politeness import SharedBucketTable, SharedDomainDelayScheduler
+
+
+def _reserve_many(path, count, queue):
+    """Proceso hijo: reserva ``count`` huecos del mismo host en la tabla compartida."""
+    scheduler = SharedDomainDelayScheduler(SharedBucketTable(path, slots=64))
+    queue.put([scheduler.reserve('tienda.com', 1.0, now=1000.0) for _ in range(count)])
+
+
+def test_schedulers_share_host_buckets(tmp_path):
+    """Dos jobs sobre el mismo fichero reparten los huecos del host en lugar de duplicar el ritmo."""
+    path = str(tmp_path / 'leads.db.politeness')
+    first = SharedDomainDelayScheduler(SharedBucketTable(path, slots=64))
+    second = SharedDomainDelayScheduler(SharedBucketTable(path, slots=64))
+
+    waits = [scheduler.reserve('tienda.com', 1.0, now=0.0) for scheduler in (first, second, first, second)]
+    assert waits == [0.0, 1.0, 2.0, 3.0]
+    assert second.pending_wait('tienda.com', now=0.0) == 4.0
+    # Otros hosts no se ven afectados
+    assert first.reserve('otra.com', 1.0, now=0.0) == 0.0
+
+    reopened = SharedBucketTable(path, slots=64)
+    assert reopened.count == 2
+    assert reopened.reserve('tienda.com', 1.0, 1.0, now=10.0) == 0.0
+
+
+def test_full_table_compacts_idle_hosts_and_falls_back_locally():
+    """Los buckets ya rellenados se descartan; sin hueco, el host se planifica en el proceso."""
+    table = SharedBucketTable(slots=16)
+    scheduler = SharedDomainDelayScheduler(table)
+    for host in range(table.max_count):
+        scheduler.reserve(f'host{host}.com', 1.0, now=0.0)
+        scheduler.reserve(f'host{host}.com', 1.0, now=0.0)
+
+    # Todos los hosts tienen reservas pendientes: la tabla no admite más
+    assert table.reserve('nuevo.com', 1.0, 1.0, now=0.0) is None
+    assert scheduler.reserve('nuevo.com', 1.0, now=0.0) == 0.0
+    assert scheduler.reserve('nuevo.com', 1.0, now=0.0) == 1.0
+    assert 'nuevo.com' in scheduler.buckets
+
+    # Pasado el tiempo, la compactación libera los buckets llenos sin perder los activos
+    scheduler.reserve('host0.com', 100.0, now=1.5)
+    assert table.reserve('otro.com', 1.0, 1.0, now=2.0) == 0.0
+    assert table.count == 2
+    assert table.pending_wait('host0.com', now=2.0) > 90.0
+
+
+def test_processes_share_host_buckets(tmp_path):
+    """Varios procesos worker reservan huecos distintos del mismo host."""
+    path = str(tmp_path / 'leads.db.politeness')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = [context.Process(target=_reserve_many, args=(path, 5, queue)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    waits = sorted(wait for _ in processes for wait in queue.get(timeout=60))
+    for process in processes:
+        process.join(10)
+
+    assert waits == [float(second) for second in range(15)]
@@ -0,0 +1,209 @@
+"""
+Tests para el recrawl incremental con GET condicional y detección de cambios.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from twisted.python.failure import Failure
+
+from app.database.models import Base, CrawlOutcome, ScrapingQueue, Website
+from app.scraper.dedupe import DedupeIndex
+from app.scraper.pipelines import DuplicateFilterPipeline
+from app.scraper.recrawl import (
+    ConditionalGetMiddleware, PageNotModified, ValidatorStore, Validators, body_hash, touch_unchanged_pages
+)
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_PAGE = b'<html><head><title>Tienda</title></head><body><p>ventas@tienda.com</p>' + b'texto ' * 40 + b'</body></html>'
+
+
+def _spider(**kwargs):
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'CONDITIONAL_GET_ENABLED': True})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/', **kwargs)
+    crawler.stats.open_spider(spider)
+    return spider, crawler
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'recrawl.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_middleware_sends_validators_and_short_circuits_unchanged_pages():
+    """304 y 200 con el mismo hash se cortan; un cuerpo distinto sigue hasta el spider."""
+    spider, crawler = _spider()
+    spider.validators = ValidatorStore({
+        'https://tienda.com/contacto': Validators('"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT', body_hash(_PAGE)),
+        'https://tienda.com/equipo': Validators(None, None, body_hash(_PAGE)),
+        'https://tienda.com/blog': Validators('"b1"', None, body_hash(_PAGE)),
+    }, {'https://tienda.com/contacto': [], 'https://tienda.com/equipo': []})
+    middleware = ConditionalGetMiddleware.from_crawler(crawler)
+
+    # Sin hijos conocidos la página se parsea, salvo en la última profundidad (no sigue enlaces)
+    unknown = Request('https://tienda.com/blog', meta={'depth': 1})
+    middleware.process_request(unknown, spider)
+    assert 'If-None-Match' not in unknown.headers and 'stored_validators' not in unknown.meta
+    assert crawler.stats.get_value('recrawl/children_unknown') == 1
+    deepest = Request('https://tienda.com/blog', meta={'depth': 3})
+    middleware.process_request(deepest, spider)
+    assert deepest.headers['If-None-Match'] == b'"b1"'
+
+    request = Request('https://tienda.com/contacto/?utm_source=x')
+    middleware.process_request(request, spider)
+    assert request.headers['If-None-Match'] == b'"v1"'
+    assert request.headers['If-Modified-Since'] == b'Mon, 01 Jan 2024 00:00:00 GMT'
+    with pytest.raises(PageNotModified):
+        middleware.process_response(request, Response(request.url, status=304, request=request), spider)
+
+    # Sin validadores HTTP: se compara el hash del cuerpo
+    same = Request('https://tienda.com/equipo')
+    middleware.process_request(same, spider)
+    assert 'If-None-Match' not in same.headers
+    with pytest.raises(PageNotModified):
+        middleware.process_response(same, HtmlResponse(same.url, body=_PAGE, request=same), spider)
+
+    changed = Request('https://tienda.com/equipo')
+    middleware.process_request(changed, spider)
+    body = _PAGE.replace(b'ventas@', b'info@')
+    response = HtmlResponse(changed.url, body=body, request=changed)
+    assert middleware.process_response(changed, response, spider) is response
+    assert changed.meta['content_hash'] == body_hash(body)
+
+    # Una redirección a una página nueva no arrastra los validadores de la original
+    redirected = request.replace(url='https://tienda.com/nueva')
+    middleware.process_request(redirected, spider)
+    assert 'stored_validators' not in redirected.meta and 'If-None-Match' not in redirected.headers
+
+    assert spider.validators.unchanged == ['https://tienda.com/contacto', 'https://tienda.com/equipo']
+    assert crawler.stats.get_value('recrawl/not_modified') == 1
+    assert crawler.stats.get_value('recrawl/unchanged_hash') == 1
+    assert crawler.stats.get_value('recrawl/changed') == 1
+
+
+def test_store_loads_children_and_touches_unchanged_pages(tmp_path):
+    """Los hijos salen de todas las descargas; las visitas sin cambios se anotan en un UPDATE."""
+    session_factory = _session_factory(tmp_path)
+    db = session_factory()
+    db.add_all([
+        Website(url='https://tienda.com/', domain='tienda.com', etag='"home"', content_hash='h0'),
+        Website(url='https://tienda.com/contacto', domain='tienda.com', source_url='https://tienda.com/?utm_source=x',
+                fetch_url='https://tienda.com/contacto/',
+                last_modified='Mon, 01 Jan 2024 00:00:00 GMT', scrape_count=1),
+        Website(url='https://otra.com/', domain='otra.com'),
+        ScrapingQueue(job_id='job-1', url='https://tienda.com/', max_depth=2, status='completed'),
+    ])
+    # Descargas del último crawl: también las páginas sin emails y las que dieron error
+    for url, source_url, depth, status in [
+        ('https://tienda.com/', None, 0, 200),
+        ('https://tienda.com/contacto/', 'https://tienda.com/', 1, 200),
+        ('https://tienda.com/blog', 'https://tienda.com/', 1, 200),
+        ('https://tienda.com/blog/post', 'https://tienda.com/blog', 2, 200),
+        ('https://tienda.com/caida', 'https://tienda.com/', 1, 500),
+    ]:
+        db.add(CrawlOutcome(job_id='job-1', url=url, domain='tienda.com', source_url=source_url,
+                            depth_level=depth, http_status=status))
+    db.commit()
+    db.close()
+
+    spider, _ = _spider()
+    store = ValidatorStore.load(['tienda.com'], spider.url_canonicalizer.canonical, session_factory)
+    assert len(store) == 2
+    assert store.get('https://tienda.com/') == Validators('"home"', None, 'h0')
+    # Los hijos se piden por la URL de su respuesta: la canónica puede no servirse sin la barra final
+    assert store.known_children('https://tienda.com/') == ['https://tienda.com/contacto/', 'https://tienda.com/blog']
+    assert store.known_children('https://tienda.com/blog') == ['https://tienda.com/blog/post']
+    # La de contacto no tuvo hijos; el post se descargó en la última profundidad de su job
+    assert store.knows_children('https://tienda.com/contacto')
+    assert store.known_children('https://tienda.com/contacto') == []
+    assert not store.knows_children('https://tienda.com/blog/post')
+
+    assert touch_unchanged_pages(['https://tienda.com/contacto'], session_factory) == 1
+    db = session_factory()
+    page = db.query(Website).filter_by(url='https://tienda.com/contacto').one()
+    assert page.scrape_count == 2 and page.last_scraped is not None
+    db.close()
+
+
+def test_recrawl_follows_known_children_and_updates_changed_pages():
+    """En modo recrawl una página sin cambios pide sus hijos guardados y una cambiada pasa los duplicados."""
+    spider, crawler = _spider(recrawl='1')
+    spider.validators = ValidatorStore(
+        {'https://tienda.com/': Validators(), 'https://tienda.com/contacto': Validators()},
+        {'https://tienda.com/': ['https://tienda.com/blog/post', 'https://tienda.com/contacto', 'https://cdn.com/x']},
+    )
+    home = Request('https://tienda.com/', meta={'depth': 0, 'seed': 'tienda.com',
+                                                'stored_url': 'https://tienda.com/'})
+    failure = Failure(PageNotModified('Not modified'))
+    failure.request = home
+    children = spider._handle_request_error(failure)
+    # Primero la de contacto, a profundidad 1 y solo del host de la semilla
+    assert [(request.url, request.meta['depth']) for request in children] == [
+        ('https://tienda.com/contacto', 1), ('https://tienda.com/blog/post', 1)]
+    assert crawler.stats.get_value('recrawl/children_followed') == 2
+
+    # Fuera del modo recrawl no hay GET condicional: la URL inicial se parsea siempre
+    plain, _ = _spider()
+    assert plain._load_validators(plain) is None and plain.validators is None
+
+    # La página cambiada lleva sus validadores y actualiza su registro aunque la URL sea conocida
+    request = children[0].replace(meta={**children[0].meta, 'stored_validators': Validators()})
+    response = HtmlResponse(request.url, body=_PAGE, request=request,
+                            headers={'Content-Type': 'text/html', 'ETag': '"v2"'})
+    item = next(entry for entry in spider.parse(response) if not isinstance(entry, Request))
+    assert (item['etag'], item['content_hash'], item['recrawled']) == ('"v2"', body_hash(_PAGE), True)
+
+    dedupe = DedupeIndex(capacity=1000)
+    dedupe.add('url', item['url'])
+    pipeline = DuplicateFilterPipeline(dedupe)
+    assert pipeline.process_item(item, spider) is item
+
+
+def test_recrawl_requests_skip_the_http_cache(tmp_path):
+    """Con el orden real de los middlewares, una página guardada se pregunta al servidor y no a la caché."""
+    from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+    from app.scraper import settings as scraper_settings
+
+    crawler = get_crawler(LeadSpider, settings_dict={
+        'DEDUPE_PERSISTENT': False, 'CONDITIONAL_GET_ENABLED': True,
+        'HTTPCACHE_ENABLED': True, 'HTTPCACHE_DIR': str(tmp_path / 'httpcache'), 'HTTPCACHE_EXPIRATION_SECS': 3600,
+    })
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/', recrawl='1')
+    crawler.stats.open_spider(spider)
+    cache = HttpCacheMiddleware.from_crawler(crawler)
+    cache.spider_opened(spider)
+
+    # El crawl anterior dejó la página en la caché HTTP
+    old = Request('https://tienda.com/contacto')
+    assert cache.process_request(old, spider) is None
+    cache.process_response(old, HtmlResponse(old.url, body=_PAGE, request=old), spider)
+    assert isinstance(cache.process_request(Request(old.url), spider), Response)
+
+    spider.validators = ValidatorStore({'https://tienda.com/contacto': Validators('"v1"', None, body_hash(_PAGE))},
+                                       {'https://tienda.com/contacto': []})
+    priorities = scraper_settings.DOWNLOADER_MIDDLEWARES
+    middlewares = sorted([
+        (priorities['app.scraper.recrawl.ConditionalGetMiddleware'], ConditionalGetMiddleware.from_crawler(crawler)),
+        (priorities['scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware'], cache),
+    ], key=lambda entry: entry[0])
+
+    request = Request('https://tienda.com/contacto', meta={'depth': 1})
+    assert all(middleware.process_request(request, spider) is None for _, middleware in middlewares)
+    assert request.headers['If-None-Match'] == b'"v1"' and request.meta['dont_cache']
+
+    # La respuesta vuelve en orden inverso: la caché no guarda el 304 y se corta como página sin cambios
+    response = Response(request.url, status=304, request=request)
+    with pytest.raises(PageNotModified):
+        for _, middleware in reversed(middlewares):
+            response = middleware.process_response(request, response, spider)
+    assert spider.validators.unchanged == ['https://tienda.com/contacto']
+    cache.spider_closed(spider)
@@ -0,0 +1,80 @@
+"""
+Tests para el corte temprano de descargas no HTML o demasiado grandes.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy import Spider
+from scrapy.exceptions import StopDownload
+from scrapy.http import Headers, Request
+from scrapy.utils.test import get_crawler
+
+from app.scraper.response_limits import ResponseLimitsExtension
+
+
+def _extension(**settings):
+    crawler = get_crawler(settings_dict=settings)
+    crawler.stats.open_spider(None)
+    return ResponseLimitsExtension.from_crawler(crawler), crawler.stats
+
+
+def test_non_html_and_oversized_bodies_are_aborted_on_headers():
+    """PDF, imágenes o Content-Length por encima del tope se cortan sin leer el cuerpo."""
+    extension, stats = _extension(RESPONSE_MAX_CONTENT_LENGTH=1000)
+    spider = Spider('test')
+    request = Request('https://tienda.com/catalogo.html')
+
+    for content_type in (b'application/pdf', b'image/jpeg'):
+        with pytest.raises(StopDownload) as stopped:
+            extension.headers_received(Headers({'Content-Type': content_type}), 50000, request, spider)
+        assert stopped.value.fail is False
+    with pytest.raises(StopDownload):
+        extension.headers_received(Headers({'Content-Type': 'text/html'}), 5000, request, spider)
+
+    # HTML/XHTML dentro del tope, sin Content-Type o sin longitud conocida: se descargan
+    extension.headers_received(Headers({'Content-Type': 'Text/HTML; charset=utf-8'}), 900, request, spider)
+    extension.headers_received(Headers({'Content-Type': 'application/xhtml+xml'}), 900, request, spider)
+    extension.headers_received(Headers({}), 900, request, spider)
+    extension.headers_received(Headers({'Content-Type': 'text/html'}), object(), request, spider)
+
+    # robots.txt y las peticiones que aceptan otros tipos (sitemaps) no se cortan
+    extension.headers_received(Headers({'Content-Type': 'text/plain'}), 500,
+                               Request('https://tienda.com/robots.txt', meta={'dont_obey_robotstxt': True}), spider)
+    extension.headers_received(Headers({'Content-Type': 'application/xml'}), 500,
+                               Request('https://tienda.com/sitemap.xml', meta={'accepted_content_types': ['application/xml']}),
+                               spider)
+
+    assert stats.get_value('response_limits/aborted_content_type') == 2
+    assert stats.get_value('response_limits/aborted_content_length') == 1
+    assert stats.get_value('response_limits/bytes_saved') == 105000
+
+
+def test_stream_cap_stops_reading_after_first_bytes():
+    """El cuerpo se deja de leer al pasar del tope; cada petición cuenta por separado."""
+    extension, stats = _extension(RESPONSE_STREAM_CAP=10000)
+    spider = Spider('test')
+    first = Request('https://tienda.com/a')
+    second = Request('https://tienda.com/b')
+
+    extension.bytes_received(b'x' * 6000, first, spider)
+    extension.bytes_received(b'x' * 6000, second, spider)
+    with pytest.raises(StopDownload):
+        extension.bytes_received(b'x' * 6000, first, spider)
+    extension.bytes_received(b'x' * 3000, second, spider)
+    assert stats.get_value('response_limits/truncated') == 1
+    # La respuesta truncada no se guarda en la caché HTTP
+    assert first.meta['dont_cache'] and 'dont_cache' not in second.meta
+
+    # El tope del job (-a stream_cap=...) manda sobre el global
+    spider.stream_cap = '0'
+    extension.bytes_received(b'x' * 50000, Request('https://tienda.com/c'), spider)
+    spider.stream_cap = '1000'
+    with pytest.raises(StopDownload):
+        extension.bytes_received(b'x' * 2000, Request('https://tienda.com/d'), spider)
+    # Y el de la petición sobre el del job (los sitemaps se leen enteros)
+    extension.bytes_received(b'x' * 50000, Request('https://tienda.com/sitemap.xml', meta={'stream_cap': 0}), spider)
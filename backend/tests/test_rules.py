@@ -0,0 +1,106 @@
+"""
+Tests para el motor de reglas compiladas (URLs, spam y palabras clave).
+"""
+
+import sys
+import os
+import re
+import random
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.utils.test import get_crawler
+
+from app.scraper import settings as scraper_settings
+from app.scraper.page_features import DEFAULT_VOCABULARY
+from app.scraper.pipelines import QualityFilterPipeline
+from app.scraper.rules import KeywordMatcher, PatternMatcher, compile_keywords, compile_patterns, required_literal
+from app.scraper.spiders.lead_spider import LeadSpider
+
+_SEGMENTS = ['productos', 'admin', 'login', 'blog', 'test', 'contacto', 'wp-admin', 'user',
+             'catalogo.pdf', 'na', 'demo', 'page#top', 'equipo', '404', 'Settings', 'Bot']
+
+
+def _urls(count=500, seed=7):
+    rng = random.Random(seed)
+    return [
+        f"https://empresa{rng.randint(0, 20)}.com/" + '/'.join(rng.choice(_SEGMENTS) for _ in range(rng.randint(1, 4)))
+        for _ in range(count)
+    ]
+
+
+def test_pattern_matcher_matches_per_pattern_search():
+    """El prefiltro por literales da el mismo resultado que recorrer los patrones uno a uno."""
+    for patterns, flags in ((scraper_settings.BLOCKED_URL_PATTERNS, 0),
+                            (scraper_settings.SPAM_URL_PATTERNS, re.IGNORECASE)):
+        matcher = PatternMatcher(patterns, flags)
+        for url in _urls():
+            expected = {pattern for pattern in patterns if re.search(pattern, url, flags)}
+            assert (matcher.search(url) is not None) == bool(expected), url
+            assert matcher.find_all(url) == expected
+            if expected:
+                assert matcher.search(url) in expected
+
+    # Reglas sin literal obligatorio se evalúan siempre
+    matcher = PatternMatcher([r'(\w)\1', r'^x'])
+    assert matcher.search('abba') == r'(\w)\1'
+    assert matcher.find_all('xyy') == {r'(\w)\1', r'^x'}
+    assert PatternMatcher([]).search('algo') is None
+    # (?i) en línea: el literal no sirve de prefiltro sensible a mayúsculas
+    assert PatternMatcher([r'(?i)privado']).search('PRIVADO')
+
+    assert required_literal(r'\bwp-admin\b') == 'wp-admin'
+    assert required_literal(r'colou?r') == 'colo'
+    assert required_literal(r'/Spam/', re.IGNORECASE) == '/spam/'
+    assert required_literal(r'a|b') is None
+    # Los dígitos de \xNN y de las referencias no son parte del literal
+    assert required_literal(r'ab\x41cd') == 'ab'
+    assert PatternMatcher([r'pre\x2dfijo']).search('pre-fijo')
+    assert PatternMatcher([r'(a)\1b']).search('aab')
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    """Todas las palabras, incluidas las que empiezan dentro o al inicio de otra."""
+    matcher = KeywordMatcher(['contact', 'contacto', 'tacto', 'Sitio Web', 'web'])
+    assert matcher.find_all('Página de CONTACTO del sitio web') == {'contact', 'contacto', 'tacto', 'sitio web', 'web'}
+    assert matcher.find_all('nada aquí') == frozenset()
+    assert matcher.search('la web')
+
+    text = 'empresa de servicios y productos: contacto, teléfono y dirección https://x.com/blog'
+    expected = {term for term in DEFAULT_VOCABULARY if term in text}
+    assert compile_keywords(DEFAULT_VOCABULARY).find_all(text) == expected
+    # Compilado una sola vez por familia
+    assert compile_keywords(DEFAULT_VOCABULARY) is compile_keywords(DEFAULT_VOCABULARY)
+    assert compile_patterns(['a', 'b']) is compile_patterns(['a', 'b'])
+
+
+def test_spider_and_quality_filter_use_compiled_rules():
+    """El spider aplica BLOCKED_URL_PATTERNS y el filtro de calidad sus familias compiladas."""
+    crawler = get_crawler(LeadSpider, settings_dict={
+        'DEDUPE_PERSISTENT': False,
+        'BLOCKED_URL_PATTERNS': [r'\bprivado\b', r'\.pdf$'],
+    })
+    spider = LeadSpider.from_crawler(crawler, start_url='https://empresa.com/')
+    assert spider._is_valid_url('https://empresa.com/contacto')
+    assert not spider._is_valid_url('https://empresa.com/PRIVADO/datos')
+    assert not spider._is_valid_url('https://empresa.com/catalogo.pdf')
+    # La lista de BLOCKED_URL_PATTERNS sustituye a la del módulo de settings
+    assert spider._is_valid_url('https://empresa.com/admin')
+    # Sin el setting, la del módulo de settings (única lista)
+    default = LeadSpider.from_crawler(get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False}),
+                                      start_url='https://empresa.com/')
+    assert not default._is_valid_url('https://empresa.com/admin')
+    assert not default._is_valid_url('https://empresa.com/cuenta/signup')
+    assert default._is_valid_url('https://empresa.com/test/contacto')
+    # El host no cuenta: solo la ruta, la query y el fragmento
+    assert spider._is_valid_url('https://privado.empresa.com/contacto')
+    assert not spider._is_valid_url('https://empresa.com/contacto?seccion=privado')
+
+    pipeline = QualityFilterPipeline(get_crawler(settings_dict={'DEDUPE_PERSISTENT': False}))
+    assert pipeline._is_spam_url('https://empresa.com/Login/')
+    assert not pipeline._is_spam_url('https://empresa.com/contacto')
+    assert pipeline._is_spam_domain('Example.COM')
+    # Cada palabra de spam del email penaliza: 'noreply' y 'info'
+    assert not pipeline._is_quality_email('noreply.info@empresa.com')
+    assert pipeline._is_quality_email('ana.garcia@empresa.com')
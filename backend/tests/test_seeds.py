@@ -0,0 +1,196 @@
+"""
+Tests para el modo batch de LeadSpider: muchas semillas en un solo spider.
+"""
+
+import io
+import sys
+import os
+from types import SimpleNamespace
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, ScrapingQueue
+from app.scraper.dispatcher import JobDispatcher
+from app.scraper.job_control import JobControlMiddleware, JobRequestHeld
+from app.scraper.seeds import Seed, claim_queue_seeds, parse_seeds, read_seeds
+from app.scraper.spiders import lead_spider
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.worker import finish_jobs, record_batch_jobs
+
+
+def _spider(**kwargs):
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False})
+    spider = LeadSpider.from_crawler(crawler, **kwargs)
+    crawler.stats.open_spider(spider)
+    return spider, crawler
+
+
+def _page(request, links):
+    anchors = ''.join(f'<a href="{href}">enlace</a>' for href in links)
+    body = (f'<html><head><title>Tienda</title></head><body><p>Escríbenos: hola@{request.meta["seed"]}</p>'
+            f'{anchors}<p>{"texto " * 40}</p></body></html>').encode()
+    return HtmlResponse(request.url, body=body, headers={'Content-Type': 'text/html; charset=utf-8'},
+                        request=request)
+
+
+def test_parse_seeds_reads_depth_job_and_comments(monkeypatch):
+    """Una semilla por línea: URL [profundidad] [job_id], con comentarios y esquema por defecto."""
+    lines = ['# prospectos', '', 'https://tienda.com/ 2 job-1', 'taller.es,1,job-2', 'panaderia.mx',
+             'roto.com hondo']
+    assert parse_seeds(lines, default_depth=3) == [
+        Seed('https://tienda.com/', 2, 'job-1'),
+        Seed('https://taller.es', 1, 'job-2'),
+        Seed('https://panaderia.mx', 3, None),
+    ]
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('https://a.com 0\n'))
+    assert read_seeds('-') == [Seed('https://a.com', 0, None)]
+
+
+def test_batch_spider_keeps_per_seed_depth_domains_and_jobs():
+    """Cada semilla sigue solo sus enlaces, con su profundidad, y sus items llevan su job."""
+    spider, crawler = _spider(seeds=[Seed('https://tienda.com/', 1, 'job-a'), Seed('https://taller.es/', 0, 'job-b'),
+                                     Seed('https://www.tienda.com/otra', 3, 'job-c'), Seed('https://TIENDA.com/x', 2)])
+    # La semilla repetida del mismo host se descarta
+    assert spider.allowed_domains == ['tienda.com', 'taller.es', 'www.tienda.com']
+
+    start = list(spider.start_requests())
+    assert crawler.stats.get_value('batch/seeds') == 3
+    assert [(request.url, request.meta['seed']) for request in start] == [
+        ('https://tienda.com/', 'tienda.com'), ('https://taller.es/', 'taller.es'),
+        ('https://www.tienda.com/otra', 'www.tienda.com')]
+
+    links = ['/contacto', 'https://taller.es/contacto', 'https://www.tienda.com/equipo']
+    output = list(spider.parse(_page(start[0], links)))
+    item, followed = output[0], output[1:]
+    assert item['job_id'] == 'job-a'
+    # Solo el host de la semilla, aunque los otros dominios también estén permitidos
+    assert [(request.url, request.meta['seed'], request.meta['depth']) for request in followed] == [
+        ('https://tienda.com/contacto', 'tienda.com', 1)]
+
+    # Profundidad 1 agotada en la página enlazada; profundidad 0 en la portada de la otra semilla
+    child = Request(followed[0].url, meta={**followed[0].meta})
+    assert [type(entry).__name__ for entry in spider.parse(_page(child, ['/mas']))] == ['LeadItem']
+    other = list(spider.parse(_page(start[1], ['/contacto'])))
+    assert [entry['job_id'] for entry in other] == ['job-b']
+
+    assert crawler.stats.get_value('batch/items/job-a') == 2
+    assert crawler.stats.get_value('batch/items/job-b') == 1
+
+
+def test_queue_seeds_are_claimed_and_finished_together(tmp_path, monkeypatch):
+    """-a queue=N reclama jobs pendientes y al cerrar se marcan todos con un solo UPDATE."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    for index, domain in enumerate(['a.com', 'b.com', 'c.com']):
+        db.add(ScrapingQueue(job_id=f'job{index}', url=f'https://{domain}/', domain=domain, max_depth=index,
+                             status='pending'))
+    db.commit()
+    db.close()
+
+    dispatcher = JobDispatcher(session_factory=session_factory, lock_path=str(tmp_path / 'dispatch.lock'),
+                               max_active_jobs=0, max_jobs_per_domain=1)
+    monkeypatch.setattr(lead_spider, 'claim_queue_seeds', lambda limit: claim_queue_seeds(limit, dispatcher))
+    spider, _ = _spider(queue='2')
+    assert spider.claimed_jobs == ['job0', 'job1']
+    assert [(key, seed.depth) for key, seed in spider.seeds.items()] == [('a.com', 0), ('b.com', 1)]
+
+    db = session_factory()
+    db.query(ScrapingQueue).filter_by(job_id='job1').update({'status': 'cancelled'})
+    db.commit()
+    db.close()
+    assert finish_jobs(spider.claimed_jobs, 'completed', session_factory) == 1
+
+    db = session_factory()
+    assert {item.job_id: item.status for item in db.query(ScrapingQueue).all()} == {
+        'job0': 'completed', 'job1': 'cancelled', 'job2': 'pending'}
+    db.close()
+
+
+def test_batch_jobs_are_closed_with_their_own_status_and_items(tmp_path, monkeypatch):
+    """Cada job se cierra según su semilla; las semillas descartadas fallan sin crawlearse."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    for index, domain in enumerate(['a.com', 'b.com', 'c.com']):
+        db.add(ScrapingQueue(job_id=f'job{index}', url=f'https://{domain}/', domain=domain, max_depth=1,
+                             status='pending'))
+    db.commit()
+    db.close()
+
+    dispatcher = JobDispatcher(session_factory=session_factory, lock_path=str(tmp_path / 'dispatch.lock'),
+                               max_active_jobs=0, max_jobs_per_domain=1)
+    monkeypatch.setattr(lead_spider, 'claim_queue_seeds', lambda limit: claim_queue_seeds(limit, dispatcher))
+    # c.com ya llega en el fichero de semillas: su job reclamado se descarta
+    spider, _ = _spider(seeds=[Seed('https://c.com/otra', 1)], queue='3')
+    assert spider.claimed_jobs == ['job0', 'job1']
+    assert spider.rejected_jobs == ['job2']
+
+    # a.com responde con un lead; b.com no llega a responder
+    start = {request.meta['seed']: request for request in spider.start_requests()}
+    list(spider.parse(_page(start['a.com'], ['/contacto'])))
+    assert spider._batch_results() == {
+        'job0': {'status': 'completed', 'processed_items': 1},
+        'job1': {'status': 'failed', 'processed_items': 0},
+    }
+    assert record_batch_jobs(spider._batch_results(), session_factory) == 2
+    assert finish_jobs(spider.rejected_jobs, 'failed', session_factory) == 1
+
+    db = session_factory()
+    assert {item.job_id: (item.status, item.processed_items, item.progress)
+            for item in db.query(ScrapingQueue).all()} == {
+        'job0': ('completed', 1, 100), 'job1': ('failed', 0, 100), 'job2': ('failed', 0, 0)}
+    db.close()
+
+
+def test_batch_jobs_can_be_paused_resumed_and_cancelled(tmp_path):
+    """Pausar retiene las peticiones de la semilla, reanudar las vuelve a pedir y cancelar las descarta."""
+    spider, crawler = _spider(seeds=[Seed('https://a.com/', 1, 'job-a'), Seed('https://b.com/', 1, 'job-b')])
+    spider.claimed_jobs = ['job-a', 'job-b']
+    crawler.engine = SimpleNamespace(scheduled=[])
+    crawler.engine.crawl = crawler.engine.scheduled.append
+    middleware = JobControlMiddleware.from_crawler(crawler)
+    start = {request.meta['seed']: request for request in spider.start_requests()}
+
+    spider.control_batch_job('job-a', 'pause')
+    with pytest.raises(JobRequestHeld):
+        middleware.process_request(start['a.com'], spider)
+    # El resto del batch sigue
+    assert middleware.process_request(start['b.com'], spider) is None
+    assert spider.held_requests['job-a'] == [start['a.com']]
+    assert spider._batch_results() == {'job-b': {'status': 'failed', 'processed_items': 0}}
+
+    spider.control_batch_job('job-a', 'resume')
+    assert [(request.url, request.dont_filter) for request in crawler.engine.scheduled] == [('https://a.com/', True)]
+    assert middleware.process_request(crawler.engine.scheduled[0], spider) is None
+
+    spider.control_batch_job('job-b', 'cancel')
+    with pytest.raises(JobRequestHeld):
+        middleware.process_request(start['b.com'], spider)
+    assert 'job-b' not in spider.held_requests
+
+    # Al cerrar, un job pausado o cancelado desde la API conserva su estado
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    db.add_all([ScrapingQueue(job_id='job-a', url='https://a.com/', status='paused'),
+                ScrapingQueue(job_id='job-b', url='https://b.com/', status='processing')])
+    db.commit()
+    db.close()
+    results = {'job-a': {'status': 'completed'}, 'job-b': {'status': 'failed'}}
+    assert record_batch_jobs(results, session_factory) == 1
+    assert finish_jobs(['job-a', 'job-b'], 'pending', session_factory) == 1
+    db = session_factory()
+    assert {item.job_id: item.status for item in db.query(ScrapingQueue).all()} == {
+        'job-a': 'paused', 'job-b': 'pending'}
+    db.close()
@@ -0,0 +1,131 @@
+"""
+Tests para el descubrimiento de páginas de contacto con robots.txt y sitemaps.
+"""
+
+import gzip
+import sys
+import os
+from types import SimpleNamespace
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import Request, Response, TextResponse, XmlResponse
+from scrapy.utils.test import get_crawler
+
+from app.scraper.sitemaps import iter_sitemap, robots_sitemaps
+from app.scraper.spiders.lead_spider import LeadSpider
+
+
+def _spider(**settings):
+    """Spider con un motor falso que recoge las peticiones enviadas directamente."""
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'SITEMAP_SEEDING_ENABLED': True,
+                                                     **settings})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/')
+    crawler.stats.open_spider(spider)
+    crawler.engine = SimpleNamespace(scheduled=[])
+    crawler.engine.crawl = crawler.engine.scheduled.append
+    return spider, crawler
+
+_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _urlset(paths, host='https://tienda.com'):
+    entries = ''.join(f'<url><loc>{host}{path}</loc><lastmod>2024-01-01</lastmod></url>' for path in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {_NS}>{entries}</urlset>'.encode()
+
+
+def test_sitemap_parsing_handles_indexes_gzip_text_and_truncation():
+    """Índices, urlsets comprimidos, sitemaps de texto y sitemaps cortados a medias."""
+    robots = b'User-agent: *\nDisallow: /admin\nSitemap: https://tienda.com/sitemap_index.xml # principal\nsitemap:https://tienda.com/extra.xml\n'
+    assert robots_sitemaps(robots) == ['https://tienda.com/sitemap_index.xml', 'https://tienda.com/extra.xml']
+
+    index = (f'<sitemapindex {_NS}><sitemap><loc> https://tienda.com/paginas.xml.gz </loc></sitemap>'
+             f'<sitemap><loc>https://tienda.com/posts.xml</loc></sitemap></sitemapindex>').encode()
+    assert list(iter_sitemap(index)) == [('sitemap', 'https://tienda.com/paginas.xml.gz'),
+                                         ('sitemap', 'https://tienda.com/posts.xml')]
+
+    compressed = gzip.compress(_urlset(['/', '/contacto']))
+    assert list(iter_sitemap(compressed)) == [('url', 'https://tienda.com/'), ('url', 'https://tienda.com/contacto')]
+
+    assert list(iter_sitemap(b'https://tienda.com/a\n\nhttps://tienda.com/b\n')) == [
+        ('url', 'https://tienda.com/a'), ('url', 'https://tienda.com/b')]
+
+    # Truncado: se entregan las URLs completas leídas antes del corte
+    body = _urlset([f'/p/{index}' for index in range(100)])
+    truncated = list(iter_sitemap(body[:len(body) // 2]))
+    assert 10 < len(truncated) < 100
+    assert truncated[0] == ('url', 'https://tienda.com/p/0')
+    truncated_gzip = list(iter_sitemap(gzip.compress(body)[:200]))
+    assert len(truncated_gzip) < 100
+
+
+def test_spider_seeds_contact_pages_from_sitemaps():
+    """robots.txt -> índice -> urlset: solo las URLs de contacto se piden, a profundidad 1 y antes que la portada."""
+    spider, crawler = _spider(SITEMAP_MAX_SEEDS=2)
+
+    # La URL inicial espera al descubrimiento
+    start = list(spider.start_requests())
+    assert [request.url for request in start] == ['https://tienda.com/robots.txt']
+    robots_request = start[0]
+    assert robots_request.priority > 200
+
+    robots = TextResponse(robots_request.url, body=b'Sitemap: https://tienda.com/index.xml\nSitemap: https://cdn.com/x.xml\n',
+                          request=robots_request)
+    sitemap_requests = list(spider.parse_robots(robots))
+    assert [request.url for request in sitemap_requests] == ['https://tienda.com/index.xml']
+
+    index = XmlResponse('https://tienda.com/index.xml', request=sitemap_requests[0], body=(
+        f'<sitemapindex {_NS}><sitemap><loc>https://tienda.com/paginas.xml.gz</loc></sitemap>'
+        f'<sitemap><loc>https://tienda.com/index.xml</loc></sitemap></sitemapindex>').encode())
+    nested = list(spider.parse_sitemap(index))
+    assert [request.url for request in nested] == ['https://tienda.com/paginas.xml.gz']
+
+    paths = [f'/blog/post-{index}' for index in range(500)] + ['/', '/contacto/', '/equipo/ana?utm_source=x',
+                                                                '/wp-admin/contact', '/quienes-somos']
+    body = gzip.compress(_urlset(paths))
+    urlset = Response('https://tienda.com/paginas.xml.gz', body=body, request=nested[0])
+    seeds = list(spider.parse_sitemap(urlset))
+    # Con el último sitemap pendiente se pide la portada, después de las semillas y a profundidad 0
+    assert [(request.url, request.meta['depth']) for request in crawler.engine.scheduled] == [
+        ('https://tienda.com/', 0)]
+
+    # Las dos mejores URLs de contacto (ruta de contacto: misma puntuación, primero las del principio)
+    assert [request.url for request in seeds] == ['https://tienda.com/contacto/', 'https://tienda.com/equipo/ana']
+    assert all(request.meta['depth'] == 1 and request.callback == spider.parse for request in seeds)
+    assert crawler.stats.get_value('sitemap/seeded') == 2
+    assert crawler.stats.get_value('sitemap/urls_scanned') == 505
+
+    # Presupuesto agotado: otro sitemap ya no siembra nada
+    more = Response('https://tienda.com/mas.xml', body=_urlset(['/legal']), request=Request('https://tienda.com/mas.xml'))
+    assert list(spider.parse_sitemap(more)) == []
+    # La portada se pide una sola vez
+    spider._on_spider_idle(spider)
+    assert len(crawler.engine.scheduled) == 1
+
+
+def test_missing_sitemaps_fall_back_and_release_start_url():
+    """Sin sitemaps en robots.txt se prueba /sitemap.xml; si tampoco existe, se pide la portada."""
+    spider, crawler = _spider()
+    robots_request = next(iter(spider.start_requests()))
+    robots = TextResponse(robots_request.url, body=b'User-agent: *\nDisallow:\n', request=robots_request)
+    fallback = list(spider.parse_robots(robots))
+    assert [request.url for request in fallback] == ['https://tienda.com/sitemap.xml']
+    assert crawler.engine.scheduled == []
+
+    spider._handle_sitemap_error(SimpleNamespace(request=fallback[0], getErrorMessage=lambda: '404'))
+    assert [request.url for request in crawler.engine.scheduled] == ['https://tienda.com/']
+
+    # Si el descubrimiento se queda colgado, el spider inactivo pide la portada
+    stalled, stalled_crawler = _spider()
+    list(stalled.start_requests())
+    with pytest.raises(DontCloseSpider):
+        stalled._on_spider_idle(stalled)
+    assert [request.url for request in stalled_crawler.engine.scheduled] == ['https://tienda.com/']
+
+    # Desactivado por defecto fuera de la configuración del proyecto
+    plain = LeadSpider.from_crawler(get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False}),
+                                    start_url='https://tienda.com/')
+    assert [request.url for request in plain.start_requests()] == ['https://tienda.com/']
@@ -0,0 +1,94 @@
+"""
+Tests para el ejecutor de E/S de base de datos del scraper.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from twisted.internet import defer
+
+from app.scraper.storage import OrderedWriter, StorageExecutor
+
+
+class _ManualPoolExecutor(StorageExecutor):
+    """Ejecutor cuyas tareas terminan solo cuando el test lo indica."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = []
+
+    def _use_threads(self):
+        return True
+
+    def call_in_reactor(self, fn, *args, **kwargs):
+        return defer.maybeDeferred(fn, *args, **kwargs)
+
+    def _defer_to_pool(self, fn, *args):
+        d = defer.Deferred()
+        self.started.append((d, fn, args))
+        return d
+
+    def finish(self, index=0):
+        d, fn, args = self.started.pop(index)
+        d.callback(fn(*args))
+
+
+def test_runs_synchronously_without_reactor():
+    """Sin reactor en marcha las tareas se ejecutan en el acto y se miden."""
+    executor = StorageExecutor()
+    results = []
+
+    executor.submit(lambda x: x * 2, 21).addCallback(results.append)
+    failed = executor.submit(lambda: 1 / 0)
+    failed.addErrback(lambda failure: results.append(failure.type))
+
+    assert results == [42, ZeroDivisionError]
+    metrics = executor.metrics()
+    assert metrics['submitted'] == 2
+    assert metrics['completed'] == 1
+    assert metrics['failed'] == 1
+    assert metrics['queue_depth'] == 0
+
+
+def test_backpressure_queues_tasks_beyond_max_pending():
+    """Por encima de max_pending las tareas esperan hueco y la cola se refleja en las métricas."""
+    executor = _ManualPoolExecutor(max_pending=2)
+    results = []
+    for value in range(4):
+        executor.submit(lambda v=value: v).addCallback(results.append)
+
+    assert len(executor.started) == 2
+    metrics = executor.metrics()
+    assert metrics['queue_depth'] == 4
+    assert metrics['waiting'] == 2
+    assert metrics['backpressure_waits'] == 2
+
+    drained = []
+    executor.drain().addCallback(drained.append)
+    executor.finish()
+    assert len(executor.started) == 2  # La tarea en espera ocupa el hueco liberado
+    while executor.started:
+        executor.finish()
+
+    assert results == [0, 1, 2, 3]
+    assert drained == [None]
+    assert executor.metrics()['max_queue_depth'] == 4
+
+
+def test_ordered_writer_runs_one_write_at_a_time():
+    """Las escrituras de un mismo componente no se solapan y respetan el orden de envío."""
+    executor = _ManualPoolExecutor(max_pending=10)
+    writer = OrderedWriter(executor)
+    order = []
+
+    writer.submit(order.append, 'primera')
+    writer.submit(order.append, 'segunda')
+    assert len(executor.started) == 1
+
+    executor.finish()
+    assert len(executor.started) == 1
+    executor.finish()
+    assert order == ['primera', 'segunda']
@@ -0,0 +1,125 @@
+"""
+Tests para la telemetría del crawl por dominio (contadores e histogramas).
+"""
+
+import sys
+import os
+import asyncio
+import json
+import logging
+import random
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from app.api.advanced_stats import get_crawl_telemetry
+from app.database.models import Base, ScrapingStats
+from app.scraper.middlewares import MonitoringMiddleware
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.telemetry import Histogram, TelemetryRegistry
+
+
+def test_histogram_percentiles_within_bucket_precision():
+    """Los percentiles de las cubetas quedan a menos de un 7% de los exactos."""
+    rng = random.Random(5)
+    values = [int(rng.lognormvariate(5, 1.2)) for _ in range(5000)]
+    histogram = Histogram(1 << 20)
+    for value in values:
+        histogram.record(value)
+
+    ordered = sorted(values)
+    for fraction in (0.5, 0.9, 0.99):
+        exact = ordered[int(round(fraction * len(ordered))) - 1]
+        assert abs(histogram.percentile(fraction) - exact) <= max(1, exact * 0.07)
+    assert histogram.count == len(values)
+    assert histogram.min == min(values) and histogram.max == max(values)
+    assert abs(histogram.mean - sum(values) / len(values)) < 1e-6
+
+    # Valores pequeños exactos, fuera de rango acotados
+    small = Histogram(100)
+    for value in (0, 3, 3, 31, -5, 10 ** 9):
+        small.record(value)
+    assert small.percentile(0.5) == 3
+    assert small.max == 100 and small.min == 0
+
+    other = Histogram(1 << 20)
+    other.record(10 ** 6)
+    histogram.merge(other)
+    assert histogram.count == len(values) + 1
+    assert histogram.max == 10 ** 6
+
+
+def test_registry_snapshot_per_domain():
+    """El registro agrupa por dominio y suma los totales en la instantánea."""
+    registry = TelemetryRegistry()
+    for latency in (100, 200, 300):
+        registry.record_request('a.com')
+        registry.record_response('a.com', 200, latency, 1000)
+    registry.record_request('b.com')
+    registry.record_response('b.com', 404, 50.7, 10)
+    registry.record_exception('b.com')
+    registry.record_response('b.com', 999, 0, 0)
+
+    snapshot = registry.snapshot()
+    a = snapshot['domains']['a.com']
+    assert a['requests'] == 3 and a['responses'] == 3 and a['errors'] == 0
+    assert a['status'] == {'200': 3}
+    # Límite superior de la cubeta de 200 (200-207)
+    assert 200 <= a['latency_ms']['p50'] <= 207 and a['latency_ms']['max'] == 300
+    assert a['size_bytes']['mean'] == 1000
+    assert snapshot['domains']['b.com']['status'] == {'404': 1, '0': 1}
+    assert snapshot['totals']['responses'] == 5
+    assert snapshot['totals']['status'] == {'0': 1, '200': 3, '404': 1}
+    assert list(registry.snapshot('b.com')['domains']) == ['b.com']
+    # La instantánea es serializable
+    json.dumps(snapshot)
+
+
+def test_monitoring_middleware_records_and_saves_snapshot(caplog):
+    """El middleware registra sin loguear las respuestas correctas y guarda la instantánea."""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'DB_LOG_ENABLED': False})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://empresa.com/', job_id='job-telemetria')
+    middleware = MonitoringMiddleware(crawler)
+    middleware.db_engine = engine
+
+    caplog.set_level(logging.INFO, logger='app.scraper.middlewares')
+    for index, status in enumerate((200, 200, 500)):
+        request = Request(f'https://empresa.com/pagina{index}', meta={'download_latency': 0.25})
+        middleware.process_request(request, spider)
+        response = HtmlResponse(url=request.url, status=status, body=b'<html></html>', request=request)
+        assert middleware.process_response(request, response, spider) is response
+    middleware.process_exception(Request('https://otra.com/'), TimeoutError(), spider)
+
+    # Solo la respuesta 500 genera un log
+    assert [record.levelno for record in caplog.records
+            if record.name == 'app.scraper.middlewares'] == [logging.WARNING]
+
+    domain = middleware.telemetry.snapshot()['domains']['empresa.com']
+    assert domain['status'] == {'200': 2, '500': 1}
+    assert domain['latency_ms']['p50'] == 250
+    assert middleware.telemetry.domains['otra.com'].errors == 1
+
+    middleware.save_snapshot(spider, final=True)
+    session = sessionmaker(bind=engine)()
+    try:
+        stats = session.query(ScrapingStats).one()
+        assert json.loads(stats.domain_stats)['domains']['empresa.com']['responses'] == 3
+        assert json.loads(stats.extra_metadata)['job_id'] == 'job-telemetria'
+        assert round(stats.success_rate) == 50
+
+        # La API devuelve la última instantánea, filtrada por dominio
+        snapshots = asyncio.run(get_crawl_telemetry(session_id=None, domain='otra.com', limit=10, db=session))
+        assert len(snapshots) == 1
+        assert snapshots[0]['final'] is True
+        assert list(snapshots[0]['domains']) == ['otra.com']
+        assert snapshots[0]['totals']['errors'] == 1
+    finally:
+        session.close()
@@ -0,0 +1,78 @@
+"""
+Tests para la detección de trampas de crawling por plantilla de URL.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.traps import TrapDetector, url_template
+
+
+def test_url_template_groups_trap_urls():
+    """Números, fechas, ids y valores de parámetros se sustituyen por marcadores."""
+    assert url_template('https://tienda.com/agenda/2024-05-12/?vista=mes&dia=3') == \
+        url_template('https://tienda.com/agenda/2025-01-30?dia=9&vista=semana') == \
+        'tienda.com/agenda/{date}?dia={v}&vista={v}'
+    assert url_template('https://tienda.com/blog/page/7/') == 'tienda.com/blog/page/{n}'
+    assert url_template('https://tienda.com/pedido/3f2a9c8e7d6b5a4f3e2d1c0b') == 'tienda.com/pedido/{id}'
+    # Filtros que se acumulan y rutas que se repiten no generan plantillas nuevas
+    assert url_template('https://tienda.com/ropa?talla=m&talla=l&talla=xl') == 'tienda.com/ropa?talla={v}'
+    assert url_template('https://tienda.com/a/b/b/b') == 'tienda.com/a/b'
+    # Las páginas con nombre propio son su propia plantilla
+    assert url_template('https://tienda.com/contacto') != url_template('https://tienda.com/nosotros')
+
+
+def test_budget_and_patience():
+    """Las páginas con emails nuevos devuelven su descarga; las rachas sin emails podan la plantilla."""
+    detector = TrapDetector(budget=3, patience=0)
+    for _ in range(3):
+        assert detector.allow('t.com/p/{n}')
+    detector.record('t.com/p/{n}', new_emails=2)
+    assert detector.allow('t.com/p/{n}')
+    assert not detector.allow('t.com/p/{n}')
+    assert not detector.allow('t.com/p/{n}')
+    assert detector.pruned == {'t.com/p/{n}': 2}
+
+    detector = TrapDetector(budget=0, patience=3)
+    assert not detector.record('t.com/cal/{n}', 0)
+    assert not detector.record('t.com/cal/{n}', 0)
+    assert detector.record('t.com/cal/{n}', 0)
+    assert not detector.allow('t.com/cal/{n}')
+    assert detector.allow('t.com/contacto')
+
+
+def test_spider_stops_following_fruitless_templates():
+    """Un calendario sin emails se poda y los enlaces descartados quedan en las estadísticas del job."""
+    crawler = get_crawler(LeadSpider, settings_dict={
+        'DEDUPE_PERSISTENT': False, 'TRAP_TEMPLATE_BUDGET': 0, 'TRAP_TEMPLATE_PATIENCE': 2,
+    })
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/')
+    crawler.stats.open_spider(spider)
+
+    def crawl(url, template, day):
+        body = (f'<html><body><p>{"texto " * 30}</p>'
+                f'<a href="/agenda/2024-05-{day:02d}">siguiente</a>'
+                f'<a href="/agenda/2024-06-{day:02d}?vista=mes">mes</a>'
+                f'<a href="/contacto">contacto</a></body></html>')
+        response = HtmlResponse(url, body=body.encode(), headers={'Content-Type': 'text/html'},
+                                request=Request(url, meta={'depth': 0, 'url_template': template}))
+        return sorted(request.url for request in spider.parse(response) if isinstance(request, Request))
+
+    assert crawl('https://tienda.com/agenda/2024-01-01', 'tienda.com/agenda/{date}', 1) == [
+        'https://tienda.com/agenda/2024-05-01', 'https://tienda.com/agenda/2024-06-01?vista=mes',
+        'https://tienda.com/contacto',
+    ]
+    # Segunda página de la plantilla sin emails: queda podada y sus enlaces ya no se siguen
+    assert crawl('https://tienda.com/agenda/2024-05-01', 'tienda.com/agenda/{date}', 2) == [
+        'https://tienda.com/agenda/2024-06-02?vista=mes',
+    ]
+    assert crawler.stats.get_value('traps/templates_pruned') == 1
+    assert crawler.stats.get_value('traps/links_pruned') == 1
+    assert crawler.stats.get_value('traps/pruned/tienda.com/agenda/{date}') == 1
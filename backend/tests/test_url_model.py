@@ -0,0 +1,122 @@
+"""
+Tests para el modelo de rendimiento de URLs y su uso en el spider.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, CrawlOutcome
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.url_model import UrlYieldModel, save_crawl_outcomes, train_from_database, url_features
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'model.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _populate(session):
+    """Descargas anteriores: contacto y equipo con emails, blog y productos sin ellos."""
+    for site in range(8):
+        host = f'https://empresa{site}.com'
+        pages = [(f'{host}/contacto', 'Contacto', 1, 2), (f'{host}/equipo/{site}', 'Nuestro equipo', 2, 1)]
+        pages += [(f'{host}/blog/post-{index}', f'Noticia {index}', 2, 0) for index in range(6)]
+        pages += [(f'{host}/productos/{index}?color=rojo', 'Producto', 3, 0) for index in range(4)]
+        for url, anchor_text, depth, emails in pages:
+            session.add(CrawlOutcome(url=url, domain=host[8:], depth_level=depth, anchor_text=anchor_text,
+                                     email_count=emails, http_status=200))
+    session.add(CrawlOutcome(url='https://caida.com/contacto', domain='caida.com', anchor_text='Contacto',
+                             email_count=0, http_status=500))
+    session.commit()
+
+
+def test_model_learns_yielding_paths_from_database(tmp_path):
+    """Las rutas de contacto puntúan por encima de blog y productos; el modelo se guarda y se recarga."""
+    session = _session(tmp_path)
+    _populate(session)
+
+    model, evaluation = train_from_database(session, min_count=2, holdout=0.25)
+    # Las páginas con error no cuentan
+    assert model.examples == 96
+    assert model.positives == 16
+    assert evaluation['pages'] == 24
+
+    contact = model.predict(url_features('https://nueva.com/contacto/', 1, 'Contacto'))
+    team = model.predict(url_features('https://nueva.com/equipo/ana', 2))
+    post = model.predict(url_features('https://nueva.com/blog/post-99', 2, 'Leer más'))
+    product = model.predict(url_features('https://nueva.com/productos/7?color=azul', 3))
+    assert contact > 0.9
+    assert team > post
+    assert post < 0.05 and product < 0.05
+
+    path = str(tmp_path / 'model.json')
+    model.save(path)
+    assert UrlYieldModel.load(path).predict(url_features('https://nueva.com/contacto/', 1, 'Contacto')) == contact
+    session.close()
+
+
+def test_spider_prunes_and_prioritizes_with_model(tmp_path):
+    """Los enlaces de bajo rendimiento se podan salvo los de contacto; el resto gana prioridad."""
+    session = _session(tmp_path)
+    _populate(session)
+    model, _ = train_from_database(session)
+    session.close()
+
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://nueva.com/')
+    crawler.stats.open_spider(spider)
+    assert spider.yield_model is None
+    spider.yield_model = model
+
+    body = ('<html><body><p>' + 'texto ' * 30 + '</p><a href="/blog/post-1">Noticia</a>'
+            '<a href="/productos/3?color=azul">Producto</a><a href="/equipo/luis">Luis</a>'
+            '<a href="/blog/contacto-prensa">Contacto de prensa</a></body></html>')
+    response = HtmlResponse('https://nueva.com/', body=body.encode(), headers={'Content-Type': 'text/html'},
+                            request=Request('https://nueva.com/', meta={'depth': 0}))
+    requests = [request for request in spider.parse(response) if isinstance(request, Request)]
+
+    assert [request.url for request in requests] == [
+        'https://nueva.com/blog/contacto-prensa', 'https://nueva.com/equipo/luis',
+    ]
+    assert crawler.stats.get_value('url_model/links_pruned') == 2
+
+
+def test_spider_records_every_fetch_for_training(tmp_path):
+    """Cada descarga queda registrada con su texto de enlace, también las páginas sin emails."""
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False, 'CRAWL_LOG_ENABLED': True})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://nueva.com/', job_id='job-1')
+    crawler.stats.open_spider(spider)
+
+    body = ('<html><body><p>' + 'texto ' * 30 + '</p><a href="/equipo/?utm_source=menu">Nuestro equipo</a>'
+            '</body></html>')
+    home = HtmlResponse('https://nueva.com/', body=body.encode(), headers={'Content-Type': 'text/html'},
+                        request=Request('https://nueva.com/', meta={'depth': 0}))
+    link = next(request for request in spider.parse(home) if isinstance(request, Request))
+    team = HtmlResponse(link.url, body=body.replace('texto', 'ana@nueva.com texto', 1).encode(),
+                        headers={'Content-Type': 'text/html'}, request=link)
+    list(spider.parse(team))
+    missing = Request('https://nueva.com/antigua', meta={'depth': 1, 'anchor_text': 'Antigua'})
+    list(spider.parse(HtmlResponse(missing.url, status=404, body=b'', request=missing)))
+
+    assert [(row['url'], row['anchor_text'], row['email_count'], row['http_status']) for row in spider.crawl_log] == [
+        ('https://nueva.com/', None, 0, 200),
+        ('https://nueva.com/equipo/', 'Nuestro equipo', 1, 200),
+        ('https://nueva.com/antigua', 'Antigua', 0, 404),
+    ]
+    assert spider.crawl_log[1]['source_url'] == 'https://nueva.com/' and spider.crawl_log[1]['job_id'] == 'job-1'
+
+    # Guardados por lotes y usados como ejemplos (los errores HTTP no cuentan)
+    session = _session(tmp_path)
+    save_crawl_outcomes(spider.crawl_log, sessionmaker(bind=session.get_bind()))
+    model, _ = train_from_database(session, min_count=1)
+    assert (model.examples, model.positives) == (2, 1)
+    session.close()
@@ -0,0 +1,85 @@
+"""
+Tests para la canonicalización de URLs y el filtrado de enlaces repetidos del spider.
+"""
+
+import sys
+import os
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from app.scraper.spiders.lead_spider import LeadSpider
+from app.scraper.urls import UrlCanonicalizer, canonicalize_url
+
+
+def test_variants_share_canonical_url():
+    """Barra final, puerto por defecto, mayúsculas, seguimiento, sesión y orden de parámetros."""
+    variants = [
+        'https://tienda.com/productos/?b=2&a=1',
+        'HTTPS://Tienda.COM:443/productos?a=1&b=2#reseñas',
+        'https://tienda.com/productos/?a=1&utm_source=news&b=2&fbclid=XYZ',
+        'https://tienda.com/productos;jsessionid=ABC123?PHPSESSID=9f&a=1&b=2',
+        'https://tienda.com/%70roductos?a=1&b=2',
+    ]
+    assert {canonicalize_url(url) for url in variants} == {'https://tienda.com/productos?a=1&b=2'}
+    assert canonicalize_url('http://tienda.com:80') == 'http://tienda.com/'
+    # Otro puerto u otra ruta son otra página; los escapes reservados se conservan en mayúsculas
+    assert canonicalize_url('http://tienda.com:8080/a') == 'http://tienda.com:8080/a'
+    assert canonicalize_url('https://tienda.com/a%2fb') == 'https://tienda.com/a%2Fb'
+
+    # La URL que se descarga conserva la ruta y el orden de los parámetros
+    canonicalizer = UrlCanonicalizer(['utm_*', 'ref'])
+    assert canonicalizer.clean('https://Tienda.com/blog/?z=1&REF=home&a=2#top') == 'https://tienda.com/blog/?z=1&a=2'
+    assert canonicalizer.clean('https://tienda.com/?sid=1') == 'https://tienda.com/?sid=1'
+
+
+def test_spider_follows_each_canonical_page_once():
+    """Las variantes de un enlace se piden una vez; ``rel=canonical`` se guarda aparte de la URL del lead."""
+    crawler = get_crawler(LeadSpider, settings_dict={'DEDUPE_PERSISTENT': False})
+    spider = LeadSpider.from_crawler(crawler, start_url='https://tienda.com/')
+    crawler.stats.open_spider(spider)
+    list(spider.start_requests())
+
+    body = """
+    <html><head><title>Zapatillas rojas</title>
+      <link rel="Canonical" href="/zapatillas/?talla=42&color=rojo">
+    </head><body>
+      <p>Contacto: ventas@tienda.com</p>
+      <a href="/contacto/">Contacto</a>
+      <a href="/contacto?utm_source=footer">Contacto</a>
+      <a href="https://TIENDA.com:443/contacto#formulario">Contacto</a>
+      <a href="/zapatillas?color=rojo&talla=42">Zapatillas</a>
+      <a href="/">Inicio</a>
+      <a href="https://otro.com/contacto">Fuera</a>
+    </body></html>
+    """
+    url = 'https://tienda.com/zapatillas?talla=42&color=rojo&fbclid=abc'
+    response = HtmlResponse(url, body=body.encode(), headers={'Content-Type': 'text/html'},
+                            request=Request(url, meta={'depth': 0}))
+
+    item = spider.extract_lead_info(response, 0, None)
+    assert item['url'] == 'https://tienda.com/zapatillas?color=rojo&talla=42'
+    assert item['canonical_url'] == 'https://tienda.com/zapatillas?color=rojo&talla=42'
+
+    # El enlace con fragmento lo descarta BLOCKED_URL_PATTERNS; la página actual y la portada ya se pidieron
+    requests = list(spider.parse(response))
+    followed = [request.url for request in requests if isinstance(request, Request)]
+    assert followed == ['https://tienda.com/contacto/']
+    assert crawler.stats.get_value('urls/duplicate_skipped') == 3
+
+    # rel=canonical a otro host no se respeta
+    foreign = HtmlResponse('https://tienda.com/oferta', body=body.replace('/zapatillas/', 'https://otro.com/z/').encode(),
+                           headers={'Content-Type': 'text/html'}, request=Request('https://tienda.com/oferta'))
+    assert spider.extract_lead_info(foreign, 0, None)['url'] == 'https://tienda.com/oferta'
+    assert spider.extract_lead_info(foreign, 0, None)['canonical_url'] is None
+
+    # Una canónica que apunta a la portada no sustituye a la página (ni se marca como pedida)
+    home = body.replace('/zapatillas/?talla=42&color=rojo', '/')
+    equipo = HtmlResponse('https://tienda.com/equipo', body=home.encode(), headers={'Content-Type': 'text/html'},
+                          request=Request('https://tienda.com/equipo', meta={'depth': 0}))
+    item = next(result for result in spider.parse(equipo) if not isinstance(result, Request))
+    assert (item['url'], item['canonical_url']) == ('https://tienda.com/equipo', 'https://tienda.com/')
+    assert item['emails'] == ['ventas@tienda.com']
@@ -0,0 +1,160 @@
+"""
+Tests para el pool de workers de scraping y su despachador de jobs.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Añadir el directorio backend al path para resolver importaciones
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, ScrapingQueue
+from app.scraper.dispatcher import JobDispatcher, registered_domain
+from app.scraper.domain_health import DomainHealthStore
+from app.scraper.worker import finish_job, heartbeat_jobs
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'worker.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _add_jobs(session_factory, jobs):
+    """Crea jobs a partir de tuplas (status, domain, priority)."""
+    db = session_factory()
+    for index, (status, domain, priority) in enumerate(jobs):
+        db.add(ScrapingQueue(
+            job_id=f"job{index}",
+            url=f"https://{domain}/pagina{index}",
+            domain=domain,
+            priority=priority,
+            max_depth=2,
+            status=status
+        ))
+    db.commit()
+    db.close()
+
+
+def _statuses(session_factory):
+    db = session_factory()
+    statuses = {item.job_id: item.status for item in db.query(ScrapingQueue).all()}
+    db.close()
+    return statuses
+
+
+def _dispatcher(session_factory, tmp_path, **kwargs):
+    return JobDispatcher(session_factory=session_factory, lock_path=str(tmp_path / 'dispatch.lock'), **kwargs)
+
+
+def test_registered_domain():
+    """Verifica la obtención del dominio registrado."""
+    assert registered_domain("https://www.tienda.com.mx/contacto") == "tienda.com.mx"
+    assert registered_domain("https://blog.empresa.es/") == "empresa.es"
+    assert registered_domain("http://127.0.0.1:8000/x") == "127.0.0.1"
+
+
+def test_claim_marks_pending_jobs_as_processing(tmp_path):
+    """Solo se reclaman jobs pendientes y cada job se reclama una única vez."""
+    session_factory = _session_factory(tmp_path)
+    _add_jobs(session_factory, [
+        ("pending", "a.com", 0), ("paused", "b.com", 0), ("pending", "c.com", 0), ("pending", "d.com", 0)
+    ])
+    dispatcher = _dispatcher(session_factory, tmp_path, max_active_jobs=0, max_jobs_per_domain=0)
+
+    first = dispatcher.claim(2)
+    second = dispatcher.claim(5)
+
+    assert [job['job_id'] for job in first] == ["job0", "job2"]
+    assert [job['job_id'] for job in second] == ["job3"]
+    assert first[0]['max_depth'] == 2 and first[0]['recrawl'] is False
+    assert dispatcher.claim(5) == []
+    assert _statuses(session_factory) == {
+        "job0": "processing", "job1": "paused", "job2": "processing", "job3": "processing"
+    }
+
+
+def test_claim_honors_priority_and_limits(tmp_path):
+    """La prioridad manda y se respetan los límites global y por dominio."""
+    session_factory = _session_factory(tmp_path)
+    _add_jobs(session_factory, [
+        ("processing", "grande.com", 0),
+        ("pending", "grande.com", 0),
+        ("pending", "grande.com", 5),
+        ("pending", "pequeno.com", 0),
+        ("pending", "otro.com", 9),
+    ])
+    dispatcher = _dispatcher(session_factory, tmp_path, max_active_jobs=3, max_jobs_per_domain=2)
+
+    claimed = [job['job_id'] for job in dispatcher.claim(10)]
+
+    # Límite global 3 con 1 activo: 2 huecos para los jobs de mayor prioridad
+    assert claimed == ["job4", "job2"]
+    # grande.com ya tiene 2 activos: su job restante no se puede reclamar
+    dispatcher.max_active_jobs = 10
+    assert [job['job_id'] for job in dispatcher.claim(10)] == ["job3"]
+
+
+def test_claim_skips_hosts_with_open_circuit(tmp_path):
+    """Los jobs de hosts con el circuito abierto se quedan pendientes."""
+    session_factory = _session_factory(tmp_path)
+    _add_jobs(session_factory, [("pending", "caido.com", 9), ("pending", "sano.com", 0)])
+    health = DomainHealthStore()
+    health.trip("caido.com", 600)
+    dispatcher = _dispatcher(session_factory, tmp_path, max_active_jobs=0, max_jobs_per_domain=0, health=health)
+
+    assert [job['job_id'] for job in dispatcher.claim(5)] == ["job1"]
+    assert _statuses(session_factory) == {"job0": "pending", "job1": "processing"}
+
+
+def test_select_round_robins_between_domains():
+    """Un dominio con muchos jobs antiguos no acapara los huecos."""
+    dispatcher = JobDispatcher(max_active_jobs=0, max_jobs_per_domain=0, lock_path='/dev/null')
+    candidates = [
+        {'id': index, 'domain': 'grande.com', 'priority': 0} for index in range(6)
+    ] + [
+        {'id': 10, 'domain': 'b.com', 'priority': 0},
+        {'id': 11, 'domain': 'c.com', 'priority': 0},
+    ]
+
+    selected = dispatcher.select(candidates, {}, 4)
+
+    assert [job['domain'] for job in selected] == ['grande.com', 'b.com', 'c.com', 'grande.com']
+
+
+def test_finish_job_keeps_cancelled_status(tmp_path):
+    """Un job cancelado desde la API no pasa a 'completed' al terminar el spider."""
+    session_factory = _session_factory(tmp_path)
+    _add_jobs(session_factory, [("processing", "a.com", 0), ("cancelled", "b.com", 0)])
+
+    finish_job("job0", "completed", session_factory)
+    finish_job("job1", "completed", session_factory)
+
+    assert _statuses(session_factory) == {"job0": "completed", "job1": "cancelled"}
+
+
+def test_expired_claims_are_requeued(tmp_path):
+    """Un job en 'processing' sin latido durante el lease vuelve a la cola y se reclama de nuevo."""
+    session_factory = _session_factory(tmp_path)
+    _add_jobs(session_factory, [("processing", "a.com", 0), ("processing", "b.com", 0), ("paused", "c.com", 0)])
+    db = session_factory()
+    db.query(ScrapingQueue).update({ScrapingQueue.updated_at: datetime.utcnow() - timedelta(hours=1)})
+    db.commit()
+    db.close()
+
+    # El worker vivo renueva su job; el del worker muerto caduca
+    assert heartbeat_jobs(["job0", "job2"], session_factory) == 1
+    dispatcher = _dispatcher(session_factory, tmp_path, max_active_jobs=0, max_jobs_per_domain=0, lease_seconds=300)
+    assert [job['job_id'] for job in dispatcher.claim(5)] == ["job1"]
+    assert _statuses(session_factory) == {"job0": "processing", "job1": "processing", "job2": "paused"}
+
+    # Sin lease no se reencola nada
+    db = session_factory()
+    db.query(ScrapingQueue).update({ScrapingQueue.updated_at: datetime.utcnow() - timedelta(hours=1)})
+    db.commit()
+    db.close()
+    assert _dispatcher(session_factory, tmp_path, max_active_jobs=0, max_jobs_per_domain=0).claim(5) == []